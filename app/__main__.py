@@ -0,0 +1,7 @@
+"""``python -m app`` エントリーポイント（実体は app/cli.py）。"""
+
+import sys
+
+from app.cli import main
+
+sys.exit(main())
@@ -8,36 +8,76 @@ This script **does not call any J‑Quants API**. All inputs are local CSV／pic
 files generated by the upstream ETL step (``generate_price_csv.py`` and
 ``make_premium_pickle.py``). Therefore refresh／ID tokens are **not acquired**
 any more.
+
+Chunked mode (``python -m app derive --chunked``) keeps peak memory bounded by
+the partition size instead of the history length:
+
+1. the raw CSV is streamed once and split into code partitions
+   (``partition_codes`` codes each, full history per code so rolling windows
+   stay correct) under a temporary directory next to the output;
+2. each partition is derived independently, optionally in parallel
+   (``n_jobs``);
+3. partition outputs are concatenated into ``DERIVED_CSV`` (code-major order)
+   and, with ``to_db``, upserted into the ``features`` table one partition at
+   a time.
 """
 from __future__ import annotations
 
+import os
+import shutil
+import tempfile
+from logging import Logger
 from pathlib import Path
 
 import numpy as np
 import pandas as pd
 
-from app.core.config import load_config
+from app.core.config import get_config
 from app.core.logger import setup_logger
+from app.core.profiling import Profiler, get_profiler, span
+from app.backtest.nk225_gap import NK225_CSV, update_nk225_gap_from_pickle
+from app.utils.kernels import group_order, rolling_mean
 
 # -----------------------------------------------------------------------------
 # Constants & paths
 # -----------------------------------------------------------------------------
 RAW_CSV = Path("backtest_data/price_ohlcv.csv")
 DERIVED_CSV = Path("backtest_data/price_ohlcv_derived.csv")
-NK225_CSV = Path("backtest_data/nk225_gap.csv")  # produced elsewhere
+
+PARTITION_CODES = 500          # codes per partition in chunked mode
+READ_CHUNK_ROWS = 250_000      # rows per read while splitting the raw CSV
 
 
 # -----------------------------------------------------------------------------
 # Helper functions
 # -----------------------------------------------------------------------------
 
+def _rolling_mean(df: pd.DataFrame, col: str, window: int, groups: tuple,
+                  min_periods: int | None = None) -> np.ndarray:
+    """Per-code rolling mean aligned to ``df`` rows (rows of a code must be in date order).
+
+    ``groups`` is ``kernels.group_order(df["Code"])``; the window runs on the
+    code-contiguous copy and is scattered back to the original row order.
+    """
+    order, starts, valid = groups
+    out = np.full(len(df), np.nan)
+    res = rolling_mean(df[col].to_numpy(dtype=np.float64)[order], starts, window, min_periods)
+    out[order[valid]] = res[valid]      # rows without a code stay NaN (as with groupby)
+    return out
+
+
 def add_derived_cols(df: pd.DataFrame) -> pd.DataFrame:
     """Return a DataFrame with derived indicators.
 
+    Every window / shift is computed per ``Code``, so the input may be in any
+    row order as long as each code's rows are in ascending date order
+    (``price_ohlcv.csv`` is date-major, partitions from ``derive_chunked``
+    are code-major).
+
     Parameters
     ----------
     df : pd.DataFrame
-        Raw OHLCV price DataFrame. Must contain columns ``[Date, High, Low,\
+        Raw OHLCV price DataFrame. Must contain columns ``[Date, Code, High, Low,\
         Close, Volume]``.
 
     Returns
@@ -47,24 +87,26 @@ def add_derived_cols(df: pd.DataFrame) -> pd.DataFrame:
         ``ATR_1``, ``ATR_5``, ``ATR_20``, ``Vol_5``, ``Vol_20``,
         ``Momentum_2``, ``PullUp``, ``NK225_gap``
     """
-    df = df.copy()
+    df = df.reset_index(drop=True)      # copy with a unique index for the per-code alignment
+    g = df.groupby("Code", sort=False)
+    groups = group_order(df["Code"])
 
     # --- ATR -----------------------------------------------------------------
     df["ATR_1"] = df["High"] - df["Low"]
-    df["ATR_5"] = df["ATR_1"].rolling(window=5, min_periods=5).mean()
-    df["ATR_20"] = df["ATR_1"].rolling(window=20, min_periods=20).mean()
+    df["ATR_5"] = _rolling_mean(df, "ATR_1", 5, groups)
+    df["ATR_20"] = _rolling_mean(df, "ATR_1", 20, groups)
 
     # --- Volume averages -----------------------------------------------------
-    df["Vol_5"] = df["Volume"].rolling(window=5, min_periods=5).mean()
-    df["Vol_20"] = df["Volume"].rolling(window=20, min_periods=20).mean()
+    df["Vol_5"] = _rolling_mean(df, "Volume", 5, groups)
+    df["Vol_20"] = _rolling_mean(df, "Volume", 20, groups)
 
     # --- Momentum (2‑day) -----------------------------------------------------
-    df["Momentum_2"] = df["Close"].pct_change(periods=2)
+    df["Momentum_2"] = g["Close"].pct_change(periods=2)
 
     # --- Pull‑up ratio --------------------------------------------------------
-    prev_low = df["Low"].shift(1)
-    prev_high = df["High"].shift(1)
-    prev_close = df["Close"].shift(1)
+    prev_low = g["Low"].shift(1)
+    prev_high = g["High"].shift(1)
+    prev_close = g["Close"].shift(1)
     df["PullUp"] = (prev_close - prev_low) / (prev_high - prev_low) + 0.5
 
     # --- NK225 gap merge ------------------------------------------------------
@@ -73,6 +115,7 @@ def add_derived_cols(df: pd.DataFrame) -> pd.DataFrame:
         df["Date"] = pd.to_datetime(df["Date"]).dt.normalize()
         nk225["Date"] = pd.to_datetime(nk225["Date"]).dt.normalize()
         df = df.merge(nk225[["Date", "NK225_gap"]], on="Date", how="left")
+        groups = group_order(df["Code"])
     else:
         df["NK225_gap"] = np.nan
 
@@ -83,17 +126,11 @@ def add_derived_cols(df: pd.DataFrame) -> pd.DataFrame:
     df["Momentum_3"] = df.groupby("Code")["Close"].pct_change(3)
 
     # Rolling ATR averages (3‑day, 10‑day) – ATR_1 already exists
-    df["ATR_3"] = (
-        df.groupby("Code")["ATR_1"].transform(lambda x: x.rolling(window=3, min_periods=1).mean())
-    )
-    df["ATR_10"] = (
-        df.groupby("Code")["ATR_1"].transform(lambda x: x.rolling(window=10, min_periods=1).mean())
-    )
+    df["ATR_3"] = _rolling_mean(df, "ATR_1", 3, groups, min_periods=1)
+    df["ATR_10"] = _rolling_mean(df, "ATR_1", 10, groups, min_periods=1)
 
     # Simple moving average (5‑day) for trend filter in score_up
-    df["MA_5"] = (
-        df.groupby("Code")["Close"].transform(lambda x: x.rolling(window=5, min_periods=1).mean())
-    )
+    df["MA_5"] = _rolling_mean(df, "Close", 5, groups, min_periods=1)
 
         # 昨日のレンジ (前日 ATR_1)
     df["Range_yesterday"] = df.groupby("Code")["ATR_1"].shift(1)
@@ -101,28 +138,178 @@ def add_derived_cols(df: pd.DataFrame) -> pd.DataFrame:
     return df
 
 
+# -----------------------------------------------------------------------------
+# Chunked (out-of-core) mode
+# -----------------------------------------------------------------------------
+
+def _read_raw(path: Path, **kw) -> pd.DataFrame:
+    return pd.read_csv(path, dtype={"Code": "str"}, **kw)
+
+
+def _split_by_partition(raw_csv: Path, work_dir: Path, partition_codes: int) -> list[Path]:
+    """Stream ``raw_csv`` into per-partition CSVs holding full histories of a code subset."""
+    codes: set[str] = set()
+    for chunk in _read_raw(raw_csv, usecols=["Code"], chunksize=READ_CHUNK_ROWS):
+        codes.update(chunk["Code"].unique())
+    ordered = sorted(codes)
+    part_of = {c: i // partition_codes for i, c in enumerate(ordered)}
+    n_parts = (len(ordered) + partition_codes - 1) // partition_codes
+    paths = [work_dir / f"raw_{i:04d}.csv" for i in range(n_parts)]
+
+    for chunk in _read_raw(raw_csv, chunksize=READ_CHUNK_ROWS):
+        for i, part in chunk.groupby(chunk["Code"].map(part_of), sort=False):
+            path = paths[i]
+            part.to_csv(path, mode="a", header=not path.exists(), index=False)
+    return paths
+
+
+def _derive_partition(in_path: Path, out_path: Path) -> tuple[int, list[dict]]:
+    """Derive one partition file (top-level so joblib workers can pickle it)."""
+    prof = Profiler()
+    with prof.span("derive.partition", partition=in_path.stem) as rec:
+        raw = _read_raw(in_path)
+        # rows of a code arrive in raw-file order; make sure each history is date-ordered
+        raw = raw.sort_values(["Code", "Date"], kind="mergesort")
+        derived = add_derived_cols(raw)
+        derived.to_csv(out_path, index=False)
+        rec.rows = len(derived)
+    return len(derived), prof.records()
+
+
+def _concat_csv(parts: list[Path], out_csv: Path) -> None:
+    """Concatenate partition CSVs (same header) into ``out_csv`` atomically."""
+    tmp = out_csv.with_suffix(out_csv.suffix + ".tmp")
+    with tmp.open("wb") as dst:
+        header = None
+        for path in parts:
+            with path.open("rb") as src:
+                first = src.readline()
+                if header is None:
+                    header = first
+                    dst.write(first)
+                elif first != header:
+                    raise ValueError(f"Column mismatch between partitions: {path.name}")
+                shutil.copyfileobj(src, dst, length=1 << 20)
+    os.replace(tmp, out_csv)
+
+
+def derive_chunked(
+    logger: Logger,
+    raw_csv: Path = RAW_CSV,
+    out_csv: Path = DERIVED_CSV,
+    partition_codes: int = PARTITION_CODES,
+    n_jobs: int = 1,
+    to_db: bool = False,
+) -> int:
+    """Derive ``raw_csv`` partition by partition and write ``out_csv``.
+
+    Parameters
+    ----------
+    logger : Logger
+        Application logger.
+    raw_csv, out_csv : Path
+        Input raw OHLCV CSV / output derived CSV.
+    partition_codes : int
+        Number of codes per partition; peak memory scales with this.
+    n_jobs : int
+        Partitions derived in parallel (joblib). Memory is ``n_jobs`` partitions.
+    to_db : bool
+        Also upsert each partition into the ``features`` table.
+
+    Returns
+    -------
+    int
+        Number of rows written.
+    """
+    if partition_codes < 1:
+        raise ValueError("partition_codes must be >= 1")
+    out_csv.parent.mkdir(parents=True, exist_ok=True)
+
+    with tempfile.TemporaryDirectory(prefix=".derive_", dir=out_csv.parent) as tmp:
+        work_dir = Path(tmp)
+        with span("derive.split"):
+            raw_parts = _split_by_partition(raw_csv, work_dir, partition_codes)
+        out_parts = [p.with_name(p.name.replace("raw_", "derived_")) for p in raw_parts]
+        logger.info("Deriving %d partitions (%d codes each, n_jobs=%d)",
+                    len(raw_parts), partition_codes, n_jobs)
+
+        with span("derive.compute") as rec:
+            if n_jobs == 1:
+                results = [_derive_partition(i, o) for i, o in zip(raw_parts, out_parts)]
+            else:
+                from joblib import Parallel, delayed   # only needed for parallel runs
+                results = Parallel(n_jobs=n_jobs)(
+                    delayed(_derive_partition)(i, o) for i, o in zip(raw_parts, out_parts)
+                )
+            rows = sum(n for n, _ in results)
+            rec.rows = rows
+        for _, records in results:
+            get_profiler().merge(records)
+
+        with span("derive.write", rows=rows):
+            _concat_csv(out_parts, out_csv)
+
+        if to_db:
+            _load_partitions_to_db(out_parts, logger)
+
+    logger.info("Written %s (%d rows, %d partitions)", out_csv, rows, len(out_parts))
+    return rows
+
+
+def _load_partitions_to_db(parts: list[Path], logger: Logger) -> None:
+    # psycopg2 is only needed when writing to the database
+    from app.db.db_client import DBClient
+    from app.db.market_store import MarketStore
+
+    with DBClient(get_config(), logger) as db, span("derive.db_load"):
+        store = MarketStore(db, logger)
+        store.ensure_schema()
+        for path in parts:
+            store.load_features(_read_raw(path, parse_dates=["Date"]))
+
+
 # -----------------------------------------------------------------------------
 # Main routine
 # -----------------------------------------------------------------------------
 
-def main() -> None:
-    cfg = load_config("configs/config.yaml")
+def main(
+    chunked: bool = False,
+    partition_codes: int = PARTITION_CODES,
+    n_jobs: int = 1,
+    to_db: bool = False,
+) -> None:
+    cfg = get_config()
     logger = setup_logger(cfg.logging)
 
     if not RAW_CSV.exists():
         logger.error("Input file not found: %s", RAW_CSV)
         raise SystemExit(1)
 
+    # NK225 gap is refreshed from the futures feed before merging
+    with span("derive.nk225_gap"):
+        update_nk225_gap_from_pickle(logger)
+
+    if chunked:
+        derive_chunked(logger, partition_codes=partition_codes, n_jobs=n_jobs, to_db=to_db)
+        return
+
     logger.info("Loading %s", RAW_CSV)
-    raw = pd.read_csv(RAW_CSV)
+    with span("derive.load") as rec:
+        raw = _read_raw(RAW_CSV)
+        rec.rows = len(raw)
 
-    derived = add_derived_cols(raw)
+    with span("derive.compute", rows=len(raw)):
+        derived = add_derived_cols(raw)
 
     DERIVED_CSV.parent.mkdir(parents=True, exist_ok=True)
-    derived.to_csv(DERIVED_CSV, index=False)
+    with span("derive.write", rows=len(derived)):
+        derived.to_csv(DERIVED_CSV, index=False)
 
     logger.info("Written %s (%d rows, %d columns)", DERIVED_CSV, *derived.shape)
 
+    if to_db:
+        _load_partitions_to_db([DERIVED_CSV], logger)
+
 
 if __name__ == "__main__":
     main()
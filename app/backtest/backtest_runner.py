@@ -1,50 +1,305 @@
 """app/backtest/backtest_runner.py
 
-Score_up バックテスト実行スクリプト（90 営業日）。
+Score_up バックテスト実行スクリプト（既定は直近 90 営業日）。
 1. 派生指標付き CSV を読み込み
 2. 上場区分フィルタ & ETF/REIT フィルタは score_up 内部に委譲
-3. 90 営業日ループでバスケットリターン計算
+3. 検証期間の営業日ループでバスケットリターン計算
 4. 結果 CSV / 資産曲線 PNG を保存
 5. 指標を metrics.py で算出
+
+検証期間は ``horizon``（末尾からの営業日数、None で全期間）・``warmup``（データ先頭で
+派生指標が揃うまで取引しない営業日数）・``start`` / ``end`` で指定する。
+
+各営業日のスコアは前日（フィルタ通過行がある直近日）の 1 日分だけから計算するため、
+所要時間は営業日数に比例する。全シグナル日の行は ``score_up_values`` でまとめて採点し、
+(日 × 銘柄) のスコア行列から ``ranking.top_k_batch`` で日ごとの上位 N 件を選ぶ。``n_jobs`` > 1 なら ``DAY_CHUNK`` 日ずつのチャンクを
+joblib で並列実行する（各ワーカーには担当日の行だけを渡す）。
+
+日次リターンは ``execution.simulate`` が (日 × 選定銘柄) の行列でまとめて計算する
+（コスト・値幅制限・出来高上限・配分方式は ``ExecutionConfig``）。``simulate_backtest`` は
+約定ごとの結果も返し、``main`` は ``OUT_TRADES`` に保存する。
+
+出来高・ボラティリティのフィルタと日付ソートは ``prepare_panel`` に分けてあり、
+同じパネルで何度も実行する場合（``app/backtest/service.py`` 等）は前処理済みの
+``TradePanel`` を ``price_df`` に渡せば毎回のフィルタ・ソートを省ける。
 """
 
 from __future__ import annotations
 
+from dataclasses import dataclass
+from datetime import date
 from pathlib import Path
-from typing import Tuple
-import matplotlib.pyplot as plt
+from typing import Optional, Sequence, Tuple
+import numpy as np
 import pandas as pd
 from logging import getLogger, basicConfig, WARNING
 
-from app.scoring.score_up import score_up
+from app.backtest.execution import (
+    LIMIT_COLS,
+    ExecutionConfig,
+    ExecutionResult,
+    at_limit_open,
+    prefix_returns,
+    prefix_turnover,
+    simulate,
+    turnover,
+)
+from app.scoring.ranking import top_k_batch
+from app.scoring.score_up import score_up_values
+from app.backtest.bootstrap import bootstrap_ci
 from app.backtest.metrics import calc_metrics
-from app.core.config import load_config
-from app.data.listed_info_fetcher import fetch_listed_info
-from app.data.jquants_signin import get_refresh_token, get_id_token
+from app.core.profiling import Profiler, get_profiler, span, timed
+from app.core.config import get_config
+from app.data.listed_info_fetcher import load_listed_info
+from app.data.trading_calendar import TradingCalendar
+from app.data.token_manager import TokenManager
+from app.backtest.price_loader import DERIVED_CSV, load_price_df
 
-INPUT_CSV = Path("backtest_data/price_ohlcv_derived.csv")
+INPUT_CSV = DERIVED_CSV
 OUT_CSV = Path("backtest_results/results_90d.csv")
 OUT_PNG = Path("backtest_results/equity_curve.png")
+OUT_TRADES = Path("backtest_results/trades_90d.csv")
+
+HORIZON_DAYS = 90      # 既定の検証営業日数
+WARMUP_DAYS = 20       # 20 日窓の派生指標が揃うまで取引しない
+DAY_CHUNK = 60         # 並列実行時の 1 タスクあたり営業日数
 
 basicConfig(level=WARNING, format="%(levelname)s  %(message)s")
 logger = getLogger("backtest_runner")
 
 
+# ----------------------------------------------------------------------
+# 検証期間
+# ----------------------------------------------------------------------
+
+def select_trade_days(
+    unique_days: Sequence,
+    horizon: Optional[int] = HORIZON_DAYS,
+    warmup: int = WARMUP_DAYS,
+    start: Optional[date | str] = None,
+    end: Optional[date | str] = None,
+) -> list:
+    """検証対象の営業日を返す。
+
+    Args:
+        unique_days: データに含まれる営業日（昇順）
+        horizon: 末尾から何営業日を検証するか。None なら条件に合う全日
+        warmup: 先頭から除外する営業日数（最低 1: 初日は前日がない）
+        start: 検証開始日（含む）
+        end: 検証終了日（含む）
+
+    Returns:
+        list: 検証対象の営業日（昇順）
+    """
+    days = np.asarray(unique_days)[max(warmup, 1):]
+    if start is not None:
+        days = days[days >= np.datetime64(pd.Timestamp(start))]
+    if end is not None:
+        days = days[days <= np.datetime64(pd.Timestamp(end))]
+    if horizon:
+        days = days[-horizon:]
+    return list(days)
+
+
 # ----------------------------------------------------------------------
 # Backtest
 # ----------------------------------------------------------------------
 
-def run_backtest(
-    price_df: pd.DataFrame,
+def _score_up_order(sel: np.ndarray, rank: np.ndarray, complete: bool) -> np.ndarray:
+    """``score_up`` の戻り値と同じ並び（Rank で quicksort し直した順）に選択行を並べる。
+
+    並びは日次リターンの平均を取る順序なので、従来の 1 日ずつの実行と合計順まで揃える。
+    全件選択（``complete``）のときは pandas が位置順の Rank を quicksort した並びが起点になる。
+    """
+    if complete:
+        by_pos = np.argsort(sel, kind="stable")
+        sel, rank = sel[by_pos], rank[by_pos]
+        first = np.argsort(rank, kind="quicksort")
+        sel, rank = sel[first], rank[first]
+    return sel[np.argsort(rank, kind="quicksort")]
+
+
+def _pick_order(idx: np.ndarray, rank: np.ndarray, count: np.ndarray, n_valid: np.ndarray) -> np.ndarray:
+    """``top_k_batch`` の選択を行ごとに ``_score_up_order`` の並びにする（不足分は -1）。
+
+    上位 k 件がちょうど埋まる通常の行は行列のまま並べ替え、件数不足・全件選択の行だけ 1 行ずつ処理する。
+    """
+    k = idx.shape[1]
+    out = np.full(idx.shape, -1, dtype=np.int64)
+    full = (count == k) & (count < n_valid)
+    if full.any():
+        order = np.argsort(rank[full], axis=1, kind="quicksort")
+        out[full] = np.take_along_axis(idx[full], order, axis=1)
+    for i in np.flatnonzero(~full):
+        n = count[i]
+        out[i, :n] = _score_up_order(idx[i, :n], rank[i, :n], n == n_valid[i])
+    return out
+
+
+def _pick_matrices(
+    tasks: list,
     info_df: pd.DataFrame,
-    coeffs: Tuple[float, float, float, float] = (1.0, 1.0, 1.0, 1.0),
-    top_n: int = 40,
-) -> pd.DataFrame:
-    """90 営業日のバックテストを実行し、日次リターン DataFrame を返す。"""
+    coeffs,
+    top_n: int,
+    execution: ExecutionConfig,
+    prof: Profiler,
+    score_order: bool = False,
+) -> dict[str, np.ndarray]:
+    """全シグナル日を一括採点し、選定銘柄の (日 × 選定銘柄) 行列を作る。
+
+    全シグナル日の行に Score_up を一括で計算し、(日 × 銘柄) のスコア行列から
+    ``top_k_batch`` で日ごとの上位 N 件を選ぶ。選定銘柄の当日価格は (日, 銘柄) キーの
+    二分探索で引く。列の並びは ``score_up`` の戻り値と同じ（``score_order`` なら
+    スコア降順・同点は行位置順で、先頭 n 列が上位 n 件になる）。
+    """
+    # 前日までのデータで Score_up（全日分まとめて）
+    with prof.span("backtest.score_days") as rec:
+        sizes = np.array([len(t[1]) for t in tasks])
+        offsets = np.cumsum(sizes) - sizes
+        signal = pd.concat([t[1] for t in tasks], ignore_index=True)
+        block = np.repeat(np.arange(len(tasks)), sizes)
+        score = score_up_values(signal, info_df, coeffs, day=block)
+        rec.rows = len(signal)
+
+    with prof.span("backtest.rank", rows=len(tasks)):
+        mat = np.full((len(tasks), sizes.max(initial=0)), np.nan)
+        mat[block, np.arange(len(signal)) - offsets[block]] = score
+        idx, rank, count = top_k_batch(mat, top_n)
+        n_valid = (~np.isnan(mat)).sum(axis=1)
+        order = idx if score_order else _pick_order(idx, rank, count, n_valid)
+        slot = order >= 0
+        pick = np.where(slot, offsets[:, None] + order, 0)      # signal の行位置
+
+    with prof.span("backtest.lookup", rows=int(count.sum())):
+        # 取引日の行を (日, 銘柄) キーで引く
+        t_sizes = np.array([len(t[2]) for t in tasks])
+        trade = pd.concat([t[2] for t in tasks], ignore_index=True)
+        t_block = np.repeat(np.arange(len(tasks)), t_sizes)
+        code_id, _ = pd.factorize(np.concatenate([signal["Code"].to_numpy(dtype=object),
+                                                  trade["Code"].to_numpy(dtype=object)]))
+        n_codes = int(code_id.max(initial=0)) + 1
+        t_key = t_block * n_codes + code_id[len(signal):]
+        by_key = np.argsort(t_key, kind="stable")
+        p_key = np.arange(len(tasks))[:, None] * n_codes + code_id[pick]
+        at = np.minimum(np.searchsorted(t_key[by_key], p_key), max(len(t_key) - 1, 0))
+        found = slot & (len(t_key) > 0)
+        if len(t_key):
+            found &= t_key[by_key][at] == p_key
+        row = np.where(found, by_key[at] if len(t_key) else 0, 0)
+
+        def today(col: str) -> np.ndarray:
+            v = trade[col].to_numpy()
+            return np.where(found, v[row], np.nan) if len(v) else np.full(found.shape, np.nan)
+
+        def prev(col: str) -> np.ndarray:
+            return np.where(slot, signal[col].to_numpy(dtype=np.float64)[pick], np.nan)
+
+        out = {
+            "codes": np.where(slot, signal["Code"].to_numpy(dtype=object)[pick], None),
+            "open": today("Open"),
+            "close": today("Close"),
+            "count": count,
+            "blocked": None,
+            "score": np.where(slot, score[pick], np.nan),
+            "atr_ratio": prev("ATR_20") / prev("Close"),
+            "adv": prev("Vol_20"),
+        }
+        if execution.block_limits:
+            has_flags = all(c in trade.columns for c in LIMIT_COLS)
+            flags = {c: np.where(found, trade[c].to_numpy()[row], 0) for c in LIMIT_COLS} \
+                if has_flags and len(trade) else {}
+            out["blocked"] = at_limit_open(
+                out["open"], today("High"), today("Low"),
+                prev_close=today("PrevClose") if "PrevClose" in trade.columns else None,
+                upper=flags.get("UpperLimit"), lower=flags.get("LowerLimit"),
+            )
+    return out
+
+
+def _run_days(
+    tasks: list,
+    info_df: pd.DataFrame,
+    coeffs,
+    top_n: int,
+    execution: ExecutionConfig = ExecutionConfig(),
+) -> tuple[ExecutionResult, list[dict]]:
+    """(取引日, シグナル日の行, 取引日の行) の列をまとめて評価する（joblib 用にトップレベル）。"""
+    prof = Profiler()
+    trade_days = np.array([t[0] for t in tasks], dtype="datetime64[ns]")
+    if not tasks:
+        return simulate(trade_days, np.empty((0, 0), dtype=object), np.empty((0, 0)),
+                        np.empty((0, 0)), np.zeros(0, dtype=np.int64), execution), prof.records()
+
+    m = _pick_matrices(tasks, info_df, coeffs, top_n, execution, prof)
+    with prof.span("backtest.execute", rows=int(m["count"].sum())):
+        result = simulate(
+            trade_days, m["codes"], m["open"], m["close"], m["count"], execution,
+            blocked=m["blocked"], score=m["score"], atr_ratio=m["atr_ratio"], adv=m["adv"],
+        )
+    return result, prof.records()
+
+
+def _run_days_topn(
+    tasks: list,
+    info_df: pd.DataFrame,
+    coeffs,
+    top_ns: Sequence[int],
+    execution: ExecutionConfig = ExecutionConfig(),
+) -> tuple[tuple[np.ndarray, np.ndarray, np.ndarray], list[dict]]:
+    """``_run_days`` の TopN 一括版。上位 ``max(top_ns)`` 件を 1 回選び、累積和で全 N を評価する。
+
+    回転率はチャンク境界をまたぐため、選定銘柄（スコア順、幅は ``max(top_ns)``）も返す。
+    """
+    prof = Profiler()
+    width = max(top_ns)
+    if not tasks:
+        return (np.empty((0, len(top_ns))), np.empty((0, width), dtype=object),
+                np.zeros(0, dtype=np.int64)), prof.records()
 
-    price_df = price_df.sort_values(["Date", "Code"]).copy()
-    unique_days = sorted(price_df["Date"].unique())
-    trade_days = unique_days[-90:]
+    m = _pick_matrices(tasks, info_df, coeffs, width, execution, prof, score_order=True)
+    with prof.span("backtest.prefix", rows=int(m["count"].sum())):
+        ret = prefix_returns(m["open"], m["close"], m["count"], top_ns, execution, m["blocked"])
+    codes = np.full((len(tasks), width), None, dtype=object)
+    codes[:, :m["codes"].shape[1]] = m["codes"]
+    return (ret, codes, m["count"]), prof.records()
+
+
+@dataclass
+class TradePanel:
+    """出来高・ボラティリティのフィルタと (Date, Code) ソートを済ませた価格パネル。
+
+    ``prepare_panel`` で 1 度作れば、期間・係数・TopN を変えたバックテストで使い回せる
+    （``simulate_backtest`` などの ``price_df`` にそのまま渡す）。
+    """
+
+    df: pd.DataFrame                # フィルタ済み・ソート済みの行
+    unique_days: np.ndarray         # フィルタ前の全営業日
+    kept_days: np.ndarray           # フィルタ通過行がある営業日
+    lo: np.ndarray                  # kept_days ごとの df の行範囲 [lo, hi)
+    hi: np.ndarray
+    prev_close: bool                # 値幅制限の判定用に PrevClose 列を付けたか
+    calendar: TradingCalendar       # unique_days の営業日カレンダー
+
+    def rows_of(self, i: int) -> pd.DataFrame:
+        return self.df.iloc[self.lo[i]:self.hi[i]] if i >= 0 else self.df.iloc[:0]
+
+
+def prepare_panel(price_df: pd.DataFrame, block_limits: bool = False) -> TradePanel:
+    """バックテスト用にパネルをフィルタ・ソートする。
+
+    Args:
+        price_df: 派生指標付き価格パネル
+        block_limits: 値幅制限フラグ（``LIMIT_COLS``）が無いパネルに、判定用の前日終値を付ける
+
+    Returns:
+        TradePanel: 前処理済みパネル
+    """
+    unique_days = np.unique(price_df["Date"].to_numpy())
+
+    prev_close = block_limits and not all(c in price_df.columns for c in LIMIT_COLS)
+    if prev_close:
+        # 値幅制限フラグが無いパネルは前日終値と制限値幅で判定する（フィルタ前に計算）
+        price_df = price_df.assign(PrevClose=price_df.groupby("Code")["Close"].shift(1))
 
     # ── 出来高 & ボラティリティ フィルタ ──────────────────────
     price_df = price_df[
@@ -52,53 +307,224 @@ def run_backtest(
         (price_df["ATR_20"] / price_df["Close"] < 0.08)      # 変動率 8％ 未満
     ]
     # --------------------------------------------------------------
+    price_df = price_df.sort_values(["Date", "Code"])
+
+    # 日付ごとの行範囲（ソート済みなので iloc スライスで切り出せる）
+    dates = price_df["Date"].to_numpy()
+    kept_days = np.unique(dates)
+    lo = np.searchsorted(dates, kept_days, side="left")
+    hi = np.searchsorted(dates, kept_days, side="right")
+    return TradePanel(price_df, unique_days, kept_days, lo, hi, prev_close,
+                      TradingCalendar(unique_days))
+
+
+def _build_tasks(
+    price_df: pd.DataFrame | TradePanel,
+    horizon: Optional[int],
+    warmup: int,
+    start: Optional[date | str],
+    end: Optional[date | str],
+    execution: ExecutionConfig,
+) -> list:
+    """検証期間の (取引日, シグナル日の行, 取引日の行) を作る。"""
+    if isinstance(price_df, TradePanel):
+        panel = price_df
+        if execution.block_limits and not panel.prev_close and \
+                not all(c in panel.df.columns for c in LIMIT_COLS):
+            raise ValueError("値幅制限の判定には prepare_panel(block_limits=True) のパネルが必要です")
+    else:
+        panel = prepare_panel(price_df, execution.block_limits)
+    unique_days, kept_days = panel.unique_days, panel.kept_days
+    trade_days = select_trade_days(unique_days, horizon, warmup, start, end)
+
+    # 前営業日（データの営業日で数える）と、フィルタ通過行がある直近日を全取引日まとめて二分探索
+    # （prev_day 当日に 1 行もなければさらに前の日）
+    days = np.asarray(trade_days, dtype=unique_days.dtype)
+    prev_day = panel.calendar.prev(days).astype(unique_days.dtype)
+    signal = np.searchsorted(kept_days, prev_day, side="right") - 1
+    signal[np.isnat(prev_day)] = -1
+    today = np.searchsorted(kept_days, days, side="left")
+    found = today < len(kept_days)
+    found[found] = kept_days[today[found]] == days[found]
+    today = np.where(found, today, -1)
+    return [(day, panel.rows_of(int(s)), panel.rows_of(int(t)))
+            for day, s, t in zip(trade_days, signal, today)]
 
-    results = []
-    for trade_day in trade_days:
-        prev_day = max(d for d in unique_days if d < trade_day)
 
-        # 前日までのデータで Score_up
-        universe = price_df[price_df["Date"] <= prev_day]
-        score_df = score_up(universe, info_df, logger, coeffs, top_n)
-        picks = score_df["Code"].tolist()
+def _map_chunks(func, tasks: list, n_jobs: int, *args) -> list:
+    """``func(tasks, *args)`` を ``DAY_CHUNK`` 日ずつ（``n_jobs`` > 1 なら並列で）実行する。"""
+    if n_jobs > 1 and len(tasks) > DAY_CHUNK:
+        from joblib import Parallel, delayed   # 長期間の並列実行時のみ読み込む
+        chunks = [tasks[i:i + DAY_CHUNK] for i in range(0, len(tasks), DAY_CHUNK)]
+        outs = Parallel(n_jobs=n_jobs)(delayed(func)(chunk, *args) for chunk in chunks)
+    else:
+        outs = [func(tasks, *args)]
+    for _, records in outs:
+        get_profiler().merge(records)
+    return [res for res, _ in outs]
 
-        # 当日の Open / Close
-        day_df = price_df[price_df["Date"] == trade_day]
-        open_px = day_df.set_index("Code")["Open"].reindex(picks)
-        close_px = day_df.set_index("Code")["Close"].reindex(picks)
-        ret = ((close_px - open_px) / open_px).mean() - 0.0005   # 0.05 %
 
-        results.append({"Date": trade_day, "Ret": round(ret, 4)})
+@timed("backtest.run")
+def simulate_backtest(
+    price_df: pd.DataFrame | TradePanel,
+    info_df: pd.DataFrame,
+    coeffs: Tuple[float, float, float, float] = (1.0, 1.0, 1.0, 1.0),
+    top_n: int = 40,
+    horizon: Optional[int] = HORIZON_DAYS,
+    warmup: int = WARMUP_DAYS,
+    start: Optional[date | str] = None,
+    end: Optional[date | str] = None,
+    n_jobs: int = 1,
+    execution: ExecutionConfig = ExecutionConfig(),
+) -> ExecutionResult:
+    """検証期間（``select_trade_days``）のバックテストを実行し、日次・約定ごとの結果を返す。
+
+    Args:
+        price_df: 派生指標付き価格パネル（``prepare_panel`` の前処理済みパネルも可）
+        info_df: 上場銘柄一覧
+        coeffs / top_n: Score_up の係数と選定数
+        horizon / warmup / start / end: 検証期間
+        n_jobs: 日チャンクの並列数
+        execution: 約定条件（既定は等金額・コスト 0.05%・制限なし）
 
-    return pd.DataFrame(results)
+    Returns:
+        ExecutionResult: ``execution.simulate`` の結果（全チャンク連結）
+    """
+    tasks = _build_tasks(price_df, horizon, warmup, start, end, execution)
+    outs = _map_chunks(_run_days, tasks, n_jobs, info_df, coeffs, top_n, execution)
+    if len(outs) == 1:
+        return outs[0]
+    daily = pd.concat([res.daily for res in outs], ignore_index=True)
+    trades = pd.concat([res.trades for res in outs], ignore_index=True)
+    # 回転率はチャンクの初日も前日（前のチャンク末日）と比べ直す
+    day = np.searchsorted(daily["Date"].to_numpy(), trades["Date"].to_numpy())
+    daily["Turnover"] = turnover(day, trades["Code"].to_numpy(),
+                                 (trades["Weight"] * trades["Fill"]).to_numpy(), len(daily))
+    return ExecutionResult(daily, trades)
+
+
+def run_backtest(
+    price_df: pd.DataFrame | TradePanel,
+    info_df: pd.DataFrame,
+    coeffs: Tuple[float, float, float, float] = (1.0, 1.0, 1.0, 1.0),
+    top_n: int = 40,
+    horizon: Optional[int] = HORIZON_DAYS,
+    warmup: int = WARMUP_DAYS,
+    start: Optional[date | str] = None,
+    end: Optional[date | str] = None,
+    n_jobs: int = 1,
+    execution: ExecutionConfig = ExecutionConfig(),
+) -> pd.DataFrame:
+    """``simulate_backtest`` の日次リターン（Date, Ret）だけを返す。"""
+    res = simulate_backtest(price_df, info_df, coeffs, top_n, horizon, warmup, start, end,
+                            n_jobs, execution)
+    return res.daily[["Date", "Ret"]]
+
+
+@timed("backtest.run_topn")
+def run_backtest_topn(
+    price_df: pd.DataFrame | TradePanel,
+    info_df: pd.DataFrame,
+    coeffs: Tuple[float, float, float, float] = (1.0, 1.0, 1.0, 1.0),
+    top_ns: Sequence[int] = range(5, 41),
+    horizon: Optional[int] = HORIZON_DAYS,
+    warmup: int = WARMUP_DAYS,
+    start: Optional[date | str] = None,
+    end: Optional[date | str] = None,
+    n_jobs: int = 1,
+    execution: ExecutionConfig = ExecutionConfig(),
+    with_turnover: bool = False,
+) -> pd.DataFrame | tuple[pd.DataFrame, pd.DataFrame]:
+    """複数の TopN の日次リターンを 1 回のバックテストで求める。
+
+    日ごとに上位 ``max(top_ns)`` 件をスコア順に 1 回だけ選び、累積和（``prefix_returns``）で
+    全 TopN のバスケットリターンを出す。所要時間は TopN 1 つ分とほぼ同じ。
+    各列は ``run_backtest(top_n=n)["Ret"]`` と丸め誤差の範囲で一致する。
+
+    Returns:
+        pd.DataFrame: index が Date、列が TopN の (営業日 × TopN) リターン行列。
+            ``with_turnover`` なら同じ形の片道回転率（``prefix_turnover``）との組
+    """
+    top_ns = list(top_ns)
+    tasks = _build_tasks(price_df, horizon, warmup, start, end, execution)
+    outs = _map_chunks(_run_days_topn, tasks, n_jobs, info_df, coeffs, top_ns, execution)
+    index = pd.DatetimeIndex([t[0] for t in tasks], name="Date")
+    columns = pd.Index(top_ns, name="TopN")
+    rets = pd.DataFrame(np.vstack([o[0] for o in outs]), index=index, columns=columns)
+    if not with_turnover:
+        return rets
+    codes = np.vstack([o[1] for o in outs])
+    count = np.concatenate([o[2] for o in outs])
+    return rets, pd.DataFrame(prefix_turnover(codes, count, top_ns), index=index, columns=columns)
 
 
 # ----------------------------------------------------------------------
 # CLI entry
 # ----------------------------------------------------------------------
 
-def main() -> None:
-    if not INPUT_CSV.exists():
-        logger.error("Input CSV not found: %s", INPUT_CSV)
-        return
+def main(
+    source: str = "csv",
+    compact: bool = False,
+    horizon: Optional[int] = HORIZON_DAYS,
+    warmup: int = WARMUP_DAYS,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    n_jobs: Optional[int] = None,
+    execution: Optional[ExecutionConfig] = None,
+) -> None:
+    """既定パラメータでバックテストする。
 
-    price_df = pd.read_csv(INPUT_CSV, parse_dates=["Date"])
+    Args:
+        source: ``"csv"`` / ``"db"``
+        compact: True なら省メモリ型で読み込む
+        horizon / warmup / start / end: 検証期間（``select_trade_days`` 参照）
+        n_jobs: 日チャンクの並列数。None なら config の BACKTEST_N_JOBS（未設定なら 1）
+        execution: 約定条件。None なら ``ExecutionConfig()``（等金額・コスト 0.05%）
+    """
+    cfg = get_config()
+    try:
+        with span("backtest.load", source=source) as rec:
+            # end より後の行は使わない（start より前はウォームアップに使うので絞らない）
+            price_df = load_price_df(source, logger, INPUT_CSV, compact=compact,
+                                     budget_mb=cfg.MEMORY_BUDGET_MB, end=end)
+            rec.rows = len(price_df)
+    except FileNotFoundError as e:
+        logger.error("%s", e)
+        return
 
-    cfg = load_config("configs/config.yaml")
-    refresh = get_refresh_token(cfg, logger)
-    id_tok = get_id_token(cfg, refresh, logger)
-    info_df = fetch_listed_info(cfg, id_tok, logger)
+    tokens = TokenManager(cfg, logger)      # 上場銘柄キャッシュが古い時だけ認証
+    info_df = load_listed_info(cfg, tokens.get_id_token, logger)
 
-    res_df = run_backtest(price_df, info_df)
+    result = simulate_backtest(price_df, info_df, horizon=horizon, warmup=warmup, start=start,
+                               end=end, n_jobs=n_jobs or cfg.BACKTEST_N_JOBS or 1,
+                               execution=execution or ExecutionConfig())
+    res_df = result.daily[["Date", "Ret"]]
+    if res_df.empty:
+        logger.error("検証期間に営業日がありません (horizon=%s, warmup=%d, start=%s, end=%s)",
+                     horizon, warmup, start, end)
+        return
+    logger.info("Backtest: %s〜%s (%d 営業日)", res_df["Date"].iloc[0].date(),
+                res_df["Date"].iloc[-1].date(), len(res_df))
     OUT_CSV.parent.mkdir(parents=True, exist_ok=True)
     res_df.to_csv(OUT_CSV, index=False, encoding="utf-8")
     logger.info("Saved %s", OUT_CSV)
+    result.trades.to_csv(OUT_TRADES, index=False, encoding="utf-8")
+    logger.info("Saved %s (%d trades, blocked %d)", OUT_TRADES, len(result.trades),
+                int(result.trades["Blocked"].sum()))
 
     # 指標計算
     metrics = calc_metrics(res_df["Ret"])
     logger.info("Metrics: %s", metrics)
+    ci = bootstrap_ci(res_df["Ret"].to_numpy()).iloc[0]
+    logger.info("Bootstrap 95%% CI: sharpe [%.2f, %.2f], mu [%.4f, %.4f], max_dd [%.4f, %.4f]",
+                ci["sharpe_lo"], ci["sharpe_hi"], ci["mu_lo"], ci["mu_hi"],
+                ci["max_dd_lo"], ci["max_dd_hi"])
+
+    # 資産曲線（描画時のみ matplotlib を読み込む）
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
 
-    # 資産曲線
     equity = (1 + res_df["Ret"]).cumprod()
     plt.figure()
     plt.plot(res_df["Date"], equity)
@@ -0,0 +1,194 @@
+"""app/backtest/bootstrap.py
+
+バックテスト指標のブートストラップ信頼区間。
+
+90 営業日程度の検証期間では Sharpe などの点推定のばらつきが大きいため、日次リターンを
+ブロック単位で再標本化して指標の分布を求める。
+
+- ``stationary_indices``: 定常ブートストラップ（Politis & Romano）。ブロック長は平均
+  ``block`` の幾何分布、系列の末尾は先頭へ循環する
+- ``block_indices``: 固定長 ``block`` の循環ブロックブートストラップ
+- ``bootstrap_metrics``: (営業日 × 戦略) のリターン行列に同じ再標本化インデックスを当てて
+  (標本 × 戦略) の指標分布を ``metrics.metric_arrays`` で一括計算する
+- ``bootstrap_ci``: 分布から戦略ごとの信頼区間・標準誤差の DataFrame を作る
+
+インデックスは (標本数 × 営業日数) の行列を一度に作り、戦略はまとめて評価する
+（全戦略で同じ再標本を使うので戦略間の比較もできる）。mu / 勝率 / Sharpe / Sortino は
+日の並びに依らないので「標本ごとの各日の出現回数」行列と (営業日 × 戦略) 行列の積で求め、
+最大 DD / Calmar だけ再標本化したリターンを展開する（``CHUNK_MB`` を超える場合は戦略を分割）。
+"""
+
+from __future__ import annotations
+
+from typing import Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from app.backtest.metrics import TRADING_DAYS_PER_YEAR, metric_arrays, safe_ratio
+
+__all__ = [
+    "METHODS",
+    "stationary_indices",
+    "block_indices",
+    "bootstrap_metrics",
+    "bootstrap_ci",
+]
+
+METHODS = ("stationary", "block")
+
+N_BOOT = 1000          # 既定の標本数
+BLOCK = 5              # 既定の（平均）ブロック長 [営業日]
+CHUNK_MB = 256         # 1 回に展開する再標本化リターンの上限
+BOOT_METRICS = ("sharpe", "mu", "max_dd")
+
+_MOMENT_KEYS = ("mu", "win_rate", "sharpe", "sortino")   # 日の並びに依らない指標
+_VAR_EPS = 1e-12
+
+
+# ----------------------------------------------------------------------
+# 再標本化インデックス
+# ----------------------------------------------------------------------
+
+def stationary_indices(n_days: int, n_boot: int, block: float = BLOCK,
+                       rng: Optional[np.random.Generator] = None) -> np.ndarray:
+    """定常ブートストラップの (n_boot, n_days) インデックス行列。
+
+    各位置で確率 ``1 / block`` で新しいブロックを乱択した開始日から始め、
+    それ以外は直前の日の翌日（末尾の次は先頭）を取る。
+    """
+    rng = rng or np.random.default_rng()
+    if n_days == 0:
+        return np.empty((n_boot, 0), dtype=np.int64)
+    new = rng.random((n_boot, n_days)) < 1.0 / max(block, 1.0)
+    new[:, 0] = True
+    starts = rng.integers(0, n_days, (n_boot, n_days))
+    pos = np.arange(n_days)
+    # 直近のブロック開始位置と、そこからの経過日数
+    last = np.maximum.accumulate(np.where(new, pos, 0), axis=1)
+    first = np.take_along_axis(starts, last, axis=1)
+    return (first + pos - last) % n_days
+
+
+def block_indices(n_days: int, n_boot: int, block: int = BLOCK,
+                  rng: Optional[np.random.Generator] = None) -> np.ndarray:
+    """固定長ブロック（循環）の (n_boot, n_days) インデックス行列。"""
+    rng = rng or np.random.default_rng()
+    if n_days == 0:
+        return np.empty((n_boot, 0), dtype=np.int64)
+    block = int(min(max(block, 1), n_days))
+    n_blocks = -(-n_days // block)
+    starts = rng.integers(0, n_days, (n_boot, n_blocks))
+    idx = starts[:, :, None] + np.arange(block)[None, None, :]
+    return idx.reshape(n_boot, -1)[:, :n_days] % n_days
+
+
+# ----------------------------------------------------------------------
+# 指標分布
+# ----------------------------------------------------------------------
+
+def bootstrap_metrics(
+    returns: np.ndarray | pd.DataFrame,
+    n_boot: int = N_BOOT,
+    method: str = "stationary",
+    block: float = BLOCK,
+    seed: Optional[int] = 0,
+    indices: Optional[np.ndarray] = None,
+    metrics: Sequence[str] = BOOT_METRICS,
+) -> dict[str, np.ndarray]:
+    """再標本化した日次リターンから指標の分布を求める。
+
+    Args:
+        returns: (営業日 × 戦略) のリターン行列（1 次元なら 1 戦略）
+        n_boot: 標本数
+        method: ``"stationary"`` / ``"block"``
+        block: （平均）ブロック長
+        seed: 乱数シード（None なら毎回変わる）
+        indices: 計算済みの (n_boot, 営業日数) インデックス（指定時は method 等を無視）
+        metrics: 計算する指標（``metric_arrays`` の turnover 以外）
+
+    Returns:
+        dict: 指標名 → (n_boot, 戦略数) の配列
+    """
+    r = np.asarray(returns, dtype=np.float64)
+    if r.ndim == 1:
+        r = r[:, None]
+    n_days, n_cols = r.shape
+    if indices is None:
+        rng = np.random.default_rng(seed)
+        if method == "stationary":
+            indices = stationary_indices(n_days, n_boot, block, rng)
+        elif method == "block":
+            indices = block_indices(n_days, n_boot, int(block), rng)
+        else:
+            raise ValueError(f"未知のブートストラップ方式です: {method} (choices: {', '.join(METHODS)})")
+
+    n_boot = len(indices)
+    out: dict[str, np.ndarray] = {}
+
+    # 順序に依らない指標は「標本ごとの各日の出現回数」行列との積で求める（展開しない）
+    moment = [k for k in metrics if k in _MOMENT_KEYS]
+    if moment:
+        flat = (indices + np.arange(n_boot)[:, None] * n_days).ravel()
+        counts = np.bincount(flat, minlength=n_boot * n_days).reshape(n_boot, n_days).astype(np.float64)
+        valid = ~np.isnan(r)
+        filled = np.where(valid, r, 0.0)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            n_valid = counts @ valid
+            mu = counts @ filled / n_valid
+            annual = np.sqrt(TRADING_DAYS_PER_YEAR)
+            if "mu" in moment:
+                out["mu"] = mu
+            if "win_rate" in moment:
+                out["win_rate"] = counts @ (r > 0) / n_days
+            if "sharpe" in moment:
+                sq = counts @ (filled ** 2) / n_valid
+                var = sq - mu ** 2
+                var[var <= _VAR_EPS * sq] = 0.0            # 定数系列の桁落ち
+                sigma = np.sqrt(var)
+                out["sharpe"] = np.where(np.isnan(sigma), np.nan, safe_ratio(annual * mu, sigma))
+            if "sortino" in moment:
+                downside = np.sqrt(counts @ (np.minimum(filled, 0.0) ** 2) / n_valid)
+                out["sortino"] = np.where(np.isnan(downside), np.nan, safe_ratio(annual * mu, downside))
+
+    # DD 系は日の並びが要るので (営業日, 標本, 戦略) に展開する。大きい場合は戦略を分ける
+    path = [k for k in metrics if k not in _MOMENT_KEYS]
+    if path:
+        per_col = indices.size * 8 * 4          # 展開後 + 作業配列の概算 [byte]
+        step = max(int(CHUNK_MB * 2**20 // max(per_col, 1)), 1)
+        parts: dict[str, list[np.ndarray]] = {k: [] for k in path}
+        for lo in range(0, n_cols, step):
+            sampled = r[:, lo:lo + step][indices.T]             # (n_days, n_boot, cols)
+            for key, value in metric_arrays(sampled, keys=path).items():
+                parts[key].append(value)
+        for key, values in parts.items():
+            out[key] = np.concatenate(values, axis=1) if values else np.empty((n_boot, 0))
+    return {k: out[k] for k in metrics}
+
+
+def bootstrap_ci(
+    returns: np.ndarray | pd.DataFrame,
+    metrics: Sequence[str] = BOOT_METRICS,
+    alpha: float = 0.05,
+    n_boot: int = N_BOOT,
+    method: str = "stationary",
+    block: float = BLOCK,
+    seed: Optional[int] = 0,
+) -> pd.DataFrame:
+    """戦略ごとの指標の信頼区間（パーセンタイル法）と標準誤差。
+
+    Returns:
+        pd.DataFrame: 行が戦略（DataFrame を渡した場合は元の列ラベル）、列が
+            ``<指標>_lo`` / ``<指標>_hi``（``alpha`` 両側）/ ``<指標>_se``（小数 4 桁に丸め）
+    """
+    labels = returns.columns if isinstance(returns, pd.DataFrame) else None
+    dist = bootstrap_metrics(returns, n_boot, method, block, seed, metrics=metrics)
+    cols = {}
+    for key in metrics:
+        d = dist[key]
+        lo, hi = np.nanquantile(d, [alpha / 2, 1 - alpha / 2], axis=0) if d.size else \
+            (np.empty(d.shape[1]), np.empty(d.shape[1]))
+        cols[f"{key}_lo"] = lo
+        cols[f"{key}_hi"] = hi
+        cols[f"{key}_se"] = np.nanstd(d, axis=0) if d.size else np.empty(d.shape[1])
+    return pd.DataFrame(cols, index=labels).round(4)
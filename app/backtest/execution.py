@@ -0,0 +1,367 @@
+"""app/backtest/execution.py
+
+約定シミュレータ（寄り付きで買い・大引けで売りの日中売買）。
+
+(営業日 × 選定銘柄) の行列をまとめて受け取り、日次リターンと約定ごとの結果を返す。
+
+- 取引コスト: 約定金額あたり ``cost``（既定 0.05%、往復分）
+- 値幅制限: ``block_limits`` なら寄り付きがストップ高 / ストップ安の銘柄は約定しない（現金のまま）
+- 出来高上限: ``max_volume_frac`` なら 1 銘柄の約定金額を
+  「シグナル日の 20 日平均出来高 × 寄り付き価格 × 割合」までに抑え、残りは現金
+- 配分: ``equal``（等金額）/ ``score``（Score_up 比例）/ ``inverse_vol``（ATR_20 / Close の逆数比例）
+
+価格が取れない銘柄（当日の行がない）は配分から外す（従来の ``mean()`` と同じ）。
+既定の ``ExecutionConfig()`` は従来の ``(Close - Open) / Open`` の等金額平均 − 0.05% と
+合計順まで同じ計算になる。
+
+``prefix_returns`` はスコア順に並べた選定銘柄の累積和から、上位 5〜40 件など複数の TopN の
+等金額リターンを 1 回で求める（TopN ごとにバックテストをやり直さない）。
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+__all__ = [
+    "LIMIT_COLS",
+    "WEIGHTINGS",
+    "ExecutionConfig",
+    "ExecutionResult",
+    "limit_width",
+    "at_limit_open",
+    "simulate",
+    "prefix_returns",
+    "turnover",
+    "prefix_turnover",
+]
+
+WEIGHTINGS = ("equal", "score", "inverse_vol")
+LIMIT_COLS = ("UpperLimit", "LowerLimit")   # J-Quants daily_quotes の値幅制限フラグ
+
+# 東証の制限値幅（基準値段が左列未満のとき右列の値幅）
+_LIMIT_BASE = np.array([100, 200, 500, 700, 1_000, 1_500, 2_000, 3_000, 5_000, 7_000, 10_000,
+                        15_000, 20_000, 30_000, 50_000, 70_000, 100_000, 150_000, 200_000,
+                        300_000, 500_000, 700_000, 1_000_000], dtype=np.float64)
+_LIMIT_WIDTH = np.array([30, 50, 80, 100, 150, 300, 400, 500, 700, 1_000, 1_500, 3_000, 4_000,
+                         5_000, 7_000, 10_000, 15_000, 30_000, 40_000, 50_000, 70_000, 100_000,
+                         150_000, 300_000], dtype=np.float64)
+
+
+@dataclass(frozen=True)
+class ExecutionConfig:
+    """約定条件。"""
+
+    cost: float = 0.0005                     # 約定金額あたりのコスト（往復）
+    block_limits: bool = False               # 寄り付きが値幅制限の銘柄を約定させない
+    max_volume_frac: Optional[float] = None  # 20 日平均売買代金に対する 1 銘柄の上限割合
+    capital: float = 10_000_000.0            # 運用金額 [円]（出来高上限の判定に使う）
+    weighting: str = "equal"                 # WEIGHTINGS のいずれか
+
+    def __post_init__(self):
+        if self.weighting not in WEIGHTINGS:
+            raise ValueError(f"未知の配分方式です: {self.weighting} (choices: {', '.join(WEIGHTINGS)})")
+
+    @property
+    def legacy(self) -> bool:
+        """従来の等金額平均と同じ計算で済むか。"""
+        return self.weighting == "equal" and self.max_volume_frac is None
+
+
+@dataclass
+class ExecutionResult:
+    """``simulate`` の結果。"""
+
+    daily: pd.DataFrame     # Date, Ret, Gross, Cost, Exposure, Trades, Blocked, Turnover
+    trades: pd.DataFrame    # Date, Code, Weight, Fill, Ret, Blocked
+
+
+# ----------------------------------------------------------------------
+# 値幅制限
+# ----------------------------------------------------------------------
+
+def limit_width(base: np.ndarray) -> np.ndarray:
+    """基準値段（前日終値）に対する制限値幅。"""
+    base = np.asarray(base, dtype=np.float64)
+    i = np.searchsorted(_LIMIT_BASE, base, side="right")
+    return np.where(np.isnan(base), np.nan, _LIMIT_WIDTH[np.minimum(i, len(_LIMIT_WIDTH) - 1)])
+
+
+def at_limit_open(
+    open_: np.ndarray,
+    high: np.ndarray,
+    low: np.ndarray,
+    prev_close: Optional[np.ndarray] = None,
+    upper: Optional[np.ndarray] = None,
+    lower: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """寄り付きがストップ高 / ストップ安だったか。
+
+    J-Quants の ``UpperLimit`` / ``LowerLimit`` フラグがあれば「フラグ付きの日に
+    始値 = 高値（安値）」で判定し、無ければ前日終値と制限値幅から判定する。
+    """
+    open_ = np.asarray(open_, dtype=np.float64)
+    if upper is not None and lower is not None:
+        up = (np.asarray(upper).astype(str) == "1") & (open_ == np.asarray(high, dtype=np.float64))
+        down = (np.asarray(lower).astype(str) == "1") & (open_ == np.asarray(low, dtype=np.float64))
+        return up | down
+    if prev_close is None:
+        return np.zeros(open_.shape, dtype=bool)
+    prev_close = np.asarray(prev_close, dtype=np.float64)
+    width = limit_width(prev_close)
+    with np.errstate(invalid="ignore"):
+        return (open_ >= prev_close + width) | (open_ <= prev_close - width)
+
+
+# ----------------------------------------------------------------------
+# 回転率
+# ----------------------------------------------------------------------
+
+def turnover(day: np.ndarray, code: np.ndarray, held: np.ndarray, n_days: int) -> np.ndarray:
+    """約定ごとの保有比率から日次の片道回転率 ``0.5 × Σ|w_t - w_{t-1}|`` を求める（初日は NaN）。
+
+    Args:
+        day: 約定ごとの営業日番号（0 始まりの連番）
+        code: 約定ごとの銘柄コード
+        held: 約定ごとの保有比率（配分 × 約定率）
+        n_days: 営業日数
+    """
+    out = np.full(n_days, np.nan)
+    if n_days == 0:
+        return out
+    if not len(code):
+        out[1:] = 0.0
+        return out
+    day = np.asarray(day, dtype=np.int64)
+    held = np.asarray(held, dtype=np.float64)
+    code_id, uniques = pd.factorize(np.asarray(code, dtype=object))
+    n_codes = len(uniques)
+    key = day * n_codes + code_id
+    order = np.argsort(key, kind="stable")
+    sorted_key = key[order]
+    # 同じ銘柄の前日の保有比率（前日に無ければ 0）
+    at = np.minimum(np.searchsorted(sorted_key, key - n_codes), len(key) - 1)
+    prev = np.where(sorted_key[at] == key - n_codes, held[order][at], 0.0)
+
+    diff = np.bincount(day, np.abs(held - prev), minlength=n_days)
+    total = np.bincount(day, held, minlength=n_days)
+    kept = np.bincount(day, prev, minlength=n_days)
+    # 前日だけに保有していた分（今日売った分）は 前日合計 − 今日も保有している分の前日比率
+    out[1:] = 0.5 * (diff[1:] + total[:-1] - kept[1:])
+    return out
+
+
+def prefix_turnover(codes: np.ndarray, n_slots: np.ndarray, top_ns) -> np.ndarray:
+    """スコア順の選定銘柄から、上位 n 件の等金額バスケットの片道回転率を全 TopN まとめて求める。
+
+    銘柄 j の前日の列位置を p として、上位 n 件どうしで持ち越す銘柄は ``max(j, p) < n`` を満たす。
+    件数が日によって変わる場合の配分差も含める（初日は NaN）。
+
+    Returns:
+        np.ndarray: (T, len(top_ns))
+    """
+    top_ns = np.asarray(list(top_ns), dtype=np.int64)
+    n_days, width = codes.shape
+    out = np.full((n_days, len(top_ns)), np.nan)
+    if n_days < 2 or width == 0:
+        return out
+
+    n_slots = np.asarray(n_slots, dtype=np.int64)
+    slot = np.arange(width)[None, :] < n_slots[:, None]
+    code_id, uniques = pd.factorize(np.where(slot, codes, None).ravel())
+    code_id = code_id.reshape(codes.shape)
+    n_codes = max(len(uniques), 1)
+    rows = np.repeat(np.arange(n_days), width).reshape(codes.shape)
+    key = np.where(slot, rows * n_codes + code_id, -1).ravel()
+    order = np.argsort(key, kind="stable")
+    sorted_key = key[order]
+    want = np.where(slot, (rows - 1) * n_codes + code_id, -2)
+    at = np.minimum(np.searchsorted(sorted_key, want), len(key) - 1)
+    found = slot & (rows > 0) & (sorted_key[at] == want)
+    prev_col = np.where(found, order[at] % width, width)     # 前日の列位置（なければ width）
+    last = np.maximum(np.arange(width)[None, :], prev_col)
+
+    kept = (last[:, :, None] < top_ns[None, None, :]).sum(axis=1)          # (T, N)
+    n_now = np.minimum(top_ns[None, :], n_slots[:, None]).astype(np.float64)
+    n_prev = n_now[:-1]
+    n_now, kept = n_now[1:], kept[1:]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        inv_now = np.where(n_now > 0, 1 / n_now, 0.0)
+        inv_prev = np.where(n_prev > 0, 1 / n_prev, 0.0)
+        out[1:] = 0.5 * (kept * np.abs(inv_now - inv_prev)
+                         + (n_now - kept) * inv_now + (n_prev - kept) * inv_prev)
+    return out
+
+
+# ----------------------------------------------------------------------
+# シミュレーション
+# ----------------------------------------------------------------------
+
+def _row_means(ret: np.ndarray, n_slots: np.ndarray) -> np.ndarray:
+    """行ごとに先頭 ``n_slots`` 個の ``Series.mean()``（欠損を 0 にして合計 / 件数）。"""
+    filled = np.where(np.isnan(ret), 0, ret)
+    nobs = (~np.isnan(ret)).sum(axis=1)
+    total = filled.sum(axis=1, dtype=ret.dtype)
+    # 件数が列数に満たない行は、合計の分割が変わらないよう実際の長さで足し直す
+    for i in np.flatnonzero(n_slots < ret.shape[1]):
+        total[i] = filled[i, : n_slots[i]].sum(dtype=ret.dtype)
+    out = np.full(len(ret), np.nan, dtype=object)
+    for i in np.flatnonzero(nobs):
+        out[i] = total[i] / ret.dtype.type(nobs[i])
+    return out
+
+
+def _weights(tradable: np.ndarray, config: ExecutionConfig,
+             score: Optional[np.ndarray], atr_ratio: Optional[np.ndarray]) -> np.ndarray:
+    if config.weighting == "score" and score is not None:
+        raw = np.clip(np.nan_to_num(score, nan=0.0), 0, None)
+    elif config.weighting == "inverse_vol" and atr_ratio is not None:
+        with np.errstate(divide="ignore"):
+            raw = np.nan_to_num(1 / atr_ratio, nan=0.0, posinf=0.0)
+    else:
+        raw = np.ones(tradable.shape)
+    raw = np.where(tradable, raw, 0.0)
+    total = raw.sum(axis=1, keepdims=True)
+    # 全銘柄の重みが 0 の行（スコアが全て 0 など）は等金額にする
+    equal = tradable / np.maximum(tradable.sum(axis=1, keepdims=True), 1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(total > 0, raw / total, equal)
+
+
+def simulate(
+    dates: np.ndarray,
+    codes: np.ndarray,
+    open_: np.ndarray,
+    close: np.ndarray,
+    n_slots: np.ndarray,
+    config: ExecutionConfig = ExecutionConfig(),
+    blocked: Optional[np.ndarray] = None,
+    score: Optional[np.ndarray] = None,
+    atr_ratio: Optional[np.ndarray] = None,
+    adv: Optional[np.ndarray] = None,
+) -> ExecutionResult:
+    """(営業日 × 選定銘柄) の行列から日次リターンと約定結果を計算する。
+
+    Args:
+        dates: 営業日（長さ T）
+        codes: 選定銘柄コード (T, K)。各行の先頭 ``n_slots`` 個が有効（選定順）
+        open_ / close: 当日の始値 / 終値 (T, K)。行がない銘柄は NaN
+        n_slots: 行ごとの選定数 (T,)
+        config: 約定条件
+        blocked: 寄り付きが値幅制限で約定できない銘柄 (T, K)
+        score: 配分 ``score`` 用のスコア (T, K)
+        atr_ratio: 配分 ``inverse_vol`` 用の ATR_20 / Close (T, K)
+        adv: 出来高上限用の 20 日平均出来高 (T, K)
+
+    Returns:
+        ExecutionResult: 日次（Ret は小数 4 桁に丸めた純リターン）と約定ごとの結果
+    """
+    n_days, width = codes.shape
+    slot = np.arange(width)[None, :] < n_slots[:, None]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        ret = (close - open_) / open_
+    priced = slot & ~np.isnan(ret)
+    blocked = np.zeros(codes.shape, dtype=bool) if blocked is None or not config.block_limits \
+        else (blocked & priced)
+    tradable = priced & ~blocked
+
+    weight = _weights(tradable, config, score, atr_ratio)
+    fill = np.where(tradable, 1.0, 0.0)
+    if config.max_volume_frac is not None and adv is not None:
+        notional = weight * config.capital
+        cap = config.max_volume_frac * np.nan_to_num(adv, nan=0.0) * np.nan_to_num(open_, nan=0.0)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            fill = np.where(tradable, np.clip(cap / notional, 0.0, 1.0), 0.0)
+        fill = np.nan_to_num(fill, nan=0.0)
+
+    exposure = (weight * fill).sum(axis=1)
+    if config.legacy:
+        # 等金額・上限なし: 従来の Series.mean() と同じ合計順で計算する
+        masked = np.where(blocked, np.nan, np.where(slot, ret, np.nan))
+        gross = _row_means(masked, n_slots)
+        net = [g - config.cost if g is not None else np.nan for g in gross]
+        if config.block_limits:
+            # 全銘柄が値幅制限で約定しなかった日は現金のまま（0）
+            all_blocked = blocked.any(axis=1) & ~tradable.any(axis=1)
+            net = [0.0 if b else r for r, b in zip(net, all_blocked)]
+        gross = np.array([np.nan if g is None else float(g) for g in gross])
+        cost = np.where(tradable.any(axis=1), config.cost, 0.0)
+    else:
+        gross = np.where(tradable, weight * fill * np.nan_to_num(ret), 0.0).sum(axis=1)
+        cost = config.cost * exposure
+        net = list(gross - cost)
+        no_price = ~priced.any(axis=1)
+        net = [np.nan if m else r for r, m in zip(net, no_price)]
+
+    rows, cols = np.nonzero(slot)
+    held = (weight * fill)[rows, cols]
+    daily = pd.DataFrame({
+        "Date": dates,
+        "Ret": [round(r, 4) for r in net],
+        "Gross": gross,
+        "Cost": cost,
+        "Exposure": exposure,
+        "Trades": tradable.sum(axis=1),
+        "Blocked": blocked.sum(axis=1),
+        "Turnover": turnover(rows, codes[rows, cols], held, n_days),
+    })
+
+    trades = pd.DataFrame({
+        "Date": np.asarray(dates)[rows],
+        "Code": codes[rows, cols],
+        "Weight": weight[rows, cols],
+        "Fill": fill[rows, cols],
+        "Ret": ret[rows, cols],
+        "Blocked": blocked[rows, cols],
+    })
+    return ExecutionResult(daily, trades)
+
+
+def prefix_returns(
+    open_: np.ndarray,
+    close: np.ndarray,
+    n_slots: np.ndarray,
+    top_ns,
+    config: ExecutionConfig = ExecutionConfig(),
+    blocked: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """スコア順の選定銘柄から、上位 n 件（n ∈ ``top_ns``）の等金額バスケットの日次純リターンを求める。
+
+    行ごとに ``(Close - Open) / Open`` と約定可能数の累積和を 1 回だけ取り、n 列目を引くだけで
+    全 TopN を評価する。``simulate`` の等金額・上限なしと同じ規則（価格なしは除外、
+    全銘柄が値幅制限なら 0）で、合計順の違いによる丸め誤差の範囲で一致する。
+
+    Args:
+        open_ / close: (T, K) の当日始値 / 終値。列はスコア降順（同点は元の並び順）
+        n_slots: 行ごとの選定数 (T,)
+        top_ns: 評価する TopN の列
+        config: 約定条件（``weighting="equal"``、``max_volume_frac=None`` のみ）
+        blocked: 値幅制限で約定できない銘柄 (T, K)
+
+    Returns:
+        np.ndarray: (T, len(top_ns)) の純リターン（小数 4 桁に丸め、約定対象がない日は NaN）
+    """
+    if not config.legacy:
+        raise ValueError("prefix_returns は等金額・出来高上限なしの約定条件のみ対応です")
+    top_ns = np.asarray(list(top_ns), dtype=np.int64)
+    n_days, width = open_.shape
+    if width == 0:
+        return np.full((n_days, len(top_ns)), np.nan)
+
+    slot = np.arange(width)[None, :] < np.asarray(n_slots)[:, None]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        ret = (np.asarray(close, dtype=np.float64) - open_) / np.asarray(open_, dtype=np.float64)
+    priced = slot & ~np.isnan(ret)
+    tradable = priced if blocked is None or not config.block_limits else priced & ~blocked
+
+    cols = np.clip(top_ns - 1, 0, width - 1)
+    total = np.cumsum(np.where(tradable, ret, 0.0), axis=1)[:, cols]
+    n_trade = np.cumsum(tradable, axis=1)[:, cols]
+    n_priced = np.cumsum(priced, axis=1)[:, cols]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        net = total / n_trade - config.cost
+    net = np.where(n_trade > 0, net, np.where(n_priced > 0, 0.0, np.nan))
+    return np.round(net, 4)
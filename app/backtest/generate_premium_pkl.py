@@ -0,0 +1,64 @@
+"""app/backtest/generate_premium_pkl.py
+
+直近 90 日分のプレミアム 4 API（先物・信用残・空売り残・投資部門別）を取得し、
+``backtest_data/premium_data.pkl`` に保存する。
+
+ルートの ``make_premium_pickle.py`` と ``python -m app fetch premium`` の実体。
+
+実行例:
+    (venv) python -m app.backtest.generate_premium_pkl
+"""
+
+from __future__ import annotations
+
+import pickle
+from datetime import date, timedelta
+from logging import Logger, basicConfig, getLogger
+from pathlib import Path
+
+import pandas as pd
+
+from app.core.config import AppConfig, get_config
+from app.data.token_manager import TokenManager, TokenSource
+from app.data.premium_temp_fetcher import fetch_premium_temp
+
+# ------------------------- 定数 ------------------------- #
+
+OUTPUT_PKL = Path("backtest_data/premium_data.pkl")
+LOOKBACK_DAYS = 90
+
+# ------------------------- 関数 ------------------------- #
+
+def fetch_premium_history(cfg: AppConfig, id_tok: TokenSource, log: Logger,
+                          lookback_days: int = LOOKBACK_DAYS) -> pd.DataFrame:
+    """直近 lookback_days 日（平日）のプレミアムデータを縦持ちで連結する。"""
+    start = date.today() - timedelta(days=lookback_days)
+    dfs = []
+    for d in pd.date_range(start, date.today(), freq="B"):
+        res = fetch_premium_temp(cfg, id_tok, log, d.strftime("%Y-%m-%d"))
+        for k, df in res.items():
+            if df.empty:
+                continue
+            df = df.assign(Date=d.date(), src=k)
+            dfs.append(df)
+    return pd.concat(dfs, ignore_index=True)
+
+
+def main() -> None:
+    """スクリプトのエントリーポイント。"""
+    basicConfig(level="INFO")
+    log = getLogger("premium_gen")
+
+    cfg = get_config()
+    id_tok = TokenManager(cfg, log)    # ← キャッシュ優先、401 時は取り直す
+
+    premium = fetch_premium_history(cfg, id_tok, log)
+
+    OUTPUT_PKL.parent.mkdir(parents=True, exist_ok=True)
+    with OUTPUT_PKL.open("wb") as f:
+        pickle.dump(premium, f)
+    log.info(f"saved {OUTPUT_PKL} rows={len(premium)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,66 +1,99 @@
 '''
 app/backtest/generate_price_csv.py
 ---------------------------------
-110 営業日分の OHLCV を J‑Quants API から取得し、
+バックテスト用の OHLCV を J‑Quants API から取得し、
 `backtest_data/price_ohlcv.csv` に保存するユーティリティ。
 
+既定は直近 ``HORIZON_DAYS + WARMUP_DAYS``（90 + 20 = 110）営業日。
+``start`` / ``end`` を指定すると、その期間 + 開始前 ``warmup`` 営業日を取得する
+（5 年分なら約 1,250 営業日。日別取得は ``FETCH_WORKERS`` 本で並行）。
+
 既存 fetcher 群 (`jquants_signin.py`, `trading_days_fetcher.py`,
 `daily_quotes_fetcher.py`) と設定ローダを再利用するため、
 把握済みのフォルダ構成・関数名は変更しない。
 
 実行例:
     (venv) python -m app.backtest.generate_price_csv
+    (venv) python -m app fetch ohlcv --start 2020-01-01 --end 2024-12-30
 '''
 
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from typing import Optional
 import pandas as pd
 from logging import Logger
 
-from app.core.config import load_config
+from app.core.config import get_config
 from app.core.logger import setup_logger
-from app.data.jquants_signin import get_refresh_token, get_id_token
-from app.data.trading_days_fetcher import get_latest_trading_days
+from app.data.token_manager import TokenManager, TokenSource
+from app.data.trading_days_fetcher import get_latest_trading_days, get_trading_days_between
 from app.data.daily_quotes_fetcher import fetch_daily_quotes
+from app.backtest.backtest_runner import HORIZON_DAYS, WARMUP_DAYS
+from app.backtest.execution import LIMIT_COLS
 
 # ------------------------- 定数 ------------------------- #
 
 OUTPUT_CSV = Path("backtest_data/price_ohlcv.csv")
-NEEDED_DAYS = 110  # 90 日検証 + 最大 20 日バッファ
+NEEDED_DAYS = HORIZON_DAYS + WARMUP_DAYS  # 90 日検証 + 20 日ウォームアップ
+FETCH_WORKERS = 4                          # 日別取得の並行数
 
 # ------------------------- 関数 ------------------------- #
 
-def _fetch_ohlcv(cfg, id_token: str, logger: Logger) -> pd.DataFrame:
-    """直近 N 営業日の四本値を取得して連結する。"""
-    days = get_latest_trading_days(cfg, id_token, logger, days=NEEDED_DAYS)
-
-    dfs: list[pd.DataFrame] = []
-    for day in days:
+def _fetch_ohlcv(
+    cfg,
+    id_token: TokenSource,
+    logger: Logger,
+    horizon: int = HORIZON_DAYS,
+    warmup: int = WARMUP_DAYS,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    workers: int = FETCH_WORKERS,
+) -> pd.DataFrame:
+    """対象営業日の四本値を取得して連結する（日付順）。
+
+    ``start`` / ``end`` がどちらも None なら直近 ``horizon + warmup`` 営業日、
+    指定があればその期間と開始前 ``warmup`` 営業日。
+    """
+    if start is None and end is None:
+        days = get_latest_trading_days(cfg, id_token, logger, days=horizon + warmup)
+    else:
+        days = get_trading_days_between(cfg, id_token, logger, start, end, warmup=warmup)
+
+    def fetch(day: str) -> pd.DataFrame:
         df = fetch_daily_quotes(cfg, id_token, logger, target_date=day)
-        dfs.append(df[[
-            "Date", "Code", "Open", "High", "Low", "Close", "Volume"
-        ]])
+        # 値幅制限フラグ（約定シミュレータのストップ高 / 安判定用）は API にあれば残す
+        limits = [c for c in LIMIT_COLS if c in df.columns]
+        return df[["Date", "Code", "Open", "High", "Low", "Close", "Volume", *limits]]
+
+    # map は入力順に返すので、並行取得しても日付順に連結される
+    with ThreadPoolExecutor(max(workers, 1)) as pool:
+        dfs: list[pd.DataFrame] = list(pool.map(fetch, days))
 
     merged = pd.concat(dfs, ignore_index=True)
     return merged
 
 
-def main() -> None:
-    """スクリプトのエントリーポイント。"""
-    cfg = load_config("configs/config.yaml")
+def main(
+    horizon: int = HORIZON_DAYS,
+    warmup: int = WARMUP_DAYS,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+) -> None:
+    """スクリプトのエントリーポイント。期間の指定は ``_fetch_ohlcv`` を参照。"""
+    cfg = get_config()
     logger = setup_logger(cfg.logging)
 
-    # 認証
-    refresh_token = get_refresh_token(cfg, logger)
-    id_token = get_id_token(cfg, refresh_token, logger)
+    # 認証（キャッシュが有効なら通信しない）
+    id_token = TokenManager(cfg, logger)    # 401 時は取り直して再試行する
 
     # データ取得
-    price_df = _fetch_ohlcv(cfg, id_token, logger)
+    price_df = _fetch_ohlcv(cfg, id_token, logger, horizon, warmup, start, end)
 
     # 保存ディレクトリの作成
     OUTPUT_CSV.parent.mkdir(parents=True, exist_ok=True)
 
     price_df.to_csv(OUTPUT_CSV, index=False, encoding="utf-8")
-    logger.info(f"Saved OHLCV: {OUTPUT_CSV}  rows={len(price_df)}")
+    logger.info("Saved OHLCV: %s  rows=%d", OUTPUT_CSV, len(price_df))
 
 
 if __name__ == "__main__":
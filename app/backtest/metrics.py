@@ -7,17 +7,40 @@
 - 最大ドローダウン (DD)
 
 単体で import して使用する。
+
+``calc_metrics_batch`` は (営業日 × 戦略) のリターン行列を列ごとに NumPy で一括評価し、
+上の 4 指標に加えてソルティノ・カルマー・平均回転率も返す（パラメータ組ごとに
+``calc_metrics`` を呼ばない）。欠損の扱いは ``calc_metrics`` と同じ
+（平均・標準偏差は欠損を除き、勝率の分母は欠損を含む全日数）。
+``passes_thresholds`` は ``THRESHOLDS`` の合格ラインを列ごとに判定する。
 """
 
 from __future__ import annotations
 
+import warnings
+from typing import Optional, Sequence
+
 import numpy as np
 import pandas as pd
 
 TRADING_DAYS_PER_YEAR = 250
 
+# 合格ライン（param_search の最適解の条件）
+THRESHOLDS = {
+    "mu": 0.05,       # +5 %
+    "win_rate": 0.55, # 55 %
+    "sharpe": 1.5,
+    "max_dd": -0.15,  # drawdown ≤ -15 % (値は負)
+}
+
 __all__ = [
+    "METRIC_KEYS",
+    "THRESHOLDS",
     "calc_metrics",
+    "calc_metrics_batch",
+    "metric_arrays",
+    "passes_thresholds",
+    "safe_ratio",
 ]
 
 
@@ -46,3 +69,99 @@ def calc_metrics(ret_series: pd.Series) -> dict[str, float]:
         "sharpe": round(sharpe, 4),
         "max_dd": round(dd, 4),
     }
+
+
+def safe_ratio(num: np.ndarray, den: np.ndarray) -> np.ndarray:
+    """要素ごとの ``num / den``。分母が 0 の列は 0.0（``calc_metrics`` の sharpe と同じ扱い）。"""
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(den != 0, num / den, 0.0)
+
+
+METRIC_KEYS = ("mu", "win_rate", "sharpe", "max_dd", "sortino", "calmar", "turnover")
+
+
+def metric_arrays(
+    r: np.ndarray,
+    turnover: Optional[np.ndarray] = None,
+    keys: Sequence[str] = METRIC_KEYS,
+) -> dict[str, np.ndarray]:
+    """先頭軸を営業日として指標を計算する（残りの軸は戦略・標本など任意の形、丸めなし）。
+
+    ``calc_metrics_batch`` と ``bootstrap`` の共通部分。``keys`` の指標だけを計算し、
+    戻り値の各配列は ``r.shape[1:]``。
+    """
+    n_days = r.shape[0]
+    shape = r.shape[1:]
+    has_nan = bool(np.isnan(r).any())
+    valid = ~np.isnan(r) if has_nan else None
+    n_valid = valid.sum(axis=0) if has_nan else np.full(shape, n_days)
+    filled = np.where(valid, r, 0.0) if has_nan else r
+    out: dict[str, np.ndarray] = {}
+    annual = np.sqrt(TRADING_DAYS_PER_YEAR)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mu = filled.sum(axis=0) / n_valid
+        if "mu" in keys:
+            out["mu"] = mu
+        if "win_rate" in keys:
+            out["win_rate"] = (r > 0).sum(axis=0) / n_days if n_days else np.full(shape, np.nan)
+        if "sharpe" in keys:
+            dev = r - mu
+            if has_nan:
+                dev[~valid] = 0.0
+            sigma = np.sqrt(np.einsum("i...,i...->...", dev, dev) / n_valid)
+            out["sharpe"] = np.where(np.isnan(sigma), np.nan, safe_ratio(annual * mu, sigma))
+        if "sortino" in keys:
+            neg = np.minimum(filled, 0.0)
+            downside = np.sqrt(np.einsum("i...,i...->...", neg, neg) / n_valid)
+            out["sortino"] = np.where(np.isnan(downside), np.nan, safe_ratio(annual * mu, downside))
+
+    if "max_dd" in keys or "calmar" in keys:
+        # 最大 DD（欠損日は資産を据え置き）
+        cumulative = np.cumprod(1 + filled, axis=0)
+        drawdown = cumulative / np.maximum.accumulate(cumulative, axis=0)
+        dd = np.where(n_valid > 0, drawdown.min(axis=0, initial=1.0) - 1, np.nan)
+        if "max_dd" in keys:
+            out["max_dd"] = dd
+        if "calmar" in keys:
+            out["calmar"] = np.where(np.isnan(dd), np.nan,
+                                     safe_ratio(mu * TRADING_DAYS_PER_YEAR, np.abs(dd)))
+
+    if "turnover" in keys:
+        if turnover is None or not n_days:
+            out["turnover"] = np.full(shape, np.nan)
+        else:
+            t = np.asarray(turnover, dtype=np.float64).reshape(r.shape)
+            with np.errstate(invalid="ignore"), warnings.catch_warnings():
+                warnings.simplefilter("ignore", RuntimeWarning)     # 全欠損列の Mean of empty slice
+                out["turnover"] = np.nanmean(t, axis=0)
+    return {k: out[k] for k in keys}
+
+
+def calc_metrics_batch(
+    returns: np.ndarray | pd.DataFrame,
+    turnover: Optional[np.ndarray | pd.DataFrame] = None,
+) -> pd.DataFrame:
+    """(営業日 × 戦略) のリターン行列から戦略ごとの指標をまとめて計算する。
+
+    Args:
+        returns: 日次リターン。列が戦略（パラメータ組・TopN など）
+        turnover: ``returns`` と同じ形の日次回転率（片道）。None なら turnover 列は NaN
+
+    Returns:
+        pd.DataFrame: 行が戦略（DataFrame を渡した場合は元の列ラベル）、列が
+            mu, win_rate, sharpe, max_dd, sortino, calmar, turnover（小数 4 桁に丸め）
+    """
+    labels = returns.columns if isinstance(returns, pd.DataFrame) else None
+    r = np.asarray(returns, dtype=np.float64)
+    if r.ndim == 1:
+        r = r[:, None]
+    return pd.DataFrame(metric_arrays(r, turnover), index=labels).round(4)
+
+
+def passes_thresholds(metrics: pd.DataFrame, thresholds: dict[str, float] = THRESHOLDS) -> pd.Series:
+    """``calc_metrics_batch`` の各行が合格ライン（すべて以上）を満たすか。"""
+    ok = np.ones(len(metrics), dtype=bool)
+    for key, line in thresholds.items():
+        ok &= (metrics[key] >= line).to_numpy()
+    return pd.Series(ok, index=metrics.index)
@@ -0,0 +1,198 @@
+"""app/backtest/nk225_gap.py
+
+日経225先物 (NK225F) の先物四本値から寄り前ギャップ系列 ``NK225_gap`` を生成する。
+
+1. ``premium_data.pkl``（``make_premium_pickle.py`` 出力）から先物行を抽出
+2. 日付ごとに期近（中心限月）1 本を選択
+3. 同一限月の前日終値に対する寄り前価格の乖離率を全期間まとめて算出
+4. ``backtest_data/nk225_gap.csv`` に未保存日だけを追記
+
+API は呼ばない。``add_derived_cols.main()`` からも自動で呼ばれる。
+
+実行例:
+    (venv) python -m app.backtest.nk225_gap
+"""
+
+from __future__ import annotations
+
+from logging import Logger
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from app.core.config import get_config
+from app.core.logger import setup_logger
+
+# ------------------------- 定数 ------------------------- #
+
+PREMIUM_PKL = Path("backtest_data/premium_data.pkl")
+NK225_CSV = Path("backtest_data/nk225_gap.csv")
+PRODUCT = "NK225F"
+
+# 寄り前価格 / 前日終値 の候補列（左ほど優先）
+PREOPEN_COLS = ["NightSessionClose", "DaySessionOpen", "WholeDayOpen"]
+CLOSE_COLS = ["DaySessionClose", "WholeDayClose", "SettlementPrice"]
+
+__all__ = [
+    "select_front_month",
+    "calc_nk225_gap",
+    "update_nk225_gap",
+    "update_nk225_gap_from_pickle",
+]
+
+# ------------------------- 関数 ------------------------- #
+
+def _first_valid(df: pd.DataFrame, cols: list[str]) -> pd.Series:
+    """候補列を左から見て最初の正の値を返す（0 / 空文字は欠損扱い）。"""
+    out = pd.Series(np.nan, index=df.index)
+    for col in cols:
+        if col in df.columns:
+            val = pd.to_numeric(df[col], errors="coerce")
+            out = out.fillna(val.where(val > 0))
+    return out
+
+
+def select_front_month(fut_df: pd.DataFrame) -> pd.DataFrame:
+    """日付ごとに NK225F の期近限月 1 行だけを残す。
+
+    ``CentralContractMonthFlag == "1"`` を最優先し、無ければ最も近い
+    ``ContractMonth``、限月情報自体が無い旧 pkl では出来高最大の行を採用する。
+
+    Args:
+        fut_df: 先物四本値 DataFrame（複数日・複数限月可）
+
+    Returns:
+        DataFrame: 1 日 1 行に絞った先物データ（Date 昇順）
+    """
+    fut = fut_df[fut_df["DerivativesProductCategory"] == PRODUCT].copy()
+    fut["Date"] = pd.to_datetime(fut["Date"]).dt.normalize()
+
+    if "LastTradingDay" in fut.columns:
+        last_day = pd.to_datetime(fut["LastTradingDay"], errors="coerce")
+        fut = fut[~(last_day < fut["Date"])]
+
+    if "ContractMonth" in fut.columns:
+        central = fut.get("CentralContractMonthFlag", pd.Series("", index=fut.index))
+        fut["_central"] = (central.astype(str) != "1").astype(int)   # 中心限月 → 0
+        sort_cols, ascending = ["Date", "_central", "ContractMonth"], [True, True, True]
+    else:
+        fut["_volume"] = pd.to_numeric(fut.get("Volume", np.nan), errors="coerce")
+        sort_cols, ascending = ["Date", "_volume"], [True, False]
+
+    front = (
+        fut.sort_values(sort_cols, ascending=ascending, kind="mergesort")
+        .drop_duplicates("Date", keep="first")
+        .drop(columns=["_central", "_volume"], errors="ignore")
+    )
+    return front.reset_index(drop=True)
+
+
+def calc_nk225_gap(fut_df: pd.DataFrame) -> pd.DataFrame:
+    """期近限月の寄り前ギャップ系列を全期間まとめて計算する。
+
+    前日終値は **同一限月** の直前営業日から取るため、限月交代日に
+    限月間スプレッドがギャップとして混入しない（限月情報の無い旧 pkl では
+    出来高最大の行の系列で前日終値を取り、ContractMonth は欠損になる）。
+
+    Args:
+        fut_df: 先物四本値 DataFrame（``fetch_premium_temp`` の ``futures``）
+
+    Returns:
+        DataFrame: Date, ContractMonth, NK225_gap
+    """
+    fut = fut_df[fut_df["DerivativesProductCategory"] == PRODUCT].copy()
+    if fut.empty:
+        return pd.DataFrame(columns=["Date", "ContractMonth", "NK225_gap"])
+
+    fut["Date"] = pd.to_datetime(fut["Date"]).dt.normalize()
+    fut["_close"] = _first_valid(fut, CLOSE_COLS)
+
+    if "ContractMonth" in fut.columns:
+        # 限月ごとに前日終値をシフト（全限月を一括で処理）
+        fut = fut.sort_values(["ContractMonth", "Date"], kind="mergesort")
+        fut["_prev_close"] = fut.groupby("ContractMonth")["_close"].shift(1)
+        front = select_front_month(fut)
+    else:
+        # 限月情報の無い旧 pkl: 出来高最大の行を選び（select_front_month の代替規則）、
+        # 選んだ系列の前営業日終値を使う
+        front = select_front_month(fut)
+        front["_prev_close"] = front["_close"].shift(1)
+        front["ContractMonth"] = None
+    gap = _first_valid(front, PREOPEN_COLS) / front["_prev_close"] - 1
+
+    return pd.DataFrame({
+        "Date": front["Date"],
+        "ContractMonth": front["ContractMonth"],
+        "NK225_gap": gap.round(6),
+    }).dropna(subset=["NK225_gap"]).reset_index(drop=True)
+
+
+def update_nk225_gap(fut_df: pd.DataFrame, out_csv: Path, logger: Logger) -> pd.DataFrame:
+    """未保存日のギャップだけを計算し ``out_csv`` に追記する。
+
+    Args:
+        fut_df: 先物四本値 DataFrame
+        out_csv: 保存先 CSV
+        logger: ロガー
+
+    Returns:
+        DataFrame: 今回追記した行
+    """
+    last_date = None
+    if out_csv.exists():
+        saved = pd.read_csv(out_csv, usecols=["Date"], parse_dates=["Date"])
+        if not saved.empty:
+            last_date = saved["Date"].max()
+
+    fut = fut_df
+    if last_date is not None:
+        # 前日終値用に保存済み最終日を 1 日だけ含めて再計算
+        dates = pd.to_datetime(fut["Date"]).dt.normalize()
+        fut = fut[dates >= last_date]
+
+    gap_df = calc_nk225_gap(fut)
+    if last_date is not None:
+        gap_df = gap_df[gap_df["Date"] > last_date]
+
+    if gap_df.empty:
+        logger.info("NK225_gap: 追記対象なし (%s)", out_csv)
+        return gap_df
+
+    out_csv.parent.mkdir(parents=True, exist_ok=True)
+    gap_df.assign(Date=gap_df["Date"].dt.strftime("%Y-%m-%d")).to_csv(
+        out_csv, mode="a", header=not out_csv.exists(), index=False, encoding="utf-8"
+    )
+    logger.info("NK225_gap: %d 日分を追記 → %s", len(gap_df), out_csv)
+    return gap_df
+
+
+def update_nk225_gap_from_pickle(
+    logger: Logger,
+    premium_pkl: Path = PREMIUM_PKL,
+    out_csv: Path = NK225_CSV,
+) -> pd.DataFrame:
+    """``premium_data.pkl`` の先物行から ``nk225_gap.csv`` を更新する。"""
+    if not premium_pkl.exists():
+        logger.warning("Premium pickle not found: %s (NK225_gap 更新スキップ)", premium_pkl)
+        return pd.DataFrame(columns=["Date", "ContractMonth", "NK225_gap"])
+
+    premium = pd.read_pickle(premium_pkl)
+    if "src" in premium.columns:
+        premium = premium[premium["src"] == "futures"]
+    if "DerivativesProductCategory" not in premium.columns:
+        logger.warning("先物データがありません: %s", premium_pkl)
+        return pd.DataFrame(columns=["Date", "ContractMonth", "NK225_gap"])
+
+    return update_nk225_gap(premium, out_csv, logger)
+
+
+def main() -> None:
+    """スクリプトのエントリーポイント。"""
+    cfg = get_config()
+    logger = setup_logger(cfg.logging)
+    update_nk225_gap_from_pickle(logger)
+
+
+if __name__ == "__main__":
+    main()
@@ -5,41 +5,48 @@
 
 - 指標は metrics.calc_metrics()
 - 合格ラインを満たしたものの中で Sharpe 最大を最適解とする
-- 結果を backtest_results/param_report.txt に保存
+- 全組のパラメータ・指標・日次リターンを ``result_store`` で backtest_results/search/<日時>/ に保存し、
+  グラフ・backtest_results/param_report.txt・最適組の results_90d.csv はそこから作る
+  （最適組のバックテストを描画のために再実行しない）。最適組の資産曲線は従来どおり
+  backtest_results/equity_curve.png にも写す
+
+TopN はグリッドの次元にせず、係数の組ごとに ``run_backtest_topn`` を 1 回だけ実行して
+全 TopN の日次リターンを累積和で同時に求める（TopN の数だけバックテストを繰り返さない）。
+ワーカーは (営業日 × TopN) のリターン行列だけを返し、指標は親で全組を横に並べた行列に
+``calc_metrics_batch`` を 1 回かけて求める（合格判定も ``passes_thresholds`` で一括）。
+全候補の Sharpe に定常ブートストラップの 95% 信頼区間（``sharpe_lo`` / ``sharpe_hi`` / ``sharpe_se``）を付ける。
 """
 
 from __future__ import annotations
 
 from itertools import product
-from joblib import Parallel, delayed
 import os
 from pathlib import Path
+import shutil
+import numpy as np
 import pandas as pd
 from logging import getLogger, basicConfig, WARNING
 
-import yaml              # ← まだ無ければ追加
-
-
-from app.core.config import load_config
-from app.data.jquants_signin import get_refresh_token, get_id_token
-from app.data.listed_info_fetcher import fetch_listed_info
-from app.backtest.add_derived_cols import add_derived_cols  # ensure derived cols exist if needed
-from app.backtest.backtest_runner import run_backtest
-from app.backtest.metrics import calc_metrics
-
-INPUT_CSV = Path("backtest_data/price_ohlcv_derived.csv")
+from app.core.config import AppConfig, get_config
+from app.data.token_manager import TokenManager
+from app.data.listed_info_fetcher import load_listed_info
+from app.backtest.backtest_runner import run_backtest_topn
+from app.backtest.bootstrap import bootstrap_ci
+from app.backtest.metrics import THRESHOLDS, calc_metrics_batch, passes_thresholds
+from app.backtest.price_loader import DERIVED_CSV, frame_mb, load_price_df
+from app.backtest.report import render_report, write_text_report
+from app.backtest.result_store import SearchResults, load_returns, new_store_dir, save_results
+from app.core.profiling import Profiler, get_profiler
+
+INPUT_CSV = DERIVED_CSV
 REPORT_TXT = Path("backtest_results/param_report.txt")
+RESULTS_CSV = Path("backtest_results/results_90d.csv")
+EQUITY_PNG = Path("backtest_results/equity_curve.png")   # 従来の出力先（ストアの equity_curve.png の写し）
 
 basicConfig(level=WARNING, format="%(levelname)s  %(message)s")
 logger = getLogger("param_search")
 
-# ------------------------------- 合格ライン ------------------------------ #
-THRESHOLDS = {
-    "mu": 0.05,       # +5 %
-    "win_rate": 0.55, # 55 %
-    "sharpe": 1.5,
-    "max_dd": -0.15,  # drawdown ≤ -15 % (値は負)
-}
+# 合格ライン THRESHOLDS は metrics.py で定義（calc_metrics_batch の結果に passes_thresholds で適用）
 
 # ------------------------------- グリッド定義 ----------------------------- #
 COARSE_C    = [1.0, 1.2, 1.4, 1.6]        # 0.6–0.8 / ≥1.8 を除外
@@ -56,125 +63,136 @@ FINE_TOPN = [8, 10, 12]
 # --------------------------------------------------------------
 # 並列数を自動決定（config.yaml > 物理コア）
 # --------------------------------------------------------------
-def _suggest_n_jobs() -> int:
+# run_backtest 1 本あたりの作業メモリ（価格パネルの何倍か: ソート済みコピー + フィルタ結果 + universe）
+WORKER_MEM_FACTOR = 3.0
+
+def _suggest_n_jobs(cfg: AppConfig, panel_mb: float | None = None) -> int:
     """
     Ryzen 9 5950X 用 推奨並列数を返す。
 
     1. configs/config.yaml に BACKTEST_N_JOBS があればそれを優先
     2. 無ければ物理コア数（16）を利用
+    3. MEMORY_BUDGET_MB があれば、パネル × WORKER_MEM_FACTOR × 並列数 が予算内に収まるよう抑える
     """
-    try:
-        with open("configs/config.yaml", "r", encoding="utf-8") as f:
-            raw = yaml.safe_load(f) or {}
-            if "BACKTEST_N_JOBS" in raw and raw["BACKTEST_N_JOBS"]:
-                return int(raw["BACKTEST_N_JOBS"])
-    except FileNotFoundError:
-        pass  # ファイルが無ければ物理コアで代用
-
-    logical = os.cpu_count() or 1        # 5950X は 32 論理
-    return logical // 2 or 1             # 16 物理。最低でも 1
+    if cfg.BACKTEST_N_JOBS:
+        n_jobs = int(cfg.BACKTEST_N_JOBS)
+    else:
+        logical = os.cpu_count() or 1        # 5950X は 32 論理
+        n_jobs = logical // 2 or 1           # 16 物理。最低でも 1
+
+    if cfg.MEMORY_BUDGET_MB and panel_mb:
+        fit = int(cfg.MEMORY_BUDGET_MB // (panel_mb * WORKER_MEM_FACTOR))
+        if fit < n_jobs:
+            logger.warning("メモリ予算 %d MB のため並列数を %d → %d に制限します",
+                           cfg.MEMORY_BUDGET_MB, n_jobs, max(fit, 1))
+            n_jobs = max(fit, 1)
+    return n_jobs
 
 # --------------------------------------------------------------
 # Helper wrappers for joblib (need top‑level picklable funcs)
 # --------------------------------------------------------------
-def _run_backtest_coarse(price_df, info_df, c, d, top):
-    res = run_backtest(price_df, info_df, (1, 1, c, d), top)
-    m   = calc_metrics(res["Ret"])
-    m.update({"a": 1, "b": 1, "c": c, "d": d, "TopN": top})
-    return m
-
-def _run_backtest_fine(price_df, info_df, a, b, c, d, top):
-    res = run_backtest(price_df, info_df, (a, b, c, d), top)
-    m   = calc_metrics(res["Ret"])
-    m.update({"a": a, "b": b, "c": c, "d": d, "TopN": top})
-    return m
-
-def _meets_threshold(m: dict[str, float]) -> bool:
-    return (
-        m["mu"] >= THRESHOLDS["mu"] and
-        m["win_rate"] >= THRESHOLDS["win_rate"] and
-        m["sharpe"] >= THRESHOLDS["sharpe"] and
-        m["max_dd"] >= THRESHOLDS["max_dd"]
-    )
+def _run_param_set(price_df, info_df, a, b, c, d, tops):
+    # ワーカープロセスの計測は戻り値に載せ、親で get_profiler().merge() する
+    prof = Profiler()
+    with prof.span("search.param_set", a=a, b=b, c=c, d=d, TopN=len(tops)) as rec:
+        rets, turn = run_backtest_topn(price_df, info_df, (a, b, c, d), tops, with_turnover=True)
+        rec.rows = len(rets)
+    return {"a": a, "b": b, "c": c, "d": d, "TopN": list(tops), "Date": rets.index.to_numpy(),
+            "rets": rets.to_numpy(), "turnover": turn.to_numpy(), "_profile": prof.records()}
+
+def _run_backtest_coarse(price_df, info_df, c, d, tops):
+    return _run_param_set(price_df, info_df, 1, 1, c, d, tops)
+
+def _run_backtest_fine(price_df, info_df, a, b, c, d, tops):
+    return _run_param_set(price_df, info_df, a, b, c, d, tops)
+
+def _score_batches(batches: list[dict], stage: str) -> SearchResults:
+    """ワーカーの結果を (営業日 × 全組) に並べて指標を一括計算する（runs の 1 行 = 1 組）。"""
+    for batch in batches:
+        get_profiler().merge(batch.pop("_profile", []))
+    params = pd.DataFrame([
+        {"stage": stage, "a": bt["a"], "b": bt["b"], "c": bt["c"], "d": bt["d"], "TopN": top}
+        for bt in batches for top in bt["TopN"]
+    ])
+    rets = np.hstack([bt["rets"] for bt in batches])
+    turn = np.hstack([bt["turnover"] for bt in batches])
+    metrics = calc_metrics_batch(rets, turn)
+    ci = bootstrap_ci(rets, metrics=("sharpe",))
+    dates = pd.DatetimeIndex(batches[0]["Date"], name="Date")
+    return SearchResults(pd.concat([params, metrics, ci], axis=1),
+                         pd.DataFrame(rets, index=dates), pd.DataFrame(turn, index=dates))
+
+def _combine(parts: list[SearchResults]) -> SearchResults:
+    """段階ごとの結果を連結し、run_id（連番）・合否・最適フラグを付ける。"""
+    runs = pd.concat([p.runs for p in parts], ignore_index=True)
+    runs.insert(0, "run_id", np.arange(len(runs)))
+    runs["passed"] = passes_thresholds(runs, THRESHOLDS).to_numpy()
+    # 最適解は細探索の合格組の中で Sharpe 最大
+    candidates = runs[runs["passed"] & (runs["stage"] == "fine")]
+    runs["best"] = False
+    if not candidates.empty:
+        runs.loc[candidates["sharpe"].idxmax(), "best"] = True
+    rets = pd.concat([p.returns for p in parts], axis=1)
+    turn = pd.concat([p.turnover for p in parts], axis=1)
+    rets.columns = turn.columns = pd.RangeIndex(len(runs))
+    return SearchResults(runs, rets, turn)
 
 # ------------------------------- メイン ---------------------------------- #
 
-def main() -> None:
-    if not INPUT_CSV.exists():
-        logger.error("Derived CSV not found: %s", INPUT_CSV)
+def main(source: str = "csv", compact: bool = False) -> None:
+    """2 段階グリッドサーチを実行する。``source`` は ``"csv"`` / ``"db"``、``compact`` で省メモリ型。"""
+    cfg = get_config()
+    try:
+        price_df = load_price_df(source, logger, INPUT_CSV, compact=compact,
+                                 budget_mb=cfg.MEMORY_BUDGET_MB)
+    except FileNotFoundError as e:
+        logger.error("%s", e)
         return
-    price_df = pd.read_csv(
-        INPUT_CSV,
-        dtype={"Code": "str"},      # ← 文字列で読み込む
-        parse_dates=["Date"],
-        low_memory=False            # ← mixed-dtype 警告回避
-    )
 
-    cfg = load_config("configs/config.yaml")
-    refresh = get_refresh_token(cfg, logger)
-    id_tok = get_id_token(cfg, refresh, logger)
-    info_df = fetch_listed_info(cfg, id_tok, logger)
+    tokens = TokenManager(cfg, logger)      # 上場銘柄キャッシュが古い時だけ認証
+    info_df = load_listed_info(cfg, tokens.get_id_token, logger)
 
-    best = None  # type: dict[str, float] | None
+    from joblib import Parallel, delayed   # 探索時のみ読み込む
 
     # --- Step A: 粗探索 (c,d) ------------------------------------------ #
-    n_jobs = _suggest_n_jobs()
-    coarse_results = Parallel(n_jobs=n_jobs, verbose=10)(
-        delayed(_run_backtest_coarse)(price_df, info_df, c, d, top)
-        for c, d, top in product(COARSE_C, COARSE_D, COARSE_TOPN)
-    )
-    coarse_sorted = sorted(coarse_results, key=lambda x: x["sharpe"], reverse=True)[:3]
+    n_jobs = _suggest_n_jobs(cfg, frame_mb(price_df))
+    coarse = _score_batches(Parallel(n_jobs=n_jobs, verbose=10)(
+        delayed(_run_backtest_coarse)(price_df, info_df, c, d, COARSE_TOPN)
+        for c, d in product(COARSE_C, COARSE_D)
+    ), "coarse")
+    coarse_sorted = coarse.runs.sort_values("sharpe", ascending=False, kind="stable").head(3)
 
     # --- Step B: 細探索 (a,b) ------------------------------------------ #
-    fine_results = []
-    for param in coarse_sorted:
-        c, d = param["c"], param["d"]
-        fine_batch = Parallel(n_jobs=n_jobs, verbose=10)(
-            delayed(_run_backtest_fine)(price_df, info_df, a, b, c, d, top)
-            for a, b, top in product(FINE_A, FINE_B, FINE_TOPN)
-        )
-        for m in fine_batch:
-            fine_results.append(m)
-            if _meets_threshold(m):
-                if best is None or m["sharpe"] > best["sharpe"]:
-                    best = m
-                    logger.info("New best: %s", best)
+    fine_batches = []
+    for c, d in coarse_sorted[["c", "d"]].itertuples(index=False):
+        fine_batches.extend(Parallel(n_jobs=n_jobs, verbose=10)(
+            delayed(_run_backtest_fine)(price_df, info_df, a, b, c, d, FINE_TOPN)
+            for a, b in product(FINE_A, FINE_B)
+        ))
+    results = _combine([coarse, _score_batches(fine_batches, "fine")])
+
+    # --- 保存: 全組のパラメータ・指標・日次リターン ---------------------- #
+    store = save_results(new_store_dir(), results)
+    logger.info("Results saved: %s (%d runs)", store, len(results.runs))
+
+    best = results.runs[results.runs["best"]]
+    if not best.empty:
+        logger.info("Best: %s", best.iloc[0].to_dict())
+        # 最適組の日次リターンは保存済みの系列を使う（再バックテストしない）
+        ret = load_returns(store, best["run_id"].tolist()).iloc[:, 0]
+        RESULTS_CSV.parent.mkdir(parents=True, exist_ok=True)
+        ret.rename("Ret").reset_index().to_csv(RESULTS_CSV, index=False, encoding="utf-8")
+        logger.info("Saved %s", RESULTS_CSV)
 
     REPORT_TXT.parent.mkdir(parents=True, exist_ok=True)
-    with REPORT_TXT.open("w", encoding="utf-8") as f:
-        f.write("### Param Search Report\n")
-        f.write(f"Best Params: {best}\n\n")
-        f.write("Top 10 by Sharpe:\n")
-        for row in sorted(fine_results, key=lambda x: x["sharpe"], reverse=True)[:10]:
-            f.write(str(row) + "\n")
+    write_text_report(store, REPORT_TXT)
     logger.info("Report saved: %s", REPORT_TXT)
-
-    # ここから追記  ▼▼▼
-    if best:
-        logger.info("Re-running backtest with BEST params for CSV/PNG …")
-        best_coeffs = (best["a"], best["b"], best["c"], best["d"])
-        best_topn   = best["TopN"]
-
-        res_best = run_backtest(price_df, info_df, best_coeffs, best_topn)
-
-        out_dir = Path("backtest_results")
-        out_dir.mkdir(exist_ok=True, parents=True)
-
-        csv_path = out_dir / "results_90d.csv"
-        res_best.to_csv(csv_path, index=False, encoding="utf-8")
-        logger.info("Saved %s", csv_path)
-
-        # 資産曲線
-        import matplotlib.pyplot as plt
-        equity = (1 + res_best["Ret"]).cumprod()
-        plt.figure()
-        plt.plot(res_best["Date"], equity)
-        plt.title("Equity Curve (Best Params)")
-        plt.xlabel("Date"); plt.ylabel("Equity")
-        plt.grid(True)
-        plt.savefig(out_dir / "equity_curve.png", dpi=120, bbox_inches="tight")
-        plt.close()
-    # 追記ここまで  ▲▲▲
+    paths = render_report(store, n_jobs=n_jobs)
+    logger.info("Charts saved: %s", ", ".join(p.name for p in paths))
+    equity = store / "equity_curve.png"
+    if equity.exists():
+        shutil.copyfile(equity, EQUITY_PNG)
+        logger.info("Saved %s", EQUITY_PNG)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,96 @@
+"""app/backtest/pipeline.py
+
+バックテスト一連フローのステージ定義（実行器は ``app/core/orchestrator.py``）。
+
+    fetch_ohlcv ──┐
+                  ├─→ derive ─→ search
+    fetch_premium ┘
+
+- 取得ステージは「取得日」をパラメータに持つため 1 日 1 回だけ API を叩く。
+- derive / search は入力 CSV・コード（各スクリプトから import される app.* 全体）・
+  グリッド定義が変わった時だけ再計算する。
+- fetch_ohlcv と fetch_premium は互いに独立なので並行実行される。
+
+実行例:
+    (venv) python -m app pipeline
+    (venv) python -m app pipeline derive --force derive
+"""
+
+from __future__ import annotations
+
+from datetime import date
+from logging import Logger
+from pathlib import Path
+
+from app.core.orchestrator import Pipeline, Stage, import_closure
+
+STATE_JSON = Path("backtest_data/.pipeline_state.json")
+
+
+def _module(name: str):
+    """``app.backtest.<name>``（``app.`` で始まる名前はそのまま）を import する。"""
+    import importlib
+    return importlib.import_module(name if name.startswith("app.") else f"app.backtest.{name}")
+
+
+def _run(name: str) -> None:
+    """ステージ実行時にだけモジュールを import して main() を呼ぶ。"""
+    _module(name).main()
+
+
+def build_stages(as_of: date | None = None) -> list[Stage]:
+    """ステージ一覧を返す。
+
+    パス・グリッド定数は各スクリプトの定義を、ステージを判定する時に import して読む
+    （``build_stages`` 自体は pandas / backtest_runner などを import しない）。
+    コードのフィンガープリントは各スクリプトからの ``import_closure``。
+    """
+    as_of = (as_of or date.today()).isoformat()
+
+    def search_params() -> dict:
+        param_search = _module("param_search")
+        return {
+            "thresholds": param_search.THRESHOLDS,
+            "coarse": [param_search.COARSE_C, param_search.COARSE_D, param_search.COARSE_TOPN],
+            "fine": [param_search.FINE_A, param_search.FINE_B, param_search.FINE_TOPN],
+        }
+
+    return [
+        Stage(
+            name="fetch_ohlcv",
+            func=lambda: _run("generate_price_csv"),
+            outputs=lambda: [_module("generate_price_csv").OUTPUT_CSV],
+            code=import_closure("app.backtest.generate_price_csv"),
+            params=lambda: {"as_of": as_of, "days": _module("generate_price_csv").NEEDED_DAYS},
+        ),
+        Stage(
+            name="fetch_premium",
+            func=lambda: _run("generate_premium_pkl"),
+            outputs=lambda: [_module("generate_premium_pkl").OUTPUT_PKL],
+            code=import_closure("app.backtest.generate_premium_pkl"),
+            params=lambda: {"as_of": as_of, "lookback": _module("generate_premium_pkl").LOOKBACK_DAYS},
+        ),
+        Stage(
+            name="derive",
+            func=lambda: _run("add_derived_cols"),
+            inputs=lambda: [_module("add_derived_cols").RAW_CSV, _module("nk225_gap").PREMIUM_PKL],
+            outputs=lambda: [_module("add_derived_cols").DERIVED_CSV, _module("nk225_gap").NK225_CSV],
+            deps=["fetch_ohlcv", "fetch_premium"],
+            code=import_closure("app.backtest.add_derived_cols"),
+        ),
+        Stage(
+            name="search",
+            func=lambda: _run("param_search"),
+            # 上場銘柄一覧は eligible_names で選べる銘柄を決めるので入力に含める
+            inputs=lambda: [_module("param_search").INPUT_CSV,
+                            _module("app.data.listed_info_fetcher").LISTED_INFO_CSV],
+            outputs=lambda: [_module("param_search").REPORT_TXT],
+            deps=["derive"],
+            code=import_closure("app.backtest.param_search"),
+            params=search_params,
+        ),
+    ]
+
+
+def build_pipeline(logger: Logger, as_of: date | None = None) -> Pipeline:
+    return Pipeline(build_stages(as_of), STATE_JSON, logger)
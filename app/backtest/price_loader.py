@@ -0,0 +1,180 @@
+"""app/backtest/price_loader.py
+
+バックテスト / パラメータ探索用の価格パネル読み込み。
+
+- ``csv``: ``backtest_data/price_ohlcv_derived.csv``（既定）
+- ``db``:  PostgreSQL の ohlcv + features を ``MarketReader`` でバイナリ COPY 読み出し
+  （``python -m app db-load`` で投入済みであること）
+
+どちらも Date(datetime64) / Code(str) + 四本値 + 派生指標列の同じ形で返す。
+``columns`` / ``codes`` / ``start`` / ``end`` を指定すると、db はその列・銘柄・期間だけを
+問い合わせ、csv は列を ``usecols`` で絞って読み、行を期間・銘柄で絞る。
+
+省メモリモード（``compact=True``）:
+- 浮動小数列は float32 に往復しても値が変わらない（相対誤差 ``FLOAT32_RTOL`` 以内）列だけ float32 へ
+- 整数に落とすのは ``INT_COLS``（出来高）だけで、全値が整数かつ int32 に収まる場合に限る。
+  四本値などそれ以外の列は値がたまたま整数でも浮動小数のまま（整数型で読まれた四本値も浮動小数へ）
+- 銘柄コードは同じ str オブジェクトを共有（行ごとの文字列を作らない）
+- CSV は ``CHUNK_ROWS`` 行ずつ読みながら縮小するため、float64 全体が一度に載ることもない
+
+``budget_mb`` を超えた場合は警告する（``param_search`` は並列数をこの予算内に抑える）。
+"""
+
+from __future__ import annotations
+
+import sys
+from logging import Logger
+from pathlib import Path
+from typing import Iterable, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from app.core.config import get_config
+
+__all__ = [
+    "DERIVED_CSV",
+    "SOURCES",
+    "compact_dtypes",
+    "frame_mb",
+    "load_price_df",
+]
+
+DERIVED_CSV = Path("backtest_data/price_ohlcv_derived.csv")
+SOURCES = ("csv", "db")
+
+FLOAT32_RTOL = 1e-6        # float32 へ落としてよい往復誤差
+INT_COLS = ("Volume",)     # int32 に落としてよい列
+PRICE_COLS = ("Open", "High", "Low", "Close")
+CHUNK_ROWS = 500_000       # compact 時の CSV 読み込み単位
+
+
+def frame_mb(df: pd.DataFrame) -> float:
+    """DataFrame の実メモリ量 [MB]。
+
+    object 列は同じ文字列オブジェクトを共有している分を 1 回だけ数える
+    （``memory_usage(deep=True)`` は行ごとに数えるため共有の効果が見えない）。
+    """
+    total = df.memory_usage(index=True, deep=False).sum()
+    for col in df.columns[df.dtypes == object]:
+        uniq = {id(x): x for x in df[col].to_numpy()}
+        total += sum(sys.getsizeof(x) for x in uniq.values())
+    return total / 2**20
+
+
+def _intern_codes(codes: pd.Series) -> pd.Series:
+    """同じ銘柄コードを 1 つの str オブジェクトで共有させる。"""
+    idx, uniques = pd.factorize(codes.astype(str), sort=False)
+    shared = np.asarray(uniques, dtype=object)
+    return pd.Series(shared[idx], index=codes.index, name=codes.name)
+
+
+def _fits_int32(v: np.ndarray) -> bool:
+    return bool(len(v)) and v.min() >= -2**31 and v.max() < 2**31
+
+
+def compact_dtypes(df: pd.DataFrame) -> pd.DataFrame:
+    """数値列を値を変えない範囲で縮小し、Code を共有文字列にした DataFrame を返す（in place）。"""
+    for col in df.columns:
+        s = df[col]
+        if col in PRICE_COLS and pd.api.types.is_integer_dtype(s):
+            s = df[col] = s.astype(np.float64)       # 四本値は常に浮動小数
+        if col == "Code":
+            df[col] = _intern_codes(s)
+        elif pd.api.types.is_float_dtype(s) and s.dtype != np.float32:
+            v = s.to_numpy()
+            finite = np.isfinite(v)
+            if col in INT_COLS and finite.all() and np.array_equal(v, np.round(v)) and _fits_int32(v):
+                df[col] = v.astype(np.int32)
+                continue
+            with np.errstate(over="ignore", invalid="ignore"):
+                v32 = v.astype(np.float32)
+            err = np.abs(v32[finite].astype(np.float64) - v[finite])
+            if not err.size or (err <= FLOAT32_RTOL * np.abs(v[finite]) + 1e-12).all():
+                df[col] = v32
+        elif pd.api.types.is_integer_dtype(s) and s.dtype.itemsize > 4 and _fits_int32(s.to_numpy()):
+            df[col] = s.astype(np.int32)
+    return df
+
+
+def _select_rows(df: pd.DataFrame, codes, start, end) -> pd.DataFrame:
+    if codes is None and start is None and end is None:
+        return df
+    keep = np.ones(len(df), dtype=bool)
+    if start is not None:
+        keep &= (df["Date"] >= pd.Timestamp(start)).to_numpy()
+    if end is not None:
+        keep &= (df["Date"] <= pd.Timestamp(end)).to_numpy()
+    if codes is not None:
+        keep &= df["Code"].isin([str(c) for c in codes]).to_numpy()
+    return df if keep.all() else df[keep].reset_index(drop=True)
+
+
+def _read_csv(csv_path: Path, compact: bool, columns=None, codes=None, start=None, end=None) -> pd.DataFrame:
+    kw = dict(dtype={"Code": "str"}, parse_dates=["Date"], low_memory=False)
+    if columns is not None:
+        kw["usecols"] = ["Date", "Code"] + [c for c in columns if c not in ("Date", "Code")]
+    if not compact:
+        return _select_rows(pd.read_csv(csv_path, **kw), codes, start, end)
+    parts = [compact_dtypes(_select_rows(chunk, codes, start, end))
+             for chunk in pd.read_csv(csv_path, chunksize=CHUNK_ROWS, **kw)]
+    df = pd.concat(parts, ignore_index=True)
+    # チャンク間で型がずれた列（片方だけ int32 など）を揃え直す
+    return compact_dtypes(df)
+
+
+def load_price_df(
+    source: str,
+    logger: Logger,
+    csv_path: Path = DERIVED_CSV,
+    compact: bool = False,
+    budget_mb: Optional[float] = None,
+    columns: Optional[Sequence[str]] = None,
+    codes: Optional[Iterable[str]] = None,
+    start=None,
+    end=None,
+) -> pd.DataFrame:
+    """派生指標付き価格パネルを読み込む。
+
+    Args:
+        source: ``"csv"`` または ``"db"``
+        logger: ロガー
+        csv_path: ``source="csv"`` のときの入力 CSV
+        compact: True なら省メモリ型に変換する
+        budget_mb: 1 プロセスあたりのメモリ予算 [MB]。超過時は警告
+        columns: 読み込む列（Date / Code は常に含む）。None なら全列
+        codes: 銘柄コードの絞り込み（None なら全銘柄）
+        start / end: 期間（両端含む、None は端まで）
+
+    Returns:
+        pd.DataFrame: Date, Code, Open..Volume, 派生指標列（Date, Code 昇順）
+    """
+    if source == "csv":
+        if not csv_path.exists():
+            raise FileNotFoundError(f"Derived CSV not found: {csv_path}")
+        df = _read_csv(csv_path, compact, columns, codes, start, end)
+
+    elif source == "db":
+        # DB 読み出し時のみ psycopg2 を読み込む
+        from app.db.db_client import DBClient
+        from app.db.market_reader import MarketReader
+        from app.db.market_store import TABLES
+
+        if columns is None:
+            columns = [c for t in ("ohlcv", "features") for c in TABLES[t]["columns"]
+                       if c not in ("Date", "Code")]
+        with DBClient(get_config(), logger) as db:
+            df = MarketReader(db, logger).read_frame(columns, codes, start, end)
+        if compact:
+            df = compact_dtypes(df)
+
+    else:
+        raise ValueError(f"未知の読み込み元です: {source} (choices: {', '.join(SOURCES)})")
+
+    size = frame_mb(df)
+    logger.info("価格パネル: %d 行 × %d 列, %.1f MB%s", len(df), df.shape[1], size,
+                " (compact)" if compact else "")
+    if budget_mb is not None and size > budget_mb:
+        logger.warning("価格パネルがメモリ予算を超えています: %.1f MB > %.1f MB "
+                       "(--compact / 期間短縮 / 並列数削減を検討)", size, budget_mb)
+    return df
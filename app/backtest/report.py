@@ -0,0 +1,197 @@
+"""app/backtest/report.py
+
+探索結果ストア（``result_store``）からグラフ・レポートを一括生成する。
+
+- ``equity_curve.png``: 最適組の資産曲線
+- ``equity_top.png``: Sharpe 上位 ``top`` 組の資産曲線
+- ``heatmap_cd.png``: (c, d) ごとの最大 Sharpe のヒートマップ（TopN ごとに 1 面）
+- ``topn_sensitivity.png``: Sharpe 上位の係数の組について TopN ごとの Sharpe（首位の組は 95% 信頼区間の帯つき）
+- ``report.txt``: 最適組と Sharpe 上位の表
+
+バックテストは再計算せず、保存済みの指標・日次リターンだけを読む。描画は非対話の
+Agg バックエンドで行い、グラフごとに joblib で並列化する（各ワーカーはストアから
+必要な組の列だけを読むので、大きな行列をプロセス間で受け渡さない）。
+
+    (venv) python -m app report                  # 最新の探索結果
+    (venv) python -m app report backtest_results/search/20250101_120000 --jobs 4
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from app.backtest.result_store import load_returns, load_runs
+
+__all__ = [
+    "CHARTS",
+    "render_report",
+    "write_text_report",
+]
+
+CHARTS = ("equity", "equity_top", "heatmap", "topn")
+
+TOP_K = 10                 # 上位として描く組数
+DPI = 120
+COEFFS = ["a", "b", "c", "d"]
+
+
+# ----------------------------------------------------------------------
+# 描画（joblib ワーカーで呼ぶのでトップレベル関数）
+# ----------------------------------------------------------------------
+
+def _pyplot():
+    """非対話バックエンドで pyplot を読み込む（描画時のみ）。"""
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    return plt
+
+
+def _label(row: pd.Series) -> str:
+    return f"a={row['a']:g} b={row['b']:g} c={row['c']:g} d={row['d']:g} N={int(row['TopN'])}"
+
+
+def _top_runs(runs: pd.DataFrame, k: int) -> pd.DataFrame:
+    return runs.sort_values("sharpe", ascending=False, kind="stable").head(k)
+
+
+def _render_equity(store: Path, out: Path, run_ids: Sequence[int], title: str) -> Path:
+    runs = load_runs(store).set_index("run_id")
+    rets = load_returns(store, run_ids)
+    equity = (1 + rets.fillna(0.0)).cumprod()
+    plt = _pyplot()
+    fig, ax = plt.subplots(figsize=(8, 4.5))
+    for run_id in run_ids:
+        ax.plot(equity.index, equity[run_id], label=_label(runs.loc[run_id]), linewidth=1)
+    ax.set_title(title)
+    ax.set_xlabel("Date")
+    ax.set_ylabel("Equity")
+    ax.grid(True)
+    if len(run_ids) > 1:
+        ax.legend(fontsize=6, loc="upper left")
+    fig.savefig(out, dpi=DPI, bbox_inches="tight")
+    plt.close(fig)
+    return out
+
+
+def _render_heatmap(store: Path, out: Path) -> Path:
+    runs = load_runs(store)
+    top_ns = sorted(runs["TopN"].unique())
+    plt = _pyplot()
+    fig, axes = plt.subplots(1, len(top_ns), figsize=(3.8 * len(top_ns), 3.2), squeeze=False,
+                             constrained_layout=True)
+    for ax, top in zip(axes[0], top_ns):
+        grid = runs[runs["TopN"] == top].pivot_table(index="c", columns="d", values="sharpe",
+                                                     aggfunc="max")
+        im = ax.imshow(grid.to_numpy(), cmap="RdYlGn", origin="lower", aspect="auto")
+        ax.set_xticks(range(grid.shape[1]), [f"{v:g}" for v in grid.columns])
+        ax.set_yticks(range(grid.shape[0]), [f"{v:g}" for v in grid.index])
+        for (i, j), value in np.ndenumerate(grid.to_numpy()):
+            if not np.isnan(value):
+                ax.text(j, i, f"{value:.2f}", ha="center", va="center", fontsize=7)
+        ax.set_title(f"TopN={top}")
+        ax.set_xlabel("d")
+        ax.set_ylabel("c")
+        fig.colorbar(im, ax=ax, fraction=0.046)
+    fig.suptitle("Max Sharpe by (c, d)")
+    fig.savefig(out, dpi=DPI, bbox_inches="tight")
+    plt.close(fig)
+    return out
+
+
+def _render_topn(store: Path, out: Path, k: int) -> Path:
+    runs = load_runs(store)
+    best = runs.groupby(COEFFS)["sharpe"].max().sort_values(ascending=False, kind="stable").head(k)
+    plt = _pyplot()
+    fig, ax = plt.subplots(figsize=(8, 4.5))
+    for rank, coeffs in enumerate(best.index):
+        rows = runs[(runs[COEFFS] == coeffs).all(axis=1)].sort_values("TopN")
+        line, = ax.plot(rows["TopN"], rows["sharpe"], marker="o", linewidth=1,
+                        label="a={:g} b={:g} c={:g} d={:g}".format(*coeffs))
+        if rank == 0 and {"sharpe_lo", "sharpe_hi"} <= set(rows.columns):      # 帯は首位の組だけ
+            ax.fill_between(rows["TopN"], rows["sharpe_lo"], rows["sharpe_hi"],
+                            color=line.get_color(), alpha=0.1)
+    ax.set_title("Sharpe by TopN")
+    ax.set_xlabel("TopN")
+    ax.set_ylabel("Sharpe")
+    ax.grid(True)
+    ax.legend(fontsize=6, loc="best")
+    fig.savefig(out, dpi=DPI, bbox_inches="tight")
+    plt.close(fig)
+    return out
+
+
+# ----------------------------------------------------------------------
+# レポート
+# ----------------------------------------------------------------------
+
+def write_text_report(store: Path, out: Path, top: int = TOP_K) -> Path:
+    """最適組と Sharpe 上位 ``top`` 組の表をテキストで書く。"""
+    runs = load_runs(store)
+    best = runs[runs["best"]] if "best" in runs.columns else runs.iloc[:0]
+    cols = [c for c in ["run_id", "stage", *COEFFS, "TopN", "mu", "win_rate", "sharpe",
+                        "sharpe_lo", "sharpe_hi", "max_dd", "sortino", "calmar", "turnover",
+                        "passed"] if c in runs.columns]
+    with Path(out).open("w", encoding="utf-8") as f:
+        f.write("### Param Search Report\n")
+        f.write(f"Store: {store}\n")
+        f.write(f"Runs: {len(runs)}\n\n")
+        f.write("Best Params:\n")
+        f.write((best[cols].to_string(index=False) if len(best) else "None") + "\n\n")
+        f.write(f"Top {top} by Sharpe:\n")
+        f.write(_top_runs(runs, top)[cols].to_string(index=False) + "\n")
+    return Path(out)
+
+
+def render_report(
+    store: Path,
+    out_dir: Optional[Path] = None,
+    charts: Sequence[str] = CHARTS,
+    top: int = TOP_K,
+    n_jobs: int = 1,
+) -> list[Path]:
+    """探索結果ストアからレポート一式を生成する。
+
+    Args:
+        store: ``result_store.save_results`` の保存先
+        out_dir: 出力先（None なら ``store`` と同じ）
+        charts: 描くグラフ（``CHARTS`` の部分集合）
+        top: 上位として描く組数
+        n_jobs: 描画の並列数
+
+    Returns:
+        list[Path]: 生成したファイル
+    """
+    unknown = set(charts) - set(CHARTS)
+    if unknown:
+        raise ValueError(f"未知のグラフです: {', '.join(sorted(unknown))} (choices: {', '.join(CHARTS)})")
+    store = Path(store)
+    out_dir = Path(out_dir or store)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    runs = load_runs(store)
+
+    jobs = []
+    best = runs.loc[runs["best"], "run_id"].tolist() if "best" in runs.columns else []
+    if "equity" in charts and best:
+        jobs.append((_render_equity, (store, out_dir / "equity_curve.png", best[:1],
+                                      "Equity Curve (Best Params)")))
+    if "equity_top" in charts and len(runs):
+        ids = _top_runs(runs, top)["run_id"].tolist()
+        jobs.append((_render_equity, (store, out_dir / "equity_top.png", ids,
+                                      f"Equity Curves (Top {len(ids)} by Sharpe)")))
+    if "heatmap" in charts and len(runs):
+        jobs.append((_render_heatmap, (store, out_dir / "heatmap_cd.png")))
+    if "topn" in charts and len(runs):
+        jobs.append((_render_topn, (store, out_dir / "topn_sensitivity.png", top)))
+
+    if n_jobs > 1 and len(jobs) > 1:
+        from joblib import Parallel, delayed   # 並列描画時のみ読み込む
+        paths = Parallel(n_jobs=min(n_jobs, len(jobs)))(delayed(func)(*args) for func, args in jobs)
+    else:
+        paths = [func(*args) for func, args in jobs]
+    paths.append(write_text_report(store, out_dir / "report.txt", top))
+    return paths
@@ -0,0 +1,177 @@
+"""app/backtest/result_store.py
+
+パラメータ探索結果の列指向ストア。
+
+1 回の探索を ``backtest_results/search/<日時>/`` の 1 ディレクトリに保存する。
+
+- ``runs``: 1 行 = 1 組（run_id・段階・a〜d・TopN・指標・信頼区間・合否・最適フラグ）
+- ``returns``: (営業日 × run_id) の日次リターン
+- ``turnover``: ``returns`` と同じ形の片道回転率（任意）
+
+グラフや最適組の CSV はここから読み出して作り、バックテストを再計算しない
+（``app/backtest/report.py`` 参照）。
+
+pyarrow（任意依存）があれば Parquet、無ければ NumPy で保存する。NumPy 形式では
+``runs.npz`` に列ごとの配列を、``returns.npy`` / ``turnover.npy`` に (run_id × 営業日) の
+行列（1 組の系列が連続）を置き、読み出しは memmap なので必要な組の分しか読まない。
+
+    (venv) pip install pyarrow      # 任意。無くても NumPy 形式で動く
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401  （pandas の Parquet エンジン）
+except ImportError:          # 任意依存
+    pyarrow = None
+
+__all__ = [
+    "FORMATS",
+    "HAVE_PARQUET",
+    "STORE_ROOT",
+    "SearchResults",
+    "latest_store",
+    "load_returns",
+    "load_runs",
+    "new_store_dir",
+    "save_results",
+]
+
+FORMATS = ("parquet", "npz")
+HAVE_PARQUET = pyarrow is not None
+STORE_ROOT = Path("backtest_results/search")
+
+
+@dataclass
+class SearchResults:
+    """探索 1 回分の結果。``returns`` / ``turnover`` の列は ``runs["run_id"]``。"""
+
+    runs: pd.DataFrame
+    returns: pd.DataFrame
+    turnover: Optional[pd.DataFrame] = None
+
+
+# ----------------------------------------------------------------------
+# 保存先
+# ----------------------------------------------------------------------
+
+def new_store_dir(root: Path = STORE_ROOT) -> Path:
+    """``root/<YYYYmmdd_HHMMSS>`` を作って返す。"""
+    path = Path(root) / datetime.now().strftime("%Y%m%d_%H%M%S")
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def latest_store(root: Path = STORE_ROOT) -> Optional[Path]:
+    """``root`` 以下で最も新しい（名前順で最後の）保存先。無ければ None。"""
+    root = Path(root)
+    dirs = sorted(p for p in root.iterdir() if _format(p)) if root.is_dir() else []
+    return dirs[-1] if dirs else None
+
+
+def _format(path: Path) -> Optional[str]:
+    if (path / "runs.parquet").exists():
+        return "parquet"
+    if (path / "runs.npz").exists():
+        return "npz"
+    return None
+
+
+# ----------------------------------------------------------------------
+# 書き込み
+# ----------------------------------------------------------------------
+
+def save_results(path: Path, results: SearchResults, fmt: Optional[str] = None) -> Path:
+    """探索結果を ``path`` に保存する。
+
+    Args:
+        path: 保存先ディレクトリ（無ければ作る）
+        results: ``runs`` の ``run_id`` は 0 からの連番で、``returns`` の列と同じ順であること
+        fmt: ``"parquet"`` / ``"npz"``。None なら pyarrow があれば Parquet
+
+    Returns:
+        Path: 保存先ディレクトリ
+    """
+    fmt = fmt or ("parquet" if HAVE_PARQUET else "npz")
+    if fmt not in FORMATS:
+        raise ValueError(f"未知の保存形式です: {fmt} (choices: {', '.join(FORMATS)})")
+    runs = results.runs.reset_index(drop=True)
+    ids = list(range(len(runs)))
+    if list(runs["run_id"]) != ids or list(results.returns.columns) != ids:
+        raise ValueError("run_id は 0 からの連番で、returns の列と一致させてください")
+
+    path = Path(path)
+    path.mkdir(parents=True, exist_ok=True)
+    series = {"returns": results.returns, "turnover": results.turnover}
+    if fmt == "parquet":
+        runs.to_parquet(path / "runs.parquet", index=False)
+        for name, frame in series.items():
+            if frame is not None:
+                out = frame.copy()
+                out.columns = out.columns.astype(str)        # Parquet の列名は文字列
+                out.rename_axis("Date").reset_index().to_parquet(path / f"{name}.parquet", index=False)
+    else:
+        np.savez(path / "runs.npz", **{col: _plain(runs[col]) for col in runs.columns})
+        np.save(path / "dates.npy", results.returns.index.to_numpy(dtype="datetime64[ns]"))
+        for name, frame in series.items():
+            if frame is not None:
+                np.save(path / f"{name}.npy", np.ascontiguousarray(frame.to_numpy(np.float64).T))
+    return path
+
+
+def _plain(col: pd.Series) -> np.ndarray:
+    """pickle 不要の配列にする（文字列列は固定長 Unicode）。"""
+    return col.astype(str).to_numpy(dtype=str) if col.dtype == object else col.to_numpy()
+
+
+# ----------------------------------------------------------------------
+# 読み出し
+# ----------------------------------------------------------------------
+
+def load_runs(path: Path) -> pd.DataFrame:
+    """``runs`` 表を読む。"""
+    path = Path(path)
+    fmt = _format(path)
+    if fmt == "parquet":
+        return pd.read_parquet(path / "runs.parquet")
+    if fmt == "npz":
+        with np.load(path / "runs.npz", allow_pickle=False) as data:
+            return pd.DataFrame({col: data[col] for col in data.files})
+    raise FileNotFoundError(f"探索結果がありません: {path}")
+
+
+def load_returns(path: Path, run_ids: Optional[Sequence[int]] = None,
+                 name: str = "returns") -> pd.DataFrame:
+    """(営業日 × run_id) の系列を読む。
+
+    Args:
+        path: 保存先ディレクトリ
+        run_ids: 読む組（None なら全組）。指定した組の列だけを読む
+        name: ``"returns"`` / ``"turnover"``
+
+    Returns:
+        pd.DataFrame: index が Date、列が run_id
+    """
+    path = Path(path)
+    fmt = _format(path)
+    if fmt == "parquet":
+        cols = None if run_ids is None else ["Date"] + [str(r) for r in run_ids]
+        frame = pd.read_parquet(path / f"{name}.parquet", columns=cols).set_index("Date")
+        frame.columns = frame.columns.astype(np.int64)
+    elif fmt == "npz":
+        values = np.load(path / f"{name}.npy", mmap_mode="r")
+        ids = np.arange(len(values)) if run_ids is None else np.asarray(run_ids, dtype=np.int64)
+        dates = pd.DatetimeIndex(np.load(path / "dates.npy"), name="Date")
+        frame = pd.DataFrame(np.asarray(values[ids]).T, index=dates, columns=ids)
+    else:
+        raise FileNotFoundError(f"探索結果がありません: {path}")
+    frame.columns.name = "run_id"
+    return frame
@@ -0,0 +1,432 @@
+"""app/backtest/service.py
+
+常駐スコアリングサービス（ローカル HTTP の問い合わせ API）。
+
+価格パネル・上場銘柄一覧を 1 度だけ読み込み、前処理（``prepare_panel`` のフィルタ・ソート、
+``eligible_names``、日付ごとの行範囲）を済ませた状態でメモリに保持して、
+Score_up とバックテストの問い合わせにプロセス起動・CSV 読み込みなしで答える。
+
+- ``GET /health``: 読み込み状態（行数・期間・読み込み時刻・再読み込み回数）
+- ``GET /score_up?date=2025-01-10&params=1,1,0.5,1.5&top_n=40``: その日の行で Score_up 上位
+  （``score_up`` と同じ結果。date 省略時は最新営業日）
+- ``GET /backtest?params=1,1,1,1&top_n=20&start=2024-01-01&end=2024-12-30&cost=0.0005``:
+  ``run_backtest`` の指標（``calc_metrics``）。``daily=1`` で日次リターンも返す。
+  期間・約定条件のキーは ``backtest`` サブコマンドと同じ（horizon / warmup / start / end /
+  cost / block_limits / max_volume_frac / capital / weighting）
+- ``POST /reload``: 強制再読み込み
+
+入力ファイル（既定は派生指標 CSV と上場銘柄キャッシュ）の更新時刻・サイズを ``poll`` 秒ごとに
+確かめ、変わっていれば裏で読み直してから差し替える（読み込み中・失敗時も旧データで応答する）。
+``source="db"`` は監視対象のファイルが上場銘柄キャッシュだけなので、DB 更新後は ``/reload`` を呼ぶ。
+
+問い合わせごとの計測記録がプロセス共通の Profiler に溜まり続けないよう、受け付け開始時に
+計測を止める（``--profile serve`` でも記録されるのは起動時の読み込みまで）。
+
+    (venv) python -m app serve --port 8766
+    (venv) curl "http://127.0.0.1:8766/backtest?params=1,1,0.5,1.5&top_n=20"
+
+    >>> from app.backtest.service import query
+    >>> query("http://127.0.0.1:8766", "/score_up", params="1,1,0.5,1.5")["picks"][:3]
+"""
+
+from __future__ import annotations
+
+import json
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from logging import Logger
+from pathlib import Path
+from typing import Any, Callable, Optional, Sequence
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+import pandas as pd
+
+from app.backtest.backtest_runner import (
+    HORIZON_DAYS,
+    WARMUP_DAYS,
+    TradePanel,
+    prepare_panel,
+    simulate_backtest,
+)
+from app.backtest.execution import ExecutionConfig
+from app.backtest.metrics import calc_metrics
+from app.backtest.price_loader import DERIVED_CSV
+from app.core.profiling import get_profiler
+from app.data.listed_info_fetcher import LISTED_INFO_CSV
+from app.scoring.score_up import eligible_names, score_up
+
+__all__ = [
+    "DEFAULT_PORT",
+    "ScoringService",
+    "query",
+]
+
+DEFAULT_PORT = 8766
+POLL_SEC = 5.0             # 入力ファイルの更新確認間隔 [秒]
+
+Loader = Callable[[], tuple[pd.DataFrame, pd.DataFrame]]
+
+
+class _HTTPError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+@dataclass
+class _State:
+    """読み込み済みのデータと前処理結果（差し替えは参照の付け替えだけで行う）。"""
+
+    price_df: pd.DataFrame          # Date で安定ソート済み（同じ日の行は元の並び）
+    info_df: pd.DataFrame
+    names: pd.Series                # eligible_names(info_df)
+    panel: TradePanel               # バックテスト用の前処理済みパネル
+    days: np.ndarray                # price_df の営業日（昇順）と行範囲 [lo, hi)
+    lo: np.ndarray
+    hi: np.ndarray
+    signature: tuple
+    loaded_at: str
+    load_sec: float
+
+
+# ----------------------------------------------------------------------
+# サービス本体
+# ----------------------------------------------------------------------
+
+class ScoringService:
+    """パネルを常駐させて Score_up / バックテストに答える。
+
+    Args:
+        logger: ロガー
+        source: 価格パネルの読み込み元（``"csv"`` / ``"db"``）
+        csv_path: ``source="csv"`` の入力 CSV
+        compact: 省メモリ型で読み込む
+        loader: ``() -> (price_df, info_df)``。None なら ``load_price_df`` と上場銘柄キャッシュ
+        watch: 更新を監視するファイル。None なら ``csv_path``（csv 時）と上場銘柄キャッシュ
+    """
+
+    def __init__(
+        self,
+        logger: Logger,
+        source: str = "csv",
+        csv_path: Path = DERIVED_CSV,
+        compact: bool = False,
+        loader: Optional[Loader] = None,
+        watch: Optional[Sequence[Path]] = None,
+    ):
+        self.logger = logger
+        self.loader = loader or (lambda: _load_market(source, Path(csv_path), compact, logger))
+        if watch is None:
+            watch = [Path(csv_path), LISTED_INFO_CSV] if source == "csv" else [LISTED_INFO_CSV]
+        self.watch = [Path(p) for p in watch]
+        self.reloads = 0
+        self._state: Optional[_State] = None
+        self._reload_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._threads: list[threading.Thread] = []
+        self.httpd: Optional[ThreadingHTTPServer] = None
+
+    # ---------------- 読み込み ---------------- #
+
+    def _signature(self) -> tuple:
+        sig = []
+        for path in self.watch:
+            try:
+                st = path.stat()
+                sig.append((str(path), st.st_mtime_ns, st.st_size))
+            except FileNotFoundError:
+                sig.append((str(path), None, None))
+        return tuple(sig)
+
+    def reload(self, force: bool = False) -> bool:
+        """入力が変わっていれば（``force`` なら常に）読み直す。読み直したら True。"""
+        with self._reload_lock:
+            signature = self._signature()
+            if not force and self._state is not None and self._state.signature == signature:
+                return False
+            t0 = time.perf_counter()
+            price_df, info_df = self.loader()
+            price_df = price_df.sort_values("Date", kind="stable", ignore_index=True)
+            dates = price_df["Date"].to_numpy()
+            days = np.unique(dates)
+            state = _State(
+                price_df=price_df,
+                info_df=info_df,
+                names=eligible_names(info_df),
+                panel=prepare_panel(price_df, block_limits=True),
+                days=days,
+                lo=np.searchsorted(dates, days, side="left"),
+                hi=np.searchsorted(dates, days, side="right"),
+                signature=signature,
+                loaded_at=datetime.now().isoformat(timespec="seconds"),
+                load_sec=round(time.perf_counter() - t0, 3),
+            )
+            if self._state is not None:
+                self.reloads += 1
+            self._state = state
+        self.logger.info("サービス: パネル読み込み %d 行 × %d 営業日（%.2f s）",
+                         len(price_df), len(days), state.load_sec)
+        return True
+
+    @property
+    def state(self) -> _State:
+        if self._state is None:
+            self.reload()
+        return self._state
+
+    # ---------------- 問い合わせ ---------------- #
+
+    def status(self) -> dict[str, Any]:
+        """読み込み状態。"""
+        st = self.state
+        return {
+            "rows": len(st.price_df),
+            "codes": int(st.price_df["Code"].nunique()),
+            "days": len(st.days),
+            "first": _day(st.days[0]) if len(st.days) else None,
+            "last": _day(st.days[-1]) if len(st.days) else None,
+            "loaded_at": st.loaded_at,
+            "load_sec": st.load_sec,
+            "reloads": self.reloads,
+        }
+
+    def score_up(
+        self,
+        day: Optional[str] = None,
+        params: Sequence[float] = (1.0, 1.0, 1.0, 1.0),
+        top_n: int = 40,
+    ) -> pd.DataFrame:
+        """``day`` の行で Score_up 上位を返す（``score_up`` と同じ。None なら最新営業日）。"""
+        st = self.state
+        i = len(st.days) - 1
+        if day is not None:
+            i = int(np.searchsorted(st.days, np.datetime64(pd.Timestamp(day))))
+            if i >= len(st.days) or st.days[i] != np.datetime64(pd.Timestamp(day)):
+                raise ValueError(f"データに無い営業日です: {day}")
+        if i < 0:
+            raise ValueError("価格パネルが空です")
+        rows = st.price_df.iloc[st.lo[i]:st.hi[i]]
+        return score_up(rows, st.info_df, self.logger, tuple(params), top_n, names=st.names)
+
+    def backtest(
+        self,
+        params: Sequence[float] = (1.0, 1.0, 1.0, 1.0),
+        top_n: int = 40,
+        horizon: Optional[int] = HORIZON_DAYS,
+        warmup: int = WARMUP_DAYS,
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+        execution: ExecutionConfig = ExecutionConfig(),
+    ) -> pd.DataFrame:
+        """前処理済みパネルで ``run_backtest`` と同じ日次リターン（Date, Ret, Turnover）を返す。"""
+        st = self.state
+        res = simulate_backtest(st.panel, st.info_df, tuple(params), top_n, horizon, warmup,
+                                start, end, execution=execution)
+        return res.daily[["Date", "Ret", "Turnover"]]
+
+    # ---------------- HTTP ---------------- #
+
+    def _route(self, method: str, path: str, q: dict[str, str]) -> dict[str, Any]:
+        if path == "/reload" and method == "POST":
+            return {"reloaded": self.reload(force=True), **self.status()}
+        if method != "GET":
+            raise _HTTPError(405, "Method Not Allowed")
+        if path == "/health":
+            return self.status()
+
+        params = _floats(q.get("params", "1,1,1,1"), 4, "params")
+        top_n = int(q.get("top_n", 40))
+        if path == "/score_up":
+            t0 = time.perf_counter()
+            day = q.get("date") or _day(self.state.days[-1])
+            top = self.score_up(day, params, top_n)
+            return {"date": day, "params": params, "top_n": top_n,
+                    "picks": _records(top), "elapsed_ms": _ms(t0)}
+        if path == "/backtest":
+            t0 = time.perf_counter()
+            start, end = q.get("start"), q.get("end")
+            horizon = int(q["horizon"]) if "horizon" in q else (0 if (start or end) else HORIZON_DAYS)
+            execution = ExecutionConfig(
+                cost=float(q.get("cost", ExecutionConfig.cost)),
+                block_limits=q.get("block_limits", "0") in ("1", "true"),
+                max_volume_frac=float(q["max_volume_frac"]) if "max_volume_frac" in q else None,
+                capital=float(q.get("capital", ExecutionConfig.capital)),
+                weighting=q.get("weighting", ExecutionConfig.weighting),
+            )
+            daily = self.backtest(params, top_n, horizon, int(q.get("warmup", WARMUP_DAYS)),
+                                  start, end, execution)
+            out = {"params": params, "top_n": top_n, "days": len(daily),
+                   "start": _day(daily["Date"].iloc[0]) if len(daily) else None,
+                   "end": _day(daily["Date"].iloc[-1]) if len(daily) else None,
+                   "metrics": {k: float(v) for k, v in calc_metrics(daily["Ret"]).items()}}
+            if q.get("daily", "0") in ("1", "true"):
+                out["daily"] = _records(daily.assign(Date=daily["Date"].dt.strftime("%Y-%m-%d")))
+            out["elapsed_ms"] = _ms(t0)
+            return out
+        raise _HTTPError(404, "Not Found")
+
+    def _handler_class(self):
+        service = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args) -> None:     # 標準エラーへのアクセスログを抑止
+                pass
+
+            def _serve(self, method: str) -> None:
+                url = urlsplit(self.path)
+                q = {k: v[-1] for k, v in parse_qs(url.query).items()}
+                length = int(self.headers.get("Content-Length") or 0)
+                if length:
+                    self.rfile.read(length)
+                try:
+                    status, payload = 200, service._route(method, url.path, q)
+                except _HTTPError as e:
+                    status, payload = e.status, {"message": str(e)}
+                except (KeyError, ValueError, TypeError) as e:
+                    status, payload = 400, {"message": f"bad request: {e}"}
+                except Exception as e:                 # サービスは落とさない
+                    service.logger.exception("サービス: %s %s", method, self.path)
+                    status, payload = 500, {"message": f"{type(e).__name__}: {e}"}
+
+                data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self) -> None:
+                self._serve("GET")
+
+            def do_POST(self) -> None:
+                self._serve("POST")
+
+        return Handler
+
+    # ---------------- ライフサイクル ---------------- #
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self, host: str = "127.0.0.1", port: int = DEFAULT_PORT,
+              poll: Optional[float] = POLL_SEC) -> "ScoringService":
+        """データを読み込み、HTTP サーバと更新監視をバックグラウンドで起動する（port=0 は空きポート）。"""
+        self.state                                    # 受け付け前に読み込む
+        prof = get_profiler()
+        if prof.enabled:                              # 常駐中の問い合わせは計測しない（記録が溜まり続けるため）
+            self.logger.info("サービス: 受け付け中は計測を停止します")
+            prof.disable()
+        self.httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self.httpd.daemon_threads = True
+        self._stop.clear()
+        self._threads = [threading.Thread(target=self.httpd.serve_forever, daemon=True)]
+        if poll:
+            self._threads.append(threading.Thread(target=self._watch, args=(poll,), daemon=True))
+        for t in self._threads:
+            t.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self.httpd is not None:
+            self.httpd.shutdown()
+            self.httpd.server_close()
+        for t in self._threads:
+            t.join()
+        self._threads = []
+
+    def __enter__(self) -> "ScoringService":
+        return self.start(port=0)
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def _watch(self, poll: float) -> None:
+        while not self._stop.wait(poll):
+            try:
+                self.reload()
+            except Exception:                         # 読み込みに失敗しても旧データで続ける
+                self.logger.exception("サービス: 再読み込みに失敗しました（旧データで継続）")
+
+
+# ----------------------------------------------------------------------
+# ヘルパ
+# ----------------------------------------------------------------------
+
+def _load_market(source: str, csv_path: Path, compact: bool, logger: Logger):
+    """既定の読み込み（``backtest`` と同じ価格パネル・上場銘柄キャッシュ）。"""
+    from app.backtest.price_loader import load_price_df
+    from app.core.config import get_config
+    from app.data.listed_info_fetcher import load_listed_info
+    from app.data.token_manager import TokenManager
+
+    cfg = get_config()
+    price_df = load_price_df(source, logger, csv_path, compact=compact, budget_mb=cfg.MEMORY_BUDGET_MB)
+    info_df = load_listed_info(cfg, TokenManager(cfg, logger).get_id_token, logger)
+    return price_df, info_df
+
+
+def _floats(text: str, n: int, name: str) -> list[float]:
+    values = [float(v) for v in text.split(",")]
+    if len(values) != n:
+        raise ValueError(f"{name} は {n} 個の数値をカンマ区切りで指定してください: {text}")
+    return values
+
+
+def _day(value) -> str:
+    return pd.Timestamp(value).strftime("%Y-%m-%d")
+
+
+def _ms(t0: float) -> float:
+    return round((time.perf_counter() - t0) * 1000, 2)
+
+
+def _records(df: pd.DataFrame) -> list[dict]:
+    """JSON 用のレコード（NumPy のスカラーは Python の値、欠損は None。桁は丸めない）。"""
+    return df.astype(object).where(df.notna(), None).to_dict("records")
+
+
+def query(base_url: str, path: str, method: str = "GET", timeout: float = 60.0, **params) -> dict:
+    """サービスに問い合わせて JSON を返す（ノートブック等からの利用向け）。"""
+    import requests                                   # 問い合わせ時のみ読み込む
+
+    resp = requests.request(method, base_url.rstrip("/") + path, params=params, timeout=timeout)
+    resp.raise_for_status()
+    return resp.json()
+
+
+def main(
+    source: str = "csv",
+    compact: bool = False,
+    host: str = "127.0.0.1",
+    port: int = DEFAULT_PORT,
+    poll: float = POLL_SEC,
+) -> None:
+    """フォアグラウンドでサービスを起動する（Ctrl+C で終了）。"""
+    from app.core.config import get_config
+    from app.core.logger import setup_logger
+
+    logger = setup_logger(get_config().logging)
+    service = ScoringService(logger, source=source, compact=compact)
+    try:
+        service.start(host, port, poll)
+    except FileNotFoundError as e:
+        logger.error("%s", e)
+        return
+    st = service.status()
+    print(f"Scoring service: {service.base_url}  ({st['codes']} 銘柄, {st['first']}〜{st['last']})")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.stop()
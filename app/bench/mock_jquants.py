@@ -0,0 +1,386 @@
+"""app/bench/mock_jquants.py
+
+J-Quants API のローカル代替サーバ（負荷試験・オフライン検証用）。
+
+``configs/config.yaml`` の endpoints と同じパスを合成データ（``app.bench.synthetic``）で返す。
+
+- 認証: ``/token/auth_user`` → refreshToken、``/token/auth_refresh`` → idToken
+  （以降の GET は ``Authorization: Bearer <idToken>`` が無いと 401）
+- ``/markets/trading_calendar`` / ``/prices/daily_quotes``（``pagination_key`` 対応）/
+  ``/listed/info`` / ``/derivatives/futures`` / ``/markets/weekly_margin_interest`` /
+  ``/markets/short_selling_positions`` / ``/markets/trades_spec``
+- 障害注入: 1 リクエストごとの遅延 ``latency``、秒間上限 ``rate_limit`` 超過で 429
+  （``Retry-After`` 付き）、確率 ``error_rate`` で 500
+- ``stats()`` でパス別件数・ステータス別件数・最大同時処理数を返す（並行度の検証用）
+
+合成データの最終営業日は「今日の前営業日」に揃えるため、
+``get_latest_trading_days`` など「直近 N 日」を取るフェッチャがそのまま動く。
+
+使い方（例）
+    with MockJQuantsServer(n_codes=500, latency=0.02, rate_limit=50) as srv:
+        cfg = srv.config(get_config())      # endpoints だけ差し替えた AppConfig
+        df = fetch_daily_quotes(cfg, srv.id_token, logger, srv.dates[-1])
+
+    (venv) python -m app mock-jquants --port 8765 --latency 0.05 --rate-limit 10
+"""
+
+from __future__ import annotations
+
+import json
+import threading
+import time
+from collections import Counter
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Optional
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+import pandas as pd
+
+from app.bench.synthetic import make_info_df, make_price_df
+from app.core.config import AppConfig, JQuantsEndpointsConfig
+
+__all__ = [
+    "ENDPOINT_PATHS",
+    "MockJQuantsServer",
+]
+
+# JQuantsEndpointsConfig のフィールド名 → パス
+ENDPOINT_PATHS = {
+    "token_auth_user": "/v1/token/auth_user",
+    "token_auth_refresh": "/v1/token/auth_refresh",
+    "trading_calendar": "/v1/markets/trading_calendar",
+    "daily_quotes": "/v1/prices/daily_quotes",
+    "listed_info": "/v1/listed/info",
+    "futures_prices": "/v1/derivatives/futures",
+    "weekly_margin_interest": "/v1/markets/weekly_margin_interest",
+    "short_selling_positions": "/v1/markets/short_selling_positions",
+    "trades_spec": "/v1/markets/trades_spec",
+}
+
+REFRESH_TOKEN = "mock-refresh-token"
+ID_TOKEN = "mock-id-token"
+
+
+class _HTTPError(Exception):
+    def __init__(self, status: int, message: str, headers: Optional[dict] = None):
+        super().__init__(message)
+        self.status = status
+        self.headers = headers or {}
+
+
+# ----------------------------------------------------------------------
+# 合成レスポンス
+# ----------------------------------------------------------------------
+
+class _MarketData:
+    """日付ごとのレスポンス用レコードを保持する。"""
+
+    def __init__(self, n_codes: int, n_days: int, seed: int):
+        last = (pd.Timestamp(date.today()) - pd.offsets.BDay(1)).normalize()
+        start = pd.bdate_range(end=last, periods=n_days)[0]
+        price = make_price_df(n_codes, n_days, seed, start=start.strftime("%Y-%m-%d"))
+        self.info = make_info_df(n_codes, seed)
+        self.dates = [d.strftime("%Y-%m-%d") for d in pd.DatetimeIndex(price["Date"].unique())]
+
+        rng = np.random.default_rng(seed + 3)
+        price["Date"] = price["Date"].dt.strftime("%Y-%m-%d")
+        price["UpperLimit"] = np.where(rng.random(len(price)) < 0.005, "1", "0")
+        price["LowerLimit"] = np.where(rng.random(len(price)) < 0.005, "1", "0")
+        price["TurnoverValue"] = (price["Close"] * price["Volume"]).round()
+        self._quotes = {d: g.to_dict("records") for d, g in price.groupby("Date", sort=False)}
+        self._by_code = None
+        self._price = price
+        self._seed = seed
+
+    def quotes(self, params: dict[str, str]) -> list[dict]:
+        if "date" in params:
+            day = pd.Timestamp(params["date"]).strftime("%Y-%m-%d")
+            return self._quotes.get(day, [])
+        if "code" in params:
+            if self._by_code is None:
+                self._by_code = {c: g.to_dict("records") for c, g in self._price.groupby("Code")}
+            code = params["code"] if len(params["code"]) == 5 else params["code"] + "0"
+            rows = self._by_code.get(code, [])
+            lo, hi = params.get("from"), params.get("to")
+            return [r for r in rows if (lo is None or r["Date"] >= _iso(lo))
+                    and (hi is None or r["Date"] <= _iso(hi))]
+        raise _HTTPError(400, "date または code を指定してください")
+
+    def calendar(self) -> list[dict]:
+        trading = set(self.dates)
+        first, last = date.fromisoformat(self.dates[0]), date.today() + timedelta(days=30)
+        out, d = [], first
+        while d <= last:
+            iso = d.isoformat()
+            weekday = d.weekday() < 5
+            out.append({"Date": iso, "HolidayDivision": "1" if iso in trading or (weekday and d >= date.today()) else "0"})
+            d += timedelta(days=1)
+        return out
+
+    def futures(self, day: str) -> list[dict]:
+        if day not in self._quotes:
+            return []
+        i_day = self.dates.index(day)
+        rng = np.random.default_rng([self._seed, i_day])
+        base = 38000 + 2000 * np.sin(i_day / 40)
+        d = pd.Timestamp(day)
+        out = []
+        for i, months in enumerate((0, 3)):
+            cm = (d + pd.offsets.MonthBegin(months + 1)).strftime("%Y%m")
+            # SQ（第 2 金曜）の前営業日
+            ltd = pd.Timestamp(cm + "01") + pd.offsets.WeekOfMonth(week=1, weekday=4) - pd.offsets.BDay(1)
+            night, open_ = base * (1 + rng.normal(0, 0.005, 2))
+            close = open_ * (1 + rng.normal(0, 0.01))
+            out.append({
+                "Date": day, "Code": f"1{cm[2:]}18", "DerivativesProductCategory": "NK225F",
+                "ContractMonth": f"{cm[:4]}-{cm[4:]}", "CentralContractMonthFlag": "1" if i == 0 else "0",
+                "LastTradingDay": ltd.strftime("%Y-%m-%d"),
+                "NightSessionClose": round(night, -1), "DaySessionOpen": round(open_, -1),
+                "DaySessionClose": round(close, -1), "WholeDayOpen": round(night, -1),
+                "WholeDayClose": round(close, -1), "SettlementPrice": round(close, -1),
+                "Volume": int(rng.integers(1e4, 1e5)) // (i * 20 + 1),
+            })
+        return out
+
+    def margin(self, day: str) -> list[dict]:
+        codes = self.info["Code"].tolist()[:50]
+        return [{"Date": day, "Code": c, "ShortMarginTradeVolume": 1000.0 * (i + 1),
+                 "LongMarginTradeVolume": 5000.0 * (i + 1)} for i, c in enumerate(codes)]
+
+    def short(self, day: str) -> list[dict]:
+        codes = self.info["Code"].tolist()[:20]
+        return [{"DisclosedDate": day, "CalculatedDate": day, "Code": c,
+                 "ShortPositionsToSharesOutstandingRatio": 0.005 + 0.001 * i} for i, c in enumerate(codes)]
+
+    def trades(self, day: str) -> list[dict]:
+        return [{"PublishedDate": day, "Section": s, "ForeignersBalance": 1.0e9 * (i - 1)}
+                for i, s in enumerate(["TSEPrime", "TSEStandard", "TSEGrowth"])]
+
+
+def _iso(s: str) -> str:
+    return pd.Timestamp(s).strftime("%Y-%m-%d")
+
+
+# ----------------------------------------------------------------------
+# サーバ
+# ----------------------------------------------------------------------
+
+class MockJQuantsServer:
+    """合成データを返すローカル J-Quants 互換 HTTP サーバ。
+
+    Args:
+        n_codes: 合成銘柄数
+        n_days: 合成営業日数（最終日 = 今日の前営業日）
+        seed: 乱数シード
+        latency: 1 リクエストごとに挟む遅延 [秒]
+        rate_limit: 秒間リクエスト上限（超過分は 429）。None なら無制限
+        error_rate: 500 を返す確率（0〜1）
+        page_size: daily_quotes の 1 ページ件数（超えると ``pagination_key`` を返す）
+        host: 待ち受けアドレス
+        port: 待ち受けポート（0 なら空きポート）
+    """
+
+    def __init__(
+        self,
+        n_codes: int = 500,
+        n_days: int = 120,
+        seed: int = 0,
+        latency: float = 0.0,
+        rate_limit: Optional[float] = None,
+        error_rate: float = 0.0,
+        page_size: int = 1000,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ):
+        self.data = _MarketData(n_codes, n_days, seed)
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.error_rate = error_rate
+        self.page_size = page_size
+        self.id_token = ID_TOKEN
+        self.refresh_token = REFRESH_TOKEN
+
+        self._rng = np.random.default_rng(seed + 4)
+        self._lock = threading.Lock()
+        self._window: list[float] = []     # 直近 1 秒の受付時刻
+        self._inflight = 0
+        self._stats: dict[str, Any] = {"paths": Counter(), "status": Counter(), "max_inflight": 0}
+
+        self.httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self.httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    # ---------------- ライフサイクル ---------------- #
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def dates(self) -> list[str]:
+        """合成データの営業日（昇順, YYYY-MM-DD）。"""
+        return self.data.dates
+
+    def start(self) -> "MockJQuantsServer":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self) -> "MockJQuantsServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def endpoints(self) -> dict[str, str]:
+        """``JQuantsEndpointsConfig`` と同じキーの URL 辞書。"""
+        return {k: self.base_url + p for k, p in ENDPOINT_PATHS.items()}
+
+    def config(self, base: AppConfig) -> AppConfig:
+        """``base`` の endpoints だけをこのサーバに向けた AppConfig を返す。"""
+        jq = base.jquants.model_copy(update={"endpoints": JQuantsEndpointsConfig(**self.endpoints())})
+        return base.model_copy(update={"jquants": jq})
+
+    def stats(self) -> dict[str, Any]:
+        """パス別件数・ステータス別件数・最大同時処理数。"""
+        with self._lock:
+            return {
+                "paths": dict(self._stats["paths"]),
+                "status": dict(self._stats["status"]),
+                "max_inflight": self._stats["max_inflight"],
+            }
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self._stats = {"paths": Counter(), "status": Counter(), "max_inflight": 0}
+
+    # ---------------- 障害注入 ---------------- #
+
+    def _admit(self, path: str) -> None:
+        """件数を記録し、レート超過なら 429、確率で 500 を送出する。"""
+        now = time.monotonic()
+        with self._lock:
+            self._stats["paths"][path] += 1
+            if self.rate_limit is not None:
+                self._window = [t for t in self._window if now - t < 1.0]
+                if len(self._window) >= self.rate_limit:
+                    retry = max(1.0 - (now - self._window[0]), 0.0)
+                    raise _HTTPError(429, "Too Many Requests", {"Retry-After": f"{retry:.3f}"})
+                self._window.append(now)
+            fail = self.error_rate > 0 and self._rng.random() < self.error_rate
+        if self.latency:
+            time.sleep(self.latency)
+        if fail:
+            raise _HTTPError(500, "Injected failure")
+
+    # ---------------- ルーティング ---------------- #
+
+    def _route(self, method: str, path: str, params: dict[str, str], headers, body: bytes) -> dict:
+        if path == ENDPOINT_PATHS["token_auth_user"] and method == "POST":
+            payload = json.loads(body or b"{}")
+            if not payload.get("mailaddress"):
+                raise _HTTPError(400, "mailaddress is required")
+            return {"refreshToken": self.refresh_token}
+        if path == ENDPOINT_PATHS["token_auth_refresh"] and method == "POST":
+            if params.get("refreshtoken") != self.refresh_token:
+                raise _HTTPError(400, "invalid refresh token")
+            return {"idToken": self.id_token}
+
+        if method != "GET":
+            raise _HTTPError(405, "Method Not Allowed")
+        if headers.get("Authorization") != f"Bearer {self.id_token}":
+            raise _HTTPError(401, "The incoming token is invalid or expired.")
+
+        day = _iso(params["date"]) if "date" in params else None
+        if path == ENDPOINT_PATHS["trading_calendar"]:
+            return {"trading_calendar": self.data.calendar()}
+        if path == ENDPOINT_PATHS["daily_quotes"]:
+            rows = self.data.quotes(params)
+            offset = int(params.get("pagination_key", 0))
+            page = rows[offset:offset + self.page_size]
+            out: dict[str, Any] = {"daily_quotes": page}
+            if offset + self.page_size < len(rows):
+                out["pagination_key"] = str(offset + self.page_size)
+            return out
+        if path == ENDPOINT_PATHS["listed_info"]:
+            return {"info": self.data.info.to_dict("records")}
+        if path == ENDPOINT_PATHS["futures_prices"]:
+            return {"futures": self.data.futures(day) if day else []}
+        if path == ENDPOINT_PATHS["weekly_margin_interest"]:
+            return {"weekly_margin_interest": self.data.margin(day) if day else []}
+        if path == ENDPOINT_PATHS["short_selling_positions"]:
+            cd = params.get("calculated_date") or params.get("date")
+            return {"short_selling_positions": self.data.short(_iso(cd)) if cd else []}
+        if path == ENDPOINT_PATHS["trades_spec"]:
+            return {"trades_spec": self.data.trades(day) if day else []}
+        raise _HTTPError(404, "Not Found")
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args) -> None:     # 標準エラーへのアクセスログを抑止
+                pass
+
+            def _serve(self, method: str) -> None:
+                url = urlsplit(self.path)
+                params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else b""
+                extra: dict[str, str] = {}
+                with server._lock:
+                    server._inflight += 1
+                    server._stats["max_inflight"] = max(server._stats["max_inflight"], server._inflight)
+                try:
+                    server._admit(url.path)
+                    status, payload = 200, server._route(method, url.path, params, self.headers, body)
+                except _HTTPError as e:
+                    status, payload, extra = e.status, {"message": str(e)}, e.headers
+                except (KeyError, ValueError) as e:
+                    status, payload = 400, {"message": f"bad request: {e}"}
+                finally:
+                    with server._lock:
+                        server._inflight -= 1
+                        server._stats["status"][status] += 1
+
+                data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("Content-Length", str(len(data)))
+                for k, v in extra.items():
+                    self.send_header(k, v)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self) -> None:
+                self._serve("GET")
+
+            def do_POST(self) -> None:
+                self._serve("POST")
+
+        return Handler
+
+
+def main(port: int = 8765, **kwargs) -> None:
+    """フォアグラウンドでサーバを起動する（Ctrl+C で終了）。"""
+    srv = MockJQuantsServer(port=port, **kwargs)
+    print(f"Mock J-Quants: {srv.base_url}  ({len(srv.dates)} 営業日, {srv.dates[0]}〜{srv.dates[-1]})")
+    for key, url in srv.endpoints().items():
+        print(f"  {key:<24} {url}")
+    try:
+        srv.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        srv.httpd.server_close()
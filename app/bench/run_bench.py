@@ -0,0 +1,441 @@
+"""app/bench/run_bench.py
+
+性能ベンチマーク（合成マーケット上で主要処理の時間とメモリを計測）。
+
+計測対象:
+    add_derived_cols / score_up / rescore_gap（NK225_gap だけを差し替えて上位銘柄を出し直す） /
+    score_stocks / run_backtest /
+    run_backtest_topn（TopN 5〜40 を 1 回で評価） / calc_metrics /
+    calc_metrics_batch（METRICS_COLS 列のリターン行列を一括評価） /
+    bootstrap_ci（BOOT_COLS 列 × 1,000 標本の信頼区間） /
+    param_search（粗探索グリッドを縮小して直列実行） /
+    export_xlsx / export_csv（営業日数分の上位 EXPORT_PER_DAY 銘柄の履歴つきでスコア出力） /
+    fetch_daily_quotes（ローカル模擬 J-Quants から FETCH_DAYS 日分を並行取得）
+
+- 入力は ``app.bench.synthetic`` の決定的な合成データ（API 不要）
+- 各ケースを ``repeat`` 回実行して所要時間を記録し、別途 1 回 ``tracemalloc`` で
+  ピークメモリを測る（tracemalloc は遅いので時間計測とは分ける）
+- 結果は ``bench_results/bench_<日時>.json`` に保存し、``compare`` で過去結果と比較
+
+実行例:
+    (venv) python -m app bench --codes 1000 --days 250
+    (venv) python -m app bench --codes 4000 --days 2500 --cases add_derived_cols score_up
+    (venv) python -m app bench --compare bench_results/bench_20250101_000000.json
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import time
+import tracemalloc
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from app.bench.synthetic import (
+    make_info_df,
+    make_nk225_gap,
+    make_picks_df,
+    make_price_df,
+    make_quotes_df,
+)
+
+__all__ = [
+    "BENCH_DIR",
+    "CASES",
+    "BenchContext",
+    "run_bench",
+    "save_result",
+    "compare",
+]
+
+BENCH_DIR = Path("bench_results")
+
+# 縮小版 param_search のグリッド（(c, d) と TopN）
+SEARCH_GRID = [(1.0, 1.0), (1.4, 1.2)]
+SEARCH_TOPN = [10, 15]
+
+# calc_metrics_batch / bootstrap_ci ケースの戦略（列）数
+METRICS_COLS = 5000
+BOOT_COLS = 200
+
+# export ケース: 1 日あたりの出力銘柄数（履歴は全営業日分）
+EXPORT_PER_DAY = 40
+
+# fetch ケース: 模擬サーバの 1 リクエスト遅延・取得日数・並行数
+FETCH_LATENCY = 0.01
+FETCH_DAYS = 20
+FETCH_WORKERS = 4
+
+
+# ----------------------------------------------------------------------
+# 入力データ（必要になった時点で 1 回だけ生成し、計測時間には含めない）
+# ----------------------------------------------------------------------
+
+class BenchContext:
+    """ケース間で共有する合成データ。"""
+
+    def __init__(self, n_codes: int, n_days: int, seed: int, logger: logging.Logger):
+        self.n_codes = n_codes
+        self.n_days = n_days
+        self.seed = seed
+        self.logger = logger
+        self._cache: dict[str, Any] = {}
+
+    def _get(self, key: str, build: Callable[[], Any]) -> Any:
+        if key not in self._cache:
+            self._cache[key] = build()
+        return self._cache[key]
+
+    @property
+    def price(self) -> pd.DataFrame:
+        return self._get("price", lambda: make_price_df(self.n_codes, self.n_days, self.seed))
+
+    @property
+    def info(self) -> pd.DataFrame:
+        return self._get("info", lambda: make_info_df(self.n_codes, self.seed))
+
+    @property
+    def derived(self) -> pd.DataFrame:
+        return self._get("derived", self._build_derived)
+
+    def _build_derived(self) -> pd.DataFrame:
+        from app.backtest.add_derived_cols import add_derived_cols
+        df = add_derived_cols(self.price)
+        # nk225_gap.csv の有無に依存しないよう合成ギャップで置き換える
+        # （NaN のままだと score_up が全銘柄を落とし、空の経路を測ってしまう）
+        gap = make_nk225_gap(self.price["Date"], self.seed).set_index("Date")["NK225_gap"]
+        df["NK225_gap"] = pd.to_datetime(df["Date"]).map(gap).to_numpy()
+        return df
+
+    @property
+    def quotes(self) -> pd.DataFrame:
+        return self._get("quotes", lambda: make_quotes_df(self.price, seed=self.seed))
+
+    @property
+    def returns(self) -> pd.Series:
+        rng = np.random.default_rng(self.seed)
+        return self._get("returns", lambda: pd.Series(rng.normal(5e-4, 0.01, self.n_days)))
+
+    @property
+    def return_matrix(self) -> np.ndarray:
+        """(営業日 × METRICS_COLS) の合成リターン行列（パラメータ組の一括評価用）。"""
+        rng = np.random.default_rng(self.seed)
+        return self._get("return_matrix",
+                         lambda: rng.normal(5e-4, 0.01, (self.n_days, METRICS_COLS)))
+
+    @property
+    def mock(self):
+        """fetch ケース用の模擬 J-Quants サーバ（初回アクセスで起動）。"""
+        from app.bench.mock_jquants import MockJQuantsServer
+        return self._get("mock", lambda: MockJQuantsServer(
+            self.n_codes, FETCH_DAYS, self.seed, latency=FETCH_LATENCY).start())
+
+    @property
+    def picks(self) -> pd.DataFrame:
+        """日ごとの上位 EXPORT_PER_DAY 銘柄（スコアの構成要素つき）。"""
+        return self._get("picks", lambda: make_picks_df(self.price, self.info, EXPORT_PER_DAY))
+
+    @property
+    def export_dir(self) -> Path:
+        """export ケース用の出力先。最終日以外の上位銘柄を history/ に置いておく。"""
+        return self._get("export_dir", self._build_export_dir)
+
+    def _build_export_dir(self) -> Path:
+        import tempfile
+        out = Path(tempfile.mkdtemp(prefix="bench_export_"))
+        (out / "history").mkdir()
+        for day, df in list(self.picks.groupby("Date"))[:-1]:
+            df.to_csv(out / "history" / f"picks_{day:%Y%m%d}.csv", index=False, encoding="utf-8")
+        return out
+
+    def close(self) -> None:
+        if "mock" in self._cache:
+            self._cache.pop("mock").stop()
+        if "export_dir" in self._cache:
+            import shutil
+            shutil.rmtree(self._cache.pop("export_dir"), ignore_errors=True)
+
+
+# ----------------------------------------------------------------------
+# ケース定義
+# ----------------------------------------------------------------------
+
+@dataclass
+class BenchCase:
+    """計測ケース。``prepare`` は計測外、``run`` だけを計測する。"""
+
+    name: str
+    run: Callable[[BenchContext, Any], Any]
+    prepare: Callable[[BenchContext], Any] = lambda ctx: None
+    loops: int = 1          # 1 回が短すぎるケースは複数回まとめて測る
+
+
+def _add_derived_cols(ctx: BenchContext, _):
+    from app.backtest.add_derived_cols import add_derived_cols
+    return add_derived_cols(ctx.price)
+
+
+def _score_up(ctx: BenchContext, _):
+    from app.scoring.score_up import score_up
+    return score_up(ctx.derived, ctx.info, ctx.logger)
+
+
+def _make_rescorer(ctx: BenchContext):
+    from itertools import cycle
+    from app.scoring.rescore import Rescorer
+    return Rescorer(ctx.derived, ctx.info, ctx.logger), cycle(np.linspace(-0.01, 0.01, 101))
+
+
+def _rescore_gap(ctx: BenchContext, state):
+    rescorer, gaps = state
+    return rescorer.update(NK225_gap=next(gaps))
+
+
+def _score_stocks(ctx: BenchContext, quotes: pd.DataFrame):
+    from app.scoring.score_stocks import score_stocks
+    return score_stocks(quotes, ctx.info, ctx.logger)
+
+
+def _run_backtest(ctx: BenchContext, _):
+    from app.backtest.backtest_runner import run_backtest
+    return run_backtest(ctx.derived, ctx.info)
+
+
+def _run_backtest_topn(ctx: BenchContext, _):
+    from app.backtest.backtest_runner import run_backtest_topn
+    return run_backtest_topn(ctx.derived, ctx.info, top_ns=range(5, 41))
+
+
+def _calc_metrics(ctx: BenchContext, _):
+    from app.backtest.metrics import calc_metrics
+    return calc_metrics(ctx.returns)
+
+
+def _calc_metrics_batch(ctx: BenchContext, _):
+    from app.backtest.metrics import calc_metrics_batch
+    return calc_metrics_batch(ctx.return_matrix)
+
+
+def _bootstrap_ci(ctx: BenchContext, _):
+    from app.backtest.bootstrap import bootstrap_ci
+    return bootstrap_ci(ctx.return_matrix[:, :BOOT_COLS])
+
+
+def _param_search(ctx: BenchContext, _):
+    from app.backtest.param_search import _run_backtest_coarse, _score_batches
+    return _score_batches([_run_backtest_coarse(ctx.derived, ctx.info, c, d, SEARCH_TOPN)
+                           for c, d in SEARCH_GRID], "coarse")
+
+
+def _export_case(fmt: str) -> Callable[[BenchContext, Any], Any]:
+    def run(ctx: BenchContext, picks: pd.DataFrame):
+        from app.exporters.export_scores_to_excel import export_scores
+        return export_scores(picks, ctx.export_dir, ctx.logger, fmt=fmt, history_days=ctx.n_days,
+                             as_of=picks["Date"].iloc[0])
+    return run
+
+
+def _last_picks(ctx: BenchContext) -> pd.DataFrame:
+    ctx.export_dir                          # 履歴は計測外で用意する
+    return ctx.picks[ctx.picks["Date"] == ctx.picks["Date"].max()]
+
+
+def _fetch_daily_quotes(ctx: BenchContext, cfg):
+    from concurrent.futures import ThreadPoolExecutor
+    from app.data.daily_quotes_fetcher import fetch_daily_quotes
+    srv = ctx.mock
+    with ThreadPoolExecutor(FETCH_WORKERS) as pool:
+        return list(pool.map(lambda d: fetch_daily_quotes(cfg, srv.id_token, ctx.logger, d), srv.dates))
+
+
+def _mock_config(ctx: BenchContext):
+    from app.core.config import get_config
+    return ctx.mock.config(get_config())
+
+
+CASES: dict[str, BenchCase] = {
+    c.name: c
+    for c in [
+        BenchCase("add_derived_cols", _add_derived_cols, prepare=lambda ctx: ctx.price),
+        BenchCase("score_up", _score_up, prepare=lambda ctx: (ctx.derived, ctx.info)),
+        BenchCase("rescore_gap", _rescore_gap, prepare=_make_rescorer, loops=100),
+        # score_stocks は引数の Date 列を書き換えるため毎回コピーを渡す
+        BenchCase("score_stocks", _score_stocks, prepare=lambda ctx: ctx.quotes.copy()),
+        BenchCase("run_backtest", _run_backtest, prepare=lambda ctx: (ctx.derived, ctx.info)),
+        BenchCase("run_backtest_topn", _run_backtest_topn, prepare=lambda ctx: (ctx.derived, ctx.info)),
+        BenchCase("calc_metrics", _calc_metrics, prepare=lambda ctx: ctx.returns, loops=100),
+        BenchCase("calc_metrics_batch", _calc_metrics_batch, prepare=lambda ctx: ctx.return_matrix),
+        BenchCase("bootstrap_ci", _bootstrap_ci, prepare=lambda ctx: ctx.return_matrix),
+        BenchCase("param_search", _param_search, prepare=lambda ctx: (ctx.derived, ctx.info)),
+        BenchCase("export_xlsx", _export_case("xlsx"), prepare=_last_picks),
+        BenchCase("export_csv", _export_case("csv"), prepare=_last_picks),
+        BenchCase("fetch_daily_quotes", _fetch_daily_quotes, prepare=_mock_config),
+    ]
+}
+
+
+# ----------------------------------------------------------------------
+# 計測
+# ----------------------------------------------------------------------
+
+def _time_case(case: BenchCase, ctx: BenchContext, repeat: int) -> list[float]:
+    seconds = []
+    for _ in range(repeat):
+        arg = case.prepare(ctx)
+        t0 = time.perf_counter()
+        for _ in range(case.loops):
+            case.run(ctx, arg)
+        seconds.append((time.perf_counter() - t0) / case.loops)
+    return seconds
+
+
+def _peak_mb(case: BenchCase, ctx: BenchContext) -> float:
+    arg = case.prepare(ctx)
+    tracemalloc.start()
+    try:
+        case.run(ctx, arg)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak / 2**20
+
+
+def _git_rev() -> Optional[str]:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"],
+                             capture_output=True, text=True, timeout=5)
+        return out.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def run_bench(
+    n_codes: int = 1000,
+    n_days: int = 250,
+    seed: int = 0,
+    cases: Optional[Sequence[str]] = None,
+    repeat: int = 3,
+    memory: bool = True,
+    logger: Optional[logging.Logger] = None,
+) -> dict:
+    """ベンチマークを実行し、結果 dict（JSON 化可能）を返す。
+
+    Args:
+        n_codes: 合成銘柄数
+        n_days: 合成営業日数
+        seed: 乱数シード
+        cases: 実行するケース名（None なら ``CASES`` 全て）
+        repeat: 時間計測の繰り返し回数
+        memory: True ならケースごとに tracemalloc でピークメモリを測る
+        logger: 計測対象に渡すロガー（None なら WARNING 以上のみ出す専用ロガー）
+
+    Returns:
+        dict: {"meta": {...}, "cases": {name: {"seconds", "best", "median", "peak_mb"}}}
+    """
+    names = list(cases) if cases else list(CASES)
+    unknown = set(names) - set(CASES)
+    if unknown:
+        raise KeyError(f"未知のケースです: {sorted(unknown)}")
+
+    if logger is None:
+        logger = logging.getLogger("MirAI_Trade.bench")
+        logger.setLevel(logging.WARNING)
+    ctx = BenchContext(n_codes, n_days, seed, logger)
+
+    result: dict = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "git": _git_rev(),
+            "n_codes": n_codes,
+            "n_days": n_days,
+            "seed": seed,
+            "repeat": repeat,
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "machine": platform.machine(),
+            "cpu_count": os.cpu_count(),
+        },
+        "cases": {},
+    }
+    try:
+        for name in names:
+            case = CASES[name]
+            seconds = _time_case(case, ctx, repeat)
+            entry = {
+                "seconds": [round(s, 6) for s in seconds],
+                "best": round(min(seconds), 6),
+                "median": round(statistics.median(seconds), 6),
+                "peak_mb": round(_peak_mb(case, ctx), 2) if memory else None,
+            }
+            result["cases"][name] = entry
+            logger.info("bench %-16s best %.4f s  peak %s MB", name, entry["best"], entry["peak_mb"])
+    finally:
+        ctx.close()
+    return result
+
+
+# ----------------------------------------------------------------------
+# 保存・比較
+# ----------------------------------------------------------------------
+
+def save_result(result: dict, out_dir: Path = BENCH_DIR) -> Path:
+    """結果を ``bench_<日時>.json`` として保存し、そのパスを返す。"""
+    out_dir.mkdir(parents=True, exist_ok=True)
+    stamp = datetime.fromisoformat(result["meta"]["timestamp"]).strftime("%Y%m%d_%H%M%S")
+    path = out_dir / f"bench_{stamp}.json"
+    path.write_text(json.dumps(result, ensure_ascii=False, indent=2), encoding="utf-8")
+    return path
+
+
+def compare(base: dict, new: dict) -> pd.DataFrame:
+    """2 つの結果を best 時間とピークメモリで比較する（speedup > 1 が改善）。"""
+    rows = []
+    for name in new["cases"]:
+        if name not in base["cases"]:
+            continue
+        b, n = base["cases"][name], new["cases"][name]
+        rows.append({
+            "case": name,
+            "base_s": b["best"],
+            "new_s": n["best"],
+            "speedup": round(b["best"] / n["best"], 2) if n["best"] else None,
+            "base_mb": b.get("peak_mb"),
+            "new_mb": n.get("peak_mb"),
+        })
+    if base["meta"].get("n_codes") != new["meta"].get("n_codes") or \
+            base["meta"].get("n_days") != new["meta"].get("n_days"):
+        logging.getLogger("MirAI_Trade.bench").warning("データ規模が異なる結果を比較しています")
+    return pd.DataFrame(rows)
+
+
+def main(
+    n_codes: int = 1000,
+    n_days: int = 250,
+    seed: int = 0,
+    cases: Optional[Sequence[str]] = None,
+    repeat: int = 3,
+    memory: bool = True,
+    out_dir: Path = BENCH_DIR,
+    compare_to: Optional[Path] = None,
+) -> Path:
+    """ベンチマークを実行して保存し、指定があれば過去結果との比較を表示する。"""
+    result = run_bench(n_codes, n_days, seed, cases, repeat, memory)
+    path = save_result(result, out_dir)
+    table = pd.DataFrame.from_dict(result["cases"], orient="index")[["best", "median", "peak_mb"]]
+    print(table.to_string())
+    print(f"Saved {path}")
+    if compare_to is not None:
+        base = json.loads(Path(compare_to).read_text(encoding="utf-8"))
+        print(compare(base, result).to_string(index=False))
+    return path
@@ -0,0 +1,140 @@
+"""app/bench/synthetic.py
+
+ベンチマーク用の決定的な合成マーケット生成器。
+
+J-Quants から取得する CSV と同じ列・型・並び（日付ごとに全銘柄）の
+DataFrame を乱数シードだけから作る。API もトークンも不要。
+
+- ``make_price_df``: ``price_ohlcv.csv`` 互換（Date, Code, Open, High, Low, Close, Volume）
+- ``make_info_df``: ``fetch_listed_info`` 互換（Code, CompanyName, MarketCode, MarginCode）
+- ``make_quotes_df``: ``fetch_daily_quotes`` 互換（score_stocks 用に UpperLimit / LowerLimit 付き）
+- ``make_nk225_gap``: ``nk225_gap.csv`` 互換（Date, NK225_gap）
+- ``make_picks_df``: ``score_stocks(components=True)`` 互換の日ごとの上位銘柄（出力ベンチ用）
+
+同じ (n_codes, n_days, seed) なら常に同じ値を返すため、
+ベンチマーク結果を実行間で比較できる。
+"""
+
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+__all__ = [
+    "make_codes",
+    "make_price_df",
+    "make_info_df",
+    "make_quotes_df",
+    "make_nk225_gap",
+    "make_picks_df",
+    "make_market",
+]
+
+START_DATE = "2015-01-05"
+
+
+def make_codes(n_codes: int, seed: int = 0) -> np.ndarray:
+    """5 桁の銘柄コード（先頭 4 桁 + "0"）を昇順で返す。"""
+    rng = np.random.default_rng(seed)
+    if n_codes > 8700:
+        raise ValueError("n_codes は 8700 以下で指定してください")
+    code4 = np.sort(rng.choice(np.arange(1300, 10000), size=n_codes, replace=False))
+    return np.array([f"{c}0" for c in code4], dtype=object)
+
+
+def make_price_df(n_codes: int = 1000, n_days: int = 250, seed: int = 0,
+                  start: str = START_DATE) -> pd.DataFrame:
+    """幾何ランダムウォークで四本値パネルを作る（日付 → 銘柄の順に並ぶ）。
+
+    Args:
+        n_codes: 銘柄数
+        n_days: 営業日数（``start`` からの平日）
+        seed: 乱数シード
+        start: 初日
+
+    Returns:
+        pd.DataFrame: Date, Code, Open, High, Low, Close, Volume
+    """
+    rng = np.random.default_rng(seed)
+    codes = make_codes(n_codes, seed)
+    dates = pd.bdate_range(start, periods=n_days)
+
+    # 銘柄ごとに水準・ボラティリティ・出来高規模を変える
+    base = np.exp(rng.uniform(np.log(200), np.log(20000), n_codes))
+    vol = rng.uniform(0.01, 0.04, n_codes)
+    liq = np.exp(rng.uniform(np.log(1e4), np.log(5e6), n_codes))
+
+    shock = rng.standard_normal((n_days, n_codes)) * vol
+    close = base * np.exp(np.cumsum(shock, axis=0))
+    gap = rng.standard_normal((n_days, n_codes)) * vol * 0.5
+    open_ = np.vstack([base[None, :], close[:-1]]) * np.exp(gap)
+    spread = np.abs(rng.standard_normal((n_days, n_codes))) * vol * close
+    high = np.maximum(open_, close) + spread
+    low = np.maximum(np.minimum(open_, close) - spread, 1.0)
+    volume = np.round(liq * rng.lognormal(0.0, 0.5, (n_days, n_codes)))
+
+    return pd.DataFrame({
+        "Date": np.repeat(dates.to_numpy(), n_codes),
+        "Code": np.tile(codes, n_days),
+        "Open": np.round(open_, 1).ravel(),
+        "High": np.round(high, 1).ravel(),
+        "Low": np.round(low, 1).ravel(),
+        "Close": np.round(close, 1).ravel(),
+        "Volume": volume.ravel(),
+    })
+
+
+def make_info_df(n_codes: int = 1000, seed: int = 0) -> pd.DataFrame:
+    """上場銘柄一覧を作る（一部は東証外・信用不可・ETF 名義）。"""
+    rng = np.random.default_rng(seed + 1)
+    codes = make_codes(n_codes, seed)
+    market = rng.choice(["0111", "0112", "0113", "0105"], size=n_codes, p=[0.45, 0.3, 0.2, 0.05])
+    margin = rng.choice(["1", "2", "3"], size=n_codes, p=[0.5, 0.4, 0.1])
+    names = np.array([f"合成{c[:4]}" for c in codes], dtype=object)
+    names[rng.random(n_codes) < 0.02] = "合成ETF"
+    return pd.DataFrame({
+        "Code": codes,
+        "CompanyName": names,
+        "MarketCode": market,
+        "MarginCode": margin,
+    })
+
+
+def make_quotes_df(price_df: pd.DataFrame, days: int = 6, seed: int = 0) -> pd.DataFrame:
+    """``price_df`` の直近 ``days`` 営業日を ``fetch_daily_quotes`` 形式に変換する。"""
+    last = np.sort(price_df["Date"].unique())[-days:]
+    quotes = price_df[price_df["Date"].isin(last)].reset_index(drop=True)
+    rng = np.random.default_rng(seed + 2)
+    quotes["Date"] = quotes["Date"].dt.strftime("%Y-%m-%d")
+    quotes["UpperLimit"] = np.where(rng.random(len(quotes)) < 0.005, "1", "0")
+    quotes["LowerLimit"] = np.where(rng.random(len(quotes)) < 0.005, "1", "0")
+    return quotes
+
+
+def make_nk225_gap(dates, seed: int = 0) -> pd.DataFrame:
+    """``nk225_gap.csv`` 互換（Date, NK225_gap）の寄り前ギャップ系列を作る。"""
+    dates = pd.DatetimeIndex(pd.unique(pd.Series(dates))).sort_values()
+    rng = np.random.default_rng(seed + 5)
+    return pd.DataFrame({"Date": dates, "NK225_gap": np.round(rng.normal(0, 0.008, len(dates)), 5)})
+
+
+def make_picks_df(price_df: pd.DataFrame, info_df: pd.DataFrame, per_day: int = 40) -> pd.DataFrame:
+    """日ごとの上位 ``per_day`` 銘柄を ``score_stocks(components=True)`` の列で返す。
+
+    ATR / 出来高の平均は当日の値幅・出来高で代用する（値の妥当性ではなく出力量の再現が目的）。
+    """
+    df = price_df.merge(info_df[["Code", "CompanyName"]], on="Code", how="left")
+    df["RangeRatio"] = (df["High"] - df["Low"]) / df["Low"]
+    df["AtrAvg"] = df["High"] - df["Low"]
+    df["VolAvg"] = df["Volume"].astype(np.float64)
+    df["Score"] = df["AtrAvg"] * df["VolAvg"] * df["RangeRatio"]
+    df["Rank"] = df.groupby("Date")["Score"].rank(method="first", ascending=False).astype(int)
+    df = df[df["Rank"] <= per_day].sort_values(["Date", "Rank"], ignore_index=True)
+    df["Date"] = df["Date"].dt.date
+    return df[["Rank", "Code", "CompanyName", "Score", "Date", "Close", "RangeRatio", "AtrAvg", "VolAvg"]]
+
+
+def make_market(n_codes: int = 1000, n_days: int = 250, seed: int = 0
+                ) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """(price_df, info_df) をまとめて返す。"""
+    return make_price_df(n_codes, n_days, seed), make_info_df(n_codes, seed)
@@ -0,0 +1,373 @@
+"""app/cli.py
+
+MirAI Trade 統合 CLI（``python -m app <subcommand>``）。
+
+- サブコマンドごとに必要なモジュールだけを関数内で import する（遅延 import）。
+  ``--help`` では pandas / matplotlib / joblib / yaml を一切読み込まない。
+- 設定は ``get_config()`` でプロセス内 1 回だけ読み込み、各スクリプトと共有する。
+
+起動時間の目標（docs/spec_scripts.md 参照）:
+    python -m app --help   インタプリタ起動 + 20 ms 以内（実測 +10 ms）
+    python -m app score    トークン・API 待ちを除き 1.5 s 以内
+
+実行例:
+    (venv) python -m app fetch ohlcv
+    (venv) python -m app derive
+    (venv) python -m app search
+    (venv) python -m app report              # 最新の探索結果からグラフを再生成
+    (venv) python -m app score --no-export --csv exports/scores.csv
+    (venv) python -m app precompute          # 大引け後
+    (venv) python -m app score --premarket   # 寄り前（API を呼ばない）
+    (venv) python -m app pipeline            # 変更のあったステージだけ実行
+    (venv) python -m app serve --port 8766   # パネルを常駐させて問い合わせに応答
+    (venv) python -m app bench --codes 4000 --days 2500
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from typing import Callable, Optional, Sequence
+
+# ----------------------------------------------------------------------
+# サブコマンド実装（重いモジュールはここで初めて import）
+# ----------------------------------------------------------------------
+
+def _horizon(args: argparse.Namespace) -> int:
+    """--horizon 未指定時は、期間指定があれば全期間（0）、なければ直近 90 営業日。"""
+    if args.horizon is not None:
+        return args.horizon
+    return 0 if (args.start or args.end) else 90
+
+
+def _cmd_fetch(args: argparse.Namespace) -> None:
+    if args.target in ("ohlcv", "all"):
+        from app.backtest.generate_price_csv import main as fetch_ohlcv
+        fetch_ohlcv(horizon=_horizon(args), warmup=args.warmup, start=args.start, end=args.end)
+    if args.target in ("premium", "all"):
+        from app.backtest.generate_premium_pkl import main as fetch_premium
+        fetch_premium()
+
+
+def _cmd_derive(args: argparse.Namespace) -> None:
+    from app.backtest.add_derived_cols import main as derive
+    derive(chunked=args.chunked, partition_codes=args.partition_codes,
+           n_jobs=args.jobs, to_db=args.to_db)
+
+
+def _cmd_backtest(args: argparse.Namespace) -> None:
+    from app.backtest.backtest_runner import main as backtest
+    from app.backtest.execution import ExecutionConfig
+    execution = ExecutionConfig(cost=args.cost, block_limits=args.block_limits,
+                                max_volume_frac=args.max_volume_frac, capital=args.capital,
+                                weighting=args.weighting)
+    backtest(source=args.source, compact=args.compact, horizon=_horizon(args),
+             warmup=args.warmup, start=args.start, end=args.end, n_jobs=args.jobs,
+             execution=execution)
+
+
+def _cmd_search(args: argparse.Namespace) -> None:
+    from app.backtest.param_search import main as search
+    search(source=args.source, compact=args.compact)
+
+
+def _cmd_report(args: argparse.Namespace) -> None:
+    from pathlib import Path
+    from app.backtest.report import CHARTS, render_report
+    from app.backtest.result_store import latest_store
+
+    store = Path(args.store) if args.store else latest_store()
+    if store is None:
+        raise SystemExit("探索結果がありません（先に search を実行してください）")
+    out_dir = Path(args.out_dir) if args.out_dir else None
+    for path in render_report(store, out_dir, args.charts or CHARTS, args.top, args.jobs):
+        print(path)
+
+
+def _cmd_score(args: argparse.Namespace) -> None:
+    from app.main import main as score
+    result_df = score(export=not args.no_export, output_dir=args.output_dir, fmt=args.format,
+                      history_days=args.history_days, premarket=args.premarket)
+    if args.csv:
+        result_df.to_csv(args.csv, index=False, encoding="utf-8")
+
+
+def _cmd_precompute(args: argparse.Namespace) -> None:
+    from app.core.config import get_config
+    from app.core.logger import setup_logger
+    from app.scoring.premarket import precompute
+
+    cfg = get_config()
+    precompute(cfg, setup_logger(cfg.logging), output_dir=args.output_dir, fmt=args.format,
+               history_days=args.history_days)
+
+
+def _cmd_export(args: argparse.Namespace) -> None:
+    import pandas as pd
+    from app.core.config import get_config
+    from app.core.logger import setup_logger
+    from app.exporters.export_scores_to_excel import export_scores
+
+    logger = setup_logger(get_config().logging)
+    df = pd.read_csv(args.input, dtype={"Code": "str"})
+    export_scores(df, output_dir=args.output_dir, logger=logger, fmt=args.format,
+                  history_days=args.history_days)
+
+
+def _cmd_db_load(args: argparse.Namespace) -> None:
+    import pandas as pd
+    from app.core.config import get_config
+    from app.core.logger import setup_logger
+    from app.db.db_client import DBClient
+    from app.db.market_store import MarketStore
+    from app.backtest.add_derived_cols import DERIVED_CSV, RAW_CSV
+
+    cfg = get_config()
+    logger = setup_logger(cfg.logging)
+    with DBClient(cfg, logger) as db:
+        store = MarketStore(db, logger)
+        store.ensure_schema()
+        if args.target in ("ohlcv", "all"):
+            store.load_ohlcv(pd.read_csv(RAW_CSV, dtype={"Code": "str"}, parse_dates=["Date"]))
+        if args.target in ("features", "all"):
+            store.load_features(pd.read_csv(DERIVED_CSV, dtype={"Code": "str"}, parse_dates=["Date"]))
+
+
+def _cmd_pipeline(args: argparse.Namespace) -> None:
+    from app.core.config import get_config
+    from app.core.logger import setup_logger
+    from app.backtest.pipeline import build_pipeline
+
+    logger = setup_logger(get_config().logging)
+    status = build_pipeline(logger).run(args.stages or None, force=args.force, dry_run=args.dry_run)
+    for name, st in status.items():
+        print(f"{name:<14} {st}")
+    if any(st in ("failed", "blocked") for st in status.values()):
+        raise SystemExit(1)
+
+
+def _cmd_bench(args: argparse.Namespace) -> None:
+    from pathlib import Path
+    from app.bench.run_bench import main as bench
+    bench(args.codes, args.days, args.seed, args.cases or None, args.repeat,
+          memory=not args.no_memory, out_dir=Path(args.out_dir),
+          compare_to=Path(args.compare) if args.compare else None)
+
+
+def _cmd_serve(args: argparse.Namespace) -> None:
+    from app.backtest.service import main as serve
+    serve(source=args.source, compact=args.compact, host=args.host, port=args.port, poll=args.poll)
+
+
+def _cmd_mock_jquants(args: argparse.Namespace) -> None:
+    from app.bench.mock_jquants import main as serve
+    serve(args.port, n_codes=args.codes, n_days=args.days, latency=args.latency,
+          rate_limit=args.rate_limit, error_rate=args.error_rate, page_size=args.page_size,
+          host=args.host)
+
+
+# ----------------------------------------------------------------------
+# パーサ
+# ----------------------------------------------------------------------
+
+def _add_export_args(p: argparse.ArgumentParser) -> None:
+    """スコア出力の共通オプション。"""
+    p.add_argument("--output-dir", default="exports", help="出力先")
+    p.add_argument("--format", default="xlsx", choices=["xlsx", "csv", "parquet"],
+                   help="出力形式（既定 xlsx。csv / parquet はシートごとのファイル）")
+    p.add_argument("--history-days", type=int, default=250,
+                   help="history シートの営業日数（0 で history シートを出さない）")
+
+
+def _add_period_args(p: argparse.ArgumentParser) -> None:
+    """検証 / 取得期間の共通オプション。"""
+    p.add_argument("--horizon", type=int, default=None,
+                   help="検証営業日数（既定 90、--start/--end 指定時は全期間。0 で全期間）")
+    p.add_argument("--warmup", type=int, default=20,
+                   help="派生指標が揃うまで取引しない先頭営業日数（既定 20）")
+    p.add_argument("--start", default=None, help="期間の開始日 YYYY-MM-DD")
+    p.add_argument("--end", default=None, help="期間の終了日 YYYY-MM-DD")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="python -m app",
+        description="MirAI Trade CLI（取得 → 派生列 → バックテスト / 探索 → スコア → 出力）",
+    )
+    parser.add_argument("--config", default=None,
+                        help="設定ファイル（既定: configs/config.yaml）")
+    parser.add_argument("--timing", action="store_true",
+                        help="終了時に経過時間を stderr に出力")
+    parser.add_argument("--profile", action="store_true",
+                        help="ステージ別の時間・CPU・ピーク RSS をログと logs/profile_*.json に出力")
+    parser.add_argument("--cprofile", default=None, metavar="PATH",
+                        help="cProfile の結果を PATH（.prof）に保存")
+    sub = parser.add_subparsers(dest="command", metavar="<command>")
+
+    p = sub.add_parser("fetch", help="J-Quants からバックテスト用データを取得")
+    p.add_argument("target", nargs="?", default="all", choices=["ohlcv", "premium", "all"])
+    _add_period_args(p)
+    p.set_defaults(func=_cmd_fetch)
+
+    p = sub.add_parser("derive", help="派生指標列と NK225_gap を生成")
+    p.add_argument("--chunked", action="store_true",
+                   help="銘柄パーティションごとに処理してメモリを一定に保つ（長期履歴向け）")
+    p.add_argument("--partition-codes", type=int, default=500,
+                   help="--chunked 時の 1 パーティションの銘柄数（既定 500）")
+    p.add_argument("--jobs", type=int, default=1, help="--chunked 時の並列パーティション数")
+    p.add_argument("--to-db", action="store_true", help="結果を features テーブルにも upsert")
+    p.set_defaults(func=_cmd_derive)
+
+    p = sub.add_parser("backtest", help="既定パラメータでバックテスト")
+    p.add_argument("--source", default="csv", choices=["csv", "db"],
+                   help="価格パネルの読み込み元（db は db-load で投入済みのこと）")
+    p.add_argument("--compact", action="store_true",
+                   help="省メモリ型（float32 / int32 / 共有文字列）で読み込む")
+    _add_period_args(p)
+    p.add_argument("--jobs", type=int, default=None,
+                   help="営業日チャンクの並列数（既定: config の BACKTEST_N_JOBS）")
+    p.add_argument("--cost", type=float, default=0.0005,
+                   help="約定金額あたりの往復コスト（既定 0.0005 = 0.05%%）")
+    p.add_argument("--block-limits", action="store_true",
+                   help="寄り付きがストップ高 / ストップ安の銘柄は約定させない")
+    p.add_argument("--max-volume-frac", type=float, default=None,
+                   help="1 銘柄の約定金額を 20 日平均売買代金のこの割合までに制限")
+    p.add_argument("--capital", type=float, default=10_000_000,
+                   help="運用金額 [円]（--max-volume-frac の判定に使う、既定 1,000 万円）")
+    p.add_argument("--weighting", default="equal", choices=["equal", "score", "inverse_vol"],
+                   help="配分方式（既定: 等金額）")
+    p.set_defaults(func=_cmd_backtest)
+
+    p = sub.add_parser("search", help="Score_up パラメータのグリッドサーチ")
+    p.add_argument("--source", default="csv", choices=["csv", "db"],
+                   help="価格パネルの読み込み元（db は db-load で投入済みのこと）")
+    p.add_argument("--compact", action="store_true",
+                   help="省メモリ型（float32 / int32 / 共有文字列）で読み込む")
+    p.set_defaults(func=_cmd_search)
+
+    p = sub.add_parser("report", help="探索結果ストアからグラフ・レポートを生成（再計算なし）")
+    p.add_argument("store", nargs="?", default=None,
+                   help="search の保存先（既定: backtest_results/search/ の最新）")
+    p.add_argument("--out-dir", default=None, help="出力先（既定: 保存先と同じ）")
+    p.add_argument("--charts", nargs="*", default=[], metavar="CHART",
+                   help="equity / equity_top / heatmap / topn（省略時は全て）")
+    p.add_argument("--top", type=int, default=10, help="上位として描く組数")
+    p.add_argument("--jobs", type=int, default=1, help="描画の並列数")
+    p.set_defaults(func=_cmd_report)
+
+    p = sub.add_parser("score", help="本番シグナル（score_stocks）を計算")
+    p.add_argument("--no-export", action="store_true", help="Excel 出力を省略")
+    p.add_argument("--premarket", action="store_true",
+                   help="precompute の結果を使い API を呼ばずに出力（当日用が無ければ通常実行）")
+    _add_export_args(p)
+    p.add_argument("--csv", default=None, help="スコア結果を CSV にも保存")
+    p.set_defaults(func=_cmd_score)
+
+    p = sub.add_parser("precompute", help="大引け後に取得・候補計算を済ませて保存（score --premarket 用）")
+    _add_export_args(p)
+    p.set_defaults(func=_cmd_precompute)
+
+    p = sub.add_parser("export", help="スコア CSV を Excel（picks / components / history）に出力")
+    p.add_argument("input", help="score --csv で保存した CSV")
+    _add_export_args(p)
+    p.set_defaults(func=_cmd_export)
+
+    p = sub.add_parser("db-load", help="OHLCV / 派生指標 CSV を PostgreSQL に一括投入")
+    p.add_argument("target", nargs="?", default="all", choices=["ohlcv", "features", "all"])
+    p.set_defaults(func=_cmd_db_load)
+
+    p = sub.add_parser("pipeline", help="変更のあったステージだけを依存順に実行")
+    p.add_argument("stages", nargs="*", help="対象ステージ（依存も実行）。省略時は全ステージ")
+    p.add_argument("--force", nargs="*", default=[], metavar="STAGE", help="強制再実行するステージ")
+    p.add_argument("--dry-run", action="store_true", help="実行予定を表示するだけ")
+    p.set_defaults(func=_cmd_pipeline)
+
+    p = sub.add_parser("bench", help="合成データで主要処理の時間・メモリを計測")
+    p.add_argument("--codes", type=int, default=1000, help="合成銘柄数")
+    p.add_argument("--days", type=int, default=250, help="合成営業日数")
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--repeat", type=int, default=3, help="時間計測の繰り返し回数")
+    p.add_argument("--cases", nargs="*", default=[], metavar="CASE", help="対象ケース（省略時は全て）")
+    p.add_argument("--no-memory", action="store_true", help="tracemalloc によるメモリ計測を省略")
+    p.add_argument("--out-dir", default="bench_results", help="結果 JSON の保存先")
+    p.add_argument("--compare", default=None, metavar="JSON", help="比較対象の過去結果")
+    p.set_defaults(func=_cmd_bench)
+
+    p = sub.add_parser("serve", help="価格パネルを常駐させ Score_up / バックテストの問い合わせに応答")
+    p.add_argument("--source", default="csv", choices=["csv", "db"],
+                   help="価格パネルの読み込み元（db は db-load で投入済みのこと）")
+    p.add_argument("--compact", action="store_true",
+                   help="省メモリ型（float32 / int32 / 共有文字列）で読み込む")
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=8766)
+    p.add_argument("--poll", type=float, default=5.0,
+                   help="入力ファイルの更新確認間隔 [秒]（0 で監視しない）")
+    p.set_defaults(func=_cmd_serve)
+
+    p = sub.add_parser("mock-jquants", help="合成データを返すローカル J-Quants 互換サーバを起動")
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=8765)
+    p.add_argument("--codes", type=int, default=500, help="合成銘柄数")
+    p.add_argument("--days", type=int, default=120, help="合成営業日数")
+    p.add_argument("--latency", type=float, default=0.0, help="1 リクエストの遅延 [秒]")
+    p.add_argument("--rate-limit", type=float, default=None, help="秒間上限（超過は 429）")
+    p.add_argument("--error-rate", type=float, default=0.0, help="500 を返す確率")
+    p.add_argument("--page-size", type=int, default=1000, help="daily_quotes の 1 ページ件数")
+    p.set_defaults(func=_cmd_mock_jquants)
+
+    return parser
+
+
+def _run_profiled(func: Callable[[argparse.Namespace], None], args: argparse.Namespace) -> None:
+    """サブコマンド全体を計測し、集計をロガーへ、生記録を JSON に出力する。"""
+    import logging
+    from datetime import datetime
+    from pathlib import Path
+    from app.core.config import get_config
+    from app.core.profiling import cprofile, get_profiler
+
+    prof = get_profiler()
+    prof.reset()
+    if args.profile:
+        prof.enable()
+    try:
+        with cprofile(Path(args.cprofile) if args.cprofile else None), prof.span(f"cli.{args.command}"):
+            func(args)
+    finally:
+        prof.disable()
+        if args.profile:
+            cfg = get_config()
+            logger = logging.getLogger("MirAI_Trade")
+            if not logger.handlers:
+                from app.core.logger import setup_logger
+                logger = setup_logger(cfg.logging)
+            stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            path = prof.dump_json(Path(cfg.logging.log_dir) / f"profile_{args.command}_{stamp}.json",
+                                  command=args.command, argv=sys.argv[1:])
+            prof.log_summary(logger)
+            logger.info("[profile] saved %s", path)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    t0 = time.perf_counter()
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    func: Optional[Callable[[argparse.Namespace], None]] = getattr(args, "func", None)
+    if func is None:
+        parser.print_help()
+        return 1
+
+    if args.config:
+        from app.core.config import get_config
+        get_config(args.config)      # 以降の get_config() はこの設定を共有
+
+    if args.profile or args.cprofile:
+        _run_profiled(func, args)
+    else:
+        func(args)
+
+    if args.timing:
+        print(f"[{args.command}] {time.perf_counter() - t0:.3f} s", file=sys.stderr)
+    return 0
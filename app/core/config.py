@@ -1,5 +1,5 @@
 from pathlib import Path
-from typing import Literal
+from typing import Literal, Optional
 from pydantic import BaseModel
 import yaml
 import os
@@ -45,6 +45,14 @@ class AppConfig(BaseModel):
     logging: LoggingConfig
     jquants: JQuantsConfig
     database: DatabaseConfig
+    BACKTEST_N_JOBS: Optional[int] = None
+    MEMORY_BUDGET_MB: Optional[int] = None     # バックテスト / 探索全体のメモリ予算
+
+DEFAULT_CONFIG_PATH = "configs/config.yaml"
+
+# プロセス内キャッシュ（get_config 用）
+_config_cache: dict[str, AppConfig] = {}
+_current_path: Optional[str] = None
 
 def load_config(path: str) -> AppConfig:
     """YAMLファイルと環境変数から設定を読み込む関数"""
@@ -63,3 +71,17 @@ def load_config(path: str) -> AppConfig:
     raw_config["database"]["password"] = os.getenv("DB_PASSWORD", "")
 
     return AppConfig(**raw_config)
+
+
+def get_config(path: Optional[str] = None) -> AppConfig:
+    """設定をプロセス内で 1 度だけ読み込んで返す。
+
+    path 省略時は直前に読み込んだパス（未読込なら既定パス）を使う。
+    CLI で ``--config`` を指定すると、以降の呼び出しも同じ設定を共有する。
+    """
+    global _current_path
+    key = str(path or _current_path or DEFAULT_CONFIG_PATH)
+    if key not in _config_cache:
+        _config_cache[key] = load_config(key)
+    _current_path = key
+    return _config_cache[key]
@@ -1,11 +1,58 @@
+"""app/core/logger.py
+
+アプリ共通ロガー ``MirAI_Trade`` の初期化。
+
+- 何度呼んでも handler は 1 組だけ（2 回目以降はレベルだけ更新して同じロガーを返す）
+- 呼び出し側は ``QueueHandler`` でキューに積むだけで、書式化とファイル / コンソール出力は
+  ``QueueListener`` のバックグラウンドスレッドが行う（日次取得ループやスコア計算を止めない）
+- プロセス終了時（atexit）または ``shutdown_logging()`` でキューを吐き出してから停止する
+
+ログ呼び出しは ``logger.info("%s 件", n)`` の %-形式で書くこと。無効レベルの行は
+引数の文字列化すら行われない。レスポンス本文のプレビューなど、引数の生成自体が重いものは
+``logger.isEnabledFor(logging.DEBUG)`` で囲む。
+"""
+
+import atexit
 import logging
-from datetime import datetime
+import queue
+from datetime import date, datetime
+from logging.handlers import QueueHandler, QueueListener
 from pathlib import Path
+from typing import Optional
 from app.core.config import LoggingConfig
 
+LOGGER_NAME = "MirAI_Trade"
+
+# 書式化を背景スレッドへ遅延してよい引数の型（後から値が変わらないもの）
+_IMMUTABLE = (str, int, float, bool, type(None), date, Path)
+
+_listener: Optional[QueueListener] = None
+
+
+class _DeferredQueueHandler(QueueHandler):
+    """書式化を QueueListener 側に任せる QueueHandler。
+
+    標準の ``QueueHandler.prepare`` は呼び出しスレッドで ``msg % args`` まで済ませてしまうため、
+    引数が不変値だけならレコードをそのまま渡す。可変オブジェクト（DataFrame など）を
+    含む場合は、後から値が変わっても記録内容がずれないよう従来どおりここで確定させる。
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        args = record.args
+        if record.exc_info is None and (
+            not args or (isinstance(args, tuple) and all(isinstance(a, _IMMUTABLE) for a in args))
+        ):
+            return record
+        return super().prepare(record)
+
+
 def setup_logger(config: LoggingConfig) -> logging.Logger:
-    logger = logging.getLogger("MirAI_Trade")
+    """共通ロガーを返す（初回のみ handler と背景スレッドを作成する）。"""
+    global _listener
+    logger = logging.getLogger(LOGGER_NAME)
     logger.setLevel(getattr(logging, config.level.upper()))
+    if _listener is not None:
+        return logger
 
     formatter = logging.Formatter(config.format)
 
@@ -21,7 +68,26 @@ def setup_logger(config: LoggingConfig) -> logging.Logger:
     sh = logging.StreamHandler()
     sh.setFormatter(formatter)
 
-    logger.addHandler(fh)
-    logger.addHandler(sh)
+    log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    _listener = QueueListener(log_queue, fh, sh, respect_handler_level=True)
+    _listener.start()
+    logger.addHandler(_DeferredQueueHandler(log_queue))
 
     return logger
+
+
+def shutdown_logging() -> None:
+    """キューに残ったログを書き出して背景スレッドを止める（二重呼び出し可）。"""
+    global _listener
+    if _listener is None:
+        return
+    listener, _listener = _listener, None
+    logger = logging.getLogger(LOGGER_NAME)
+    for h in [h for h in logger.handlers if isinstance(h, QueueHandler)]:
+        logger.removeHandler(h)
+    listener.stop()
+    for h in listener.handlers:
+        h.close()
+
+
+atexit.register(shutdown_logging)
@@ -0,0 +1,273 @@
+"""app/core/orchestrator.py
+
+入出力フィンガープリント付きの小さな DAG 実行器。
+
+- 各ステージは入力ファイル・出力ファイル・依存ステージ・コード（モジュール名）・
+  パラメータを宣言する。
+- 入力ファイル内容のハッシュ + ソースコードのハッシュ + パラメータ から
+  フィンガープリントを作り、前回成功時と同じかつ出力が揃っていればスキップする。
+- ファイルハッシュは (size, mtime) が変わらない限り状態ファイルの値を再利用するため、
+  変更なしの再実行は数秒で終わる。
+- 依存関係の無いステージ（OHLCV 取得とプレミアム取得など）はスレッドで並行実行する。
+- コードは ``import_closure`` でエントリモジュールから静的に import されるモジュールを
+  推移的に集めて指定できる（手で列挙した一覧が古くなって再計算が漏れるのを防ぐ）。
+
+具体的なステージ定義は ``app/backtest/pipeline.py`` を参照。
+"""
+
+from __future__ import annotations
+
+import ast
+import hashlib
+import importlib.util
+import json
+import os
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from logging import Logger
+from pathlib import Path
+from typing import Any, Callable, Iterable
+
+__all__ = [
+    "Stage",
+    "Pipeline",
+    "import_closure",
+]
+
+_CHUNK = 1 << 20    # ハッシュ計算時の読み込み単位 (1 MiB)
+
+
+@dataclass
+class Stage:
+    """パイプラインの 1 ステージ。
+
+    Attributes:
+        name: ステージ名（依存指定・状態保存のキー）
+        func: 実行関数（引数なし）
+        inputs: 入力ファイル
+        outputs: 出力ファイル
+        deps: 先に完了している必要があるステージ名
+        code: ソースをフィンガープリントに含めるモジュール名
+        params: フィンガープリントに含めるパラメータ（JSON 化可能な値）
+
+    inputs / outputs / params は値を返す引数なしの関数でもよい（ステージを判定する時に
+    初めて呼ぶので、定数を持つ重いモジュールの import を対象ステージだけに限れる）。
+    """
+
+    name: str
+    func: Callable[[], Any]
+    inputs: list[Path] | Callable[[], list[Path]] = field(default_factory=list)
+    outputs: list[Path] | Callable[[], list[Path]] = field(default_factory=list)
+    deps: list[str] = field(default_factory=list)
+    code: list[str] = field(default_factory=list)
+    params: dict[str, Any] | Callable[[], dict[str, Any]] = field(default_factory=dict)
+
+
+def _value(field_value):
+    return field_value() if callable(field_value) else field_value
+
+
+def _module_file(module: str) -> Path | None:
+    """モジュールのソースファイル。トップレベルのパッケージ以外は import せずにパスから探す。"""
+    top, _, rest = module.partition(".")
+    spec = importlib.util.find_spec(top)
+    if spec is None:
+        return None
+    if not rest:
+        return Path(spec.origin) if spec.origin and os.path.exists(spec.origin) else None
+    for base in spec.submodule_search_locations or []:
+        path = Path(base, *rest.split("."))
+        for candidate in (path.with_suffix(".py"), path / "__init__.py"):
+            if candidate.is_file():
+                return candidate
+    return None
+
+
+def import_closure(module: str, prefix: str = "app.") -> list[str]:
+    """``module`` と、そこから推移的に import される ``prefix`` 配下のモジュール（昇順）。
+
+    ソースを ``ast`` で解析するだけで import はしない。関数内の遅延 import も含める。
+    ``from pkg import name`` は ``pkg.name`` がモジュールならそれを、そうでなければ ``pkg`` を数える。
+    """
+    seen: set[str] = set()
+    stack = [module]
+    while stack:
+        name = stack.pop()
+        if name in seen:
+            continue
+        path = _module_file(name)
+        if path is None:
+            continue
+        seen.add(name)
+        for node in ast.walk(ast.parse(path.read_bytes(), filename=str(path))):
+            if isinstance(node, ast.Import):
+                stack.extend(a.name for a in node.names if a.name.startswith(prefix))
+            elif isinstance(node, ast.ImportFrom) and node.level == 0 and node.module \
+                    and node.module.startswith(prefix):
+                subs = [f"{node.module}.{a.name}" for a in node.names]
+                found = [m for m in subs if _module_file(m) is not None]
+                stack.extend(found or [node.module])
+    return sorted(seen)
+
+
+class Pipeline:
+    """Stage の DAG を状態ファイル付きで実行するクラス。"""
+
+    def __init__(self, stages: Iterable[Stage], state_path: Path, logger: Logger, max_workers: int = 4):
+        self.stages = {s.name: s for s in stages}
+        self.state_path = Path(state_path)
+        self.logger = logger
+        self.max_workers = max_workers
+        for s in self.stages.values():
+            unknown = set(s.deps) - set(self.stages)
+            if unknown:
+                raise ValueError(f"{s.name}: 未定義の依存ステージ {sorted(unknown)}")
+        self._state = self._load_state()
+
+    # ---------------- フィンガープリント ---------------- #
+
+    def _file_hash(self, path: Path) -> str | None:
+        """内容ハッシュ。(size, mtime_ns) が前回と同じなら再計算しない。"""
+        try:
+            st = path.stat()
+        except FileNotFoundError:
+            return None
+        key = str(path)
+        cached = self._state["files"].get(key)
+        if cached and cached["size"] == st.st_size and cached["mtime_ns"] == st.st_mtime_ns:
+            return cached["sha256"]
+
+        h = hashlib.sha256()
+        with path.open("rb") as f:
+            for chunk in iter(lambda: f.read(_CHUNK), b""):
+                h.update(chunk)
+        digest = h.hexdigest()
+        self._state["files"][key] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": digest}
+        return digest
+
+    @staticmethod
+    def _code_hash(module: str) -> str:
+        """モジュールのソースファイルハッシュ（import はしない）。"""
+        spec = importlib.util.find_spec(module)
+        if spec is None or not spec.origin or not os.path.exists(spec.origin):
+            return "missing"
+        return hashlib.sha256(Path(spec.origin).read_bytes()).hexdigest()
+
+    def fingerprint(self, stage: Stage) -> str:
+        payload = {
+            "inputs": {str(p): self._file_hash(Path(p)) for p in _value(stage.inputs)},
+            "code": {m: self._code_hash(m) for m in stage.code},
+            "params": _value(stage.params),
+        }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+    def is_current(self, stage: Stage) -> bool:
+        """前回成功時から入力・コード・パラメータ・出力が変わっていなければ True。"""
+        prev = self._state["stages"].get(stage.name)
+        if not prev or prev["fingerprint"] != self.fingerprint(stage):
+            return False
+        for p in _value(stage.outputs):
+            if self._file_hash(Path(p)) != prev["outputs"].get(str(p)):
+                return False
+        return True
+
+    # ---------------- 実行 ---------------- #
+
+    def run(self, targets: Iterable[str] | None = None, force: Iterable[str] = (),
+            dry_run: bool = False) -> dict[str, str]:
+        """DAG を実行し、ステージごとの結果（ran / skipped / failed / blocked）を返す。
+
+        Args:
+            targets: 実行対象（依存ステージも含めて実行）。None なら全ステージ
+            force: フィンガープリントに関係なく再実行するステージ
+            dry_run: True なら実行せず、実行予定（ran）/ 最新（skipped）を返すだけ
+        """
+        selected = self._with_deps(targets or self.stages)
+        force = set(force)
+        status: dict[str, str] = {}
+        pending = set(selected)
+        running: dict[Future, str] = {}
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            while pending or running:
+                progressed = False
+                for name in sorted(pending):
+                    stage = self.stages[name]
+                    dep_status = [status.get(d) for d in stage.deps if d in selected]
+                    if any(s is None for s in dep_status):
+                        continue                          # 依存ステージ未完了
+                    pending.discard(name)
+                    progressed = True
+                    if any(s in ("failed", "blocked") for s in dep_status):
+                        status[name] = "blocked"
+                        continue
+                    if dry_run and "ran" in dep_status:
+                        status[name] = "ran"              # 上流が再実行される予定
+                        continue
+                    # 依存ステージが実行されても出力が同一ならフィンガープリントで判定できる
+                    if name not in force and self.is_current(stage):
+                        status[name] = "skipped"
+                        self.logger.info("[pipeline] %s: up to date", name)
+                        continue
+                    if dry_run:
+                        status[name] = "ran"
+                        continue
+                    self.logger.info("[pipeline] %s: running", name)
+                    running[pool.submit(stage.func)] = name
+
+                if not running:
+                    if not progressed and pending:
+                        raise ValueError(f"依存関係が循環しています: {sorted(pending)}")
+                    continue
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    name = running.pop(fut)
+                    exc = fut.exception()
+                    if exc is None:
+                        self._record(self.stages[name])
+                        status[name] = "ran"
+                        self.logger.info("[pipeline] %s: done", name)
+                    else:
+                        status[name] = "failed"
+                        self.logger.error("[pipeline] %s: failed: %s", name, exc)
+                self._save_state()
+
+        self._save_state()
+        return status
+
+    def _with_deps(self, targets: Iterable[str]) -> set[str]:
+        selected: set[str] = set()
+        stack = list(targets)
+        while stack:
+            name = stack.pop()
+            if name not in self.stages:
+                raise KeyError(f"未定義のステージ: {name}")
+            if name not in selected:
+                selected.add(name)
+                stack.extend(self.stages[name].deps)
+        return selected
+
+    def _record(self, stage: Stage) -> None:
+        self._state["stages"][stage.name] = {
+            "fingerprint": self.fingerprint(stage),
+            "outputs": {str(p): self._file_hash(Path(p)) for p in _value(stage.outputs)},
+        }
+
+    # ---------------- 状態ファイル ---------------- #
+
+    def _load_state(self) -> dict:
+        try:
+            with self.state_path.open("r", encoding="utf-8") as f:
+                state = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            state = {}
+        state.setdefault("stages", {})
+        state.setdefault("files", {})
+        return state
+
+    def _save_state(self) -> None:
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.state_path.with_suffix(".tmp")
+        with tmp.open("w", encoding="utf-8") as f:
+            json.dump(self._state, f, indent=1, sort_keys=True)
+        os.replace(tmp, self.state_path)
@@ -0,0 +1,254 @@
+"""app/core/profiling.py
+
+ステージ・ホット関数の計測（経過時間 / CPU 時間 / ピーク RSS / 行数）。
+
+- ``span(name)``: with 文で区間を計測（``rec.rows = len(df)`` で行数を付与）
+- ``@timed(name)``: 関数全体を計測（戻り値が ``len()`` を持てば行数として記録）
+- 記録はプロセス内の ``Profiler`` に集約し、``summary()`` で名前別に合算。
+  プロセス共通の Profiler は既定で無効（``span`` / ``@timed`` は何もしない）で、
+  ``--profile`` か ``get_profiler().enable()`` で記録を始める
+- ``dump_json`` で 1 実行分のプロファイル JSON を保存、``log_summary`` でロガーへ出力
+- ``cprofile(path)``: 区間内を cProfile で記録して ``.prof`` を保存（``--cprofile``）
+
+joblib などの別プロセスで計測した記録は ``records()`` を戻り値で返し、
+親プロセスで ``merge()`` する。
+
+計測 1 回あたりのコストは数 µs（perf_counter / thread_time / getrusage のみ）。
+
+使い方（例）
+    with span("derive", rows=len(raw)) as rec:
+        derived = add_derived_cols(raw)
+        rec.rows = len(derived)
+
+    (venv) python -m app --profile backtest          # logs/profile_backtest_<日時>.json
+    (venv) python -m app --cprofile out.prof search
+"""
+
+from __future__ import annotations
+
+import cProfile
+import json
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from functools import wraps
+from logging import Logger
+from pathlib import Path
+from typing import Any, Callable, Iterator, Optional
+
+__all__ = [
+    "SpanRecord",
+    "Profiler",
+    "get_profiler",
+    "span",
+    "timed",
+    "cprofile",
+    "peak_rss_mb",
+]
+
+
+# ----------------------------------------------------------------------
+# ピーク RSS（プロセス開始からの最大値）
+# ----------------------------------------------------------------------
+
+def peak_rss_mb() -> Optional[float]:
+    """プロセスのピーク常駐メモリ [MB]。取得できない環境では None。"""
+    try:
+        import resource
+    except ImportError:             # Windows
+        return _peak_rss_mb_windows()
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux は KB、macOS は byte 単位
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+
+def _peak_rss_mb_windows() -> Optional[float]:
+    try:
+        import ctypes
+        from ctypes import wintypes
+
+        class _Counters(ctypes.Structure):
+            _fields_ = [
+                ("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD),
+                ("PeakWorkingSetSize", ctypes.c_size_t), ("WorkingSetSize", ctypes.c_size_t),
+                ("QuotaPeakPagedPoolUsage", ctypes.c_size_t), ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t), ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                ("PagefileUsage", ctypes.c_size_t), ("PeakPagefileUsage", ctypes.c_size_t),
+            ]
+
+        counters = _Counters()
+        counters.cb = ctypes.sizeof(_Counters)
+        handle = ctypes.windll.kernel32.GetCurrentProcess()
+        if not ctypes.windll.psapi.GetProcessMemoryInfo(handle, ctypes.byref(counters), counters.cb):
+            return None
+        return counters.PeakWorkingSetSize / 2**20
+    except (AttributeError, OSError):
+        return None
+
+
+# ----------------------------------------------------------------------
+# 記録
+# ----------------------------------------------------------------------
+
+@dataclass
+class SpanRecord:
+    """1 区間の計測結果。"""
+
+    name: str
+    wall: float = 0.0
+    cpu: float = 0.0
+    peak_rss_mb: Optional[float] = None
+    rows: Optional[int] = None
+    meta: dict[str, Any] = field(default_factory=dict)
+
+
+class Profiler:
+    """計測記録をスレッド安全に集約する。
+
+    Args:
+        enabled: False の間は ``span`` / ``add`` / ``merge`` を記録しない
+    """
+
+    def __init__(self, enabled: bool = True):
+        self._records: list[SpanRecord] = []
+        self._lock = threading.Lock()
+        self.enabled = enabled
+        self.started = datetime.now()
+
+    def enable(self) -> None:
+        self.enabled = True
+
+    def disable(self) -> None:
+        self.enabled = False
+
+    def add(self, rec: SpanRecord) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._records.append(rec)
+
+    def merge(self, records: list[dict]) -> None:
+        """別プロセスで ``records()`` した結果を取り込む。"""
+        if not self.enabled:
+            return
+        for r in records:
+            self.add(SpanRecord(**r))
+
+    def records(self) -> list[dict]:
+        with self._lock:
+            return [asdict(r) for r in self._records]
+
+    def reset(self) -> None:
+        with self._lock:
+            self._records.clear()
+        self.started = datetime.now()
+
+    @contextmanager
+    def span(self, name: str, rows: Optional[int] = None, **meta) -> Iterator[SpanRecord]:
+        """with 区間の経過時間・CPU 時間（実行スレッド分）・終了時点のピーク RSS を記録する。"""
+        rec = SpanRecord(name, rows=rows, meta=meta)
+        if not self.enabled:
+            yield rec
+            return
+        w0, c0 = time.perf_counter(), time.thread_time()
+        try:
+            yield rec
+        finally:
+            rec.wall = time.perf_counter() - w0
+            rec.cpu = time.thread_time() - c0
+            rec.peak_rss_mb = peak_rss_mb()
+            self.add(rec)
+
+    def summary(self) -> dict[str, dict[str, Any]]:
+        """名前別の合計（count / wall / cpu / max_wall / rows / peak_rss_mb）。"""
+        out: dict[str, dict[str, Any]] = {}
+        for r in self.records():
+            s = out.setdefault(r["name"], {"count": 0, "wall": 0.0, "cpu": 0.0, "max_wall": 0.0,
+                                           "rows": None, "peak_rss_mb": None})
+            s["count"] += 1
+            s["wall"] += r["wall"]
+            s["cpu"] += r["cpu"]
+            s["max_wall"] = max(s["max_wall"], r["wall"])
+            if r["rows"] is not None:
+                s["rows"] = (s["rows"] or 0) + r["rows"]
+            if r["peak_rss_mb"] is not None:
+                s["peak_rss_mb"] = max(s["peak_rss_mb"] or 0.0, r["peak_rss_mb"])
+        return dict(sorted(out.items(), key=lambda kv: kv[1]["wall"], reverse=True))
+
+    def log_summary(self, logger: Logger) -> None:
+        for name, s in self.summary().items():
+            logger.info(
+                "[profile] %-28s n=%-5d wall=%8.3fs cpu=%8.3fs max=%7.3fs rows=%s rss=%s MB",
+                name, s["count"], s["wall"], s["cpu"], s["max_wall"], s["rows"],
+                None if s["peak_rss_mb"] is None else round(s["peak_rss_mb"], 1),
+            )
+
+    def dump_json(self, path: Path, **meta) -> Path:
+        """集計と生記録を JSON で保存する。"""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        body = {
+            "started": self.started.isoformat(timespec="seconds"),
+            "finished": datetime.now().isoformat(timespec="seconds"),
+            "peak_rss_mb": peak_rss_mb(),
+            "meta": meta,
+            "summary": self.summary(),
+            "records": self.records(),
+        }
+        path.write_text(json.dumps(body, ensure_ascii=False, indent=2, default=str), encoding="utf-8")
+        return path
+
+
+# ----------------------------------------------------------------------
+# プロセス共通のショートカット
+# ----------------------------------------------------------------------
+
+_profiler = Profiler(enabled=False)       # --profile / enable() まで記録しない
+
+
+def get_profiler() -> Profiler:
+    """プロセス共通の Profiler を返す。"""
+    return _profiler
+
+
+def span(name: str, rows: Optional[int] = None, **meta):
+    """``get_profiler().span(...)`` の短縮形。"""
+    return _profiler.span(name, rows, **meta)
+
+
+def timed(name: Optional[str] = None) -> Callable:
+    """関数全体を計測するデコレータ（戻り値が DataFrame / list なら件数も記録）。"""
+
+    def deco(func: Callable) -> Callable:
+        label = name or f"{func.__module__.rsplit('.', 1)[-1]}.{func.__name__}"
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with _profiler.span(label) as rec:
+                result = func(*args, **kwargs)
+                if hasattr(result, "__len__") and not isinstance(result, (str, bytes)):
+                    rec.rows = len(result)
+                return result
+
+        return wrapper
+
+    return deco
+
+
+@contextmanager
+def cprofile(path: Optional[Path]) -> Iterator[None]:
+    """``path`` が指定されていれば区間内を cProfile で記録し、``.prof`` を保存する。"""
+    if path is None:
+        yield
+        return
+    prof = cProfile.Profile()
+    prof.enable()
+    try:
+        yield
+    finally:
+        prof.disable()
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        prof.dump_stats(str(path))
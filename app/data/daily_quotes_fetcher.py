@@ -1,32 +1,41 @@
 from typing import Optional
-import requests
 import pandas as pd
 from logging import Logger
 from app.core.config import AppConfig
 from datetime import datetime
+from app.core.profiling import timed
+from app.data.token_manager import TokenSource, auth_get
 
+@timed("fetch.daily_quotes")
 def fetch_daily_quotes(
     config: AppConfig,
-    id_token: str,
+    id_token: TokenSource,
     logger: Logger,
     target_date: str
 ) -> pd.DataFrame:
     """
     指定した日付の株価四本値を取得する。
+    レスポンスに pagination_key が含まれる間は続きのページを取得して連結する。
+    ``id_token`` に ``TokenManager`` を渡すと 401 時にトークンを取り直して再試行する。
     """
     url = config.jquants.endpoints.daily_quotes
-    headers = {"Authorization": f"Bearer {id_token}"}
     params = {"date": target_date}
 
-    logger.info(f"株価四本値取得: {url} パラメータ: {params}")
-    response = requests.get(url, headers=headers, params=params)
+    logger.info("株価四本値取得: %s パラメータ: %s", url, params)
+    records = []
+    while True:
+        response = auth_get(url, id_token, logger, params=params)
 
-    if response.status_code != 200:
-        logger.error(f"株価四本値取得失敗: {response.status_code} {response.text}")
-        raise RuntimeError("株価四本値API呼び出しに失敗")
+        if response.status_code != 200:
+            logger.error("株価四本値取得失敗: %s %s", response.status_code, response.text)
+            raise RuntimeError("株価四本値API呼び出しに失敗")
 
-    records = response.json().get("daily_quotes", [])
-    logger.info(f"{target_date} のデータ件数: {len(records)}")
+        body = response.json()
+        records.extend(body.get("daily_quotes", []))
+        if not body.get("pagination_key"):
+            break
+        params = {"date": target_date, "pagination_key": body["pagination_key"]}
+    logger.info("%s のデータ件数: %d", target_date, len(records))
 
     df = pd.DataFrame(records)
 
@@ -2,8 +2,10 @@ import requests
 import json
 from app.core.config import AppConfig
 from logging import Logger
+from app.core.profiling import timed
 
 
+@timed("fetch.token_auth_user")
 def get_refresh_token(config: AppConfig, logger: Logger) -> str:
     payload = {
         "mailaddress": config.jquants.auth.email,
@@ -24,6 +26,7 @@ def get_refresh_token(config: AppConfig, logger: Logger) -> str:
         logger.error(f"Unexpected error occurred during refresh token request: {e}")
         raise
 
+@timed("fetch.token_auth_refresh")
 def get_id_token(config: AppConfig, refresh_token: str, logger: Logger) -> str:
     try:
         url = f"{config.jquants.endpoints.token_auth_refresh}?refreshtoken={refresh_token}"
@@ -1,33 +1,76 @@
-import requests
+import logging
+import time
+from pathlib import Path
+from typing import Callable
 import pandas as pd
 from app.core.config import AppConfig
 from logging import Logger
+from app.core.profiling import timed
+from app.data.token_manager import TokenSource, auth_get, token_source
 
+LISTED_INFO_CSV = Path("backtest_data/listed_info.csv")
 
-def fetch_listed_info(config: AppConfig, id_token: str, logger: Logger) -> pd.DataFrame:
+
+@timed("fetch.listed_info")
+def fetch_listed_info(config: AppConfig, id_token: TokenSource, logger: Logger) -> pd.DataFrame:
     """
     J-Quants APIの上場銘柄一覧エンドポイントから最新の上場銘柄情報を取得する。
 
     Args:
         config (AppConfig): アプリケーション設定オブジェクト。
-        id_token (str): J-Quants APIのIDトークン。
+        id_token (str | TokenManager): J-Quants APIのIDトークン（TokenManager なら 401 時に取り直す）。
         logger (Logger): ロガーインスタンス。
 
     Returns:
         pd.DataFrame: 上場銘柄情報を含むDataFrame。
     """
     url = config.jquants.endpoints.listed_info
-    headers = {"Authorization": f"Bearer {id_token}"}
 
-    logger.info(f"上場銘柄一覧取得: {url}")
-    response = requests.get(url, headers=headers)
-    logger.debug(f"Status Code: {response.status_code}")
-    logger.debug(f"Response Preview: {response.text[:300]}")
+    logger.info("上場銘柄一覧取得: %s", url)
+    response = auth_get(url, id_token, logger)
+    logger.debug("Status Code: %s", response.status_code)
+    if logger.isEnabledFor(logging.DEBUG):        # 本文のデコードは DEBUG 時のみ
+        logger.debug("Response Preview: %s", response.text[:300])
 
     if response.status_code != 200:
         raise RuntimeError(f"上場銘柄一覧の取得に失敗しました: {response.status_code} {response.text}")
 
     data = response.json().get("info", [])
     df = pd.DataFrame(data)
-    logger.info(f"上場銘柄一覧の取得成功: {len(df)}件")
+    logger.info("上場銘柄一覧の取得成功: %d件", len(df))
+    return df
+
+
+def load_listed_info(
+    config: AppConfig,
+    id_token_provider: Callable[[], str],
+    logger: Logger,
+    cache_csv: Path = LISTED_INFO_CSV,
+    max_age_days: int = 7,
+) -> pd.DataFrame:
+    """
+    ローカルキャッシュ優先で上場銘柄一覧を返す。
+
+    キャッシュが無い・古い場合のみ ``id_token_provider()`` を呼んで API から取得し、
+    キャッシュを更新する。オフラインのバックテストはトークン取得も含め通信しない。
+
+    Args:
+        config (AppConfig): アプリケーション設定オブジェクト。
+        id_token_provider (Callable[[], str]): ID トークンを返す関数（``TokenManager.get_id_token`` など）。
+        logger (Logger): ロガーインスタンス。
+        cache_csv (Path): キャッシュ CSV のパス。
+        max_age_days (int): キャッシュの有効日数。
+
+    Returns:
+        pd.DataFrame: 上場銘柄情報を含むDataFrame（全列 str）。
+    """
+    if cache_csv.exists():
+        age_sec = time.time() - cache_csv.stat().st_mtime
+        if age_sec < max_age_days * 24 * 3600:
+            logger.info("上場銘柄一覧をキャッシュから読み込み: %s", cache_csv)
+            return pd.read_csv(cache_csv, dtype=str, keep_default_na=False)
+
+    df = fetch_listed_info(config, token_source(id_token_provider), logger)
+    cache_csv.parent.mkdir(parents=True, exist_ok=True)
+    df.to_csv(cache_csv, index=False, encoding="utf-8")
     return df
@@ -12,43 +12,46 @@
 
 from __future__ import annotations
 from typing import Dict, Any
-import requests, pandas as pd
+import pandas as pd
 from logging import Logger
-from app.core.config import config as cfg   # ❷ alias cfg
+from app.core.config import get_config     # ❷ import 時には読み込まない
+from app.core.profiling import span
+from app.data.token_manager import TokenSource, auth_get
 
 # ---------------- 共通 GET ----------------
-def _get(url: str, headers: Dict[str, str], params: Dict[str, Any], lg: Logger):
-    lg.debug(f"GET {url}  params={params}")
-    r = requests.get(url, headers=headers, params=params, timeout=10)
-    r.raise_for_status()
-    return r.json()
+def _get(url: str, id_token: TokenSource, params: Dict[str, Any], lg: Logger):
+    lg.debug("GET %s  params=%s", url, params)
+    with span("fetch." + url.rstrip("/").rsplit("/", 1)[-1]):
+        r = auth_get(url, id_token, lg, params=params, timeout=10)
+        r.raise_for_status()
+        return r.json()
 
 # -------- 個別 API ラッパ --------
-def _futures(id_token: str, lg: Logger, dt: str) -> pd.DataFrame:
-    url = cfg.jquants.endpoints.futures_prices
-    js  = _get(url, {"Authorization": f"Bearer {id_token}"}, {"date": dt}, lg)
+def _futures(id_token: TokenSource, lg: Logger, dt: str) -> pd.DataFrame:
+    url = get_config().jquants.endpoints.futures_prices
+    js  = _get(url, id_token, {"date": dt}, lg)
     df  = pd.DataFrame(js.get("futures_prices", []))
     if not df.empty:
         df = df[["Date", "SettlementPrice", "Volume"]]
     return df
 
-def _margin(id_token: str, lg: Logger, dt: str) -> pd.DataFrame:
-    url = cfg.jquants.endpoints.weekly_margin_interest
-    js  = _get(url, {"Authorization": f"Bearer {id_token}"}, {"date": dt}, lg)
+def _margin(id_token: TokenSource, lg: Logger, dt: str) -> pd.DataFrame:
+    url = get_config().jquants.endpoints.weekly_margin_interest
+    js  = _get(url, id_token, {"date": dt}, lg)
     return pd.DataFrame(js.get("weekly_margin_interest", []))
 
-def _short(id_token: str, lg: Logger, dt: str) -> pd.DataFrame:
-    url = cfg.jquants.endpoints.short_selling_positions
-    js  = _get(url, {"Authorization": f"Bearer {id_token}"}, {"date": dt}, lg)
+def _short(id_token: TokenSource, lg: Logger, dt: str) -> pd.DataFrame:
+    url = get_config().jquants.endpoints.short_selling_positions
+    js  = _get(url, id_token, {"date": dt}, lg)
     return pd.DataFrame(js.get("short_selling_positions", []))
 
-def _trades(id_token: str, lg: Logger, dt: str) -> pd.DataFrame:
-    url = cfg.jquants.endpoints.trades_spec
-    js  = _get(url, {"Authorization": f"Bearer {id_token}"}, {"date": dt}, lg)
+def _trades(id_token: TokenSource, lg: Logger, dt: str) -> pd.DataFrame:
+    url = get_config().jquants.endpoints.trades_spec
+    js  = _get(url, id_token, {"date": dt}, lg)
     return pd.DataFrame(js.get("trades_spec", []))
 
 # -------------- 公開関数 --------------
-def get_premium_data(id_token: str, logger: Logger, target_date: str
+def get_premium_data(id_token: TokenSource, logger: Logger, target_date: str
                      ) -> Dict[str, pd.DataFrame]:
     """
     target_date : 'YYYY-MM-DD'
@@ -5,31 +5,42 @@ premium_temp_fetcher.py
 signature / logging / エラーハンドリング は既存 fetcher と同一。
 """
 from typing import Dict
-import requests, pandas as pd
+import pandas as pd
 from logging import Logger
 from app.core.config import AppConfig
+from app.core.profiling import span
+from app.data.token_manager import TokenSource, auth_get
+
+# 先物で保持する列（期近限月判定とギャップ算出に必要なもの）
+FUTURES_COLS = [
+    "Date", "Code", "DerivativesProductCategory", "ContractMonth",
+    "CentralContractMonthFlag", "LastTradingDay",
+    "NightSessionClose", "DaySessionOpen", "DaySessionClose",
+    "WholeDayOpen", "WholeDayClose", "SettlementPrice", "Volume",
+]
 
 # ---------- 個別 API 呼び出し (内部関数) ----------
-def _call(cfg: AppConfig, id_tok: str, lg: Logger,
+def _call(cfg: AppConfig, id_tok: TokenSource, lg: Logger,
           url_key: str, params: Dict[str, str]) -> pd.DataFrame:
     url = getattr(cfg.jquants.endpoints, url_key)
-    headers = {"Authorization": f"Bearer {id_tok}"}
-    lg.info(f"{url_key} 取得: {url}  params={params}")
-    r = requests.get(url, headers=headers, params=params, timeout=10)
-    if r.status_code != 200:
-        lg.error(f"{url_key} 失敗 {r.status_code}: {r.text[:120]}")
-        raise RuntimeError(f"{url_key} API error")
-    # 先物だけトップキーが "futures"
-    key = "futures" if url_key == "futures_prices" else url_key
-    df = pd.DataFrame(r.json().get(key, []))\
-    
+    lg.info("%s 取得: %s  params=%s", url_key, url, params)
+    with span(f"fetch.{url_key}") as rec:
+        r = auth_get(url, id_tok, lg, params=params, timeout=10)
+        if r.status_code != 200:
+            lg.error("%s 失敗 %s: %s", url_key, r.status_code, r.text[:120])
+            raise RuntimeError(f"{url_key} API error")
+        # 先物だけトップキーが "futures"
+        key = "futures" if url_key == "futures_prices" else url_key
+        df = pd.DataFrame(r.json().get(key, []))
+        rec.rows = len(df)
+
     if key == "futures":                       # ← key で判定
-        df = df[["Date", "DerivativesProductCategory",   # ← ここを含める
-                 "SettlementPrice", "Volume"]]
+        # 空レスポンスでも KeyError にならないよう存在列のみ残す
+        df = df[[c for c in FUTURES_COLS if c in df.columns]]
     return df
 
 # ---------- 公開関数 ----------
-def fetch_premium_temp(cfg: AppConfig, id_tok: str,
+def fetch_premium_temp(cfg: AppConfig, id_tok: TokenSource,
                        lg: Logger, target_date: str) -> Dict[str, pd.DataFrame]:
     """プレミアム4 API を辞書で返す（キー名＝API 名）"""
     return {
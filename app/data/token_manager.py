@@ -0,0 +1,199 @@
+"""app/data/token_manager.py
+
+J-Quants 認証トークンのキャッシュ & 遅延取得。
+
+- リフレッシュトークン（有効 約 1 週間）と ID トークン（有効 約 24 時間）を
+  有効期限付きでローカル JSON に保存し、プロセス間で共有する。
+- API 呼び出しで実際に ID トークンが必要になった時点で初めて取得する
+  （オフラインのバックテストではネットワーク I/O が一切発生しない）。
+- トークン取得自体は既存の ``jquants_signin`` を再利用する。
+- fetcher は ``auth_get`` で API を呼ぶ。トークンに ``TokenManager`` を渡すと、401 が返った時に
+  ID トークンを破棄して 1 度だけ取り直して再試行する（失効・破損したキャッシュを使い続けない）。
+
+使い方（例）
+    tokens = TokenManager(cfg, logger)
+    df = fetch_listed_info(cfg, tokens.get_id_token(), logger)
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import time
+from logging import Logger
+from pathlib import Path
+from typing import Callable, Union
+
+import requests
+
+from app.core.config import AppConfig
+from app.data.jquants_signin import get_refresh_token, get_id_token
+
+# ------------------------- 定数 ------------------------- #
+
+TOKEN_CACHE = Path(
+    os.getenv("JQ_TOKEN_CACHE", str(Path.home() / ".mirai_trade" / "jquants_tokens.json"))
+)
+
+# 失効直前のトークンを掴まないよう公称値より短めに扱う
+REFRESH_TTL_SEC = 6 * 24 * 3600      # 公称 1 週間
+ID_TTL_SEC = 23 * 3600               # 公称 24 時間
+
+LOCK_TIMEOUT_SEC = 30.0              # これより古いロックファイルは放棄されたとみなす
+
+
+class TokenManager:
+    """J-Quants トークンをファイルキャッシュ付きで管理するクラス。
+
+    同一マシン上の複数プロセス（main.py と param_search の同時実行など）は
+    キャッシュファイルとロックファイルを介して同じトークンを使い回す。
+    """
+
+    def __init__(self, config: AppConfig, logger: Logger, cache_path: Path | None = None):
+        self.config = config
+        self.logger = logger
+        self.cache_path = Path(cache_path) if cache_path else TOKEN_CACHE
+        self._lock_path = self.cache_path.with_suffix(self.cache_path.suffix + ".lock")
+        self._id_token: str | None = None
+        self._id_expires = 0.0
+        # メールアドレスが変わったらキャッシュを使わない
+        self._owner = hashlib.sha256(config.jquants.auth.email.encode("utf-8")).hexdigest()
+
+    # ---------------- 公開 API ---------------- #
+
+    def get_id_token(self) -> str:
+        """有効な ID トークンを返す。必要な場合のみ API を呼ぶ。"""
+        now = time.time()
+        if self._id_token and now < self._id_expires:
+            return self._id_token
+
+        with self._file_lock():
+            cache = self._read_cache()
+            now = time.time()
+
+            if cache.get("id_token") and now < cache.get("id_expires", 0):
+                self.logger.debug("ID token loaded from cache: %s", self.cache_path)
+            else:
+                from_cache = bool(cache.get("refresh_token")) and now < cache.get("refresh_expires", 0)
+                if not from_cache:
+                    self._renew_refresh_token(cache, now)
+                try:
+                    cache["id_token"] = get_id_token(self.config, cache["refresh_token"], self.logger)
+                except Exception:
+                    if not from_cache:
+                        raise
+                    # サーバ側でリフレッシュトークンが失効していた場合は 1 度だけ取り直す
+                    self._renew_refresh_token(cache, now)
+                    cache["id_token"] = get_id_token(self.config, cache["refresh_token"], self.logger)
+                cache["id_expires"] = now + ID_TTL_SEC
+                self._write_cache(cache)
+
+        self._id_token = cache["id_token"]
+        self._id_expires = cache["id_expires"]
+        return self._id_token
+
+    def invalidate(self, id_token: str | None = None) -> None:
+        """ID トークンを破棄する（API が 401 を返した場合などに呼ぶ）。
+
+        Args:
+            id_token: 拒否されたトークン。指定時はキャッシュがまだそのトークンの場合だけ消す
+                （別プロセスが取り直した新しいトークンは残す）
+        """
+        self._id_token = None
+        self._id_expires = 0.0
+        with self._file_lock():
+            cache = self._read_cache()
+            if id_token is not None and cache.get("id_token") != id_token:
+                return
+            cache.pop("id_token", None)
+            cache.pop("id_expires", None)
+            self._write_cache(cache)
+
+    # ---------------- 内部処理 ---------------- #
+
+    def _renew_refresh_token(self, cache: dict, now: float) -> None:
+        cache["refresh_token"] = get_refresh_token(self.config, self.logger)
+        cache["refresh_expires"] = now + REFRESH_TTL_SEC
+
+    def _read_cache(self) -> dict:
+        try:
+            with self.cache_path.open("r", encoding="utf-8") as f:
+                cache = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {"owner": self._owner}
+        if cache.get("owner") != self._owner:
+            return {"owner": self._owner}
+        return cache
+
+    def _write_cache(self, cache: dict) -> None:
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.cache_path.with_suffix(f".{os.getpid()}.tmp")
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(cache, f)
+        os.replace(tmp, self.cache_path)     # 読み手が書きかけを見ないようアトミックに置換
+
+    def _file_lock(self) -> "_FileLock":
+        return _FileLock(self._lock_path, self.logger)
+
+
+# ---------------- API 呼び出し ---------------- #
+
+TokenSource = Union[str, TokenManager]
+
+
+def token_source(id_token_provider: Callable[[], str]) -> TokenSource:
+    """``TokenManager.get_id_token`` ならその ``TokenManager`` を、それ以外は呼んだ結果を返す。
+
+    ``load_listed_info`` など提供関数を受け取る関数が、``auth_get`` の 401 再試行を使えるようにする。
+    """
+    owner = getattr(id_token_provider, "__self__", None)
+    return owner if isinstance(owner, TokenManager) else id_token_provider()
+
+
+def auth_get(url: str, token: TokenSource, logger: Logger, **kwargs) -> requests.Response:
+    """``Authorization: Bearer`` 付きで GET する。
+
+    ``token`` が ``TokenManager`` なら、401 の時にトークンを破棄して 1 度だけ取り直して再試行する。
+    文字列のトークンはそのまま使う（401 もそのまま返す）。
+    """
+    manager = token if isinstance(token, TokenManager) else None
+    id_token = manager.get_id_token() if manager is not None else token
+    response = requests.get(url, headers={"Authorization": f"Bearer {id_token}"}, **kwargs)
+    if response.status_code == 401 and manager is not None:
+        logger.warning("ID トークンが拒否されました（401）。取り直して再試行します: %s", url)
+        manager.invalidate(id_token)
+        response = requests.get(url, headers={"Authorization": f"Bearer {manager.get_id_token()}"},
+                                **kwargs)
+    return response
+
+
+class _FileLock:
+    """O_EXCL でロックファイルを作る簡易プロセス間ロック（Windows / POSIX 共通）。"""
+
+    def __init__(self, path: Path, logger: Logger):
+        self.path = path
+        self.logger = logger
+
+    def __enter__(self) -> "_FileLock":
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        deadline = time.time() + LOCK_TIMEOUT_SEC
+        while True:
+            try:
+                fd = os.open(self.path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                os.close(fd)
+                return self
+            except FileExistsError:
+                try:
+                    stale = time.time() - self.path.stat().st_mtime > LOCK_TIMEOUT_SEC
+                except FileNotFoundError:
+                    continue
+                if stale or time.time() > deadline:
+                    self.logger.warning("Stale token lock removed: %s", self.path)
+                    self.path.unlink(missing_ok=True)
+                    continue
+                time.sleep(0.05)
+
+    def __exit__(self, *exc) -> None:
+        self.path.unlink(missing_ok=True)
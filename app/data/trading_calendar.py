@@ -0,0 +1,199 @@
+"""app/data/trading_calendar.py
+
+営業日カレンダーのローカルキャッシュと営業日計算。
+
+- ``TradingCalendar``: 昇順の営業日配列に対する前後・n 営業日後・期間の問い合わせ。
+  すべて ``np.searchsorted`` の二分探索（O(log n)）で、日付の配列を渡せば一括で求める。
+  スカラーを渡すと ``date``（範囲外は None）、配列を渡すと ``datetime64[D]`` の配列（範囲外は NaT）を返す
+- ``load_trading_calendar``: ``trading_days_fetcher.fetch_trading_calendar`` の結果を
+  ``backtest_data/trading_calendar.json`` に保存し、``max_age_days`` 日（既定 7 日）経つか、
+  取得元の URL が変わるか、カレンダーが本日までしか無いときだけ取り直す。読み込んだ
+  カレンダーはプロセス内でも保持するので、2 回目以降はファイルも読まない
+
+営業日は HolidayDivision が "1"（営業日）/ "2"（半日立会）の日。
+
+使い方（例）
+    cal = load_trading_calendar(cfg, tokens.get_id_token, logger)
+    cal.prev(date(2025, 1, 6))          # → date(2024, 12, 30)
+    cal.next(days_array, 2)             # 2 営業日後（配列で一括）
+"""
+
+from __future__ import annotations
+
+import json
+import time
+from datetime import date, datetime
+from logging import Logger
+from pathlib import Path
+from typing import Callable, Optional
+
+import numpy as np
+
+from app.core.config import AppConfig
+
+__all__ = [
+    "BUSINESS_DIVISIONS",
+    "CALENDAR_CACHE",
+    "TradingCalendar",
+    "load_trading_calendar",
+]
+
+CALENDAR_CACHE = Path("backtest_data/trading_calendar.json")
+MAX_AGE_DAYS = 7
+BUSINESS_DIVISIONS = ("1", "2")
+
+_NAT = np.datetime64("NaT", "D")
+
+
+def _as_days(value) -> tuple[np.ndarray, bool]:
+    """日付（str / date / datetime64、またはその配列）を ``datetime64[D]`` の配列にする。"""
+    scalar = np.ndim(value) == 0
+    return np.atleast_1d(np.asarray(value)).astype("datetime64[D]"), scalar
+
+
+def _out(days: np.ndarray, scalar: bool):
+    if not scalar:
+        return days
+    return None if np.isnat(days[0]) else days[0].astype(date)
+
+
+class TradingCalendar:
+    """営業日配列に対する営業日計算。
+
+    Args:
+        days: 営業日（str / date / datetime64 の配列。順不同・重複可）
+    """
+
+    def __init__(self, days):
+        self.days = np.unique(_as_days(days)[0])
+
+    def __len__(self) -> int:
+        return len(self.days)
+
+    @property
+    def first(self) -> Optional[date]:
+        return self.days[0].astype(date) if len(self.days) else None
+
+    @property
+    def last(self) -> Optional[date]:
+        return self.days[-1].astype(date) if len(self.days) else None
+
+    def _take(self, idx: np.ndarray, scalar: bool):
+        ok = (idx >= 0) & (idx < len(self.days))
+        out = np.full(len(idx), _NAT)
+        out[ok] = self.days[idx[ok]]
+        return _out(out, scalar)
+
+    def is_trading_day(self, day):
+        """営業日か（配列なら要素ごと）。"""
+        d, scalar = _as_days(day)
+        i = np.minimum(np.searchsorted(self.days, d), max(len(self.days) - 1, 0))
+        hit = (self.days[i] == d) if len(self.days) else np.zeros(len(d), dtype=bool)
+        return bool(hit[0]) if scalar else hit
+
+    def offset(self, day, k: int):
+        """``day`` から ``k`` 営業日ずらした日。
+
+        ``k`` > 0 は ``day`` より後の k 番目、``k`` < 0 は前の |k| 番目、
+        ``k`` = 0 は ``day`` 自身（非営業日なら翌営業日）。カレンダーの範囲外は None / NaT。
+        """
+        d, scalar = _as_days(day)
+        if k > 0:
+            idx = np.searchsorted(self.days, d, side="right") + (k - 1)
+        else:
+            idx = np.searchsorted(self.days, d, side="left") + k
+        return self._take(idx, scalar)
+
+    def prev(self, day, n: int = 1):
+        """``day`` より前の n 番目の営業日。"""
+        return self.offset(day, -n)
+
+    def next(self, day, n: int = 1):
+        """``day`` より後の n 番目の営業日。"""
+        return self.offset(day, n)
+
+    def range(self, start=None, end=None) -> np.ndarray:
+        """``start``〜``end``（両端含む、None は端まで）の営業日（``datetime64[D]``）。"""
+        lo = 0 if start is None else int(np.searchsorted(self.days, _as_days(start)[0][0], side="left"))
+        hi = len(self.days) if end is None else int(np.searchsorted(self.days, _as_days(end)[0][0], side="right"))
+        return self.days[lo:hi]
+
+    def latest(self, n: int, before=None) -> np.ndarray:
+        """``before``（既定: 本日）より前の直近 n 営業日（昇順）。"""
+        before = before if before is not None else date.today()
+        hi = int(np.searchsorted(self.days, _as_days(before)[0][0], side="left"))
+        return self.days[max(hi - n, 0):hi]
+
+
+# ----------------------------------------------------------------------
+# キャッシュ
+# ----------------------------------------------------------------------
+
+# cache パス → (取得元 URL, 取得時刻, カレンダー)
+_loaded: dict[Path, tuple[str, float, TradingCalendar]] = {}
+
+
+def _fresh(entry: Optional[tuple], source: str, max_age_days: float) -> bool:
+    if entry is None:
+        return False
+    src, fetched, cal = entry
+    # 本日までしか無いカレンダーは翌営業日が引けないので取り直す（同じ日に取得済みなら使う）
+    covers = cal.last is not None and (cal.last > date.today()
+                                       or date.fromtimestamp(fetched) == date.today())
+    return src == source and time.time() - fetched < max_age_days * 24 * 3600 and covers
+
+
+def load_trading_calendar(
+    config: AppConfig,
+    id_token_provider: Callable[[], str],
+    logger: Logger,
+    cache_path: Optional[Path] = None,
+    max_age_days: float = MAX_AGE_DAYS,
+) -> TradingCalendar:
+    """
+    ローカルキャッシュ優先で営業日カレンダーを返す。
+
+    キャッシュが無い・古い・取得元が違う場合のみ ``id_token_provider()`` を呼んで API から取得し、
+    キャッシュを更新する。
+
+    Args:
+        config (AppConfig): アプリケーション設定オブジェクト。
+        id_token_provider (Callable[[], str]): ID トークンを返す関数（``TokenManager.get_id_token`` など）。
+        logger (Logger): ロガーインスタンス。
+        cache_path (Path): キャッシュ JSON のパス（None なら ``CALENDAR_CACHE``）。
+        max_age_days (float): キャッシュの有効日数。
+
+    Returns:
+        TradingCalendar: 営業日カレンダー
+    """
+    path = Path(cache_path or CALENDAR_CACHE)
+    source = config.jquants.endpoints.trading_calendar
+    if _fresh(_loaded.get(path), source, max_age_days):
+        return _loaded[path][2]
+
+    if path.exists():
+        with path.open(encoding="utf-8") as f:
+            cached = json.load(f)
+        entry = (cached["source"], cached["fetched"], TradingCalendar(cached["days"]))
+        if _fresh(entry, source, max_age_days):
+            logger.debug("営業日カレンダーをキャッシュから読み込み: %s", path)
+            _loaded[path] = entry
+            return entry[2]
+
+    from app.data.token_manager import token_source                     # 取り直す時のみ
+    from app.data.trading_days_fetcher import fetch_trading_calendar
+
+    records = fetch_trading_calendar(config, token_source(id_token_provider), logger)
+    days = sorted(r["Date"] for r in records if r["HolidayDivision"] in BUSINESS_DIVISIONS)
+    fetched = time.time()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".json.tmp")
+    with tmp.open("w", encoding="utf-8") as f:
+        json.dump({"source": source, "fetched": fetched,
+                   "fetched_at": datetime.fromtimestamp(fetched).isoformat(timespec="seconds"),
+                   "days": days}, f)
+    tmp.replace(path)
+    _loaded[path] = (source, fetched, TradingCalendar(days))
+    logger.info("営業日カレンダーを更新: %s（%d 営業日、%s〜%s）", path, len(days),
+                days[0] if days else "-", days[-1] if days else "-")
+    return _loaded[path][2]
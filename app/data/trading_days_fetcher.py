@@ -1,45 +1,110 @@
-import requests
-from datetime import datetime
+import logging
+import numpy as np
+from datetime import date, timedelta
 from app.core.config import AppConfig
-from typing import List
+from typing import List, Optional
+from app.core.profiling import timed
+from app.data.token_manager import TokenSource, auth_get
+from app.data.trading_calendar import TradingCalendar, load_trading_calendar
 
-def get_latest_trading_days(config: AppConfig, id_token: str, logger, days: int = 6) -> List[str]:
+@timed("fetch.trading_calendar")
+def fetch_trading_calendar(config: AppConfig, id_token: TokenSource, logger) -> List[dict]:
     """
-    J-Quants APIを用いて、過去の営業日を取得。
+    J-Quants API から営業日カレンダー全体を取得する（Date, HolidayDivision のレコード）。
+
+    営業日の判定・キャッシュは ``app.data.trading_calendar.load_trading_calendar`` が行う。
+    """
+    url = config.jquants.endpoints.trading_calendar
+
+    logger.debug("GET %s", url)
+    response = auth_get(url, id_token, logger)
+    logger.debug("Status Code: %s", response.status_code)
+    if logger.isEnabledFor(logging.DEBUG):        # 本文のデコードは DEBUG 時のみ
+        logger.debug("Response Preview: %s...", response.text[:300])
+    response.raise_for_status()
+    return response.json()["trading_calendar"]
+
+
+def _calendar(config: AppConfig, id_token: TokenSource, logger) -> TradingCalendar:
+    return load_trading_calendar(config, lambda: id_token, logger)
+
+
+def get_latest_trading_days(
+    config: AppConfig,
+    id_token: TokenSource,
+    logger,
+    days: int = 6,
+    until: Optional[date] = None,
+) -> List[str]:
+    """
+    J-Quants APIの営業日カレンダー（ローカルキャッシュ）から、過去の営業日を取得。
     HolidayDivisionが "1" または "2" の日付のみを営業日として扱う。
 
     Args:
         config (AppConfig): 設定情報
-        id_token (str): 認証トークン
+        id_token (str | TokenManager): 認証トークン
         logger (Logger): ロガーインスタンス
         days (int): 取得する営業日数（デフォルト6）
+        until (date): この日（当日を含む）までの営業日を返す。None なら本日より前（本日を含まない）
 
     Returns:
         List[str]: 過去の営業日（YYYY-MM-DD形式の文字列）
     """
-    url = config.jquants.endpoints.trading_calendar
-    headers = {"Authorization": f"Bearer {id_token}"}
+    before = None if until is None else until + timedelta(days=1)
+    latest_days = _calendar(config, id_token, logger).latest(days, before=before).astype(date)
+    logger.info("取得した営業日（最新%d件）:", days)
+    for d in latest_days:
+        logger.info("  %s (%s)", d.isoformat(), d.strftime("%A"))
 
-    logger.debug(f"GET {url}")
-    response = requests.get(url, headers=headers)
-    logger.debug(f"Status Code: {response.status_code}")
-    logger.debug(f"Response Preview: {response.text[:300]}...")
-    response.raise_for_status()
+    return [d.isoformat() for d in latest_days]
 
-    data = response.json()
-    all_days = [
-        item["Date"] for item in data["trading_calendar"]
-        if item["HolidayDivision"] in ["1", "2"]
-    ]
 
-    # datetimeに変換して本日以前に限定
-    all_days_dt = sorted(datetime.strptime(d, "%Y-%m-%d").date() for d in all_days)
-    today = datetime.today().date()
-    past_days = [d for d in all_days_dt if d < today]
+def get_next_trading_day(config: AppConfig, id_token: TokenSource, logger, after: date) -> Optional[date]:
+    """
+    ``after`` の翌営業日を取得する（カレンダーに未来日が無ければ None）。
 
-    latest_days = past_days[-days:]
-    logger.info("取得した営業日（最新%d件）:" % days)
-    for d in latest_days:
-        logger.info("  %s (%s)" % (d.isoformat(), d.strftime("%A")))
+    Args:
+        config (AppConfig): 設定情報
+        id_token (str | TokenManager): 認証トークン
+        logger (Logger): ロガーインスタンス
+        after (date): 基準日
 
-    return [d.isoformat() for d in latest_days]
+    Returns:
+        date | None: 翌営業日
+    """
+    return _calendar(config, id_token, logger).next(after)
+
+
+def get_trading_days_between(
+    config: AppConfig,
+    id_token: TokenSource,
+    logger,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    warmup: int = 0,
+) -> List[str]:
+    """
+    ``start``〜``end``（両端含む、YYYY-MM-DD）の過去の営業日を取得。
+    ``warmup`` を指定すると ``start`` より前の営業日をその数だけ先頭に加える。
+
+    Args:
+        config (AppConfig): 設定情報
+        id_token (str | TokenManager): 認証トークン
+        logger (Logger): ロガーインスタンス
+        start (str | None): 開始日。None ならカレンダーの先頭から
+        end (str | None): 終了日。None なら前営業日まで
+        warmup (int): 開始日前に追加する営業日数
+
+    Returns:
+        List[str]: 営業日（YYYY-MM-DD形式の文字列、昇順）
+    """
+    cal = _calendar(config, id_token, logger)
+    past_days = cal.latest(len(cal))                          # 本日より前
+
+    lo = 0 if start is None else int(np.searchsorted(past_days, np.datetime64(start, "D"), side="left"))
+    hi = len(past_days) if end is None else int(np.searchsorted(past_days, np.datetime64(end, "D"), side="right"))
+    days = list(past_days[max(lo - warmup, 0):hi].astype(date))
+    if days:
+        logger.info("取得した営業日: %s〜%s (%d件, うちウォームアップ%d件)",
+                    days[0].isoformat(), days[-1].isoformat(), len(days), min(warmup, lo))
+    return [d.isoformat() for d in days]
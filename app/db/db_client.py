@@ -1,4 +1,7 @@
+from contextlib import contextmanager
+from typing import Iterator
 import psycopg2
+from psycopg2.pool import ThreadedConnectionPool
 from logging import Logger
 from app.core.config import AppConfig
 
@@ -6,28 +9,61 @@ from app.core.config import AppConfig
 class DBClient:
     """
     PostgreSQL への接続と切断を管理するクラス。
-    インスタンス生成時に接続し、破棄時に自動切断する。
+    インスタンス生成時にコネクションプールを作成し、close() / with 文の終了 / 破棄時に自動切断する。
+
+    使い方（例）
+        with DBClient(cfg, logger) as db:
+            with db.connection() as conn:      # 正常終了で commit、例外で rollback
+                conn.cursor().execute("SELECT 1")
     """
 
-    def __init__(self, config: AppConfig, logger: Logger):
+    def __init__(self, config: AppConfig, logger: Logger, minconn: int = 1, maxconn: int = 4,
+                 **connect_kwargs):
         self.logger = logger
         try:
-            self.conn = psycopg2.connect(
+            self.pool = ThreadedConnectionPool(
+                minconn,
+                maxconn,
                 host=config.database.host,
                 port=config.database.port,
                 dbname=config.database.name,
                 user=config.database.user,
-                password=config.database.password
+                password=config.database.password,
+                **connect_kwargs          # options="-c search_path=..." など
             )
             self.logger.info("PostgreSQL に接続しました。")
         except Exception as e:
             self.logger.error(f"DB接続エラー: {e}")
             raise
 
-    def __del__(self):
+    @contextmanager
+    def connection(self) -> Iterator["psycopg2.extensions.connection"]:
+        """プールから接続を借り、ブロック終了時に commit / rollback して返却する。"""
+        conn = self.pool.getconn()
         try:
-            if hasattr(self, "conn"):
-                self.conn.close()
+            yield conn
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            self.pool.putconn(conn)
+
+    def close(self) -> None:
+        """プール内の全接続を切断する（二重呼び出し可）。"""
+        pool = getattr(self, "pool", None)
+        if pool is not None and not pool.closed:
+            pool.closeall()
             self.logger.info("PostgreSQL 接続を切断しました。")
+
+    def __enter__(self) -> "DBClient":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def __del__(self):
+        try:
+            self.close()
         except Exception as e:
             self.logger.warning(f"DB切断時のエラー: {e}")
@@ -0,0 +1,140 @@
+"""app/db/market_reader.py
+
+DBClient 上に構築した時系列ストア（読み出し側）。``market_store.py`` の対。
+
+- 要求された列・銘柄・期間だけを ``COPY (SELECT ...) TO STDOUT (FORMAT binary)`` で取得
+- 受信バイト列を ``pg_binary.CopyBinaryReader`` で事前確保した NumPy 配列へ直接展開
+  （Python の行タプルを作らないため、メモリは結果配列 + 受信バッファ 1 MiB で頭打ち）
+- ohlcv と features にまたがる列は (code, date) で結合して 1 回で読む
+- 行数・コード幅の問い合わせと COPY は同じ REPEATABLE READ の読み取り専用トランザクションで行い、
+  間に upsert が入っても同じスナップショットを読む（行数が食い違って配列がずれることはない）
+
+使い方（例）
+    with DBClient(cfg, logger) as db:
+        price_df = MarketReader(db, logger).read_frame(
+            ["Open", "Close", "Vol_20", "ATR_20"], start="2024-01-01")
+"""
+
+from __future__ import annotations
+
+from logging import Logger
+from typing import Iterable, Sequence
+
+import numpy as np
+import pandas as pd
+
+from app.db.db_client import DBClient
+from app.db.market_store import TABLES
+from app.db.pg_binary import CopyBinaryReader
+
+__all__ = [
+    "MarketReader",
+]
+
+# 読み出し対象テーブル（先に見つかった方の列を使う）
+_SOURCES = ["ohlcv", "features"]
+
+
+class MarketReader:
+    """PostgreSQL から価格パネルを列指向で読み出すクラス。"""
+
+    def __init__(self, db: DBClient, logger: Logger):
+        self.db = db
+        self.logger = logger
+
+    def _resolve(self, columns: Sequence[str]) -> dict[str, tuple[str, str]]:
+        """DataFrame 列名 → (テーブル別名, SQL 列名)。"""
+        out = {}
+        for col in columns:
+            for alias, table in zip("of", _SOURCES):
+                if col in TABLES[table]["columns"]:
+                    out[col] = (alias, TABLES[table]["columns"][col][0])
+                    break
+            else:
+                raise KeyError(f"未知の列です: {col}")
+        return out
+
+    def read_arrays(
+        self,
+        columns: Sequence[str],
+        codes: Iterable[str] | None = None,
+        start=None,
+        end=None,
+    ) -> dict[str, np.ndarray]:
+        """指定列を (Date, Code) 昇順の列配列で返す。
+
+        Args:
+            columns: 取得する列（Date / Code は常に含まれる）
+            codes: 銘柄コードの絞り込み（None なら全銘柄）
+            start: 開始日（含む）
+            end: 終了日（含む）
+
+        Returns:
+            dict: 列名 → ndarray（Date は datetime64[D]、Code は str の object 配列、他は float64）
+        """
+        value_cols = [c for c in columns if c not in ("Date", "Code")]
+        resolved = self._resolve(value_cols)
+        use_features = any(alias == "f" for alias, _ in resolved.values())
+
+        where, params = [], []
+        if start is not None:
+            where.append("o.date >= %s")
+            params.append(pd.Timestamp(start).date())
+        if end is not None:
+            where.append("o.date <= %s")
+            params.append(pd.Timestamp(end).date())
+        if codes is not None:
+            where.append("o.code = ANY(%s)")
+            params.append([str(c) for c in codes])
+        from_sql = "ohlcv o" + (" LEFT JOIN features f USING (code, date)" if use_features else "")
+        where_sql = (" WHERE " + " AND ".join(where)) if where else ""
+
+        with self.db.connection() as conn, conn.cursor() as cur:
+            # 接続は直前に commit 済みなので、これがトランザクションの最初の文になる
+            # （set_session と違いプールへ返す接続の設定は変えない）
+            cur.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ, READ ONLY")
+            # features は (code, date) が主キーの LEFT JOIN なので行数は ohlcv だけで数える
+            cur.execute(
+                f"SELECT count(*), coalesce(max(octet_length(o.code)), 1) FROM ohlcv o{where_sql}",
+                params,
+            )
+            n_rows, width = cur.fetchone()
+
+            # NULL を NaN に、code を固定幅に揃えて全行を同じバイト長にする
+            select = ["o.date", f"rpad(o.code, {width})"]
+            select += [f"coalesce({a}.{c}, 'NaN'::float8)" for a, c in resolved.values()]
+            query = cur.mogrify(
+                f"COPY (SELECT {', '.join(select)} FROM {from_sql}{where_sql}) "
+                f"TO STDOUT WITH (FORMAT binary)",
+                params,
+            ).decode()
+
+            fields = [("Date", "date"), ("Code", f"S{width}")] + [(c, "float8") for c in value_cols]
+            reader = CopyBinaryReader(fields, n_rows)
+            cur.copy_expert(query, reader)
+            arrays = reader.finish()
+
+        # 銘柄コードはユニーク値だけ decode し、同じ str オブジェクトを共有する
+        uniq, inverse = np.unique(arrays["Code"], return_inverse=True)
+        decoded = np.array([u.decode("utf-8").rstrip(" ") for u in uniq], dtype=object)
+
+        # サーバ側 ORDER BY（ソート + ディスク退避）より手元の lexsort の方が速い
+        order = np.lexsort((inverse, arrays["Date"]))
+        arrays = {name: arr[order] for name, arr in arrays.items()}
+        arrays["Code"] = decoded[inverse[order]] if len(decoded) else np.empty(0, dtype=object)
+
+        self.logger.info("DB 読み出し: %d 行 × %d 列", n_rows, len(value_cols) + 2)
+        return arrays
+
+    def read_frame(
+        self,
+        columns: Sequence[str],
+        codes: Iterable[str] | None = None,
+        start=None,
+        end=None,
+    ) -> pd.DataFrame:
+        """``read_arrays`` の結果を ``price_ohlcv_derived.csv`` 互換の DataFrame で返す。"""
+        arrays = self.read_arrays(columns, codes, start, end)
+        arrays["Date"] = arrays["Date"].astype("datetime64[ns]")
+        order = ["Date", "Code"] + [c for c in columns if c not in ("Date", "Code")]
+        return pd.DataFrame({c: arrays[c] for c in order}, copy=False)
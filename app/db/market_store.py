@@ -0,0 +1,182 @@
+"""app/db/market_store.py
+
+DBClient 上に構築した時系列ストア（書き込み側）。
+
+- OHLCV / 派生指標 / スコア / バックテスト結果をメモリ上のバイナリバッファから
+  ``COPY FROM STDIN`` で一括投入（``pg_binary.encode_copy_binary``）
+- テーブルは ``date`` で年単位にレンジパーティション（投入時に自動作成）
+- 既存日を含む再投入は一時テーブル経由の ``INSERT ... ON CONFLICT DO UPDATE`` で冪等
+
+使い方（例）
+    with DBClient(cfg, logger) as db:
+        store = MarketStore(db, logger)
+        store.ensure_schema()
+        store.load_ohlcv(price_df)
+"""
+
+from __future__ import annotations
+
+from logging import Logger
+
+import pandas as pd
+
+from app.db.db_client import DBClient
+from app.db.pg_binary import encode_copy_binary
+
+__all__ = [
+    "TABLES",
+    "MarketStore",
+]
+
+# ----------------------------------------------------------------------
+# テーブル定義: DataFrame 列名 → (SQL 列名, 型)
+# ----------------------------------------------------------------------
+
+_PRICE_COLS = {
+    "Open": ("open", "double precision"),
+    "High": ("high", "double precision"),
+    "Low": ("low", "double precision"),
+    "Close": ("close", "double precision"),
+    "Volume": ("volume", "double precision"),
+}
+
+_FEATURE_COLS = {
+    c: (c.lower(), "double precision")
+    for c in [
+        "ATR_1", "ATR_3", "ATR_5", "ATR_10", "ATR_20", "Vol_5", "Vol_20",
+        "Momentum_2", "Momentum_3", "PullUp", "MA_5", "Range_yesterday", "NK225_gap",
+    ]
+}
+
+TABLES: dict[str, dict] = {
+    "ohlcv": {
+        "columns": {"Date": ("date", "date"), "Code": ("code", "text"), **_PRICE_COLS},
+        "key": ["code", "date"],
+    },
+    "features": {
+        "columns": {"Date": ("date", "date"), "Code": ("code", "text"), **_FEATURE_COLS},
+        "key": ["code", "date"],
+    },
+    "scores": {
+        "columns": {
+            "Date": ("date", "date"), "Scorer": ("scorer", "text"), "Code": ("code", "text"),
+            "Rank": ("rank", "integer"), "Score": ("score", "double precision"),
+        },
+        "key": ["scorer", "code", "date"],
+    },
+    "backtest_results": {
+        "columns": {
+            "Date": ("date", "date"), "RunId": ("run_id", "text"), "Ret": ("ret", "double precision"),
+        },
+        "key": ["run_id", "date"],
+    },
+}
+
+
+# SQL 型 → バイナリ COPY の型名
+_KIND = {"date": "date", "text": "text", "integer": "int4", "double precision": "float8"}
+
+
+class MarketStore:
+    """バックテスト・本番データを PostgreSQL に一括投入するクラス。"""
+
+    def __init__(self, db: DBClient, logger: Logger):
+        self.db = db
+        self.logger = logger
+
+    # ---------------- スキーマ ---------------- #
+
+    def ensure_schema(self) -> None:
+        """全テーブル（パーティション親）を作成する。既存なら何もしない。"""
+        with self.db.connection() as conn, conn.cursor() as cur:
+            for table, spec in TABLES.items():
+                cols = ", ".join(f"{name} {typ}" for name, typ in spec["columns"].values())
+                key = ", ".join(spec["key"])
+                cur.execute(
+                    f"CREATE TABLE IF NOT EXISTS {table} ({cols}, PRIMARY KEY ({key})) "
+                    f"PARTITION BY RANGE (date)"
+                )
+
+    def _ensure_partitions(self, cur, table: str, years: list[int]) -> None:
+        for y in years:
+            cur.execute(
+                f"CREATE TABLE IF NOT EXISTS {table}_y{y} PARTITION OF {table} "
+                f"FOR VALUES FROM ('{y}-01-01') TO ('{y + 1}-01-01')"
+            )
+
+    # ---------------- 投入 ---------------- #
+
+    def bulk_upsert(self, table: str, df: pd.DataFrame) -> int:
+        """DataFrame をバイナリ COPY で一括投入し、既存日の行は主キーで upsert する。
+
+        - 投入日がテーブルに未登録なら主キー順に並べて直接 COPY（最速経路）
+        - 既存日を含む場合は一時テーブルへ COPY 後 ``INSERT ... ON CONFLICT DO UPDATE``
+
+        Args:
+            table: ``TABLES`` のキー
+            df: 投入データ（``TABLES[table]["columns"]`` の DataFrame 列を含むこと）
+
+        Returns:
+            int: 投入行数
+        """
+        spec = TABLES[table]
+        src_cols = [c for c in spec["columns"] if c in df.columns]
+        key_src = [c for c, (n, _) in spec["columns"].items() if n in spec["key"]]
+        missing = set(key_src) - set(src_cols)
+        if missing:
+            raise KeyError(f"{table}: 必須列がありません {sorted(missing)}")
+        if df.empty:
+            return 0
+
+        out = df[src_cols].copy()
+        out["Date"] = pd.to_datetime(out["Date"]).dt.normalize()
+        if "Code" in out.columns:
+            out["Code"] = out["Code"].astype(str)
+        # 主キー順に並べると索引への挿入が局所化され速い
+        key_order = sorted(key_src, key=lambda c: spec["key"].index(spec["columns"][c][0]))
+        out = out.drop_duplicates(key_src, keep="last").sort_values(key_order, kind="mergesort")
+
+        sql_cols = [spec["columns"][c][0] for c in src_cols]
+        buf = encode_copy_binary([(out[c].to_numpy(), _KIND[spec["columns"][c][1]]) for c in src_cols])
+
+        col_list = ", ".join(sql_cols)
+        key = ", ".join(spec["key"])
+        updates = ", ".join(f"{c} = EXCLUDED.{c}" for c in sql_cols if c not in spec["key"])
+        on_conflict = f"DO UPDATE SET {updates}" if updates else "DO NOTHING"
+        days = out["Date"].dt.date.unique().tolist()
+        years = sorted({d.year for d in days})
+
+        with self.db.connection() as conn, conn.cursor() as cur:
+            self._ensure_partitions(cur, table, years)
+            cur.execute(f"SELECT 1 FROM {table} WHERE date = ANY(%s) LIMIT 1", (days,))
+            reload = cur.fetchone() is not None
+            if not reload:
+                cur.copy_expert(f"COPY {table} ({col_list}) FROM STDIN WITH (FORMAT binary)", buf)
+            else:
+                cur.execute(f"CREATE TEMP TABLE _stage (LIKE {table}) ON COMMIT DROP")
+                cur.copy_expert(f"COPY _stage ({col_list}) FROM STDIN WITH (FORMAT binary)", buf)
+                cur.execute(
+                    f"INSERT INTO {table} ({col_list}) SELECT {col_list} FROM _stage "
+                    f"ORDER BY {key} ON CONFLICT ({key}) {on_conflict}"
+                )
+
+        self.logger.info("%s: %d 行を投入 (%s〜%s%s)", table, len(out), min(days), max(days),
+                         ", upsert" if reload else "")
+        return len(out)
+
+    def load_ohlcv(self, df: pd.DataFrame) -> int:
+        """四本値（``price_ohlcv.csv`` 形式）を投入する。"""
+        return self.bulk_upsert("ohlcv", df)
+
+    def load_features(self, df: pd.DataFrame) -> int:
+        """派生指標（``price_ohlcv_derived.csv`` 形式）を投入する。"""
+        return self.bulk_upsert("features", df)
+
+    def load_scores(self, df: pd.DataFrame, scorer: str, date) -> int:
+        """スコアリング結果（Rank, Code, Score / Score_up）を投入する。"""
+        out = df.rename(columns={"Score_up": "Score"}).assign(Scorer=scorer, Date=date)
+        return self.bulk_upsert("scores", out)
+
+    def load_backtest_results(self, df: pd.DataFrame, run_id: str) -> int:
+        """バックテストの日次リターン（Date, Ret）を投入する。"""
+        return self.bulk_upsert("backtest_results", df.assign(RunId=run_id))
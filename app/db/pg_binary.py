@@ -0,0 +1,197 @@
+"""app/db/pg_binary.py
+
+PostgreSQL の ``COPY ... (FORMAT binary)`` 形式を NumPy で直接組み立て / 解釈するヘルパ。
+
+行ごとの Python オブジェクト（タプル・文字列整形）を作らず、列配列と
+バイト列をベクトル演算で相互変換するため、CSV 経由より大幅に速い。
+
+- ``encode_copy_binary``: 列配列 → ``COPY FROM STDIN`` 用バッファ（投入）
+- ``CopyBinaryReader``: ``COPY TO STDOUT`` の固定長行 → 事前確保した列配列（読み出し）
+
+対応型: ``date`` / ``float8`` / ``int4`` / ``text``（欠損は NULL）
+"""
+
+from __future__ import annotations
+
+import io
+from typing import Sequence
+
+import numpy as np
+import pandas as pd
+
+__all__ = [
+    "PG_EPOCH",
+    "COPY_HEADER",
+    "COPY_TRAILER",
+    "encode_copy_binary",
+    "CopyBinaryReader",
+]
+
+PG_EPOCH = np.datetime64("2000-01-01", "D")
+COPY_HEADER = b"PGCOPY\n\xff\r\n\x00" + b"\x00\x00\x00\x00" + b"\x00\x00\x00\x00"
+COPY_TRAILER = b"\xff\xff"
+
+_FIXED = {"date": ">i4", "int4": ">i4", "float8": ">f8"}
+_CHUNK_ROWS = 250_000     # エンコード時の作業メモリを抑える分割単位
+
+
+def _column_payload(values, kind: str) -> tuple[np.ndarray, np.ndarray | list]:
+    """列 → (各行のバイト長 [-1 = NULL], ペイロード)。"""
+    if kind == "text":
+        ser = pd.Series(values, dtype=object)
+        null = ser.isna().to_numpy()
+        codes, uniques = pd.factorize(ser.where(~null))
+        encoded = [str(u).encode("utf-8") for u in uniques]
+        ulen = np.array([len(b) for b in encoded], dtype=np.int64)
+        lengths = np.where(codes >= 0, ulen[np.maximum(codes, 0)] if len(ulen) else 0, -1)
+        return lengths, (codes, encoded)
+
+    if kind == "date":
+        dt = pd.to_datetime(pd.Series(values)).dt.normalize()
+        null = dt.isna().to_numpy()
+        days = (dt.to_numpy().astype("datetime64[D]") - PG_EPOCH).astype(np.int64)
+        arr = np.where(null, 0, days).astype(_FIXED[kind])
+    else:
+        num = pd.to_numeric(pd.Series(values), errors="coerce").to_numpy(dtype=np.float64)
+        null = np.isnan(num)
+        arr = np.where(null, 0, num).astype(_FIXED[kind])
+    width = arr.dtype.itemsize
+    lengths = np.where(null, -1, width)
+    return lengths, arr.view(np.uint8).reshape(-1, width)
+
+
+def _encode_chunk(columns: Sequence[tuple[object, str]]) -> bytes:
+    payloads = [(_column_payload(v, k), k) for v, k in columns]
+    n = len(payloads[0][0][0])
+    if n == 0:
+        return b""
+
+    row_size = np.full(n, 2, dtype=np.int64)
+    for (lengths, _), _ in payloads:
+        row_size += 4 + np.maximum(lengths, 0)
+    starts = np.concatenate([[0], np.cumsum(row_size)[:-1]])
+    buf = np.zeros(int(row_size.sum()), dtype=np.uint8)
+
+    # フィールド数 (int16)
+    nfields = np.array([len(columns)], dtype=">i2").view(np.uint8)
+    buf[starts[:, None] + np.arange(2)] = nfields
+
+    pos = starts + 2
+    for (lengths, data), kind in payloads:
+        buf[pos[:, None] + np.arange(4)] = lengths.astype(">i4").view(np.uint8).reshape(-1, 4)
+        body = pos + 4
+        if kind == "text":
+            codes, encoded = data
+            for width in np.unique(lengths[lengths > 0]):
+                sel = np.flatnonzero(lengths == width)
+                uniq_idx = [i for i, b in enumerate(encoded) if len(b) == width]
+                table = np.frombuffer(b"".join(encoded[i] for i in uniq_idx), dtype=np.uint8).reshape(-1, width)
+                remap = np.full(len(encoded), -1, dtype=np.int64)
+                remap[uniq_idx] = np.arange(len(uniq_idx))
+                buf[body[sel, None] + np.arange(width)] = table[remap[codes[sel]]]
+        else:
+            sel = np.flatnonzero(lengths >= 0)
+            buf[body[sel, None] + np.arange(data.shape[1])] = data[sel]
+        pos = body + np.maximum(lengths, 0)
+
+    return buf.tobytes()
+
+
+def encode_copy_binary(columns: Sequence[tuple[object, str]]) -> io.BytesIO:
+    """列配列から ``COPY FROM STDIN (FORMAT binary)`` 用のバッファを作る。
+
+    Args:
+        columns: ``(値の配列, 型名)`` のリスト。型名は date / float8 / int4 / text
+
+    Returns:
+        BytesIO: 先頭に巻き戻し済みのバッファ（``cursor.copy_expert`` にそのまま渡せる）
+    """
+    n = len(columns[0][0]) if columns else 0
+    out = io.BytesIO()
+    out.write(COPY_HEADER)
+    for lo in range(0, n, _CHUNK_ROWS):
+        chunk = [(np.asarray(v, dtype=object if k == "text" else None)[lo:lo + _CHUNK_ROWS], k)
+                 for v, k in columns]
+        out.write(_encode_chunk(chunk))
+    out.write(COPY_TRAILER)
+    out.seek(0)
+    return out
+
+
+class CopyBinaryReader:
+    """``COPY ... TO STDOUT (FORMAT binary)`` の固定長行を NumPy 配列へ直接書き込む file-like。
+
+    ``cursor.copy_expert(sql, reader)`` に渡すと、受信したバイト列を一定量ずつ
+    構造化 dtype として解釈し、事前確保した配列へコピーする。Python の行タプルは作らない。
+
+    全列が NULL を含まない固定長であること（SQL 側で ``COALESCE(x, 'NaN')`` や
+    ``rpad(code, w)`` により揃える）が前提。
+
+    Args:
+        fields: ``(列名, 型名)`` のリスト。型名は date / int4 / float8 / ``S<幅>``
+        n_rows: 事前確保する行数（``SELECT count(*)`` の結果）
+        flush_bytes: 受信バッファをこのサイズごとに解析する
+    """
+
+    def __init__(self, fields: Sequence[tuple[str, str]], n_rows: int, flush_bytes: int = 1 << 20):
+        dt = [("_n", ">i2")]
+        for i, (name, kind) in enumerate(fields):
+            dt += [(f"_l{i}", ">i4"), (name, _FIXED.get(kind, kind))]
+        self.fields = list(fields)
+        self.row_dtype = np.dtype(dt)
+        self.arrays = {
+            name: np.empty(n_rows, dtype=("datetime64[D]" if kind == "date"
+                                          else np.float64 if kind == "float8"
+                                          else np.int32 if kind == "int4" else kind))
+            for name, kind in fields
+        }
+        self.n_rows = n_rows
+        self.filled = 0
+        self._buf = bytearray()
+        self._header_done = False
+        self._flush_bytes = flush_bytes
+        self._widths = [np.dtype(_FIXED.get(k, k)).itemsize for _, k in fields]
+
+    def write(self, data) -> int:
+        self._buf += data
+        if len(self._buf) >= self._flush_bytes:
+            self._parse()
+        return len(data)
+
+    def _parse(self) -> None:
+        if not self._header_done:
+            if len(self._buf) < len(COPY_HEADER):
+                return
+            if bytes(self._buf[:11]) != COPY_HEADER[:11]:
+                raise ValueError("COPY binary ヘッダが不正です")
+            ext_len = int.from_bytes(self._buf[15:19], "big")
+            del self._buf[:19 + ext_len]
+            self._header_done = True
+
+        k = len(self._buf) // self.row_dtype.itemsize
+        if k == 0:
+            return
+        if self.filled + k > self.n_rows:
+            # 末尾のトレーラ (0xFFFF) を行と誤認しないよう上限で切る
+            k = self.n_rows - self.filled
+        rows = np.frombuffer(self._buf, dtype=self.row_dtype, count=k)
+        if (rows["_n"] != len(self.fields)).any():
+            raise ValueError("列数が一致しません")
+        for i, ((name, kind), width) in enumerate(zip(self.fields, self._widths)):
+            if (rows[f"_l{i}"] != width).any():
+                raise ValueError(f"{name}: 固定長でない値（NULL など）が含まれています")
+            dst = self.arrays[name][self.filled:self.filled + k]
+            if kind == "date":
+                dst[:] = PG_EPOCH + rows[name].astype(np.int64)
+            else:
+                dst[:] = rows[name]
+        self.filled += k
+        del rows
+        del self._buf[:k * self.row_dtype.itemsize]
+
+    def finish(self) -> dict[str, np.ndarray]:
+        """残りのバッファを解析し、列配列を返す。"""
+        self._parse()
+        if self.filled != self.n_rows or bytes(self._buf) not in (b"", COPY_TRAILER):
+            raise ValueError(f"受信行数が一致しません: {self.filled} / {self.n_rows}")
+        return self.arrays
@@ -1,10 +1,139 @@
+"""app/exporters/export_scores_to_excel.py
+
+スコアリング結果をトレーダー向けに出力する。
+
+- ``picks``: 当日の上位銘柄（Rank, Code, CompanyName, Score）
+- ``components``: 当日の上位銘柄とスコアの構成要素（``score_stocks(components=True)`` の全列）
+- ``history``: 直近 ``history_days`` 営業日分の ``components``（AsOf 列つき）
+
+当日分は ``<output_dir>/history/picks_<YYYYMMDD>.csv`` にも保存し（同じ日の再実行は上書き。
+旧来の ``export_scores_to_excel`` は ``history=True`` のときだけ）、
+history シートはこのファイル群を 1 日ずつ読み出して書く。書き出しは ``writers.write_sheets``
+のストリーミング書き出しなので、履歴が数十万行でもメモリは 1 チャンク分で済む。
+
+``export_history`` は history だけを別ファイル（``top40_history_<YYYYMMDD>``）に書く
+（寄り前実行では履歴の書き出しを大引け後の ``precompute`` に回す）。
+"""
+
+from __future__ import annotations
+
 import pandas as pd
 from pathlib import Path
-from datetime import datetime
+from datetime import date, datetime
 from logging import Logger
+from typing import Iterator, Optional
+
+from app.exporters.writers import iter_chunks, write_sheets
+
+__all__ = [
+    "HISTORY_DAYS",
+    "PICK_COLS",
+    "export_history",
+    "export_scores",
+    "export_scores_to_excel",
+    "iter_history",
+]
+
+PICK_COLS = ["Rank", "Code", "CompanyName", "Score"]
+HISTORY_DAYS = 250
+
 
+def _save_history(df: pd.DataFrame, history_dir: Path, as_of: date) -> Path:
+    history_dir.mkdir(parents=True, exist_ok=True)
+    path = history_dir / f"picks_{as_of:%Y%m%d}.csv"
+    df.to_csv(path, index=False, encoding="utf-8")
+    return path
 
-def export_scores_to_excel(df: pd.DataFrame, output_dir: str, logger: Logger) -> None:
+
+def iter_history(history_dir: Path, days: int = HISTORY_DAYS) -> Iterator[pd.DataFrame]:
+    """履歴ファイルを古い順に 1 日ずつ読む（直近 ``days`` 日分、先頭に AsOf 列）。
+
+    日によって列が違っても（構成要素の追加・欠落）、全日の列を合わせた同じ列で返す
+    （無い列は欠損。ヘッダや parquet のスキーマは先頭の日で決まるため）。
+    """
+    files = sorted(Path(history_dir).glob("picks_*.csv"))[-days:] if days > 0 else []
+    columns = ["AsOf"]
+    for path in files:
+        columns += [c for c in pd.read_csv(path, nrows=0).columns if c not in columns]
+    for path in files:
+        df = pd.read_csv(path, dtype={"Code": "str"})
+        if "Date" in df.columns:
+            df["Date"] = pd.to_datetime(df["Date"]).dt.date
+        df.insert(0, "AsOf", datetime.strptime(path.stem[len("picks_"):], "%Y%m%d").date())
+        yield df.reindex(columns=columns)
+
+
+def export_scores(
+    df: pd.DataFrame,
+    output_dir: str,
+    logger: Logger,
+    fmt: str = "xlsx",
+    history_days: int = HISTORY_DAYS,
+    as_of: Optional[date] = None,
+    save_history: bool = True,
+) -> list[Path]:
+    """
+    スコアリング結果を picks / components / history の 3 シートで出力する。
+
+    Args:
+        df (pd.DataFrame): スコアリング済み上位銘柄の DataFrame（構成要素の列があれば components に出す）。
+        output_dir (str): 出力ディレクトリパス。
+        logger (Logger): ロガーインスタンス。
+        fmt (str): ``"xlsx"`` / ``"csv"`` / ``"parquet"``（csv / parquet はシートごとのファイル）。
+        history_days (int): history シートの営業日数。0 なら history シートを出さない（当日分の保存はする）。
+        as_of (date): 出力日（ファイル名・履歴の日付）。None なら今日。
+        save_history (bool): 当日分を ``<output_dir>/history`` に保存するか。
+
+    Returns:
+        list[Path]: 書き出したファイル
+    """
+    as_of = as_of or datetime.today().date()
+    out_dir = Path(output_dir)
+    file_path = out_dir / f"top40_scores_{as_of:%Y%m%d}.{fmt}"
+
+    sheets = {"picks": iter_chunks(df[[c for c in PICK_COLS if c in df.columns]])}
+    if set(df.columns) - set(PICK_COLS):
+        sheets["components"] = iter_chunks(df)
+    if save_history:
+        _save_history(df, out_dir / "history", as_of)
+    if history_days > 0:
+        sheets["history"] = iter_history(out_dir / "history", history_days)
+
+    logger.info("出力開始: %s (%s)", file_path, ", ".join(sheets))
+    paths = write_sheets(file_path, sheets, fmt)
+    logger.info("出力完了: %s", ", ".join(str(p) for p in paths))
+    return paths
+
+
+def export_history(
+    output_dir: str,
+    logger: Logger,
+    fmt: str = "xlsx",
+    history_days: int = HISTORY_DAYS,
+    as_of: Optional[date] = None,
+) -> list[Path]:
+    """
+    保存済みの履歴（直近 ``history_days`` 営業日）だけを ``top40_history_<as_of>`` に出力する。
+
+    Args:
+        output_dir (str): 出力ディレクトリパス（履歴は ``<output_dir>/history``）。
+        logger (Logger): ロガーインスタンス。
+        fmt (str): ``"xlsx"`` / ``"csv"`` / ``"parquet"``。
+        history_days (int): 出力する営業日数。
+        as_of (date): ファイル名の日付。None なら今日。
+
+    Returns:
+        list[Path]: 書き出したファイル
+    """
+    as_of = as_of or datetime.today().date()
+    file_path = Path(output_dir) / f"top40_history_{as_of:%Y%m%d}.{fmt}"
+    logger.info("履歴出力開始: %s", file_path)
+    paths = write_sheets(file_path, {"history": iter_history(Path(output_dir) / "history", history_days)}, fmt)
+    logger.info("履歴出力完了: %s", ", ".join(str(p) for p in paths))
+    return paths
+
+
+def export_scores_to_excel(df: pd.DataFrame, output_dir: str, logger: Logger, history: bool = False) -> None:
     """
     スコアリング結果DataFrameをExcelファイルとして出力する。
 
@@ -12,16 +141,10 @@ def export_scores_to_excel(df: pd.DataFrame, output_dir: str, logger: Logger) ->
         df (pd.DataFrame): スコアリング済み上位40銘柄のDataFrame。
         output_dir (str): Excelファイルの出力ディレクトリパス。
         logger (Logger): ロガーインスタンス。
+        history (bool): True なら当日分を履歴に保存し history シートも出す（既定は出力ファイルのみ）。
 
     Returns:
         None
     """
-    Path(output_dir).mkdir(parents=True, exist_ok=True)
-
-    date_str = datetime.today().strftime("%Y%m%d")
-    file_name = f"top40_scores_{date_str}.xlsx"
-    file_path = Path(output_dir) / file_name
-
-    logger.info(f"Excel出力開始: {file_path}")
-    df.to_excel(file_path, index=False)
-    logger.info("Excel出力完了")
+    export_scores(df, output_dir, logger, fmt="xlsx",
+                  history_days=HISTORY_DAYS if history else 0, save_history=history)
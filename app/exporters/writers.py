@@ -0,0 +1,153 @@
+"""app/exporters/writers.py
+
+出力形式ごとのストリーミング書き出し。
+
+シートはチャンク（DataFrame）の反復子で渡し、1 チャンクずつ書き出すので
+メモリ使用量は総行数ではなくチャンクの大きさで決まる。
+
+- ``xlsx``: openpyxl の write-only ブック（行をそのままファイルへ流す。複数シート）
+- ``csv``: シートごとに ``<stem>_<シート名>.csv``（追記書き込み）
+- ``parquet``: シートごとに ``<stem>_<シート名>.parquet``（pyarrow の ParquetWriter で
+  チャンクごとに row group を追加。列の型は値のあるチャンクから決める。pyarrow は任意依存）
+
+同じシートのチャンクは同じ列（同じ順）でなければならず、違えば ``ValueError``。
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Iterable, Iterator, Mapping
+
+import pandas as pd
+
+__all__ = [
+    "CHUNK_ROWS",
+    "FORMATS",
+    "iter_chunks",
+    "write_sheets",
+]
+
+FORMATS = ("xlsx", "csv", "parquet")
+CHUNK_ROWS = 50_000
+
+Sheets = Mapping[str, Iterable[pd.DataFrame]]
+
+
+def iter_chunks(df: pd.DataFrame, rows: int = CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+    """DataFrame を ``rows`` 行ずつに分ける（空でも 1 回は返して列名を残す）。"""
+    for lo in range(0, max(len(df), 1), rows):
+        yield df.iloc[lo:lo + rows]
+
+
+# ----------------------------------------------------------------------
+# 形式ごとの書き出し
+# ----------------------------------------------------------------------
+
+def _same_columns(name: str, chunks: Iterable[pd.DataFrame]) -> Iterator[pd.DataFrame]:
+    """チャンクが先頭チャンクと同じ列かを確かめながら返す（ヘッダは先頭チャンクで決まるため）。"""
+    columns = None
+    for chunk in chunks:
+        if columns is None:
+            columns = list(chunk.columns)
+        elif list(chunk.columns) != columns:
+            raise ValueError(f"シート {name} のチャンクの列が先頭チャンクと異なります: "
+                             f"{list(chunk.columns)} (expected: {columns})")
+        yield chunk
+
+
+def _write_xlsx(path: Path, sheets: Sheets) -> list[Path]:
+    from openpyxl import Workbook   # 出力時のみ読み込む
+
+    wb = Workbook(write_only=True)
+    for name, chunks in sheets.items():
+        ws = wb.create_sheet(title=name[:31])          # Excel のシート名は 31 文字まで
+        header = False
+        for chunk in _same_columns(name, chunks):
+            if not header:
+                ws.append([str(c) for c in chunk.columns])
+                header = True
+            # 欠損は空セル、それ以外は Python / NumPy のスカラーのまま書く
+            values = chunk.astype(object).where(chunk.notna(), None)
+            for row in values.itertuples(index=False, name=None):
+                ws.append(row)
+    wb.save(path)
+    return [path]
+
+
+def _write_csv(path: Path, sheets: Sheets) -> list[Path]:
+    paths = []
+    for name, chunks in sheets.items():
+        out = path.with_name(f"{path.stem}_{name}.csv")
+        first = True
+        for chunk in _same_columns(name, chunks):
+            chunk.to_csv(out, mode="w" if first else "a", header=first, index=False,
+                         encoding="utf-8")
+            first = False
+        paths.append(out)
+    return paths
+
+
+def _write_parquet(path: Path, sheets: Sheets) -> list[Path]:
+    import pyarrow as pa            # 任意依存
+    import pyarrow.parquet as pq
+
+    def conform(table: "pa.Table", schema: "pa.Schema") -> "pa.Table":
+        # 全欠損の列はチャンクごとに型が揺れる（null / double など）ので、値を持たない列として作り直す
+        columns = [pa.nulls(len(col), field.type) if col.null_count == len(col) else col.cast(field.type)
+                   for field, col in zip(schema, table.columns)]
+        return pa.Table.from_arrays(columns, schema=schema)
+
+    def open_writer(out: Path, pending: list, types: dict) -> "pq.ParquetWriter":
+        # 先頭チャンクの列順で、値のあるチャンクから決めた型のスキーマにする
+        schema = pa.schema([pa.field(f.name, types.get(f.name, f.type)) for f in pending[0].schema])
+        writer = pq.ParquetWriter(out, schema)
+        for table in pending:
+            writer.write_table(conform(table, schema))
+        return writer
+
+    paths = []
+    for name, chunks in sheets.items():
+        out = path.with_name(f"{path.stem}_{name}.parquet")
+        writer = None
+        pending: list = []          # 列の型が決まるまで保留するチャンク
+        types: dict = {}            # 列名 → 値のあるチャンクで最初に見た型
+        try:
+            for chunk in _same_columns(name, chunks):
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                if writer is not None:
+                    writer.write_table(conform(table, writer.schema))
+                    continue
+                for field, col in zip(table.schema, table.columns):
+                    if col.null_count < len(col):
+                        types.setdefault(field.name, field.type)
+                pending.append(table)
+                if len(types) == table.num_columns:
+                    writer, pending = open_writer(out, pending, types), []
+            if writer is None and pending:
+                writer = open_writer(out, pending, types)       # 最後まで値の無い列は null 型のまま
+        finally:
+            if writer is not None:
+                writer.close()
+        paths.append(out)
+    return paths
+
+
+_WRITERS = {"xlsx": _write_xlsx, "csv": _write_csv, "parquet": _write_parquet}
+
+
+def write_sheets(path: Path, sheets: Sheets, fmt: str = "xlsx") -> list[Path]:
+    """シートごとのチャンク列を ``fmt`` で書き出す。
+
+    Args:
+        path: 出力パス。拡張子は ``fmt`` に置き換える（csv / parquet はシートごとのファイル名の基準）
+        sheets: シート名 → DataFrame チャンクの反復子（同じシートのチャンクは同じ列）
+        fmt: ``"xlsx"`` / ``"csv"`` / ``"parquet"``
+
+    Returns:
+        list[Path]: 書き出したファイル
+    """
+    if fmt not in _WRITERS:
+        raise ValueError(f"未知の出力形式です: {fmt} (choices: {', '.join(FORMATS)})")
+    path = Path(path).with_suffix(f".{fmt}")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    return _WRITERS[fmt](path, sheets)
@@ -1,27 +1,63 @@
-from app.core.config import load_config
+from app.core.config import AppConfig, get_config
 from app.core.logger import setup_logger
-from app.data.jquants_signin import get_refresh_token, get_id_token
-from app.data.trading_days_fetcher import get_latest_trading_days
-from app.data.daily_quotes_fetcher import fetch_daily_quotes
-from app.data.listed_info_fetcher import fetch_listed_info
 from app.scoring.score_stocks import score_stocks
-from app.exporters.export_scores_to_excel import export_scores_to_excel
+from app.scoring.premarket import premarket_scores
+from app.exporters.export_scores_to_excel import export_scores
+from app.core.profiling import span
 
 import pandas as pd
-import os
+from logging import Logger
 
-def main():
+def main(export: bool = True, output_dir: str = "exports", fmt: str = "xlsx",
+         history_days: int = 250, premarket: bool = False) -> pd.DataFrame:
     """
     MirAI_Trade 初期リリース版のエントリーポイント。
     株価情報をJ-Quants APIから取得し、スコア計算・Excel出力を行う。
+
+    Args:
+        export (bool): False の場合は Excel 出力を省略する。
+        output_dir (str): Excel の出力先ディレクトリ。
+        fmt (str): 出力形式（"xlsx" / "csv" / "parquet"）。
+        history_days (int): history シートの営業日数（0 で履歴なし）。
+        premarket (bool): True の場合は大引け後のプリコンピュート結果（``app/scoring/premarket.py``）を使い、
+            API を呼ばずに出力する（history シートは precompute が別ファイルに出力済み）。
+            当日用の結果が無ければ通常どおり取得・計算する。
+
+    Returns:
+        pd.DataFrame: スコアリング結果（上位40件、スコアの構成要素つき）。
     """
     # 設定読み込みとロガー初期化
-    config = load_config("configs/config.yaml")
+    config = get_config()
     logger = setup_logger(config.logging)
 
-    # 認証トークン取得
-    refresh_token = get_refresh_token(config, logger)
-    id_token = get_id_token(config, refresh_token, logger)
+    result_df = None
+    if premarket:
+        with span("score.premarket"):
+            result_df = premarket_scores(logger)
+        if result_df is not None:
+            history_days = 0        # 履歴は precompute が top40_history_* に出力済み
+    if result_df is None:
+        result_df = _score_from_api(config, logger)
+
+    # Excel出力
+    if export:
+        with span("score.export", rows=len(result_df)):
+            export_scores(result_df, output_dir=output_dir, logger=logger, fmt=fmt,
+                          history_days=history_days)
+
+    return result_df
+
+
+def _score_from_api(config: AppConfig, logger: Logger) -> pd.DataFrame:
+    """API から取得してスコアを計算する（通常経路）。"""
+    # API 関連（requests）は寄り前経路では読み込まない
+    from app.data.token_manager import TokenManager
+    from app.data.trading_days_fetcher import get_latest_trading_days
+    from app.data.daily_quotes_fetcher import fetch_daily_quotes
+    from app.data.listed_info_fetcher import fetch_listed_info
+
+    # 認証トークン取得（キャッシュが有効なら通信しない）
+    id_token = TokenManager(config, logger)    # 401 時は取り直して再試行する
 
     # 最新営業日（過去6日）を取得
     trading_days = get_latest_trading_days(config, id_token, logger, days=6)
@@ -38,10 +74,8 @@ def main():
     info_df = fetch_listed_info(config, id_token, logger)
 
     # スコア計算
-    result_df = score_stocks(quotes_df, info_df, logger)
-
-    # Excel出力
-    export_scores_to_excel(result_df, output_dir="exports", logger=logger)
+    with span("score.compute", rows=len(quotes_df)):
+        return score_stocks(quotes_df, info_df, logger, components=True)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,199 @@
+"""app/scoring/premarket.py
+
+本番シグナル（``score_stocks``）の大引け後プリコンピュートと寄り前実行。
+
+``score_stocks`` の入力はすべて前営業日の大引けまでに確定しているため、
+API 取得と上場情報に依存しない計算（``score_components``）を大引け後に済ませて保存し、
+寄り前は保存済みの候補に上場情報のフィルタと上位 40 件の選択（``rank_candidates``）を
+かけて出力するだけにする。寄り前の経路では API・認証を一切使わない。
+
+- ``precompute``: 大引け後に実行。営業日カレンダー・当日までの直近 6 営業日の四本値（並行取得）・
+  上場銘柄一覧を取得し、候補と構成要素を ``backtest_data/premarket/snapshot_<日付>.pkl`` に保存。
+  当日の四本値がまだ公開されていなければ前営業日までの 6 営業日で作る（売買日は当日になる）。
+  前営業日までの履歴（``export_history``）もここで出力し、寄り前は当日分だけを書く
+- ``premarket_scores``: 寄り前に実行。当日が ``valid_for``（株価の最新営業日の翌営業日）と
+  一致するスナップショットがあれば上位銘柄を返す。無ければ None（呼び出し側は通常経路へ）
+
+実行例:
+    (venv) python -m app precompute            # 大引け後（例: 16:00 以降）
+    (venv) python -m app score --premarket     # 寄り前
+"""
+
+from __future__ import annotations
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from logging import Logger
+from pathlib import Path
+from typing import Optional
+
+import pandas as pd
+
+from app.core.config import AppConfig
+from app.core.profiling import span
+from app.exporters.export_scores_to_excel import HISTORY_DAYS, export_history
+from app.scoring.score_stocks import INFO_COLS, rank_candidates, score_components
+
+__all__ = [
+    "SNAPSHOT_DIR",
+    "Snapshot",
+    "load_snapshot",
+    "precompute",
+    "premarket_scores",
+    "save_snapshot",
+]
+
+SNAPSHOT_DIR = Path("backtest_data/premarket")
+QUOTE_DAYS = 6             # score_stocks が使う営業日数
+FETCH_WORKERS = 4          # 四本値の並行取得数
+KEEP_SNAPSHOTS = 5         # 残す過去スナップショット数
+
+
+@dataclass
+class Snapshot:
+    """大引け後の計算結果。"""
+
+    as_of: date                  # 株価の最新営業日
+    valid_for: date              # このスナップショットで売買する営業日
+    created: str                 # 作成日時（ISO 形式）
+    candidates: pd.DataFrame     # score_components の結果
+    info: pd.DataFrame           # 上場銘柄一覧（INFO_COLS）
+
+
+# ----------------------------------------------------------------------
+# 保存・読み込み
+# ----------------------------------------------------------------------
+
+def save_snapshot(snapshot: Snapshot, snapshot_dir: Path = SNAPSHOT_DIR) -> Path:
+    """``snapshot_<as_of>.pkl`` に保存する（一時ファイルから置き換えるので読み手は途中状態を見ない）。"""
+    snapshot_dir = Path(snapshot_dir)
+    snapshot_dir.mkdir(parents=True, exist_ok=True)
+    path = snapshot_dir / f"snapshot_{snapshot.as_of:%Y%m%d}.pkl"
+    tmp = path.with_suffix(".pkl.tmp")
+    pd.to_pickle(snapshot, tmp)
+    os.replace(tmp, path)
+    for old in sorted(snapshot_dir.glob("snapshot_*.pkl"))[:-KEEP_SNAPSHOTS]:
+        old.unlink()
+    return path
+
+
+def load_snapshot(snapshot_dir: Path = SNAPSHOT_DIR) -> Optional[Snapshot]:
+    """最新のスナップショットを読む。無ければ None。"""
+    files = sorted(Path(snapshot_dir).glob("snapshot_*.pkl"))
+    return pd.read_pickle(files[-1]) if files else None
+
+
+def _next_weekday(day: date) -> date:
+    day += timedelta(days=1)
+    while day.weekday() >= 5:
+        day += timedelta(days=1)
+    return day
+
+
+# ----------------------------------------------------------------------
+# 大引け後
+# ----------------------------------------------------------------------
+
+def precompute(
+    config: AppConfig,
+    logger: Logger,
+    snapshot_dir: Path = SNAPSHOT_DIR,
+    output_dir: str = "exports",
+    fmt: str = "xlsx",
+    history_days: int = HISTORY_DAYS,
+    today: Optional[date] = None,
+) -> Path:
+    """
+    データを取得して候補と構成要素を計算し、スナップショットとして保存する。
+
+    大引け後の実行を前提に ``today`` 当日の四本値まで使い、売買日は翌営業日になる。
+    当日分が空（公開前・休業日）なら 1 営業日前にずらした 6 営業日を使う。
+    上場銘柄一覧はキャッシュを使わず取り直し、``load_listed_info`` のキャッシュも更新する。
+
+    Args:
+        config (AppConfig): アプリケーション設定オブジェクト。
+        logger (Logger): ロガーインスタンス。
+        snapshot_dir (Path): 保存先ディレクトリ。
+        output_dir / fmt / history_days: 履歴の出力（``export_history``）。history_days が 0 なら出力しない
+        today (date): 実行日。None なら今日。
+
+    Returns:
+        Path: 保存したスナップショット
+    """
+    from app.data.daily_quotes_fetcher import fetch_daily_quotes
+    from app.data.listed_info_fetcher import LISTED_INFO_CSV, fetch_listed_info
+    from app.data.token_manager import TokenManager
+    from app.data.trading_days_fetcher import get_latest_trading_days, get_next_trading_day
+
+    today = today or datetime.today().date()
+    id_token = TokenManager(config, logger)    # 401 時は取り直して再試行する
+    # 当日を含む QUOTE_DAYS + 1 営業日を取り、当日分が空なら捨てて前営業日までの QUOTE_DAYS 日を使う
+    trading_days = get_latest_trading_days(config, id_token, logger, days=QUOTE_DAYS + 1, until=today)
+    with span("premarket.fetch", days=len(trading_days)):
+        with ThreadPoolExecutor(FETCH_WORKERS) as pool:
+            quotes = list(pool.map(
+                lambda d: fetch_daily_quotes(config, id_token, logger, target_date=d), trading_days))
+        info_df = fetch_listed_info(config, id_token, logger)
+    if quotes and quotes[-1].empty:
+        logger.warning("%s の株価がまだありません。前営業日までの株価で作成します", trading_days[-1])
+        quotes = quotes[:-1]
+    quotes = quotes[-QUOTE_DAYS:]
+    LISTED_INFO_CSV.parent.mkdir(parents=True, exist_ok=True)
+    info_df.to_csv(LISTED_INFO_CSV, index=False, encoding="utf-8")
+
+    quotes_df = pd.concat(quotes, ignore_index=True)
+    with span("premarket.components", rows=len(quotes_df)) as rec:
+        candidates = score_components(quotes_df, logger)
+        rec.rows = len(candidates)
+
+    as_of = candidates["Date"].max() if len(candidates) else pd.to_datetime(quotes_df["Date"]).max().date()
+    valid_for = get_next_trading_day(config, id_token, logger, as_of) or _next_weekday(as_of)
+    snapshot = Snapshot(as_of, valid_for, datetime.now().isoformat(timespec="seconds"),
+                        candidates.reset_index(drop=True), info_df[INFO_COLS].copy())
+    path = save_snapshot(snapshot, snapshot_dir)
+    logger.info("プリコンピュート完了: %s（株価 %s、売買日 %s、候補 %d 銘柄）",
+                path, as_of, valid_for, len(candidates))
+    if history_days > 0:
+        with span("premarket.history"):
+            export_history(output_dir, logger, fmt, history_days, as_of=valid_for)
+    return path
+
+
+# ----------------------------------------------------------------------
+# 寄り前
+# ----------------------------------------------------------------------
+
+def premarket_scores(
+    logger: Logger,
+    snapshot_dir: Path = SNAPSHOT_DIR,
+    today: Optional[date] = None,
+    info_df: Optional[pd.DataFrame] = None,
+    components: bool = True,
+) -> Optional[pd.DataFrame]:
+    """
+    当日用のスナップショットから上位銘柄を選ぶ。
+
+    Args:
+        logger (Logger): ロガーインスタンス。
+        snapshot_dir (Path): スナップショットの保存先。
+        today (date): 売買日。None なら今日。
+        info_df (pd.DataFrame): 上場銘柄一覧の差し替え（None ならスナップショット作成時のもの）。
+        components (bool): スコアの構成要素の列も返すか。
+
+    Returns:
+        pd.DataFrame | None: ``score_stocks`` と同じ結果。当日用のスナップショットが無ければ None
+    """
+    today = today or datetime.today().date()
+    snapshot = load_snapshot(snapshot_dir)
+    if snapshot is None:
+        logger.warning("プリコンピュート結果がありません: %s", snapshot_dir)
+        return None
+    if snapshot.valid_for != today:
+        logger.warning("プリコンピュート結果が当日用ではありません（売買日 %s、本日 %s）",
+                       snapshot.valid_for, today)
+        return None
+    logger.info("プリコンピュート結果を使用: 株価 %s（作成 %s）", snapshot.as_of, snapshot.created)
+    return rank_candidates(snapshot.candidates, snapshot.info if info_df is None else info_df,
+                           logger, components=components)
@@ -0,0 +1,124 @@
+"""app/scoring/ranking.py
+
+横断ランキング（score_stocks / score_up / バックテスト共通）。
+
+- ``top_k(scores, k)``: 1 日分のスコア降順上位 k 件の位置と順位
+- ``top_k_batch(scores_2d, k)``: (日 or パラメータ組) × 銘柄 の 2 次元スコアを行ごとに一括選択
+- ``min_rank(scores)``: 全件の順位（``rank(method="min", ascending=False)`` と同じ、欠損は 0）
+
+順位は「自分より大きいスコアの数 + 1」（同点は同順位）、同点の並びは元の位置が先の行。
+上位 k 件は ``np.partition`` の部分選択で求め、全件ソートも DataFrame も作らない。
+上位 k 件の中の順位は、自分より大きい値がすべて k 件の中にあることから
+並べ替え済みの k 件だけで決まる。
+
+欠損（NaN）は対象外として扱う（``top_k`` は欠損を含まない入力を想定）。
+"""
+
+from __future__ import annotations
+
+import numpy as np
+
+__all__ = [
+    "min_rank",
+    "top_k",
+    "top_k_batch",
+]
+
+
+def _ranks_of_sorted(sorted_desc: np.ndarray) -> np.ndarray:
+    """降順に並んだ値の順位（同点は先頭の順位）を最後の軸に沿って求める。"""
+    k = sorted_desc.shape[-1]
+    pos = np.broadcast_to(np.arange(1, k + 1), sorted_desc.shape)
+    new = np.ones(sorted_desc.shape, dtype=bool)
+    new[..., 1:] = sorted_desc[..., 1:] != sorted_desc[..., :-1]
+    return np.maximum.accumulate(np.where(new, pos, 0), axis=-1)
+
+
+def min_rank(scores: np.ndarray) -> np.ndarray:
+    """全件の降順順位（欠損は 0）。"""
+    scores = np.asarray(scores, dtype=np.float64)
+    valid = ~np.isnan(scores)
+    ranked = np.sort(scores[valid])
+    out = np.zeros(len(scores), dtype=np.int64)
+    out[valid] = len(ranked) - np.searchsorted(ranked, scores[valid], side="right") + 1
+    return out
+
+
+def top_k(scores: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+    """スコア降順の上位 k 件（同点は元の並び順が先の行）を部分選択で求める。
+
+    ``rank(method="min", ascending=False)`` + ``nsmallest(k, "Rank")`` と同じ行・同じ並び
+    （k が件数以上のときの並びも pandas に合わせる）。
+
+    Args:
+        scores: 欠損を含まないスコア
+        k: 件数
+
+    Returns:
+        tuple: (位置, 順位)
+    """
+    scores = np.asarray(scores, dtype=np.float64)
+    n = len(scores)
+    k = max(min(k, n), 0)
+    if k == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+
+    if k == n:
+        # 全件のときは pandas も部分選択せず順位の quicksort 順になる（同点の並びも揃える）
+        rank = min_rank(scores)
+        idx = np.argsort(rank, kind="quicksort")
+        return idx.astype(np.int64), rank[idx]
+
+    # k 番目に大きい値を O(n) で求め、それより大きい行 + 同点の先頭から不足分を取る
+    kth = -np.partition(-scores, k - 1)[k - 1]
+    above = np.flatnonzero(scores > kth)
+    ties = np.flatnonzero(scores == kth)[: k - len(above)]
+    idx = np.concatenate([above, ties])
+    idx = idx[np.lexsort((idx, -scores[idx]))]
+    return idx.astype(np.int64), _ranks_of_sorted(scores[idx]).astype(np.int64)
+
+
+def top_k_batch(scores: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """2 次元スコアの各行から降順上位 k 件を一括で選ぶ。
+
+    行は営業日やパラメータ組、列は銘柄（欠損は対象外）。同点は列位置が先のもの。
+
+    Args:
+        scores: (行数, 銘柄数) のスコア
+        k: 行ごとの件数
+
+    Returns:
+        tuple: (位置, 順位, 件数)
+            位置・順位は (行数, k)。行の有効件数が k 未満の分は位置 -1・順位 0
+            件数は行ごとの選択数 ``min(k, 有効件数)``
+    """
+    scores = np.asarray(scores, dtype=np.float64)
+    n_rows, n_cols = scores.shape
+    k = max(min(k, n_cols), 0)
+    idx = np.full((n_rows, k), -1, dtype=np.int64)
+    rank = np.zeros((n_rows, k), dtype=np.int64)
+    valid = ~np.isnan(scores)
+    count = np.minimum(valid.sum(axis=1), k)
+    if k == 0 or not count.any():
+        return idx, rank, count
+
+    # 欠損を -inf にして k 番目の値を行ごとに求める
+    neg = np.where(valid, -scores, np.inf)
+    kth = -np.partition(neg, k - 1, axis=1)[:, k - 1:k]
+    above = valid & (scores > kth)
+    tie = valid & (scores == kth)
+    need = (count - above.sum(axis=1))[:, None]
+    chosen = above | (tie & (np.cumsum(tie, axis=1) <= need))
+
+    # 行ごとに (スコア降順, 列位置) で並べ、左詰めで (行数, k) に収める
+    rows, cols = np.nonzero(chosen)
+    order = np.lexsort((cols, -scores[rows, cols], rows))
+    rows, cols = rows[order], cols[order]
+    slot = np.arange(len(rows)) - np.repeat(np.cumsum(count) - count, count)
+    idx[rows, slot] = cols
+
+    vals = np.full((n_rows, k), -np.inf)
+    vals[rows, slot] = scores[rows, cols]
+    ranks = _ranks_of_sorted(vals)
+    rank[rows, slot] = ranks[rows, slot]
+    return idx, rank, count
@@ -0,0 +1,139 @@
+"""app/scoring/rescore.py
+
+市場全体の入力（NK225_gap 等）だけが変わったときの Score_up の再計算。
+
+寄り前は日経225F の気配に合わせて ``NK225_gap`` が刻々と変わるが、Score_up の他の項は
+前日の大引けで確定している。``Rescorer`` は最新営業日の銘柄ごとの項（``score_up_parts``）と
+上位銘柄を一度だけ計算して保持し、``update`` では市場項を差し替えて掛け直すだけにする
+（DataFrame の結合・フィルタはやり直さない）。
+
+市場項は全銘柄に同じ値を掛けるので順位は原則変わらない。``update`` は掛け直したスコアで
+保持中の上位銘柄の並び・順位（同点）と圏外の最大値を確かめ、変わっていなければ部分選択を
+省略する（丸めで同点ができた等の場合だけ ``top_k`` で選び直す）。結果は同じ市場値を
+入れた ``score_up`` とビット一致する。
+
+    rescorer = Rescorer(df, info_df, logger, params=(a, b, c, d))
+    top = rescorer.update(NK225_gap=0.004)     # 気配が変わるたびに呼ぶ
+"""
+
+from __future__ import annotations
+
+from logging import Logger
+from typing import Tuple
+
+import numpy as np
+import pandas as pd
+
+from app.scoring.ranking import top_k
+from app.scoring.score_up import MARKET_FACTORS, combine_parts, eligible_names, score_up_parts
+
+__all__ = [
+    "Rescorer",
+]
+
+
+class Rescorer:
+    """最新営業日の Score_up を保持し、市場項だけを差し替えて上位銘柄を出し直す。
+
+    Args:
+        df: OHLCV + 派生指標 DataFrame（``score_up`` と同じ。最新営業日の行だけを使う）
+        info_df: 上場銘柄一覧 DataFrame
+        logger: ロガー
+        params: (a,b,c,d) 係数タプル
+        top_n: 抽出銘柄数
+    """
+
+    def __init__(
+        self,
+        df: pd.DataFrame,
+        info_df: pd.DataFrame,
+        logger: Logger,
+        params: Tuple[float, float, float, float] = (1.0, 1.0, 1.0, 1.0),
+        top_n: int = 40,
+    ) -> None:
+        latest = df[df["Date"] == df["Date"].max()]
+        names = eligible_names(info_df)
+        self.logger = logger
+        self.top_n = top_n
+        self.parts = score_up_parts(latest, info_df, params, names=names)
+        self.market = {k: _uniform(k, v) for k, v in self.parts.market.items()}
+        self.codes = latest["Code"].to_numpy()
+        self.company = names.reindex(self.codes).to_numpy()
+        self.updates = 0            # update の回数
+        self.reranks = 0            # うち選び直した回数
+        self._select(combine_parts(self.parts, self.market))
+
+    # ------------------------------------------------------------------
+
+    @property
+    def result(self) -> pd.DataFrame:
+        """現在の市場値での上位銘柄（``score_up`` と同じ列: Rank, Code, CompanyName, Score_up）。"""
+        rows = self._rows
+        return pd.DataFrame({
+            "Rank": self._rank,
+            "Code": self.codes[rows],
+            "CompanyName": self.company[rows],
+            "Score_up": self._score[rows],
+        }).sort_values("Rank").reset_index(drop=True)
+
+    def update(self, **market: float) -> pd.DataFrame:
+        """市場項を差し替えて上位銘柄を返す。
+
+        Args:
+            **market: ``MARKET_FACTORS`` の列名 → 新しい値（全銘柄共通のスカラー）
+
+        Returns:
+            pd.DataFrame: ``result`` と同じ
+        """
+        unknown = set(market) - set(MARKET_FACTORS)
+        if unknown:
+            raise ValueError(f"未知の市場項です: {', '.join(sorted(unknown))} "
+                             f"(choices: {', '.join(MARKET_FACTORS)})")
+        market = {**self.market, **{k: float(v) for k, v in market.items()}}
+        self.updates += 1
+        if market == self.market:
+            return self.result
+        self.market = market
+        score = combine_parts(self.parts, market)
+        if self._same_ranking(score):
+            self._score = score
+        else:
+            self.reranks += 1
+            self._select(score)
+            self.logger.debug("Score_up 再選択: %s", market)
+        return self.result
+
+    # ------------------------------------------------------------------
+
+    def _select(self, score: np.ndarray) -> None:
+        """全件から上位を選び直す（``score_up`` と同じ手順）。"""
+        scored = np.flatnonzero(~np.isnan(score))
+        idx, rank = top_k(score[scored], self.top_n)
+        rows = scored[idx]
+        self._score = score
+        self._n_scored = len(scored)
+        self._rows = rows
+        self._rank = rank
+        self._outside = ~np.isnan(score)
+        self._outside[rows] = False
+
+    def _same_ranking(self, score: np.ndarray) -> bool:
+        """掛け直したスコアでも保持中の上位銘柄・並び・順位がそのままか。"""
+        if np.count_nonzero(~np.isnan(score)) != self._n_scored:
+            return False
+        top = score[self._rows]
+        if np.isnan(top).any() or (np.diff(top) > 0).any():
+            return False
+        if not np.array_equal(top[1:] == top[:-1], self._rank[1:] == self._rank[:-1]):   # 同点の組
+            return False
+        outside = score[self._outside & ~np.isnan(score)]
+        return not (len(outside) and len(top) and outside.max() >= top[-1])
+
+
+def _uniform(name: str, values: np.ndarray) -> float:
+    """市場項の列が 1 日の中で一様であることを確かめてスカラーにする（空・全欠損は NaN）。"""
+    values = np.asarray(values, dtype=np.float64)
+    finite = values[~np.isnan(values)]
+    if len(finite) and (len(finite) != len(values) or (finite != finite[0]).any()):
+        raise ValueError(f"市場項 {name} が銘柄ごとに異なります（最新営業日で一様な値が必要です）")
+    return float(finite[0]) if len(finite) else float("nan")
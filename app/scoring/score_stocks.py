@@ -1,7 +1,14 @@
 import pandas as pd
-import numpy as np
 import re
 from logging import Logger
+from app.scoring.ranking import top_k
+from app.utils.kernels import true_range
+
+SCORE_COLS = ["Rank", "Code", "CompanyName", "Score"]
+# Score = AtrAvg × VolAvg × RangeRatio の構成要素（出力用）
+COMPONENT_COLS = ["Date", "Close", "RangeRatio", "AtrAvg", "VolAvg"]
+# フィルタに使う上場情報の列（API の上場情報にも Date 列があるため必要な列だけを結合する）
+INFO_COLS = ["Code", "CompanyName", "MarketCode", "MarginCode"]
 
 def normalize(code: str) -> str:
     """
@@ -17,17 +24,20 @@ def normalize(code: str) -> str:
     digits = ''.join(re.findall(r'\d', str(code)))
     return digits[:4] if len(digits) >= 4 else ''
 
-def score_stocks(quotes_df: pd.DataFrame, info_df: pd.DataFrame, logger: Logger) -> pd.DataFrame:
+def score_components(quotes_df: pd.DataFrame, logger: Logger) -> pd.DataFrame:
     """
-    銘柄の株価情報と上場情報を用いてスコアを計算し、ランキングする。
+    株価情報だけから最新営業日の候補銘柄とスコアの構成要素を計算する（上場情報に依存しない部分）。
+
+    大引け後に計算して保存しておけば、寄り前は ``rank_candidates`` だけで済む
+    （``app/scoring/premarket.py`` 参照）。
 
     Args:
         quotes_df (pd.DataFrame): 6営業日分の株価四本値データ。
-        info_df (pd.DataFrame): 最新の上場銘柄情報。
         logger (Logger): ロガーインスタンス。
 
     Returns:
-        pd.DataFrame: Rank, Code, CompanyName, Score を含むスコアリング結果（上位40件）。
+        pd.DataFrame: 最新営業日の候補（価格フィルタ通過銘柄）。株価の列に加え
+        RangeRatio, AtrAvg, VolAvg, Score を持つ。
     """
     # 日付型に変換
     quotes_df["Date"] = pd.to_datetime(quotes_df["Date"]).dt.date
@@ -44,9 +54,47 @@ def score_stocks(quotes_df: pd.DataFrame, info_df: pd.DataFrame, logger: Logger)
 
     # 株価レンジフィルタ（1000〜3000円）
     latest_df = latest_df[(latest_df["Close"] >= 1000) & (latest_df["Close"] <= 3000)]
+    logger.info("価格フィルタ通過銘柄数: %d", len(latest_df))
+
+    # 値幅率 = (High - Low) / Low（最新日）
+    latest_df["RangeRatio"] = (latest_df["High"] - latest_df["Low"]) / latest_df["Low"]
+
+    # TR計算のために quotes_df をソート
+    quotes_df = quotes_df.sort_values(["Code", "Date"]).copy()
+    quotes_df["PrevClose"] = quotes_df.groupby("Code")["Close"].shift(1)
+
+    # TR = max(High - Low, abs(High - PrevClose), abs(Low - PrevClose))
+    quotes_df["TR"] = true_range(quotes_df["High"], quotes_df["Low"], quotes_df["PrevClose"])
+
+    # 5日分のTR平均を銘柄ごとに計算
+    atr_df = quotes_df.groupby("Code").tail(5).groupby("Code")["TR"].mean()
+    vol_df = quotes_df.groupby("Code").tail(5).groupby("Code")["Volume"].mean()
+
+    # スコア計算用にマッピング
+    latest_df["AtrAvg"] = latest_df["Code"].map(atr_df)
+    latest_df["VolAvg"] = latest_df["Code"].map(vol_df)
+    latest_df = latest_df.dropna(subset=["AtrAvg", "VolAvg", "RangeRatio"])
+    latest_df["Score"] = latest_df["AtrAvg"] * latest_df["VolAvg"] * latest_df["RangeRatio"]
+    return latest_df
+
+
+def rank_candidates(candidates: pd.DataFrame, info_df: pd.DataFrame, logger: Logger,
+                    components: bool = False, top_n: int = 40) -> pd.DataFrame:
+    """
+    ``score_components`` の候補に上場情報のフィルタをかけて上位銘柄を選ぶ。
+
+    Args:
+        candidates (pd.DataFrame): ``score_components`` の結果。
+        info_df (pd.DataFrame): 最新の上場銘柄情報。
+        logger (Logger): ロガーインスタンス。
+        components (bool): True の場合はスコアの構成要素（COMPONENT_COLS）の列も返す。
+        top_n (int): 選ぶ銘柄数。
 
+    Returns:
+        pd.DataFrame: Rank, Code, CompanyName, Score を含むスコアリング結果（上位 top_n 件）。
+    """
     # 上場銘柄とマージ
-    merged = pd.merge(latest_df, info_df, on="Code", how="inner")
+    merged = pd.merge(candidates, info_df[INFO_COLS], on="Code", how="inner")
 
     # 信用銘柄 & 東証上場フィルタ
     merged = merged[merged["MarginCode"].isin(["1", "2"])]
@@ -70,39 +118,31 @@ def score_stocks(quotes_df: pd.DataFrame, info_df: pd.DataFrame, logger: Logger)
 
     merged = merged[~(is_etf_etn | is_reit)].copy()
 
-    logger.info(f"フィルタ通過銘柄数: {len(merged)}")
-
-    # 値幅率 = (High - Low) / Low（最新日）
-    merged["RangeRatio"] = (merged["High"] - merged["Low"]) / merged["Low"]
+    logger.info("フィルタ通過銘柄数: %d", len(merged))
 
-    # TR計算のために quotes_df をソート
-    quotes_df = quotes_df.sort_values(["Code", "Date"]).copy()
-    quotes_df["PrevClose"] = quotes_df.groupby("Code")["Close"].shift(1)
+    # ランク付け & 上位40件のみ抽出（全件ソートせず部分選択）
+    idx, rank = top_k(merged["Score"].to_numpy(), top_n)
+    top40 = merged.iloc[idx].assign(Rank=rank)
 
-    # TR = max(High - Low, abs(High - PrevClose), abs(Low - PrevClose))
-    quotes_df["TR"] = quotes_df.apply(
-        lambda row: max(
-            row["High"] - row["Low"],
-            abs(row["High"] - row["PrevClose"]),
-            abs(row["Low"] - row["PrevClose"])
-        ) if pd.notnull(row["PrevClose"]) else np.nan,
-        axis=1
-    )
+    cols = SCORE_COLS + COMPONENT_COLS if components else SCORE_COLS
+    return top40[cols].sort_values("Rank")
 
-    # 5日分のTR平均を銘柄ごとに計算
-    atr_df = quotes_df.groupby("Code").tail(5).groupby("Code")["TR"].mean()
-    vol_df = quotes_df.groupby("Code").tail(5).groupby("Code")["Volume"].mean()
 
-    # スコア計算用にマッピング
-    merged["AtrAvg"] = merged["Code"].map(atr_df)
-    merged["VolAvg"] = merged["Code"].map(vol_df)
-    merged = merged.dropna(subset=["AtrAvg", "VolAvg", "RangeRatio"])
-    merged["Score"] = merged["AtrAvg"] * merged["VolAvg"] * merged["RangeRatio"]
+def score_stocks(quotes_df: pd.DataFrame, info_df: pd.DataFrame, logger: Logger,
+                 components: bool = False) -> pd.DataFrame:
+    """
+    銘柄の株価情報と上場情報を用いてスコアを計算し、ランキングする。
 
-    # ランク付け
-    merged["Rank"] = merged["Score"].rank(method="min", ascending=False).astype(int)
+    ``score_components``（株価のみ）→ ``rank_candidates``（上場情報のフィルタ + 上位 40 件）。
 
-    # 上位40件のみ抽出
-    top40 = merged.nsmallest(40, "Rank")
+    Args:
+        quotes_df (pd.DataFrame): 6営業日分の株価四本値データ。
+        info_df (pd.DataFrame): 最新の上場銘柄情報。
+        logger (Logger): ロガーインスタンス。
+        components (bool): True の場合はスコアの構成要素（COMPONENT_COLS）の列も返す。
 
-    return top40[["Rank", "Code", "CompanyName", "Score"]].sort_values("Rank")
+    Returns:
+        pd.DataFrame: Rank, Code, CompanyName, Score を含むスコアリング結果（上位40件）。
+    """
+    candidates = score_components(quotes_df, logger)
+    return rank_candidates(candidates, info_df, logger, components=components)
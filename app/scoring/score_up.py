@@ -8,17 +8,27 @@ Score_up スコアリングロジック（新順張り指標）。
 - パラメータ (a,b,c,d, TopN) は関数引数で上書き可能。
 
 戻り値は Rank, Code, CompanyName, Score_up を含む DataFrame。
+
+``score_up_values`` は同じ式を複数日分の行にまとめて適用し、行ごとのスコア配列を返す
+（バックテストはこれと ``ranking.top_k_batch`` で全営業日を一括評価する）。
+上場銘柄一覧の Code は一意である前提（重複時は先頭行を使う）。
+
+式は銘柄ごとの項（``score_up_parts``）と全銘柄に共通の市場項（``MARKET_FACTORS``、
+現在は NK225_gap）に分けて持ち、``combine_parts`` で元の式と同じ順に掛け合わせる
+（寄り前の再計算は ``app/scoring/rescore.py`` が銘柄ごとの項を保持して市場項だけを差し替える）。
 """
 
 from __future__ import annotations
 
 import re
-from typing import Tuple
+from dataclasses import dataclass
+from typing import Callable, Mapping, Optional, Tuple
 import pandas as pd
 import numpy as np
 from logging import Logger
 
 from app.utils.filters import keep_tse_sections
+from app.scoring.ranking import top_k
 
 # ----------------------------------------------------------------------
 # ヘルパ
@@ -33,6 +43,136 @@ def _normalize(code: str) -> str:
 PAT_ETF = re.compile(r"^(1[3-8]\d{2}|15\d{2}|20\d{2}|2[5-9]\d{2})$")
 PAT_REIT = re.compile(r"^(3\d{3}|8\d{3}|92\d{2}|34[5-9]\d)$")
 
+def eligible_names(info_df: pd.DataFrame) -> pd.Series:
+    """スコア対象銘柄（東証 3 市場、ETF/ETN・J-REIT 除外）の Code → CompanyName。"""
+    # ---------------- 上場区分フィルタ ---------------- #
+    info = keep_tse_sections(info_df).drop_duplicates("Code")
+
+    # ETF / ETN / REIT 除外
+    code4 = info["Code"].apply(_normalize)
+    is_etf = code4.str.match(PAT_ETF, na=False) | info["CompanyName"].str.contains(r"ETF|ETN", case=False, na=False)
+    is_reit = code4.str.match(PAT_REIT, na=False) & info["CompanyName"].str.contains("投資法人", na=False)
+
+    return info.loc[~(is_etf | is_reit)].set_index("Code")["CompanyName"]
+
+
+def nk225_factor(gap):
+    """日経225F ギャップの乗数（±2% でクリップ）。"""
+    return 1 + np.clip(gap, -0.02, 0.02)
+
+
+# 市場全体の入力（列名）→ 乗数。同じ日の全銘柄に同じ値が入る
+MARKET_FACTORS: dict[str, Callable] = {
+    "NK225_gap": nk225_factor,
+}
+
+
+@dataclass
+class ScoreParts:
+    """Score_up の行ごとの項（``combine_parts`` で掛け合わせる）。"""
+
+    base: np.ndarray            # 出来高・ボラ・レンジ・陽線の項の積
+    momentum: np.ndarray        # max(0, Momentum_3) ** c
+    pullup: np.ndarray          # (PullUp ** 1.5) ** d
+    in_universe: np.ndarray     # スコア対象銘柄か
+    market: dict                # MARKET_FACTORS の列 → 行ごとの値
+
+
+def score_up_parts(
+    df: pd.DataFrame,
+    info_df: pd.DataFrame,
+    params: Tuple[float, float, float, float] = (1.0, 1.0, 1.0, 1.0),
+    day: Optional[np.ndarray] = None,
+    names: Optional[pd.Series] = None,
+) -> ScoreParts:
+    """``df`` の各行の Score_up を銘柄ごとの項と市場項に分けて返す（引数は ``score_up_values`` と同じ）。"""
+    a, b, c, d = params
+    if names is None:
+        names = eligible_names(info_df)
+    in_universe = df["Code"].isin(names.index).to_numpy()
+
+    col = {k: df[k].to_numpy() for k in
+           ["Close", "MA_5", "ATR_3", "ATR_10", "Range_yesterday"]}
+
+    # NaN を 0 に
+    needed_cols = ["Vol_5", "Vol_20", "ATR_5", "ATR_20", "Momentum_3", "PullUp"]
+    for k in needed_cols:
+        v = df[k].to_numpy()
+        col[k] = np.where(np.isnan(v), 0, v)
+
+    # --- 10 % 急騰・急落を除外（同じ日に同じ銘柄が複数行ある場合のみ前行比が出る） ---
+    if day is None:
+        keys = [df["Code"]]
+        dup = df["Code"].duplicated().any()
+    else:
+        keys = [pd.Series(day, index=df.index), df["Code"]]
+        dup = pd.concat(keys, axis=1).duplicated().any()
+    if dup:
+        one_day_ret = df["Close"].groupby(keys).pct_change(fill_method=None).to_numpy()
+        spike = np.abs(one_day_ret) >= 0.10   # ±10 % 以上
+        for k in needed_cols:
+            col[k] = np.where(spike, 0, col[k])
+    # ------------------------------
+
+    mom3_pos = np.clip(col["Momentum_3"], 0, None)
+
+    with np.errstate(all="ignore"):
+        base = (
+            (col["Vol_5"] / col["Vol_20"]) *                          # 出来高異常
+            (col["ATR_5"] / col["ATR_20"]) *                          # ボラ異常
+            (1 / np.log1p(1 + col["Range_yesterday"])**2.2) *         # 花火を圧縮
+            np.clip(col["ATR_3"] / col["ATR_10"], 0.5, 3)**1.6 *      # 連日ボラ加点
+            (1 + (col["Close"] > col["MA_5"]).astype(int))            # 当日陽線で 2 倍
+        )
+        momentum = mom3_pos ** c                                      # c・d 係数はそのまま
+        pullup = (col["PullUp"] ** 1.5) ** d
+    return ScoreParts(base, momentum, pullup, in_universe,
+                      {k: df[k].to_numpy() for k in MARKET_FACTORS})
+
+
+def combine_parts(parts: ScoreParts, market: Optional[Mapping[str, object]] = None) -> np.ndarray:
+    """項を元の式の順に掛け合わせる（対象外・計算不能な行は NaN）。
+
+    Args:
+        parts: ``score_up_parts`` の結果
+        market: 市場項の差し替え（列名 → スカラーまたは行ごとの値）。無い列は ``parts.market`` の値
+
+    Returns:
+        np.ndarray: 行ごとのスコア
+    """
+    market = {**parts.market, **(market or {})}
+    with np.errstate(all="ignore"):
+        score = parts.base
+        for name, factor in MARKET_FACTORS.items():
+            score = score * factor(market[name])                      # 日経225F ギャップ等
+        score = score * parts.momentum * parts.pullup
+    score = np.array(np.broadcast_to(score, parts.base.shape), dtype=np.float64)
+    score[~(np.isfinite(score) & parts.in_universe)] = np.nan
+    return score
+
+
+def score_up_values(
+    df: pd.DataFrame,
+    info_df: pd.DataFrame,
+    params: Tuple[float, float, float, float] = (1.0, 1.0, 1.0, 1.0),
+    day: Optional[np.ndarray] = None,
+    names: Optional[pd.Series] = None,
+) -> np.ndarray:
+    """``df`` の各行の Score_up を返す（対象外・計算不能な行は NaN）。
+
+    Args:
+        df: OHLCV + 派生指標の行（1 日分または複数日分）
+        info_df: 上場銘柄一覧 DataFrame
+        params: (a,b,c,d) 係数タプル
+        day: 行ごとの日（区間）キー。None なら全行を 1 日分として扱う
+        names: ``eligible_names(info_df)`` の計算済み結果（繰り返し呼ぶ場合の省略用）
+
+    Returns:
+        np.ndarray: ``len(df)`` のスコア
+    """
+    return combine_parts(score_up_parts(df, info_df, params, day=day, names=names))
+
+
 # ----------------------------------------------------------------------
 # メイン API
 # ----------------------------------------------------------------------
@@ -43,6 +183,7 @@ def score_up(
     logger: Logger,
     params: Tuple[float, float, float, float] = (1.0, 1.0, 1.0, 1.0),
     top_n: int = 40,
+    names: Optional[pd.Series] = None,
 ) -> pd.DataFrame:
     """Score_up を計算し TopN 銘柄を返す。
 
@@ -52,67 +193,33 @@ def score_up(
         logger: ロガー
         params: (a,b,c,d) 係数タプル
         top_n: 抽出銘柄数
+        names: ``eligible_names(info_df)`` の計算済み結果（繰り返し呼ぶ場合の省略用）
 
     Returns:
         DataFrame: Rank, Code, CompanyName, Score_up
     """
-
-    a, b, c, d = params
-
-    # ---------------- 上場区分フィルタ ---------------- #
-    info_df = keep_tse_sections(info_df)
-
     # 最新営業日を取得
     latest_day = df["Date"].max()
-    latest = df[df["Date"] == latest_day].copy()
-
-    # マージ
-    merged = pd.merge(latest, info_df, on="Code", how="inner")
-
-    # ETF / ETN / REIT 除外
-    merged["Code4"] = merged["Code"].apply(_normalize)
-
-    is_etf = merged["Code4"].str.match(PAT_ETF, na=False) | merged["CompanyName"].str.contains(r"ETF|ETN", case=False, na=False)
-    is_reit = merged["Code4"].str.match(PAT_REIT, na=False) & merged["CompanyName"].str.contains("投資法人", na=False)
+    latest = df[df["Date"] == latest_day]
 
-    merged = merged[~(is_etf | is_reit)].copy()
-
-    # NaN を落とす
-    needed_cols = ["Vol_5", "Vol_20", "ATR_5", "ATR_20", "Momentum_3", "PullUp"]
-    merged[needed_cols] = merged[needed_cols].fillna(0)
-
-    # --- 追加ここから ---
-    merged["Momentum_3_pos"] = merged["Momentum_3"].clip(lower=0)
-    # --- 追加ここまで ---
-
-    # --- 10 % 急騰・急落を除外 ---
-    merged["OneDayRet"] = (
-        merged.groupby("Code")["Close"].pct_change(fill_method=None)
-    )
-    spike_mask = merged["OneDayRet"].abs() >= 0.10   # ±10 % 以上
-    merged.loc[spike_mask, needed_cols] = 0
-    # ------------------------------
-    
-    # スコア計算
-    merged["Score_up"] = (
-    (merged["Vol_5"] / merged["Vol_20"]) *                    # 出来高異常
-    (merged["ATR_5"] / merged["ATR_20"]) *                    # ボラ異常
-    (1 / np.log1p(1 + merged["Range_yesterday"])**2.2) *      # 花火を圧縮
-    (merged["ATR_3"] / merged["ATR_10"]).clip(0.5, 3)**1.6 *  # 連日ボラ加点
-    (1 + (merged["Close"] > merged["MA_5"]).astype(int)) *    # 当日陽線で 2 倍
-    (1 + merged["NK225_gap"].clip(-0.02, 0.02)) *             # 日経225F ギャップ（±2% でクリップ）
-    (merged["Momentum_3_pos"]) ** c *                         # c・d 係数はそのまま
-    (merged["PullUp"] ** 1.5) ** d
-    )
-
-    merged = merged.replace([np.inf, -np.inf], np.nan).dropna(subset=["Score_up"])
+    if names is None:
+        names = eligible_names(info_df)
+    score = score_up_values(latest, info_df, params, names=names)
+    scored = np.flatnonzero(~np.isnan(score))
 
     # ランク付け
-    merged["Rank"] = merged["Score_up"].rank(method="min", ascending=False).astype(int)
-    top = merged.nsmallest(top_n, "Rank")
+    idx, rank = top_k(score[scored], top_n)
+    rows = scored[idx]
+    codes = latest["Code"].to_numpy()[rows]
+    top = pd.DataFrame({
+        "Rank": rank,
+        "Code": codes,
+        "CompanyName": names.reindex(codes).to_numpy(),
+        "Score_up": score[rows],
+    })
 
     logger.debug(
-    "Score_up 完了: %d → 上位%d件", len(merged), len(top)
+    "Score_up 完了: %d → 上位%d件", len(scored), len(top)
     )
-    
-    return top[["Rank", "Code", "CompanyName", "Score_up"]].sort_values("Rank").reset_index(drop=True)
+
+    return top.sort_values("Rank").reset_index(drop=True)
@@ -0,0 +1,206 @@
+"""app/utils/kernels.py
+
+派生指標・スコアリングのホットループ用カーネル（連続配列に対する NumPy / Numba 実装）。
+
+- ``group_order(codes)``: 銘柄ごとに連続する並び（安定ソート）と各区間の先頭位置
+- ``rolling_mean(values, starts, window, min_periods)``: 区間（銘柄）ごとの移動平均。
+  ``groupby("Code").rolling(window).mean()`` と同じ値を返す
+- ``true_range(high, low, prev_close)``: TR = max(H-L, |H-前日終値|, |L-前日終値|)
+
+上位 N 件の選択は ``app/scoring/ranking.py`` を参照。
+
+Numba（任意依存、CPU のみ）が入っていれば ``rolling_mean`` を JIT 版で実行する。
+JIT 版は pandas と同じ補償付き加減算（Kahan）で窓をずらすため結果はビット一致、
+NumPy 版は窓内を直接合計するので丸め誤差の範囲（相対 1e-12 程度）で一致する。
+``USE_NUMBA = False`` にすると Numba があっても NumPy 版を使う。
+Numba の import（約 0.2 s）と JIT は ``rolling_mean`` の初回呼び出しまで遅らせる
+（``score_stocks`` の寄り前経路などは ``true_range`` しか使わないため）。
+
+    (venv) pip install numba      # 任意。無くても NumPy 版で動く
+"""
+
+from __future__ import annotations
+
+import importlib.util
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+__all__ = [
+    "HAVE_NUMBA",
+    "USE_NUMBA",
+    "group_order",
+    "rolling_mean",
+    "true_range",
+]
+
+HAVE_NUMBA = importlib.util.find_spec("numba") is not None      # 任意依存
+USE_NUMBA = HAVE_NUMBA
+
+
+# ----------------------------------------------------------------------
+# 区間（銘柄）
+# ----------------------------------------------------------------------
+
+def group_order(codes) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """銘柄ごとに行を連続させる並びを返す。
+
+    元の行順を保つ安定ソートなので、各銘柄の行が日付順なら並べ替え後も日付順。
+
+    Args:
+        codes: 行ごとの銘柄コード（欠損可）
+
+    Returns:
+        tuple: (order, starts, valid)
+            order: 並べ替え後の i 行目が元の何行目か
+            starts: 並べ替え後の各銘柄区間の先頭位置
+            valid: 並べ替え後の行の銘柄コードが欠損でないか（groupby は欠損キーを落とす）
+    """
+    keys, _ = pd.factorize(np.asarray(codes, dtype=object))
+    order = np.argsort(keys, kind="stable")
+    sorted_keys = keys[order]
+    starts = np.flatnonzero(np.r_[True, sorted_keys[1:] != sorted_keys[:-1]]) if len(keys) else \
+        np.empty(0, dtype=np.int64)
+    return order, starts, sorted_keys >= 0
+
+
+# ----------------------------------------------------------------------
+# 区間ごとの移動平均
+# ----------------------------------------------------------------------
+
+def _rolling_mean_numpy(values: np.ndarray, starts: np.ndarray, window: int, min_periods: int) -> np.ndarray:
+    # 区間を行、区間内の位置を列にした 2 次元配列（先頭に window-1 列の欠損を足す）に並べ、
+    # 列方向の sliding window で合計と非欠損数を数える
+    n = len(values)
+    lengths = np.diff(np.r_[starts, n])
+    seg = np.repeat(np.arange(len(starts)), lengths)
+    col = np.arange(n) - np.repeat(starts, lengths) + window - 1
+
+    filled = np.zeros((len(starts), lengths.max() + window - 1))
+    count = np.zeros(filled.shape)
+    finite = ~np.isnan(values)
+    filled[seg[finite], col[finite]] = values[finite]
+    count[seg[finite], col[finite]] = 1.0
+
+    view = np.lib.stride_tricks.sliding_window_view
+    total = view(filled, window, axis=1).sum(axis=2)[seg, col - window + 1]
+    nobs = view(count, window, axis=1).sum(axis=2)[seg, col - window + 1]
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        out = total / nobs
+    out[(nobs < min_periods) | (nobs == 0)] = np.nan
+    return out
+
+
+def _rolling_mean_loop(values, starts, window, min_periods, out):
+    """pandas の roll_mean と同じ順序・同じ補償加算で窓をずらす（Numba で JIT）。"""
+    n = len(values)
+    n_seg = len(starts)
+    for g in range(n_seg):
+        s0 = starts[g]
+        e0 = starts[g + 1] if g + 1 < n_seg else n
+        sum_x = 0.0
+        comp_add = 0.0
+        comp_rem = 0.0
+        nobs = 0
+        neg_ct = 0
+        same = 0
+        prev = np.nan
+        for i in range(s0, e0):
+            # 窓から外れる値を先に引く（pandas と同じ順序）
+            j = i - window
+            if j >= s0:
+                val = values[j]
+                if val == val:
+                    nobs -= 1
+                    y = -val - comp_rem
+                    t = sum_x + y
+                    comp_rem = t - sum_x - y
+                    sum_x = t
+                    if np.signbit(val):
+                        neg_ct -= 1
+            val = values[i]
+            if val == val:
+                nobs += 1
+                y = val - comp_add
+                t = sum_x + y
+                comp_add = t - sum_x - y
+                sum_x = t
+                if np.signbit(val):
+                    neg_ct += 1
+                if val == prev:
+                    same += 1
+                else:
+                    same = 1
+                prev = val
+            if nobs >= min_periods and nobs > 0:
+                res = sum_x / nobs
+                if same >= nobs:
+                    res = prev
+                elif neg_ct == 0 and res < 0:
+                    res = 0.0
+                elif neg_ct == nobs and res > 0:
+                    res = 0.0
+                out[i] = res
+            else:
+                out[i] = np.nan
+
+
+_jit_loop = None
+
+
+def _rolling_mean_numba(values: np.ndarray, starts: np.ndarray, window: int, min_periods: int) -> np.ndarray:
+    global _jit_loop
+    if _jit_loop is None:
+        import numba
+        _jit_loop = numba.njit(cache=True, nogil=True)(_rolling_mean_loop)
+    out = np.empty(len(values))
+    _jit_loop(values, starts.astype(np.int64), window, min_periods, out)
+    return out
+
+
+def rolling_mean(
+    values: np.ndarray,
+    starts: np.ndarray,
+    window: int,
+    min_periods: Optional[int] = None,
+) -> np.ndarray:
+    """区間ごとの移動平均（区間をまたがない）。
+
+    Args:
+        values: 区間ごとに連続した値（float64 に変換して計算）
+        starts: 各区間の先頭位置（``group_order`` の戻り値）
+        window: 窓幅
+        min_periods: 必要な非欠損数。None なら ``window``
+
+    Returns:
+        np.ndarray: ``values`` と同じ長さの float64 配列
+    """
+    values = np.ascontiguousarray(values, dtype=np.float64)
+    min_periods = window if min_periods is None else min_periods
+    if not len(values):
+        return np.empty(0)
+    if USE_NUMBA and HAVE_NUMBA:
+        return _rolling_mean_numba(values, starts, window, min_periods)
+    return _rolling_mean_numpy(values, starts, window, min_periods)
+
+
+# ----------------------------------------------------------------------
+# True Range
+# ----------------------------------------------------------------------
+
+def true_range(high: np.ndarray, low: np.ndarray, prev_close: np.ndarray) -> np.ndarray:
+    """TR = max(H-L, |H-前日終値|, |L-前日終値|)。前日終値が欠損なら NaN。
+
+    組み込み ``max`` を行ごとに呼んだ場合と同じく、先頭の候補から順に
+    「より大きければ置き換える」ため、欠損の扱いも行ごとの ``max`` と一致する。
+    """
+    high = np.asarray(high, dtype=np.float64)
+    low = np.asarray(low, dtype=np.float64)
+    prev_close = np.asarray(prev_close, dtype=np.float64)
+    tr = high - low
+    for cand in (np.abs(high - prev_close), np.abs(low - prev_close)):
+        tr = np.where(cand > tr, cand, tr)
+    tr[np.isnan(prev_close)] = np.nan
+    return tr
@@ -0,0 +1,53 @@
+import io
+import logging
+import numpy as np
+import pandas as pd
+import pytest
+from app.backtest.add_derived_cols import add_derived_cols, derive_chunked
+from app.bench.synthetic import make_price_df
+
+RAW_COLS = ["Date", "Code", "Open", "High", "Low", "Close", "Volume"]
+
+
+@pytest.fixture
+def raw_csv(tmp_path, monkeypatch):
+    # NK225_CSV は相対パスなので、空の作業ディレクトリで実行して NaN 列に固定する
+    monkeypatch.chdir(tmp_path)
+    df = make_price_df(23, 40, seed=5)[RAW_COLS]
+    df["Date"] = df["Date"].dt.strftime("%Y-%m-%d")
+    path = tmp_path / "price_ohlcv.csv"
+    df.to_csv(path, index=False)
+    return path
+
+
+def _by_code(df: pd.DataFrame) -> pd.DataFrame:
+    return df.sort_values(["Code", "Date"]).reset_index(drop=True)
+
+
+def test_windows_do_not_cross_codes(raw_csv):
+    raw = pd.read_csv(raw_csv, dtype={"Code": "str"})      # 日付優先の並び
+    out = add_derived_cols(raw)
+    for _, g in out.groupby("Code"):
+        assert g["ATR_5"].iloc[:4].isna().all()
+        assert g["Momentum_2"].iloc[:2].isna().all()
+        assert np.isnan(g["PullUp"].iloc[0])
+
+    one = raw[raw["Code"] == raw["Code"].iloc[7]]
+    alone = add_derived_cols(one).reset_index(drop=True)
+    mixed = out[out["Code"] == one["Code"].iloc[0]].reset_index(drop=True)
+    pd.testing.assert_frame_equal(alone, mixed)
+
+
+@pytest.mark.parametrize("n_jobs", [1, 2])
+def test_chunked_matches_in_memory(raw_csv, tmp_path, n_jobs):
+    expected = add_derived_cols(pd.read_csv(raw_csv, dtype={"Code": "str"}))
+    out_csv = tmp_path / "derived.csv"
+    rows = derive_chunked(logging.getLogger("test_derive"), raw_csv, out_csv,
+                          partition_codes=5, n_jobs=n_jobs)
+
+    got = pd.read_csv(out_csv, dtype={"Code": "str"})
+    assert rows == len(expected) == len(got)
+    assert got["Code"].is_monotonic_increasing                  # 銘柄ごとに連続
+    pd.testing.assert_frame_equal(_by_code(got), _by_code(
+        pd.read_csv(io.StringIO(expected.to_csv(index=False)), dtype={"Code": "str"})))
+    assert [p.name for p in tmp_path.iterdir() if p.name.startswith(".derive_")] == []
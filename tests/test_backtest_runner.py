@@ -0,0 +1,104 @@
+import logging
+import numpy as np
+import pandas as pd
+import pytest
+import app.backtest.backtest_runner as runner
+from app.backtest.backtest_runner import (
+    run_backtest,
+    run_backtest_topn,
+    select_trade_days,
+    simulate_backtest,
+)
+from app.backtest.execution import ExecutionConfig
+from app.bench.run_bench import BenchContext
+
+
+@pytest.fixture(scope="module")
+def market():
+    ctx = BenchContext(150, 160, 0, logging.getLogger("test_backtest_runner"))
+    return ctx.derived, ctx.info
+
+
+def test_select_trade_days():
+    days = pd.bdate_range("2024-01-01", periods=50).to_numpy()
+    assert select_trade_days(days, horizon=10, warmup=5) == list(days[-10:])
+    assert select_trade_days(days, horizon=None, warmup=5) == list(days[5:])
+    assert select_trade_days(days, horizon=None, warmup=0)[0] == days[1]     # 初日は前日がない
+    got = select_trade_days(days, horizon=None, warmup=20, start="2024-01-02", end="2024-02-02")
+    assert got[0] == days[20] and got[-1] == np.datetime64("2024-02-02")
+    assert select_trade_days(days, horizon=3, start="2024-01-15", end="2024-01-31") \
+        == list(days[(days >= np.datetime64("2024-01-29")) & (days <= np.datetime64("2024-01-31"))])
+
+
+def test_days_are_independent(market):
+    price_df, info_df = market
+    full = run_backtest(price_df, info_df, horizon=None)
+    assert len(full) == 160 - runner.WARMUP_DAYS
+    assert full["Ret"].notna().all()
+
+    # 期間を分けて実行しても同じ日次リターン（日ごとに独立 = 日数に比例）
+    mid = full["Date"].iloc[len(full) // 2]
+    first = run_backtest(price_df, info_df, horizon=None, end=mid)
+    second = run_backtest(price_df, info_df, horizon=None, start=mid + pd.Timedelta(days=1))
+    pd.testing.assert_frame_equal(pd.concat([first, second], ignore_index=True), full)
+
+    tail = run_backtest(price_df, info_df)                   # 既定は直近 90 営業日
+    pd.testing.assert_frame_equal(tail, full.iloc[-90:].reset_index(drop=True))
+
+
+def test_parallel_day_chunks(market, monkeypatch):
+    price_df, info_df = market
+    monkeypatch.setattr(runner, "DAY_CHUNK", 25)
+    serial = run_backtest(price_df, info_df, horizon=None)
+    parallel = run_backtest(price_df, info_df, horizon=None, n_jobs=2)
+    pd.testing.assert_frame_equal(serial, parallel)
+
+
+def test_trades_match_daily(market):
+    price_df, info_df = market
+    res = simulate_backtest(price_df, info_df, top_n=10, horizon=30)
+    pd.testing.assert_frame_equal(res.daily[["Date", "Ret"]],
+                                  run_backtest(price_df, info_df, top_n=10, horizon=30))
+    # 等金額: 約定ごとのリターンの日平均 − コスト
+    per_day = res.trades.groupby("Date")["Ret"].mean() - 0.0005
+    np.testing.assert_allclose(per_day.round(4).to_numpy(), res.daily["Ret"].to_numpy())
+
+    # 前日終値から判定した値幅制限は約定から外れる
+    capped = price_df.copy()
+    day = res.daily["Date"].iloc[-1]
+    code = res.trades.loc[res.trades["Date"] == day, "Code"].iloc[0]
+    row = (capped["Date"] == day) & (capped["Code"] == code)
+    capped.loc[row, "Open"] = capped.loc[row, "Open"] * 10
+    blocked = simulate_backtest(capped, info_df, top_n=10, horizon=30,
+                                execution=ExecutionConfig(block_limits=True))
+    assert blocked.daily["Blocked"].tolist() == [0] * 29 + [1]
+
+
+def test_topn_matrix_matches_single_runs(market):
+    price_df, info_df = market
+    rets = run_backtest_topn(price_df, info_df, top_ns=[1, 5, 12, 40, 500], horizon=40)
+    assert rets.shape == (40, 5)
+    for n in rets.columns:
+        single = run_backtest(price_df, info_df, top_n=n, horizon=40)
+        np.testing.assert_allclose(rets[n].to_numpy(), single["Ret"].to_numpy(), atol=1e-4)
+        assert (rets.index == single["Date"]).all()
+
+
+def test_topn_turnover_matches_simulate(market):
+    price_df, info_df = market
+    rets, turn = run_backtest_topn(price_df, info_df, top_ns=[5, 10], horizon=30, with_turnover=True)
+    assert turn.shape == rets.shape and turn.iloc[0].isna().all()
+    daily = simulate_backtest(price_df, info_df, top_n=10, horizon=30).daily
+    # 前日・当日とも全銘柄に価格があれば等金額の保有比率どうしの回転率と一致
+    full = (daily["Trades"] == 10).to_numpy()
+    both = np.flatnonzero(full[1:] & full[:-1]) + 1
+    assert len(both) > 10
+    np.testing.assert_allclose(turn[10].to_numpy()[both], daily["Turnover"].to_numpy()[both])
+
+
+def test_parallel_turnover_crosses_chunks(market, monkeypatch):
+    price_df, info_df = market
+    monkeypatch.setattr(runner, "DAY_CHUNK", 25)
+    serial = simulate_backtest(price_df, info_df, horizon=None).daily
+    parallel = simulate_backtest(price_df, info_df, horizon=None, n_jobs=2).daily
+    pd.testing.assert_frame_equal(serial, parallel)
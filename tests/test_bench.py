@@ -0,0 +1,35 @@
+import json
+import pandas as pd
+from app.bench.synthetic import make_info_df, make_price_df, make_quotes_df
+from app.bench.run_bench import compare, run_bench, save_result
+
+
+def test_synthetic_market_is_deterministic():
+    a = make_price_df(50, 30, seed=1)
+    b = make_price_df(50, 30, seed=1)
+    pd.testing.assert_frame_equal(a, b)
+    assert not a.equals(make_price_df(50, 30, seed=2))
+
+    # J-Quants 取得 CSV と同じ列・並び（日付ごとに全銘柄）
+    assert list(a.columns) == ["Date", "Code", "Open", "High", "Low", "Close", "Volume"]
+    assert len(a) == 50 * 30 and a["Date"].is_monotonic_increasing
+    assert (a["High"] >= a[["Open", "Close"]].max(axis=1)).all()
+    assert (a["Low"] <= a[["Open", "Close"]].min(axis=1)).all()
+
+    info = make_info_df(50, seed=1)
+    assert set(info["Code"]) == set(a["Code"])
+    quotes = make_quotes_df(a, days=6)
+    assert quotes["Date"].nunique() == 6 and set(quotes["UpperLimit"]) <= {"0", "1"}
+
+
+def test_run_bench_records_json(tmp_path):
+    result = run_bench(60, 40, cases=["score_up", "calc_metrics"], repeat=2)
+    assert set(result["cases"]) == {"score_up", "calc_metrics"}
+    entry = result["cases"]["score_up"]
+    assert len(entry["seconds"]) == 2 and entry["best"] > 0 and entry["peak_mb"] > 0
+
+    path = save_result(result, tmp_path)
+    loaded = json.loads(path.read_text(encoding="utf-8"))
+    assert loaded["meta"]["n_codes"] == 60
+    table = compare(loaded, result)
+    assert table["speedup"].tolist() == [1.0, 1.0]
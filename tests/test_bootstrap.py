@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+import pytest
+from app.backtest.bootstrap import bootstrap_ci, bootstrap_metrics, block_indices, stationary_indices
+from app.backtest.metrics import metric_arrays
+
+
+def test_indices_shape_and_blocks():
+    rng = np.random.default_rng(0)
+    idx = stationary_indices(30, 200, block=5, rng=rng)
+    assert idx.shape == (200, 30) and idx.min() >= 0 and idx.max() < 30
+    # ブロック内は翌日（末尾の次は先頭）が続く
+    step = (np.diff(idx, axis=1) % 30 == 1).mean()
+    assert 0.7 < step < 0.9                       # 平均ブロック長 5 → 約 0.8
+
+    idx = block_indices(10, 3, block=4, rng=rng)
+    assert idx.shape == (3, 10)
+    assert ((idx[:, 1:4] - idx[:, 0:1]) % 10 == np.arange(1, 4)).all()
+
+
+def test_moment_metrics_match_resampled_paths():
+    rng = np.random.default_rng(1)
+    rets = rng.normal(1e-3, 0.01, (60, 8))
+    rets[rng.random(rets.shape) < 0.05] = np.nan
+    idx = stationary_indices(60, 100, rng=rng)
+    keys = ("mu", "win_rate", "sharpe", "sortino", "max_dd", "calmar")
+    got = bootstrap_metrics(rets, indices=idx, metrics=keys)
+    ref = metric_arrays(rets[idx.T], keys=keys)
+    for key in keys:
+        assert got[key].shape == (100, 8)
+        np.testing.assert_allclose(got[key], ref[key], rtol=1e-9, atol=1e-12)
+
+
+def test_ci_covers_true_sharpe():
+    rng = np.random.default_rng(2)
+    rets = pd.DataFrame(rng.normal(1e-3, 0.01, (250, 100)))
+    ci = bootstrap_ci(rets, n_boot=400, method="block", seed=3)
+    assert list(ci.index) == list(range(100))
+    assert {"sharpe_lo", "sharpe_hi", "sharpe_se", "mu_lo", "max_dd_hi"} <= set(ci.columns)
+    true_sharpe = np.sqrt(250) * 0.1
+    covered = ((ci["sharpe_lo"] <= true_sharpe) & (true_sharpe <= ci["sharpe_hi"])).mean()
+    assert 0.85 <= covered <= 1.0
+    # シードが同じなら再現する
+    pd.testing.assert_frame_equal(ci, bootstrap_ci(rets, n_boot=400, method="block", seed=3))
+
+
+def test_unknown_method():
+    with pytest.raises(ValueError):
+        bootstrap_metrics(np.zeros(10), method="iid")
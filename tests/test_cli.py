@@ -0,0 +1,44 @@
+import subprocess
+import sys
+from pathlib import Path
+import pytest
+from app.cli import build_parser
+
+ROOT = Path(__file__).parent.parent
+
+
+def test_help_does_not_import_heavy_modules():
+    # 別プロセスで CLI を構築し、重いモジュールが読み込まれていないことを確認
+    code = (
+        "import sys; from app.cli import build_parser; build_parser().format_help(); "
+        "print(','.join(m for m in ('pandas', 'matplotlib', 'joblib', 'yaml', 'pydantic') "
+        "if m in sys.modules))"
+    )
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == ""
+
+
+@pytest.mark.parametrize("argv, command", [
+    (["fetch", "ohlcv"], "fetch"),
+    (["derive"], "derive"),
+    (["derive", "--chunked", "--partition-codes", "200", "--jobs", "4"], "derive"),
+    (["backtest"], "backtest"),
+    (["backtest", "--start", "2020-01-01", "--warmup", "30", "--jobs", "4"], "backtest"),
+    (["backtest", "--block-limits", "--max-volume-frac", "0.01", "--weighting", "score"], "backtest"),
+    (["fetch", "ohlcv", "--horizon", "250"], "fetch"),
+    (["search"], "search"),
+    (["report"], "report"),
+    (["report", "backtest_results/search/x", "--charts", "heatmap", "--jobs", "2"], "report"),
+    (["score", "--no-export"], "score"),
+    (["score", "--premarket"], "score"),
+    (["precompute"], "precompute"),
+    (["export", "scores.csv"], "export"),
+    (["export", "scores.csv", "--format", "csv", "--history-days", "0"], "export"),
+    (["bench", "--cases", "score_up"], "bench"),
+    (["serve", "--source", "db", "--port", "0", "--poll", "0"], "serve"),
+    (["mock-jquants", "--latency", "0.1"], "mock-jquants"),
+])
+def test_subcommands(argv, command):
+    args = build_parser().parse_args(argv)
+    assert args.command == command
+    assert callable(args.func)
@@ -0,0 +1,100 @@
+import numpy as np
+import pandas as pd
+import pytest
+from app.backtest.execution import ExecutionConfig, at_limit_open, limit_width, prefix_returns, simulate
+
+DATES = np.array(["2024-01-04", "2024-01-05"], dtype="datetime64[ns]")
+CODES = np.array([["1301", "1332", "1333"], ["1301", "1332", None]], dtype=object)
+OPEN = np.array([[100.0, 200.0, 400.0], [100.0, np.nan, np.nan]])
+CLOSE = np.array([[110.0, 190.0, 400.0], [105.0, np.nan, np.nan]])
+N_SLOTS = np.array([3, 2])
+
+
+def test_default_matches_series_mean():
+    res = simulate(DATES, CODES, OPEN, CLOSE, N_SLOTS)
+    day0 = pd.Series([0.1, -0.05, 0.0]).mean() - 0.0005
+    assert res.daily["Ret"].tolist() == [round(day0, 4), round(0.05 - 0.0005, 4)]
+    # 価格のない銘柄は配分から外れる
+    assert res.daily["Trades"].tolist() == [3, 1]
+    assert len(res.trades) == 5
+    assert res.trades.groupby("Date")["Weight"].sum().round(12).tolist() == [1.0, 1.0]
+
+
+def test_block_limits_keeps_cash():
+    blocked = np.array([[True, False, False], [True, False, False]])
+    res = simulate(DATES, CODES, OPEN, CLOSE, N_SLOTS, ExecutionConfig(block_limits=True),
+                   blocked=blocked)
+    assert res.daily["Ret"].iloc[0] == round(pd.Series([-0.05, 0.0]).mean() - 0.0005, 4)
+    # 唯一の約定候補が止まった日は現金（0）
+    assert res.daily["Ret"].iloc[1] == 0.0
+    assert res.daily["Blocked"].tolist() == [1, 1]
+    # 指定しなければ blocked は無視される
+    assert simulate(DATES, CODES, OPEN, CLOSE, N_SLOTS, blocked=blocked).daily["Blocked"].sum() == 0
+
+
+def test_volume_cap_scales_exposure():
+    adv = np.array([[10.0, 1e6, 1e6], [1e6, 1e6, 1e6]])
+    config = ExecutionConfig(max_volume_frac=0.1, capital=3000.0)
+    res = simulate(DATES, CODES, OPEN, CLOSE, N_SLOTS, config, adv=adv)
+    # 1301: 上限 0.1 × 10 株 × 100 円 = 100 円 / 配分 1000 円
+    assert res.trades["Fill"].iloc[0] == pytest.approx(0.1)
+    assert res.daily["Exposure"].iloc[0] == pytest.approx(0.1 / 3 + 2 / 3)
+    gross = (0.1 * 0.1 - 0.05 + 0.0) / 3
+    assert res.daily["Gross"].iloc[0] == pytest.approx(gross)
+    assert res.daily["Ret"].iloc[0] == round(gross - 0.0005 * (0.1 / 3 + 2 / 3), 4)
+
+
+@pytest.mark.parametrize("weighting, raw", [
+    ("score", [2.0, 1.0, 1.0]),
+    ("inverse_vol", [1 / 0.02, 1 / 0.04, 1 / 0.04]),
+])
+def test_weighting(weighting, raw):
+    score = np.array([[2.0, 1.0, 1.0], [1.0, 1.0, np.nan]])
+    atr_ratio = np.array([[0.02, 0.04, 0.04], [0.02, 0.04, np.nan]])
+    res = simulate(DATES, CODES, OPEN, CLOSE, N_SLOTS, ExecutionConfig(weighting=weighting),
+                   score=score, atr_ratio=atr_ratio)
+    expected = np.array(raw) / sum(raw)
+    np.testing.assert_allclose(res.trades["Weight"].iloc[:3], expected)
+    assert res.trades["Weight"].iloc[3] == 1.0     # 2 日目は価格がある 1 銘柄だけ
+
+
+def test_unknown_weighting():
+    with pytest.raises(ValueError):
+        ExecutionConfig(weighting="kelly")
+
+
+def test_limit_width_table():
+    np.testing.assert_array_equal(limit_width(np.array([99, 100, 999, 1000, 4999.9, 50_000])),
+                                  [30, 50, 150, 300, 700, 10_000])
+    assert np.isnan(limit_width(np.array([np.nan]))[0])
+
+
+def test_at_limit_open():
+    open_ = np.array([1300.0, 700.0, 1050.0, 1000.0])
+    high = np.array([1300.0, 1000.0, 1100.0, 1000.0])
+    low = np.array([1300.0, 700.0, 1000.0, 1000.0])
+    prev = np.array([1000.0, 1000.0, 1000.0, 1000.0])
+    np.testing.assert_array_equal(at_limit_open(open_, high, low, prev_close=prev),
+                                  [True, True, False, False])
+    # フラグがあればフラグ + 始値 = 高値 / 安値で判定
+    upper = np.array(["1", "0", "1", "0"])
+    lower = np.array(["0", "1", "0", "0"])
+    np.testing.assert_array_equal(at_limit_open(open_, high, low, upper=upper, lower=lower),
+                                  [True, True, False, False])
+
+
+def test_prefix_returns_per_topn():
+    got = prefix_returns(OPEN, CLOSE, N_SLOTS, [1, 2, 3, 10])
+    for j, n in enumerate([1, 2, 3, 10]):
+        slots = np.minimum(N_SLOTS, n)
+        res = simulate(DATES, CODES, OPEN, CLOSE, slots)
+        np.testing.assert_allclose(got[:, j], res.daily["Ret"].to_numpy())
+
+    blocked = np.array([[True, False, False], [True, False, False]])
+    got = prefix_returns(OPEN, CLOSE, N_SLOTS, [1, 2], ExecutionConfig(block_limits=True), blocked)
+    assert got[1].tolist() == [0.0, 0.0]
+    assert got[0, 0] == 0.0
+    assert got[0, 1] == round(-0.05 - 0.0005, 4)
+
+    with pytest.raises(ValueError):
+        prefix_returns(OPEN, CLOSE, N_SLOTS, [1], ExecutionConfig(weighting="score"))
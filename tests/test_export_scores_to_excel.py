@@ -7,11 +7,11 @@ import datetime
 import os
 
 
-def test_export_scores_to_excel():
+def test_export_scores_to_excel(tmp_path):
     # ロガー初期化
     logger = setup_logger(LoggingConfig(
         level="INFO",
-        log_dir="./logs",
+        log_dir=str(tmp_path / "logs"),
         format="%(asctime)s %(levelname)s %(message)s"
     ))
 
@@ -25,14 +25,119 @@ def test_export_scores_to_excel():
     df = pd.DataFrame(data)
 
     # 出力テスト
-    output_dir = "exports"
+    output_dir = tmp_path / "exports"
     export_scores_to_excel(df, output_dir, logger)
 
     # ファイル存在確認
     date_str = datetime.datetime.today().strftime("%Y%m%d")
     expected_file = Path(output_dir) / f"top40_scores_{date_str}.xlsx"
     assert expected_file.exists(), f"ファイルが存在しません: {expected_file}"
+    # 既定では履歴に保存しない
+    assert not (Path(output_dir) / "history").exists()
 
     # 後始末（テストで生成されたファイルを削除）
     # os.remove(expected_file)
     print("✅ test_export_scores_to_excel: PASS")
+
+
+def _picks(day, n=3):
+    return pd.DataFrame({
+        "Rank": range(1, n + 1),
+        "Code": [f"{1000 + i}0" for i in range(n)],
+        "CompanyName": [f"Test Corp {i}" for i in range(n)],
+        "Score": [3.0, 2.0, float("nan")][:n],
+        "Date": day,
+        "AtrAvg": [10.0] * n,
+    })
+
+
+def test_export_scores_sheets_and_history(tmp_path):
+    import logging
+    from app.exporters.export_scores_to_excel import export_history, export_scores
+
+    logger = logging.getLogger("test_export")
+    days = [datetime.date(2024, 1, d) for d in (4, 5, 9)]
+    for day in days:
+        paths = export_scores(_picks(day), tmp_path, logger, history_days=2, as_of=day)
+    assert paths == [tmp_path / "top40_scores_20240109.xlsx"]
+
+    sheets = pd.read_excel(paths[0], sheet_name=None, dtype={"Code": str})
+    assert list(sheets) == ["picks", "components", "history"]
+    assert list(sheets["picks"].columns) == ["Rank", "Code", "CompanyName", "Score"]
+    assert sheets["picks"]["Score"].isna().tolist() == [False, False, True]     # 欠損は空セル
+    assert len(sheets["components"].columns) == 6
+    # 直近 2 日分（古い順）、先頭に AsOf
+    history = sheets["history"]
+    assert history.columns[0] == "AsOf" and len(history) == 6
+    assert pd.to_datetime(history["AsOf"]).dt.date.unique().tolist() == days[1:]
+
+    # 同じ日の再実行は履歴を上書き（重複しない）
+    paths = export_scores(_picks(days[-1]), tmp_path, logger, fmt="csv", history_days=10, as_of=days[-1])
+    assert [p.name for p in paths] == ["top40_scores_20240109_picks.csv",
+                                       "top40_scores_20240109_components.csv",
+                                       "top40_scores_20240109_history.csv"]
+    assert len(pd.read_csv(paths[2])) == 9
+
+    # history_days=0 は history シートを出さないが当日分は保存し、export_history で別ファイルに出せる
+    day = datetime.date(2024, 1, 10)
+    paths = export_scores(_picks(day), tmp_path, logger, history_days=0, as_of=day)
+    assert list(pd.read_excel(paths[0], sheet_name=None)) == ["picks", "components"]
+    paths = export_history(tmp_path, logger, fmt="csv", history_days=2, as_of=day)
+    assert [p.name for p in paths] == ["top40_history_20240110_history.csv"]
+    assert pd.read_csv(paths[0])["AsOf"].unique().tolist() == ["2024-01-09", "2024-01-10"]
+
+
+def test_write_sheets_streams_chunks(tmp_path):
+    import pytest
+    from app.exporters.writers import iter_chunks, write_sheets
+
+    df = pd.DataFrame({"a": range(10), "b": [str(i) for i in range(10)]})
+    path, = write_sheets(tmp_path / "out", {"s": iter_chunks(df, rows=3)}, fmt="xlsx")
+    pd.testing.assert_frame_equal(pd.read_excel(path, dtype={"b": str}), df)
+    path, = write_sheets(tmp_path / "out", {"s": iter_chunks(df, rows=3)}, fmt="csv")
+    pd.testing.assert_frame_equal(pd.read_csv(path, dtype={"b": str}), df)
+    with pytest.raises(ValueError):
+        write_sheets(tmp_path / "out", {"s": iter_chunks(df)}, fmt="json")
+
+
+def test_history_columns_fixed_across_days(tmp_path):
+    import logging
+    import pytest
+    from app.exporters.export_scores_to_excel import export_history, export_scores
+    from app.exporters.writers import write_sheets
+
+    logger = logging.getLogger("test_export")
+    # 1 日目は構成要素の列が無く、2 日目で増える
+    first = datetime.date(2024, 1, 4)
+    export_scores(_picks(first).drop(columns=["AtrAvg"]), tmp_path, logger, history_days=0, as_of=first)
+    day = datetime.date(2024, 1, 5)
+    export_scores(_picks(day), tmp_path, logger, history_days=0, as_of=day)
+
+    for fmt in ("xlsx", "csv"):
+        path, = export_history(tmp_path, logger, fmt=fmt, history_days=2, as_of=day)
+        history = pd.read_excel(path) if fmt == "xlsx" else pd.read_csv(path)
+        assert list(history.columns) == ["AsOf", *_picks(day).columns]
+        assert history["AtrAvg"].isna().tolist() == [True] * 3 + [False] * 3
+
+    # 列の違うチャンクはヘッダとずれるので書かない
+    chunks = [pd.DataFrame({"a": [1]}), pd.DataFrame({"a": [2], "b": [3]})]
+    with pytest.raises(ValueError):
+        write_sheets(tmp_path / "out", {"s": iter(chunks)}, fmt="csv")
+
+
+def test_parquet_schema_from_non_empty_chunks(tmp_path):
+    import pytest
+    pytest.importorskip("pyarrow")
+    from app.exporters.writers import write_sheets
+
+    # 先頭は空・全欠損（型が決まらない）、後のチャンクで値が入る
+    chunks = [
+        pd.DataFrame({"a": pd.Series([], dtype=object), "b": pd.Series([], dtype=object)}),
+        pd.DataFrame({"a": [None, None], "b": [float("nan")] * 2}),
+        pd.DataFrame({"a": [1, 2], "b": [None, None]}),
+        pd.DataFrame({"a": [None], "b": ["x"]}),
+    ]
+    path, = write_sheets(tmp_path / "out", {"s": iter(chunks)}, fmt="parquet")
+    df = pd.read_parquet(path)
+    assert len(df) == 5
+    assert df["a"].tolist()[2:4] == [1, 2] and df["b"].tolist()[-1] == "x"
@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+import pytest
+import app.utils.kernels as kernels
+from app.utils.kernels import group_order, rolling_mean, true_range
+
+BACKENDS = [False] + ([True] if kernels.HAVE_NUMBA else [])
+
+
+@pytest.fixture
+def panel():
+    rng = np.random.default_rng(1)
+    codes = np.tile(np.array(["1301", "7203", "130A", "9984", "6758"], dtype=object), 60)
+    df = pd.DataFrame({"Code": codes, "x": rng.lognormal(8, 1, len(codes))})
+    df.loc[rng.random(len(df)) < 0.05, "x"] = np.nan
+    df.loc[df["Code"] == "9984", "x"] = 250.0                 # 一定値の区間
+    df.loc[df.index[-7:], "Code"] = None                      # 欠損コードは groupby で落ちる
+    return df
+
+
+@pytest.mark.parametrize("use_numba", BACKENDS)
+@pytest.mark.parametrize("window, min_periods", [(5, None), (20, None), (3, 1), (10, 1)])
+def test_rolling_mean_matches_pandas(panel, monkeypatch, use_numba, window, min_periods):
+    monkeypatch.setattr(kernels, "USE_NUMBA", use_numba)
+    expected = (
+        panel.groupby("Code", sort=False)["x"]
+        .rolling(window, min_periods=window if min_periods is None else min_periods).mean()
+        .reset_index(level=0, drop=True).reindex(panel.index).to_numpy()
+    )
+    order, starts, valid = group_order(panel["Code"])
+    got = np.full(len(panel), np.nan)
+    res = rolling_mean(panel["x"].to_numpy()[order], starts, window, min_periods)
+    got[order[valid]] = res[valid]
+    if use_numba:
+        np.testing.assert_array_equal(got, expected)           # JIT 版はビット一致
+    else:
+        np.testing.assert_allclose(got, expected, rtol=1e-12, equal_nan=True)
+
+
+def test_true_range_matches_rowwise():
+    rng = np.random.default_rng(2)
+    df = pd.DataFrame({"High": rng.uniform(100, 110, 200), "Low": rng.uniform(90, 100, 200),
+                       "PrevClose": rng.uniform(85, 115, 200)})
+    df.iloc[::11, 0] = np.nan
+    df.iloc[::13, 2] = np.nan
+    expected = df.apply(
+        lambda row: max(row["High"] - row["Low"], abs(row["High"] - row["PrevClose"]),
+                        abs(row["Low"] - row["PrevClose"])) if pd.notnull(row["PrevClose"]) else np.nan,
+        axis=1,
+    ).to_numpy()
+    np.testing.assert_array_equal(true_range(df["High"], df["Low"], df["PrevClose"]), expected)
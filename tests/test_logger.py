@@ -0,0 +1,42 @@
+import logging
+from logging.handlers import QueueHandler
+from app.core.config import LoggingConfig
+from app.core.logger import setup_logger, shutdown_logging
+
+
+def _config(tmp_path, level="INFO"):
+    return LoggingConfig(level=level, log_dir=str(tmp_path), format="%(levelname)s %(message)s")
+
+
+def test_setup_is_idempotent_and_flushes(tmp_path):
+    shutdown_logging()       # 他のテストで起動済みのリスナーを止めて作り直す
+    try:
+        logger = setup_logger(_config(tmp_path))
+        assert setup_logger(_config(tmp_path, "DEBUG")) is logger
+        assert logger.level == logging.DEBUG
+        assert sum(isinstance(h, QueueHandler) for h in logger.handlers) == 1
+
+        rows = [1, 2]
+        logger.info("件数: %d", 3)
+        logger.info("可変引数: %s", rows)
+        rows.append(99)           # 記録後の変更はログに反映されない
+    finally:
+        shutdown_logging()
+
+    text = next(tmp_path.glob("MirAI_Trade_*.log")).read_text(encoding="utf-8")
+    assert text.count("件数: 3") == 1
+    assert "可変引数: [1, 2]\n" in text
+    assert not [h for h in logging.getLogger("MirAI_Trade").handlers if isinstance(h, QueueHandler)]
+
+
+def test_disabled_debug_does_not_format(tmp_path):
+    class Boom:
+        def __str__(self):
+            raise AssertionError("formatted")
+
+    shutdown_logging()
+    try:
+        logger = setup_logger(_config(tmp_path, "INFO"))
+        logger.debug("preview %s", Boom())
+    finally:
+        shutdown_logging()
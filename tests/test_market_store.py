@@ -0,0 +1,104 @@
+from pathlib import Path
+import uuid
+import numpy as np
+import pandas as pd
+import pytest
+from app.core.config import load_config
+from app.core.logger import setup_logger
+
+psycopg2 = pytest.importorskip("psycopg2")
+from app.db.db_client import DBClient
+from app.db.market_store import MarketStore
+
+# config.yaml の絶対パスを設定（接続先は DB_HOST などの環境変数で指定）
+CONFIG_PATH = Path(__file__).parent.parent / "configs" / "config.yaml"
+
+
+@pytest.fixture(scope="module")
+def config():
+    return load_config(str(CONFIG_PATH))
+
+
+@pytest.fixture(scope="module")
+def logger(config):
+    return setup_logger(config.logging)
+
+
+@pytest.fixture(scope="module")
+def db(config, logger):
+    # ローカル PostgreSQL が無い環境ではスキップ
+    try:
+        admin = DBClient(config, logger)
+    except psycopg2.OperationalError as e:
+        pytest.skip(f"PostgreSQL に接続できません: {e}")
+    schema = f"test_{uuid.uuid4().hex[:8]}"
+    with admin.connection() as conn, conn.cursor() as cur:
+        cur.execute(f"CREATE SCHEMA {schema}")
+
+    # テスト用スキーマに閉じ込める
+    client = DBClient(config, logger, options=f"-c search_path={schema}")
+    yield client
+    client.close()
+    with admin.connection() as conn, conn.cursor() as cur:
+        cur.execute(f"DROP SCHEMA {schema} CASCADE")
+    admin.close()
+
+
+def _ohlcv(dates, codes, close):
+    idx = pd.MultiIndex.from_product([pd.to_datetime(dates), codes], names=["Date", "Code"])
+    df = idx.to_frame(index=False)
+    df["Open"] = df["High"] = df["Low"] = close
+    df["Close"] = close
+    df["Volume"] = 1000.0
+    return df
+
+
+def test_bulk_load_is_idempotent(db, logger):
+    store = MarketStore(db, logger)
+    store.ensure_schema()
+
+    # 年を跨ぐデータでパーティションが自動作成されること
+    store.load_ohlcv(_ohlcv(["2024-12-30", "2025-01-06"], ["1301", "7203"], 100.0))
+    # 同じ日を再投入すると上書きされ、行数は増えない
+    store.load_ohlcv(_ohlcv(["2025-01-06"], ["1301", "7203"], 200.0))
+
+    with db.connection() as conn, conn.cursor() as cur:
+        cur.execute("SELECT date, code, close FROM ohlcv ORDER BY date, code")
+        rows = cur.fetchall()
+        cur.execute("SELECT count(*) FROM pg_inherits WHERE inhparent = 'ohlcv'::regclass")
+        n_partitions = cur.fetchone()[0]
+
+    assert len(rows) == 4
+    assert [r[2] for r in rows] == [100.0, 100.0, 200.0, 200.0]
+    assert n_partitions == 2
+
+
+def test_features_nan_become_null(db, logger):
+    store = MarketStore(db, logger)
+    store.ensure_schema()
+    df = _ohlcv(["2025-01-06"], ["1301"], 100.0).assign(ATR_20=np.nan, PullUp=0.7)
+    store.load_features(df)
+
+    with db.connection() as conn, conn.cursor() as cur:
+        cur.execute("SELECT atr_20, pullup FROM features")
+        assert cur.fetchone() == (None, 0.7)
+
+
+def test_reader_roundtrip(db, logger):
+    from app.db.market_reader import MarketReader
+
+    store = MarketStore(db, logger)
+    store.ensure_schema()
+    store.load_ohlcv(_ohlcv(["2025-02-03", "2025-02-04"], ["7203", "1301", "13010"], 50.0))
+    store.load_features(_ohlcv(["2025-02-04"], ["1301"], 0.0).assign(ATR_20=1.5))
+
+    df = MarketReader(db, logger).read_frame(["Close", "ATR_20"], start="2025-02-03")
+    assert df["Code"].tolist() == ["1301", "13010", "7203"] * 2
+    assert df["Date"].is_monotonic_increasing
+    assert (df["Close"] == 50.0).all()
+    # features に無い行は NaN
+    assert df["ATR_20"].isna().sum() == 5
+    assert df.loc[(df["Date"] == "2025-02-04") & (df["Code"] == "1301"), "ATR_20"].item() == 1.5
+
+    only = MarketReader(db, logger).read_frame(["Close"], codes=["7203"], start="2025-02-01", end="2025-02-03")
+    assert len(only) == 1 and only["Code"].item() == "7203"
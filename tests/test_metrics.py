@@ -0,0 +1,38 @@
+import numpy as np
+import pandas as pd
+from app.backtest.metrics import THRESHOLDS, calc_metrics, calc_metrics_batch, passes_thresholds
+
+
+def test_batch_matches_calc_metrics():
+    rng = np.random.default_rng(0)
+    rets = rng.normal(1e-3, 0.01, (120, 6))
+    rets[rng.random(rets.shape) < 0.05] = np.nan
+    rets[:, 4] = 0.0                         # 分散 0 → sharpe 0
+    rets[:, 5] = np.nan                      # 全欠損
+    batch = calc_metrics_batch(pd.DataFrame(rets, columns=list("abcdef")))
+    assert list(batch.index) == list("abcdef")
+    for col in "abcde":
+        one = calc_metrics(pd.Series(rets[:, "abcdef".index(col)]))
+        for key, value in one.items():
+            assert abs(batch.loc[col, key] - value) <= 1e-4, (col, key)
+    assert batch.loc["e", "sortino"] == 0.0 and batch.loc["e", "calmar"] == 0.0
+    assert batch.loc["f"].drop(["win_rate", "turnover"]).isna().all()
+
+
+def test_sortino_calmar_turnover():
+    rets = np.array([[0.02, 0.01], [-0.01, 0.01], [0.03, -0.02]])
+    turn = np.array([[np.nan, np.nan], [0.5, 0.0], [1.0, 0.25]])
+    m = calc_metrics_batch(rets, turn)
+    mu = rets[:, 0].mean()
+    downside = np.sqrt(np.mean(np.minimum(rets[:, 0], 0) ** 2))
+    assert m.loc[0, "sortino"] == round(np.sqrt(250) * mu / downside, 4)
+    assert m.loc[0, "max_dd"] == -0.01
+    assert m.loc[0, "calmar"] == round(mu * 250 / 0.01, 4)
+    assert m["turnover"].tolist() == [0.75, 0.125]
+
+
+def test_passes_thresholds():
+    m = pd.DataFrame({"mu": [0.06, 0.06], "win_rate": [0.6, 0.6],
+                      "sharpe": [2.0, 1.0], "max_dd": [-0.1, -0.1]})
+    assert passes_thresholds(m, THRESHOLDS).tolist() == [True, False]
+    assert passes_thresholds(m, {"mu": 0.05}).tolist() == [True, True]
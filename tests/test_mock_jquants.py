@@ -0,0 +1,115 @@
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import pytest
+import requests
+import app.data.trading_calendar as trading_calendar
+from app.core.config import load_config
+from app.core.logger import setup_logger
+from app.bench.mock_jquants import MockJQuantsServer
+from app.data.jquants_signin import get_refresh_token, get_id_token
+from app.data.trading_days_fetcher import get_latest_trading_days
+from app.data.daily_quotes_fetcher import fetch_daily_quotes
+from app.data.listed_info_fetcher import fetch_listed_info
+from app.data.premium_temp_fetcher import fetch_premium_temp
+from app.data.token_manager import TokenManager
+
+# config.yaml の絶対パスを設定（endpoints は模擬サーバに差し替える）
+CONFIG_PATH = Path(__file__).parent.parent / "configs" / "config.yaml"
+
+
+@pytest.fixture(scope="module")
+def logger():
+    return setup_logger(load_config(str(CONFIG_PATH)).logging)
+
+
+@pytest.fixture(scope="module")
+def server():
+    with MockJQuantsServer(n_codes=120, n_days=15, page_size=50) as srv:
+        yield srv
+
+
+@pytest.fixture(autouse=True)
+def calendar_cache(tmp_path, monkeypatch):
+    # 営業日カレンダーのキャッシュを backtest_data/ に書かない
+    monkeypatch.setattr(trading_calendar, "_loaded", {})
+    monkeypatch.setattr(trading_calendar, "CALENDAR_CACHE", tmp_path / "calendar.json")
+
+
+@pytest.fixture
+def config(server):
+    cfg = server.config(load_config(str(CONFIG_PATH)))
+    cfg.jquants.auth.email = "mock@example.com"
+    return cfg
+
+
+def test_fetchers_offline(server, config, logger):
+    id_token = get_id_token(config, get_refresh_token(config, logger), logger)
+    days = get_latest_trading_days(config, id_token, logger, 6)
+    assert days == server.dates[-6:]
+
+    # 50 件ずつのページを pagination_key で辿って全銘柄分を連結する
+    quotes = fetch_daily_quotes(config, id_token, logger, days[-1])
+    assert len(quotes) == 120 and quotes["Code"].is_unique
+
+    assert len(fetch_listed_info(config, id_token, logger)) == 120
+    premium = fetch_premium_temp(config, id_token, logger, days[-1])
+    assert set(premium["futures"]["DerivativesProductCategory"]) == {"NK225F"}
+
+    # トークン無しは 401
+    r = requests.get(config.jquants.endpoints.listed_info)
+    assert r.status_code == 401
+
+
+def test_rate_limit_and_concurrency(server, config, logger):
+    server.reset_stats()
+    server.rate_limit, server.latency = 5, 0.05
+    try:
+        def _get(_):
+            return requests.get(config.jquants.endpoints.listed_info,
+                                headers={"Authorization": f"Bearer {server.id_token}"})
+        with ThreadPoolExecutor(8) as pool:
+            codes = [r.status_code for r in pool.map(_get, range(8))]
+    finally:
+        server.rate_limit, server.latency = None, 0.0
+
+    assert codes.count(200) == 5 and codes.count(429) == 3
+    stats = server.stats()
+    assert stats["status"] == {200: 5, 429: 3}
+    assert stats["max_inflight"] > 1
+
+
+def test_injected_failures(server, config, logger):
+    server.error_rate = 1.0
+    try:
+        with pytest.raises(RuntimeError):
+            fetch_daily_quotes(config, server.id_token, logger, server.dates[-1])
+    finally:
+        server.error_rate = 0.0
+
+
+def test_fetch_ohlcv_period(server, config, logger):
+    from app.backtest.generate_price_csv import _fetch_ohlcv
+    id_token = get_id_token(config, get_refresh_token(config, logger), logger)
+    dates = server.dates
+    df = _fetch_ohlcv(config, id_token, logger, start=dates[5], end=dates[9], warmup=2)
+    got = sorted({str(d) for d in df["Date"]})
+    assert got == dates[3:10]
+    assert df["Date"].is_monotonic_increasing        # 並行取得でも日付順
+
+    df = _fetch_ohlcv(config, id_token, logger, horizon=4, warmup=1)
+    assert sorted({str(d) for d in df["Date"]}) == dates[-5:]
+
+
+def test_rejected_id_token_is_renewed_once(server, config, logger, tmp_path):
+    # 有効期限内だがサーバに拒否されるトークンを持った状態から始める
+    manager = TokenManager(config, logger, cache_path=tmp_path / "tokens.json")
+    manager._id_token, manager._id_expires = "stale-token", float("inf")
+    before = server.stats()["status"].get(401, 0)
+
+    assert len(fetch_listed_info(config, manager, logger)) == 120
+    assert manager.get_id_token() == server.id_token
+    assert server.stats()["status"].get(401, 0) - before == 1   # 取り直しは 1 度だけ
+
+    # 文字列で渡したトークンは取り直せないので、そのまま失敗する
+    with pytest.raises(RuntimeError):
+        fetch_listed_info(config, "stale-token", logger)
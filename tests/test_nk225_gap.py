@@ -0,0 +1,64 @@
+import logging
+import pandas as pd
+import pytest
+from app.backtest.nk225_gap import select_front_month, calc_nk225_gap, update_nk225_gap
+
+logger = logging.getLogger("test_nk225_gap")
+
+
+@pytest.fixture
+def futures_df():
+    # 2 限月 × 3 日。3 日目に中心限月が 2025-09 → 2025-12 へ交代
+    rows = [
+        ("2025-06-02", "2025-09", "1", 38000, 38100, 38200),
+        ("2025-06-02", "2025-12", "",  38050, 38150, 38250),
+        ("2025-06-03", "2025-09", "1", 38300, 38400, 38500),
+        ("2025-06-03", "2025-12", "",  38350, 38450, 38550),
+        ("2025-06-04", "2025-09", "",  38600, 38700, 38800),
+        ("2025-06-04", "2025-12", "1", 38700, 38800, 38900),
+    ]
+    return pd.DataFrame(rows, columns=[
+        "Date", "ContractMonth", "CentralContractMonthFlag",
+        "NightSessionClose", "DaySessionOpen", "DaySessionClose",
+    ]).assign(DerivativesProductCategory="NK225F")
+
+
+def test_select_front_month(futures_df):
+    front = select_front_month(futures_df)
+    assert len(front) == 3
+    assert front["ContractMonth"].tolist() == ["2025-09", "2025-09", "2025-12"]
+
+
+def test_calc_nk225_gap_uses_same_contract(futures_df):
+    gap = calc_nk225_gap(futures_df)
+    # 初日は前日終値が無いので除外
+    assert gap["Date"].dt.strftime("%Y-%m-%d").tolist() == ["2025-06-03", "2025-06-04"]
+    assert gap["NK225_gap"].iloc[0] == pytest.approx(38300 / 38200 - 1, abs=1e-6)
+    # 限月交代日は 2025-12 限月同士で比較する
+    assert gap["NK225_gap"].iloc[1] == pytest.approx(38700 / 38550 - 1, abs=1e-6)
+
+
+def test_update_nk225_gap_appends_only_new_days(futures_df, tmp_path):
+    out_csv = tmp_path / "nk225_gap.csv"
+    first = futures_df[futures_df["Date"] <= "2025-06-03"]
+    assert len(update_nk225_gap(first, out_csv, logger)) == 1
+
+    added = update_nk225_gap(futures_df, out_csv, logger)
+    assert len(added) == 1
+    saved = pd.read_csv(out_csv)
+    assert saved["Date"].tolist() == ["2025-06-03", "2025-06-04"]
+
+
+def test_calc_nk225_gap_volume_fallback_without_contract_month():
+    # 限月情報の無い旧 pkl: 日ごとに出来高最大の行を期近とみなす
+    rows = [
+        ("2025-06-02", 38000, 38100, 38200, 900),
+        ("2025-06-02", 38050, 38150, 38250, 100),
+        ("2025-06-03", 38300, 38400, 38500, 800),
+        ("2025-06-03", 38350, 38450, 38550, 200),
+    ]
+    df = pd.DataFrame(rows, columns=["Date", "NightSessionClose", "DaySessionOpen",
+                                     "DaySessionClose", "Volume"]).assign(DerivativesProductCategory="NK225F")
+    gap = calc_nk225_gap(df)
+    assert len(gap) == 1 and gap["ContractMonth"].isna().all()
+    assert gap["NK225_gap"].iloc[0] == pytest.approx(38300 / 38200 - 1, abs=1e-6)
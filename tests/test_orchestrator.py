@@ -0,0 +1,144 @@
+import logging
+import pytest
+from app.core.orchestrator import Pipeline, Stage, import_closure
+
+logger = logging.getLogger("test_orchestrator")
+
+
+@pytest.fixture
+def pipeline_factory(tmp_path):
+    src = tmp_path / "raw.txt"
+    mid = tmp_path / "derived.txt"
+    src.write_text("1,2,3")
+    runs = []
+
+    def derive():
+        runs.append("derive")
+        mid.write_text(src.read_text().upper())
+
+    def make(params=None):
+        stages = [
+            Stage("fetch_a", lambda: runs.append("fetch_a"), params={"as_of": "2025-06-30"}),
+            Stage("fetch_b", lambda: runs.append("fetch_b"), params={"as_of": "2025-06-30"}),
+            Stage("derive", derive, inputs=[src], outputs=[mid], deps=["fetch_a", "fetch_b"],
+                  code=["app.core.orchestrator"], params=params or {}),
+        ]
+        return Pipeline(stages, tmp_path / "state.json", logger)
+
+    return make, runs, src, mid
+
+
+def test_second_run_skips_up_to_date_stages(pipeline_factory):
+    make, runs, _, _ = pipeline_factory
+    assert set(make().run().values()) == {"ran"}
+    runs.clear()
+
+    status = make().run()
+    assert status == {"fetch_a": "skipped", "fetch_b": "skipped", "derive": "skipped"}
+    assert runs == []
+
+
+def test_changed_input_or_params_rerun_stage(pipeline_factory):
+    make, runs, src, _ = pipeline_factory
+    make().run()
+    runs.clear()
+
+    src.write_text("4,5,6,7")
+    assert make().run()["derive"] == "ran"
+    assert make(params={"window": 5}).run()["derive"] == "ran"
+    assert runs == ["derive", "derive"]
+
+
+def test_deleted_output_reruns_stage(pipeline_factory):
+    make, runs, _, mid = pipeline_factory
+    make().run()
+    mid.unlink()
+    assert make().run()["derive"] == "ran"
+
+
+def test_failure_blocks_dependents(tmp_path):
+    def boom():
+        raise RuntimeError("fetch failed")
+
+    stages = [Stage("fetch", boom), Stage("derive", lambda: None, deps=["fetch"])]
+    status = Pipeline(stages, tmp_path / "state.json", logger).run()
+    assert status == {"fetch": "failed", "derive": "blocked"}
+
+
+def test_independent_stages_run_concurrently(tmp_path):
+    import threading
+    barrier = threading.Barrier(2, timeout=5)   # 並行実行されなければタイムアウトで失敗
+
+    stages = [Stage("fetch_a", barrier.wait), Stage("fetch_b", barrier.wait)]
+    status = Pipeline(stages, tmp_path / "state.json", logger).run()
+    assert status == {"fetch_a": "ran", "fetch_b": "ran"}
+
+
+def test_lazy_fields_and_import_closure(tmp_path):
+    calls = []
+
+    def params():
+        calls.append("params")
+        return {"n": 1}
+
+    out = tmp_path / "out.txt"
+    stage = Stage("s", lambda: out.write_text("x"), outputs=lambda: [out], params=params)
+    pipeline = Pipeline([stage], tmp_path / "state.json", logger)
+    assert calls == []                                      # 判定するまで評価しない
+    assert pipeline.run() == {"s": "ran"} and calls
+    assert Pipeline([stage], tmp_path / "state.json", logger).run() == {"s": "skipped"}
+
+    closure = import_closure("app.backtest.pipeline")
+    assert closure == ["app.backtest.pipeline", "app.core.orchestrator"]
+
+
+def test_pipeline_stage_code_covers_imports():
+    import ast
+    import importlib.util
+    import subprocess
+    import sys
+    from app.backtest.pipeline import build_stages
+
+    entries = {"fetch_ohlcv": "generate_price_csv", "fetch_premium": "generate_premium_pkl",
+               "derive": "add_derived_cols", "search": "param_search"}
+    for stage in build_stages():
+        module = f"app.backtest.{entries[stage.name]}"
+        tree = ast.parse(open(importlib.util.find_spec(module).origin, "rb").read())
+        direct = {n.module for n in ast.walk(tree)
+                  if isinstance(n, ast.ImportFrom) and (n.module or "").startswith("app.")}
+        assert module in stage.code and direct <= set(stage.code), stage.name
+    code = {s.name: set(s.code) for s in build_stages()}
+    assert {"app.backtest.execution", "app.scoring.ranking", "app.backtest.bootstrap",
+            "app.backtest.price_loader"} <= code["search"]
+    assert "app.utils.kernels" in code["derive"]
+
+    # build_stages はスクリプト（pandas / backtest_runner）を import しない
+    code = ("import sys; from app.backtest.pipeline import build_stages; build_stages(); "
+            "print(sorted(m for m in sys.modules if m == 'pandas' or m.startswith('app.backtest.')))")
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == "['app.backtest.pipeline']"
+
+
+def test_search_reruns_when_listed_info_changes(tmp_path, monkeypatch):
+    import app.backtest.param_search as param_search
+    import app.data.listed_info_fetcher as listed_info_fetcher
+    from app.backtest.pipeline import build_stages
+
+    derived, info, report = tmp_path / "derived.csv", tmp_path / "listed_info.csv", tmp_path / "report.txt"
+    derived.write_text("Date,Code\n")
+    info.write_text("Code,CompanyName\n1301,A\n")
+    monkeypatch.setattr(param_search, "INPUT_CSV", derived)
+    monkeypatch.setattr(param_search, "REPORT_TXT", report)
+    monkeypatch.setattr(listed_info_fetcher, "LISTED_INFO_CSV", info)
+
+    runs = []
+    search = next(s for s in build_stages() if s.name == "search")
+    search.deps = []
+    search.func = lambda: (runs.append("search"), report.write_text("ok"))
+
+    def run():
+        return Pipeline([search], tmp_path / "state.json", logger).run()["search"]
+
+    assert run() == "ran" and run() == "skipped"
+    info.write_text("Code,CompanyName\n1301,A\n1332,B\n")
+    assert run() == "ran" and runs == ["search", "search"]
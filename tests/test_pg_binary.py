@@ -0,0 +1,40 @@
+import numpy as np
+import pandas as pd
+import pytest
+from app.db.pg_binary import COPY_HEADER, CopyBinaryReader, encode_copy_binary
+
+
+def _feed(buf: bytes, reader: CopyBinaryReader, chunk: int) -> dict:
+    # psycopg2 と同様に細切れで write() される前提
+    for i in range(0, len(buf), chunk):
+        reader.write(buf[i:i + chunk])
+    return reader.finish()
+
+
+@pytest.mark.parametrize("chunk", [1, 7, 1 << 16])
+def test_roundtrip_fixed_width(chunk):
+    dates = pd.to_datetime(["2024-12-30", "2025-01-06", "1999-12-31"])
+    codes = ["1301", "7203", "9984"]
+    close = [100.5, np.nan, -3.0]
+    # NaN は NULL として送られるので、読み出し側の前提（固定長）に合わせて置き換える
+    buf = encode_copy_binary([(dates, "date"), (codes, "text"),
+                              (np.nan_to_num(close, nan=0.0), "float8")]).getvalue()
+
+    reader = CopyBinaryReader([("Date", "date"), ("Code", "S4"), ("Close", "float8")], 3,
+                              flush_bytes=16)
+    out = _feed(buf, reader, chunk)
+
+    assert (out["Date"] == dates.to_numpy().astype("datetime64[D]")).all()
+    assert out["Code"].tolist() == [b"1301", b"7203", b"9984"]
+    assert out["Close"].tolist() == [100.5, 0.0, -3.0]
+
+
+def test_null_and_row_count_are_rejected():
+    buf = encode_copy_binary([([1.0, np.nan], "float8")]).getvalue()
+    with pytest.raises(ValueError):
+        _feed(buf, CopyBinaryReader([("x", "float8")], 2), 1 << 16)
+
+    buf = encode_copy_binary([([1.0, 2.0], "float8")]).getvalue()
+    with pytest.raises(ValueError):
+        _feed(buf, CopyBinaryReader([("x", "float8")], 3), 1 << 16)
+    assert buf.startswith(COPY_HEADER)
@@ -0,0 +1,74 @@
+from datetime import date, timedelta
+from pathlib import Path
+import pandas as pd
+import pytest
+import app.data.listed_info_fetcher as listed_info_fetcher
+import app.data.token_manager as token_manager
+import app.data.trading_calendar as trading_calendar
+from app.bench.mock_jquants import MockJQuantsServer
+from app.core.config import load_config
+from app.core.logger import setup_logger
+from app.data.daily_quotes_fetcher import fetch_daily_quotes
+from app.data.listed_info_fetcher import fetch_listed_info
+from app.data.trading_calendar import load_trading_calendar
+from app.scoring.premarket import load_snapshot, precompute, premarket_scores
+from app.scoring.score_stocks import score_stocks
+
+CONFIG_PATH = Path(__file__).parent.parent / "configs" / "config.yaml"
+
+
+@pytest.fixture
+def env(tmp_path, monkeypatch):
+    monkeypatch.setattr(token_manager, "TOKEN_CACHE", tmp_path / "tokens.json")
+    monkeypatch.setattr(listed_info_fetcher, "LISTED_INFO_CSV", tmp_path / "listed_info.csv")
+    monkeypatch.setattr(trading_calendar, "_loaded", {})
+    monkeypatch.setattr(trading_calendar, "CALENDAR_CACHE", tmp_path / "calendar.json")
+    cfg = load_config(str(CONFIG_PATH))
+    with MockJQuantsServer(n_codes=400, n_days=12) as srv:
+        cfg = srv.config(cfg)
+        cfg.jquants.auth.email = "mock@example.com"
+        yield srv, cfg, setup_logger(cfg.logging), tmp_path
+
+
+def test_precompute_matches_score_stocks(env):
+    srv, cfg, logger, tmp_path = env
+    precompute(cfg, logger, snapshot_dir=tmp_path / "snap", output_dir=tmp_path / "out")
+    snapshot = load_snapshot(tmp_path / "snap")
+    assert str(snapshot.as_of) == srv.dates[-1] and snapshot.valid_for > snapshot.as_of
+    assert (tmp_path / "listed_info.csv").exists()
+    assert (tmp_path / "out" / f"top40_history_{snapshot.valid_for:%Y%m%d}.xlsx").exists()
+
+    # 寄り前の結果は同じ入力で score_stocks を通しで実行した結果と一致する
+    quotes = pd.concat([fetch_daily_quotes(cfg, srv.id_token, logger, d) for d in srv.dates[-6:]],
+                       ignore_index=True)
+    expected = score_stocks(quotes, fetch_listed_info(cfg, srv.id_token, logger), logger,
+                            components=True)
+    got = premarket_scores(logger, tmp_path / "snap", today=snapshot.valid_for)
+    pd.testing.assert_frame_equal(got.reset_index(drop=True), expected.reset_index(drop=True))
+
+    # 当日用でなければ使わない
+    assert premarket_scores(logger, tmp_path / "snap", today=snapshot.valid_for + timedelta(days=1)) is None
+    assert premarket_scores(logger, tmp_path / "none", today=snapshot.valid_for) is None
+
+    # 上場情報の差し替え（信用不可になった銘柄は除外）
+    info = snapshot.info.copy()
+    info.loc[info["Code"] == got["Code"].iloc[0], "MarginCode"] = "3"
+    swapped = premarket_scores(logger, tmp_path / "snap", today=snapshot.valid_for, info_df=info)
+    assert got["Code"].iloc[0] not in set(swapped["Code"])
+
+
+def test_precompute_after_close_targets_next_trading_day(env):
+    srv, cfg, logger, tmp_path = env
+    closed = date.fromisoformat(srv.dates[-1])             # 大引け後の当日（株価公開済み）
+    precompute(cfg, logger, snapshot_dir=tmp_path / "snap", history_days=0, today=closed)
+    snapshot = load_snapshot(tmp_path / "snap")
+    cal = load_trading_calendar(cfg, lambda: srv.id_token, logger)
+    assert snapshot.as_of == closed
+    assert snapshot.valid_for == cal.next(closed)
+    assert premarket_scores(logger, tmp_path / "snap", today=cal.next(closed)) is not None
+
+    # 当日の株価が未公開なら前営業日までで作り、売買日は当日
+    opening = cal.next(closed)
+    precompute(cfg, logger, snapshot_dir=tmp_path / "snap2", history_days=0, today=opening)
+    snapshot = load_snapshot(tmp_path / "snap2")
+    assert snapshot.as_of == closed and snapshot.valid_for == opening
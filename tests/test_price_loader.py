@@ -0,0 +1,82 @@
+import logging
+import numpy as np
+import pandas as pd
+import pytest
+import app.backtest.price_loader as price_loader
+from app.backtest.price_loader import compact_dtypes, frame_mb, load_price_df
+from app.bench.synthetic import make_price_df
+
+
+@pytest.fixture
+def derived_csv(tmp_path):
+    df = make_price_df(30, 40, seed=3)
+    df["ATR_20"] = (df["High"] - df["Low"]).where(df.index > 50)   # NaN を含む列
+    df["Momentum_3"] = df["Close"].pct_change(3)
+    path = tmp_path / "derived.csv"
+    df.to_csv(path, index=False)
+    return path
+
+
+def test_compact_keeps_values(derived_csv, monkeypatch):
+    logger = logging.getLogger("test_price_loader")
+    full = load_price_df("csv", logger, derived_csv)
+    monkeypatch.setattr(price_loader, "CHUNK_ROWS", 128)   # チャンク読み込みの経路も通す
+    small = load_price_df("csv", logger, derived_csv, compact=True)
+
+    assert small["Volume"].dtype == np.int32
+    assert small["Close"].dtype == np.float32
+    assert small["Code"].tolist() == full["Code"].tolist()
+    # 同じ銘柄コードは同一オブジェクトを共有する
+    codes = small["Code"].to_numpy()
+    assert codes[0] is codes[30]
+    for col in ["Open", "Close", "ATR_20", "Momentum_3"]:
+        np.testing.assert_allclose(small[col], full[col], rtol=1e-6, equal_nan=True)
+    assert frame_mb(small) < 0.7 * frame_mb(full)
+
+
+def test_budget_warning(derived_csv, caplog):
+    with caplog.at_level(logging.WARNING):
+        load_price_df("csv", logging.getLogger("test_price_loader"), derived_csv, budget_mb=0.01)
+    assert "メモリ予算" in caplog.text
+
+
+def test_compact_leaves_unsafe_floats():
+    df = pd.DataFrame({"x": [1.5, 1e300], "n": np.array([1, 2], dtype=np.int64)})
+    out = compact_dtypes(df)
+    assert out["x"].dtype == np.float64      # float32 の範囲外
+    assert out["n"].dtype == np.int32
+
+
+def test_compact_keeps_prices_float():
+    # 端数の無い四本値・派生指標でも整数型にはしない（出来高だけ int32、収まらなければ浮動小数）
+    df = pd.DataFrame({"Close": [100.0, 250.0], "ATR_5": [3.0, 4.0],
+                       "Open": np.array([100, 250], dtype=np.int64),
+                       "Volume": [1000.0, 2000.0]})
+    out = compact_dtypes(df)
+    assert out["Close"].dtype == out["ATR_5"].dtype == out["Open"].dtype == np.float32
+    assert out["Volume"].dtype == np.int32
+    assert compact_dtypes(pd.DataFrame({"Volume": [1.0, 3e9]}))["Volume"].dtype.kind == "f"
+
+
+def test_n_jobs_capped_by_budget():
+    from app.backtest.param_search import WORKER_MEM_FACTOR, _suggest_n_jobs
+    from app.core.config import load_config
+    from pathlib import Path
+    cfg = load_config(str(Path(__file__).parent.parent / "configs" / "config.yaml"))
+    cfg = cfg.model_copy(update={"BACKTEST_N_JOBS": 16, "MEMORY_BUDGET_MB": 1000})
+    assert _suggest_n_jobs(cfg, 1000 / WORKER_MEM_FACTOR / 4) == 4
+    assert _suggest_n_jobs(cfg, 10_000) == 1
+    assert _suggest_n_jobs(cfg) == 16
+
+
+def test_columns_codes_and_range(derived_csv):
+    logger = logging.getLogger("test_price_loader")
+    full = load_price_df("csv", logger, derived_csv)
+    days = sorted(full["Date"].unique())
+    codes = full["Code"].unique()[:3]
+    for compact in (False, True):
+        part = load_price_df("csv", logger, derived_csv, compact=compact, columns=["Close", "ATR_20"],
+                             codes=codes, start=days[5], end=days[9])
+        assert list(part.columns) == ["Date", "Code", "Close", "ATR_20"]
+        assert set(part["Code"]) == set(codes) and len(part) == 3 * 5
+        assert part["Date"].min() == days[5] and part["Date"].max() == days[9]
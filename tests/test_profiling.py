@@ -0,0 +1,72 @@
+import json
+import pandas as pd
+from app.core.profiling import Profiler, get_profiler, span, timed, cprofile
+
+
+def test_span_summary_and_json(tmp_path):
+    prof = Profiler()
+    for n in (10, 20):
+        with prof.span("stage", rows=n):
+            sum(range(10_000))
+    with prof.span("other"):
+        pass
+
+    s = prof.summary()
+    assert s["stage"]["count"] == 2 and s["stage"]["rows"] == 30
+    assert s["stage"]["wall"] >= s["stage"]["max_wall"] > 0
+    assert s["stage"]["peak_rss_mb"] is None or s["stage"]["peak_rss_mb"] > 0
+
+    path = prof.dump_json(tmp_path / "profile.json", command="test")
+    body = json.loads(path.read_text(encoding="utf-8"))
+    assert body["meta"] == {"command": "test"}
+    assert len(body["records"]) == 3 and set(body["summary"]) == {"stage", "other"}
+
+
+def test_global_profiler_is_opt_in():
+    prof = get_profiler()
+    prof.reset()
+    assert not prof.enabled
+
+    @timed("unit.off")
+    def _noop():
+        return [1, 2]
+
+    _noop()
+    with span("unit.off_span"):
+        pass
+    prof.merge([{"name": "worker", "wall": 0.1, "cpu": 0.1}])
+    assert prof.records() == []
+
+
+def test_timed_and_merge():
+    get_profiler().reset()
+    get_profiler().enable()
+
+    @timed("unit.frame")
+    def _frame():
+        return pd.DataFrame({"x": range(5)})
+
+    @timed("unit.token")
+    def _token():
+        return "abc"
+
+    _frame(), _token()
+
+    # 別プロセスの記録を取り込めること
+    worker = Profiler()
+    with worker.span("search.param_set", c=1.0):
+        pass
+    get_profiler().merge(worker.records())
+
+    s = get_profiler().summary()
+    assert s["unit.frame"]["rows"] == 5
+    assert s["unit.token"]["rows"] is None
+    assert s["search.param_set"]["count"] == 1
+    get_profiler().disable()
+
+
+def test_cprofile_dump(tmp_path):
+    out = tmp_path / "run.prof"
+    with cprofile(out), span("cprof"):
+        sorted(range(1000), reverse=True)
+    assert out.stat().st_size > 0
@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+import pytest
+from app.scoring.ranking import min_rank, top_k, top_k_batch
+
+
+def _scores(n, seed):
+    # 小数 1 桁に丸めて同点を多く含める
+    return np.round(np.random.default_rng(seed).normal(size=n), 1)
+
+
+@pytest.mark.parametrize("k", [1, 7, 40, 300, 1000])
+def test_top_k_matches_rank_nsmallest(k):
+    scores = _scores(300, 3)
+    df = pd.DataFrame({"Score": scores, "pos": np.arange(300)})
+    df["Rank"] = df["Score"].rank(method="min", ascending=False).astype(int)
+    expected = df.nsmallest(k, "Rank")
+
+    idx, rank = top_k(scores, k)
+    np.testing.assert_array_equal(idx, expected["pos"].to_numpy())
+    np.testing.assert_array_equal(rank, expected["Rank"].to_numpy())
+
+
+def test_top_k_empty():
+    idx, rank = top_k(np.array([]), 5)
+    assert len(idx) == len(rank) == 0
+
+
+def test_min_rank():
+    scores = _scores(50, 4)
+    scores[[3, 17]] = np.nan
+    expected = pd.Series(scores).rank(method="min", ascending=False).fillna(0).astype(int)
+    np.testing.assert_array_equal(min_rank(scores), expected.to_numpy())
+
+
+@pytest.mark.parametrize("k", [1, 5, 40, 60])
+def test_top_k_batch_matches_rows(k):
+    mat = np.stack([_scores(60, s) for s in range(12)])
+    mat[np.random.default_rng(5).random(mat.shape) < 0.2] = np.nan
+    mat[3, :] = np.nan                                    # 全欠損の行
+    mat[4, 10:] = np.nan                                  # 有効件数 < k の行
+
+    idx, rank, count = top_k_batch(mat, k)
+    for row, scores in enumerate(mat):
+        valid = np.flatnonzero(~np.isnan(scores))
+        n = min(k, len(valid))
+        assert count[row] == n
+        # 同点は位置が先（全件でも同じ規則）: (スコア降順, 位置) の先頭 n 件
+        order = valid[np.lexsort((valid, -scores[valid]))][:n]
+        np.testing.assert_array_equal(idx[row, :n], order)
+        np.testing.assert_array_equal(rank[row, :n], min_rank(scores)[order])
+        assert (idx[row, n:] == -1).all() and (rank[row, n:] == 0).all()
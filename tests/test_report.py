@@ -0,0 +1,36 @@
+import numpy as np
+import pandas as pd
+import pytest
+from app.backtest.report import render_report
+from app.backtest.result_store import SearchResults, save_results
+
+
+@pytest.fixture
+def store(tmp_path):
+    rng = np.random.default_rng(0)
+    params = pd.DataFrame([(a, 1.0, c, d, n) for a in (0.9, 1.1) for c in (1.0, 1.2)
+                           for d in (1.0, 1.4) for n in (10, 15)], columns=["a", "b", "c", "d", "TopN"])
+    runs = params.assign(stage="fine", sharpe=rng.normal(size=len(params)))
+    runs = runs.assign(sharpe_lo=runs["sharpe"] - 1, sharpe_hi=runs["sharpe"] + 1,
+                       best=np.arange(len(runs)) == 3)
+    runs.insert(0, "run_id", np.arange(len(runs)))
+    dates = pd.bdate_range("2024-01-01", periods=40, name="Date")
+    rets = pd.DataFrame(rng.normal(0, 0.01, (40, len(runs))), index=dates)
+    return save_results(tmp_path / "run", SearchResults(runs, rets))
+
+
+@pytest.mark.parametrize("n_jobs", [1, 2])
+def test_render_report(store, tmp_path, n_jobs):
+    paths = render_report(store, tmp_path / "out", n_jobs=n_jobs)
+    assert [p.name for p in paths] == ["equity_curve.png", "equity_top.png", "heatmap_cd.png",
+                                       "topn_sensitivity.png", "report.txt"]
+    assert all(p.stat().st_size > 0 for p in paths)
+    text = (tmp_path / "out" / "report.txt").read_text(encoding="utf-8")
+    assert "Best Params:" in text and "Runs: 16" in text
+
+
+def test_render_report_subset(store):
+    paths = render_report(store, charts=["heatmap"])
+    assert [p.name for p in paths] == ["heatmap_cd.png", "report.txt"]
+    with pytest.raises(ValueError):
+        render_report(store, charts=["pie"])
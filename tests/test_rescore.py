@@ -0,0 +1,49 @@
+import logging
+import numpy as np
+import pandas as pd
+import pytest
+from app.bench.run_bench import BenchContext
+from app.scoring.rescore import Rescorer
+from app.scoring.score_up import score_up
+
+logger = logging.getLogger("test_rescore")
+
+
+@pytest.fixture(scope="module")
+def ctx():
+    return BenchContext(300, 40, 0, logger)
+
+
+def _with_gap(df, gap):
+    latest = df[df["Date"] == df["Date"].max()].copy()
+    latest["NK225_gap"] = gap
+    return latest
+
+
+@pytest.mark.parametrize("params", [(1.0, 1.0, 1.0, 1.0), (1.0, 1.0, 0.5, 1.5)])
+def test_update_matches_score_up(ctx, params):
+    rescorer = Rescorer(ctx.derived, ctx.info, logger, params, top_n=20)
+    pd.testing.assert_frame_equal(rescorer.result, score_up(ctx.derived, ctx.info, logger, params, top_n=20))
+    for gap in [-0.05, -0.01, 0.0, 0.004, 0.03]:
+        expected = score_up(_with_gap(ctx.derived, gap), ctx.info, logger, params, top_n=20)
+        pd.testing.assert_frame_equal(rescorer.update(NK225_gap=gap), expected, check_exact=True)
+    # 全銘柄共通の乗数なので選び直しは起きない
+    assert rescorer.updates == 5 and rescorer.reranks == 0
+
+
+def test_update_reselects_when_scored_set_changes(ctx):
+    # ギャップ欠損では全銘柄が計算不能 → 値が入ったら選び直す
+    rescorer = Rescorer(_with_gap(ctx.derived, np.nan), ctx.info, logger)
+    assert rescorer.result.empty
+    expected = score_up(_with_gap(ctx.derived, 0.01), ctx.info, logger)
+    pd.testing.assert_frame_equal(rescorer.update(NK225_gap=0.01), expected)
+    assert rescorer.reranks == 1
+
+
+def test_rescorer_rejects_bad_market_inputs(ctx):
+    with pytest.raises(ValueError, match="未知の市場項"):
+        Rescorer(ctx.derived, ctx.info, logger).update(Topix_gap=0.01)
+    latest = _with_gap(ctx.derived, 0.0)
+    latest.iloc[0, latest.columns.get_loc("NK225_gap")] = 0.01
+    with pytest.raises(ValueError, match="一様"):
+        Rescorer(latest, ctx.info, logger)
@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+import pytest
+from app.backtest.result_store import (
+    SearchResults,
+    latest_store,
+    load_returns,
+    load_runs,
+    save_results,
+)
+
+
+def _results(n_runs=6, n_days=30):
+    rng = np.random.default_rng(0)
+    dates = pd.bdate_range("2024-01-01", periods=n_days, name="Date")
+    runs = pd.DataFrame({
+        "run_id": np.arange(n_runs),
+        "stage": ["coarse"] * 4 + ["fine"] * (n_runs - 4),
+        "c": np.repeat([1.0, 1.2, 1.4], 2)[:n_runs],
+        "TopN": np.tile([10, 15], n_runs)[:n_runs],
+        "sharpe": rng.normal(size=n_runs),
+        "best": np.arange(n_runs) == 5,
+    })
+    rets = pd.DataFrame(rng.normal(0, 0.01, (n_days, n_runs)), index=dates)
+    return SearchResults(runs, rets, rets.abs())
+
+
+@pytest.mark.parametrize("fmt", ["npz", "parquet"])
+def test_roundtrip(tmp_path, fmt):
+    if fmt == "parquet":
+        pytest.importorskip("pyarrow")
+    res = _results()
+    save_results(tmp_path / "run", res, fmt=fmt)
+    pd.testing.assert_frame_equal(load_runs(tmp_path / "run"), res.runs)
+
+    # 指定した組の列だけを読む
+    got = load_returns(tmp_path / "run", [5, 2])
+    np.testing.assert_array_equal(got.to_numpy(), res.returns[[5, 2]].to_numpy())
+    assert list(got.columns) == [5, 2] and (got.index == res.returns.index).all()
+    full = load_returns(tmp_path / "run", name="turnover")
+    np.testing.assert_array_equal(full.to_numpy(), res.turnover.to_numpy())
+
+
+def test_rejects_unaligned_runs(tmp_path):
+    res = _results()
+    res.returns.columns = res.returns.columns + 1
+    with pytest.raises(ValueError):
+        save_results(tmp_path, res)
+    with pytest.raises(ValueError):
+        save_results(tmp_path, _results(), fmt="hdf5")
+
+
+def test_latest_store(tmp_path):
+    assert latest_store(tmp_path) is None
+    for name in ["20240101_000000", "20240301_000000"]:
+        save_results(tmp_path / name, _results())
+    (tmp_path / "20240401_000000").mkdir()          # 保存途中（runs が無い）は除く
+    assert latest_store(tmp_path) == tmp_path / "20240301_000000"
+    with pytest.raises(FileNotFoundError):
+        load_runs(tmp_path / "20240401_000000")
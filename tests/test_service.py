@@ -0,0 +1,87 @@
+import logging
+import os
+import pandas as pd
+import pytest
+import requests
+from app.backtest.backtest_runner import run_backtest
+from app.backtest.execution import ExecutionConfig
+from app.backtest.metrics import calc_metrics
+from app.backtest.service import ScoringService, query
+from app.bench.run_bench import BenchContext
+from app.core.profiling import get_profiler
+from app.scoring.score_up import score_up
+
+logger = logging.getLogger("test_service")
+
+
+@pytest.fixture(scope="module")
+def ctx():
+    return BenchContext(200, 80, 0, logger)
+
+
+@pytest.fixture
+def service(ctx, tmp_path):
+    marker = tmp_path / "panel.csv"
+    marker.write_text("v1")
+    loads = []
+
+    def loader():
+        loads.append(1)
+        return ctx.derived, ctx.info
+
+    with ScoringService(logger, loader=loader, watch=[marker]) as svc:
+        yield svc, marker, loads
+
+
+def test_score_up_matches(ctx, service):
+    svc, _, _ = service
+    days = sorted(ctx.derived["Date"].unique())
+    got = query(svc.base_url, "/score_up", params="1,1,0.5,1.5", top_n=15, date=str(days[40].date()))
+    rows = ctx.derived[ctx.derived["Date"] == days[40]]
+    expected = score_up(rows, ctx.info, logger, (1, 1, 0.5, 1.5), top_n=15)
+    assert pd.DataFrame(got["picks"])["Code"].tolist() == expected["Code"].tolist()
+    assert pd.DataFrame(got["picks"])["Score_up"].tolist() == expected["Score_up"].tolist()
+    # 日付省略時は最新営業日
+    latest = query(svc.base_url, "/score_up")
+    assert latest["date"] == str(days[-1].date())
+    assert len(latest["picks"]) == len(score_up(ctx.derived, ctx.info, logger))
+
+
+def test_backtest_matches(ctx, service):
+    svc, _, _ = service
+    got = query(svc.base_url, "/backtest", params="1,1,1,1", top_n=10, horizon=30, cost=0.001,
+                block_limits=1, daily=1)
+    expected = run_backtest(ctx.derived, ctx.info, top_n=10, horizon=30,
+                            execution=ExecutionConfig(cost=0.001, block_limits=True))
+    assert got["days"] == len(expected) == 30
+    assert [d["Ret"] for d in got["daily"]] == expected["Ret"].tolist()
+    assert got["metrics"] == calc_metrics(expected["Ret"])
+
+
+def test_reload_on_change_and_errors(service):
+    svc, marker, loads = service
+    assert svc.reload() is False and len(loads) == 1          # 変更なし
+    marker.write_text("v2 (updated)")
+    os.utime(marker, ns=(0, 10**9))
+    assert svc.reload() is True and len(loads) == 2
+    assert requests.post(svc.base_url + "/reload").json()["reloads"] == 2
+
+    assert requests.get(svc.base_url + "/nope").status_code == 404
+    resp = requests.get(svc.base_url + "/score_up", params={"params": "1,1"})
+    assert resp.status_code == 400
+    assert requests.get(svc.base_url + "/score_up", params={"date": "1999-01-04"}).status_code == 400
+
+
+def test_requests_do_not_accumulate_profile(ctx):
+    prof = get_profiler()
+    prof.reset()
+    prof.enable()                                              # --profile serve 相当
+    try:
+        with ScoringService(logger, loader=lambda: (ctx.derived, ctx.info), watch=[]) as svc:
+            n = len(prof.records())
+            for _ in range(20):
+                query(svc.base_url, "/backtest", top_n=5, horizon=10)
+            assert len(prof.records()) == n
+    finally:
+        prof.disable()
+        prof.reset()
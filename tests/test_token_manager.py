@@ -0,0 +1,75 @@
+import logging
+import json
+import pytest
+from app.core.config import AppConfig
+import app.data.token_manager as tm
+from app.data.token_manager import TokenManager
+
+logger = logging.getLogger("test_token_manager")
+
+
+@pytest.fixture
+def config():
+    return AppConfig(**{
+        "logging": {"level": "INFO", "log_dir": "./logs", "format": "%(message)s"},
+        "jquants": {
+            "auth": {"email": "user@example.com", "password": "x"},
+            "endpoints": {k: "http://localhost/" + k for k in [
+                "token_auth_user", "token_auth_refresh", "trading_calendar", "daily_quotes",
+                "listed_info", "futures_prices", "weekly_margin_interest",
+                "short_selling_positions", "trades_spec",
+            ]},
+        },
+        "database": {"host": "localhost", "port": 5432, "name": "db", "user": "u", "password": ""},
+    })
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    # API 呼び出し回数を記録するモック
+    counter = {"refresh": 0, "id": 0}
+
+    def fake_refresh(cfg, lg):
+        counter["refresh"] += 1
+        return f"refresh-{counter['refresh']}"
+
+    def fake_id(cfg, refresh, lg):
+        counter["id"] += 1
+        return f"id-{counter['id']}"
+
+    monkeypatch.setattr(tm, "get_refresh_token", fake_refresh)
+    monkeypatch.setattr(tm, "get_id_token", fake_id)
+    return counter
+
+
+def test_no_network_until_token_needed(config, calls, tmp_path):
+    TokenManager(config, logger, tmp_path / "tokens.json")
+    assert calls == {"refresh": 0, "id": 0}
+
+
+def test_tokens_shared_through_cache_file(config, calls, tmp_path):
+    cache = tmp_path / "tokens.json"
+    assert TokenManager(config, logger, cache).get_id_token() == "id-1"
+    # 別プロセス相当の新インスタンスはキャッシュを再利用する
+    assert TokenManager(config, logger, cache).get_id_token() == "id-1"
+    assert calls == {"refresh": 1, "id": 1}
+
+
+def test_expired_id_token_uses_cached_refresh_token(config, calls, tmp_path):
+    cache = tmp_path / "tokens.json"
+    TokenManager(config, logger, cache).get_id_token()
+
+    data = json.loads(cache.read_text())
+    data["id_expires"] = 0
+    cache.write_text(json.dumps(data))
+
+    assert TokenManager(config, logger, cache).get_id_token() == "id-2"
+    assert calls == {"refresh": 1, "id": 2}
+
+
+def test_invalidate_forces_new_id_token(config, calls, tmp_path):
+    tokens = TokenManager(config, logger, tmp_path / "tokens.json")
+    tokens.get_id_token()
+    tokens.invalidate()
+    assert tokens.get_id_token() == "id-2"
+    assert not (tmp_path / "tokens.json.lock").exists()
@@ -0,0 +1,73 @@
+from datetime import date
+from pathlib import Path
+import numpy as np
+import pandas as pd
+import pytest
+import app.data.trading_calendar as trading_calendar
+from app.bench.mock_jquants import ENDPOINT_PATHS, MockJQuantsServer
+from app.core.config import load_config
+from app.core.logger import setup_logger
+from app.data.trading_calendar import TradingCalendar, load_trading_calendar
+from app.data.trading_days_fetcher import get_latest_trading_days, get_next_trading_day
+
+CONFIG_PATH = Path(__file__).parent.parent / "configs" / "config.yaml"
+
+
+def test_calendar_queries_match_scan():
+    days = pd.bdate_range("2024-01-01", "2024-06-28").drop(pd.to_datetime(["2024-02-12", "2024-05-03"]))
+    cal = TradingCalendar(days.strftime("%Y-%m-%d")[::-1])            # 順不同でもよい
+    listed = [d.date() for d in days]
+    queries = pd.date_range("2023-12-25", "2024-07-05").date
+
+    for k in (-3, -1, 0, 1, 2):
+        got = cal.offset(np.array(queries, dtype="datetime64[D]"), k)
+        for q, g in zip(queries, got):
+            after = [d for d in listed if d > q]
+            before = [d for d in listed if d < q]
+            if k > 0:
+                expected = after[k - 1] if len(after) >= k else None
+            elif k < 0:
+                expected = before[k] if len(before) >= -k else None
+            else:
+                expected = ([q] if q in listed else after[:1] or [None])[0]
+            assert (None if np.isnat(g) else g.astype(date)) == expected
+            assert cal.offset(q, k) == expected                       # スカラーは date / None
+
+    assert cal.prev(date(2024, 2, 13)) == date(2024, 2, 9)            # 祝日をまたぐ
+    assert cal.next("2024-05-02") == date(2024, 5, 6)
+    assert cal.is_trading_day(["2024-02-12", "2024-02-13"]).tolist() == [False, True]
+    assert list(cal.range("2024-02-09", "2024-02-14").astype(str)) == ["2024-02-09", "2024-02-13", "2024-02-14"]
+    assert list(cal.latest(2, before=date(2024, 2, 13)).astype(str)) == ["2024-02-08", "2024-02-09"]
+
+
+@pytest.fixture
+def env(tmp_path, monkeypatch):
+    monkeypatch.setattr(trading_calendar, "_loaded", {})
+    monkeypatch.setattr(trading_calendar, "CALENDAR_CACHE", tmp_path / "calendar.json")
+    cfg = load_config(str(CONFIG_PATH))
+    with MockJQuantsServer(n_codes=20, n_days=15) as srv:
+        cfg = srv.config(cfg)
+        yield srv, cfg, setup_logger(cfg.logging), tmp_path / "calendar.json"
+
+
+def test_calendar_is_cached(env):
+    srv, cfg, logger, path = env
+
+    def fetches():
+        return srv.stats()["paths"].get(ENDPOINT_PATHS["trading_calendar"], 0)
+
+    assert get_latest_trading_days(cfg, srv.id_token, logger, 6) == srv.dates[-6:]
+    assert get_next_trading_day(cfg, srv.id_token, logger, date.fromisoformat(srv.dates[-1])) > \
+        date.fromisoformat(srv.dates[-1])
+    assert fetches() == 1 and path.exists()
+
+    trading_calendar._loaded.clear()                                  # 別プロセス相当: ファイルから読む
+    cal = load_trading_calendar(cfg, lambda: srv.id_token, logger)
+    assert fetches() == 1 and cal.latest(3).astype(str).tolist() == srv.dates[-3:]
+
+    load_trading_calendar(cfg, lambda: srv.id_token, logger, max_age_days=0)   # 期限切れ
+    assert fetches() == 2
+    other = cfg.model_copy(deep=True)
+    other.jquants.endpoints.trading_calendar = srv.base_url + "/v1/markets/trading_calendar?x=1"
+    load_trading_calendar(other, lambda: srv.id_token, logger)                 # 取得元が違う
+    assert fetches() == 3